@@ -0,0 +1,448 @@
+"""
+AI Worker Processes for Legend of the Obsidian Vault
+Runs an AI provider in separate processes, so model inference never competes
+with the API process for its GIL. Requests carry IDs and deadlines; a worker
+that crashes or hangs is replaced.
+"""
+import importlib
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Connection, wait
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+CANCEL_GRACE = 3.0  # Seconds a worker gets to stop after a cancel/timeout before it is killed
+MAX_START_FAILURES = 3  # Consecutive failed starts after which a worker slot gives up
+RESTART_DELAY = 1.0  # Seconds between restarts of a crashed worker
+
+
+class AIWorkerError(RuntimeError):
+    """A request failed in (or with) its worker process"""
+
+
+class AIWorkerCrashed(AIWorkerError):
+    """The worker process died while running the request"""
+
+
+class AIWorkerTimeout(AIWorkerError, TimeoutError):
+    """The request was not finished by its deadline"""
+
+
+class AIWorkerCancelled(AIWorkerError):
+    """The request was cancelled by its caller"""
+
+
+# =============================================================================
+# Worker process
+# =============================================================================
+
+def _worker_main(conn: Connection, factory: str, methods: Tuple[str, ...]):
+    """Entry point of a worker process: build the target, report readiness, then serve calls.
+
+    Messages in: ("call", request_id, method, args), ("cancel", request_id), or None to stop.
+    Messages out: ("ready", ok, info), ("result", request_id, ok, value or error, error type).
+    """
+    # Imported here: the worker is what needs the AI stack, the API process side of this module does not
+    from brainbot import AICancelled, CancelToken, cancel_scope
+
+    module_name, _, attribute = factory.partition(":")
+    target = getattr(importlib.import_module(module_name), attribute)()
+    try:
+        ok = bool(target.initialize())
+        info = {"cache_identity": tuple(target.cache_identity), "provider_name": target.provider_name}
+    except Exception as e:
+        ok, info = False, {"error": repr(e)}
+    conn.send(("ready", ok, info))
+    if not ok:
+        return
+
+    calls: "Deque[Tuple[int, str, tuple]]" = deque()
+    arrived = threading.Condition()
+    current: Dict[str, Any] = {"id": None, "token": None}
+    stopping = threading.Event()
+
+    def read():
+        # Cancels must be seen while the main thread is busy generating
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = None
+            with arrived:
+                if message is None:
+                    stopping.set()
+                elif message[0] == "cancel":
+                    if current["id"] == message[1]:
+                        current["token"].cancel()
+                    else:
+                        for call in list(calls):
+                            if call[0] == message[1]:
+                                calls.remove(call)
+                else:
+                    calls.append(message[1:])
+                arrived.notify()
+            if message is None:
+                return
+
+    threading.Thread(target=read, daemon=True, name="ai-worker-reader").start()
+    while True:
+        with arrived:
+            while not calls and not stopping.is_set():
+                arrived.wait()
+            if stopping.is_set():
+                return
+            request_id, method, args = calls.popleft()
+            token = CancelToken()
+            current.update(id=request_id, token=token)
+        try:
+            if method not in methods:
+                raise AttributeError(f"method '{method}' is not served by this worker")
+            with cancel_scope(token):
+                reply = ("result", request_id, True, getattr(target, method)(*args), None)
+        except AICancelled as e:
+            reply = ("result", request_id, False, str(e), "cancelled")
+        except Exception as e:
+            reply = ("result", request_id, False, repr(e), type(e).__name__)
+        with arrived:
+            current.update(id=None, token=None)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Unpicklable result - report it instead of losing the request
+            conn.send(("result", request_id, False, f"result could not be sent: {e!r}", type(e).__name__))
+
+
+# =============================================================================
+# Pool (API process side)
+# =============================================================================
+
+class _Request:
+    __slots__ = ("id", "method", "args", "future", "deadline", "kill_at", "timed_out")
+
+    def __init__(self, request_id: int, method: str, args: tuple, deadline: float):
+        self.id = request_id
+        self.method = method
+        self.args = args
+        self.future: Future = Future()
+        self.deadline = deadline
+        self.kill_at: Optional[float] = None  # Set once a cancel has been sent to the worker
+        self.timed_out = False
+
+
+class _Worker:
+    __slots__ = ("slot", "process", "conn", "ready", "request", "failures", "restart_at")
+
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.process = None
+        self.conn: Optional[Connection] = None
+        self.ready = False
+        self.request: Optional[_Request] = None
+        self.failures = 0  # Consecutive starts that never became ready
+        self.restart_at = 0.0
+
+
+class AIWorkerPool:
+    """Worker processes that each build `factory` ("module:attribute") and serve calls to it.
+
+    One request runs per worker at a time; the rest wait in FIFO order. A
+    monitor thread dispatches requests, collects results, enforces deadlines
+    and restarts workers that die (failing their request with AIWorkerCrashed).
+    """
+
+    def __init__(self, factory: str, methods: Tuple[str, ...], size: int = 1, timeout: float = 120.0):
+        self.factory = factory
+        self.methods = tuple(methods)
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")  # Forking a threaded process is unsafe
+        self._workers = [_Worker(slot) for slot in range(self.size)]
+        self._pending: Deque[_Request] = deque()
+        self._requests: Dict[int, _Request] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake_recv, self._wake_send = multiprocessing.Pipe(duplex=False)
+        self._ready = threading.Condition(self._lock)
+        self._info: Optional[Dict[str, Any]] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._closed = False
+        self.counts = {"completed": 0, "failed": 0, "timeouts": 0, "cancelled": 0, "crashes": 0, "restarts": 0}
+
+    # -- Lifecycle --
+
+    def start(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Start the workers and wait for the first to be ready.
+
+        Returns what it reported about its target (cache_identity, provider_name),
+        or None if no worker came up.
+        """
+        with self._lock:
+            if self._monitor is None:
+                for worker in self._workers:
+                    self._spawn(worker)
+                self._monitor = threading.Thread(target=self._run, daemon=True, name="ai-worker-monitor")
+                self._monitor.start()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._info is None and not self._closed and any(
+                    w.failures < MAX_START_FAILURES for w in self._workers):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._ready.wait(remaining if remaining is not None else 1.0)
+            return self._info
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._context.Pipe()
+        worker.process = self._context.Process(target=_worker_main, args=(child_conn, self.factory, self.methods),
+                                               daemon=True, name=f"ai-worker-{worker.slot}")
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.ready = False
+        worker.request = None
+
+    def available(self) -> bool:
+        with self._lock:
+            return any(worker.ready for worker in self._workers)
+
+    def close(self):
+        """Stop every worker; requests still waiting fail with AIWorkerCancelled"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            waiting = list(self._requests.values())
+            self._requests.clear()
+            self._pending.clear()
+            self._ready.notify_all()
+        self._wake()
+        if self._monitor is not None:
+            self._monitor.join(timeout=2)
+        for request in waiting:
+            self._finish(request, error=AIWorkerCancelled("worker pool closed"))
+        for worker in self._workers:
+            self._stop(worker)
+
+    def _stop(self, worker: _Worker):
+        if worker.process is None:
+            return
+        try:
+            worker.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        worker.process.join(timeout=2)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join(timeout=2)
+        worker.conn.close()
+        worker.process = None
+        worker.ready = False
+
+    # -- Requests --
+
+    def submit(self, method: str, args: tuple = (), timeout: Optional[float] = None) -> Tuple[int, Future]:
+        """Queue a call. Returns its request ID (for cancel()) and a Future with its result."""
+        request = _Request(next(self._ids), method, tuple(args), time.monotonic() + (timeout or self.timeout))
+        with self._lock:
+            if self._closed:
+                raise AIWorkerError("worker pool is closed")
+            self._requests[request.id] = request
+            self._pending.append(request)
+        self._wake()
+        return request.id, request.future
+
+    def call(self, method: str, *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run a call and wait for its result. Raises AIWorkerError subclasses on failure."""
+        _, future = self.submit(method, args, timeout)
+        return future.result()
+
+    def cancel(self, request_id: int):
+        """Drop a waiting request, or ask the worker running it to stop (killing it if it does not)"""
+        with self._lock:
+            request = self._requests.get(request_id)
+            if request is None:
+                return
+            if request in self._pending:
+                self._pending.remove(request)
+                del self._requests[request_id]
+            else:
+                self._signal_cancel(request)  # Its reply still frees the worker
+        # The caller stops waiting now, not when the worker gets round to stopping
+        self._finish(request, error=AIWorkerCancelled("AI request cancelled"), outcome="cancelled")
+        self._wake()
+
+    def _signal_cancel(self, request: _Request):
+        """Tell the worker running request to stop; called with the lock held"""
+        if request.kill_at is not None:
+            return
+        request.kill_at = time.monotonic() + CANCEL_GRACE
+        for worker in self._workers:
+            if worker.request is request:
+                try:
+                    worker.conn.send(("cancel", request.id))
+                except (OSError, ValueError):
+                    pass
+
+    def _finish(self, request: _Request, value: Any = None, error: Optional[Exception] = None,
+                outcome: Optional[str] = None):
+        if request.future.done():
+            return  # Already failed for its caller (cancelled); this is the worker catching up
+        with self._lock:
+            self.counts[outcome or ("failed" if error else "completed")] += 1
+        if error is not None:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(value)
+
+    def _wake(self):
+        try:
+            self._wake_send.send(None)
+        except (OSError, ValueError):
+            pass
+
+    # -- Monitor --
+
+    def _run(self):
+        while not self._closed:
+            self._dispatch()
+            waitables: List[Any] = [self._wake_recv]
+            with self._lock:
+                for worker in self._workers:
+                    if worker.process is not None:
+                        waitables += [worker.conn, worker.process.sentinel]
+            for ready in wait(waitables, timeout=0.25):
+                if ready is self._wake_recv:
+                    while self._wake_recv.poll():
+                        self._wake_recv.recv()
+                    continue
+                worker = next((w for w in self._workers if w.process is not None and
+                               ready in (w.conn, w.process.sentinel)), None)
+                if worker is None:
+                    continue
+                if ready is worker.conn:
+                    try:
+                        self._receive(worker, worker.conn.recv())
+                    except (EOFError, OSError):
+                        self._crashed(worker)
+                elif not worker.process.is_alive():
+                    self._crashed(worker)
+            self._enforce_deadlines()
+            self._restart_due()
+
+    def _dispatch(self):
+        with self._lock:
+            for worker in self._workers:
+                if not self._pending:
+                    return
+                if worker.ready and worker.request is None:
+                    request = self._pending.popleft()
+                    try:
+                        worker.conn.send(("call", request.id, request.method, request.args))
+                        worker.request = request
+                    except (OSError, ValueError):
+                        self._pending.appendleft(request)  # Dead worker - its sentinel will say so
+
+    def _receive(self, worker: _Worker, message: tuple):
+        if message[0] == "ready":
+            _, ok, info = message
+            with self._lock:
+                if ok:
+                    worker.ready = True
+                    worker.failures = 0
+                    if self._info is None:
+                        self._info = info
+                    self._ready.notify_all()
+                else:
+                    # The process exits next; its sentinel counts the failed start
+                    print(f"⚠️ AI worker {worker.slot} failed to start: {info.get('error', 'not available')}")
+            return
+
+        _, request_id, ok, value, error_type = message
+        with self._lock:
+            request = self._requests.pop(request_id, None)
+            if worker.request is not None and worker.request.id == request_id:
+                worker.request = None
+        if request is None:
+            return  # Timed out or cancelled already
+        if ok:
+            self._finish(request, value)
+        elif error_type == "cancelled" and request.timed_out:
+            self._finish(request, error=AIWorkerTimeout(f"{request.method} did not finish by its deadline"),
+                         outcome="timeouts")
+        elif error_type == "cancelled":
+            self._finish(request, error=AIWorkerCancelled(value), outcome="cancelled")
+        else:
+            self._finish(request, error=AIWorkerError(f"{request.method} failed in worker: {value}"))
+
+    def _crashed(self, worker: _Worker, error: Optional[AIWorkerError] = None):
+        """Fail the worker's request and schedule a fresh process in its slot"""
+        with self._lock:
+            request, worker.request = worker.request, None
+            if request is not None:
+                self._requests.pop(request.id, None)
+            if not worker.ready:
+                worker.failures += 1
+            worker.ready = False
+            if error is None:
+                self.counts["crashes"] += 1
+            worker.restart_at = time.monotonic() + RESTART_DELAY
+            self._ready.notify_all()
+        if worker.process is not None:
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.process.join(timeout=2)
+            worker.conn.close()
+            worker.process = None
+        if error is None:
+            print(f"💥 AI worker {worker.slot} died - restarting")
+        if request is not None:
+            self._finish(request, error=error or AIWorkerCrashed(f"worker died during {request.method}"),
+                         outcome="timeouts" if isinstance(error, AIWorkerTimeout) else None)
+
+    def _enforce_deadlines(self):
+        now = time.monotonic()
+        expired: List[_Request] = []
+        hung: List[Tuple[_Worker, _Request]] = []
+        with self._lock:
+            for request in list(self._pending):
+                if request.deadline <= now:
+                    self._pending.remove(request)
+                    self._requests.pop(request.id, None)
+                    expired.append(request)
+            for worker in self._workers:
+                request = worker.request
+                if request is None:
+                    continue
+                if request.kill_at is not None and request.kill_at <= now:
+                    hung.append((worker, request))
+                elif request.deadline <= now and request.kill_at is None:
+                    request.timed_out = True
+                    self._signal_cancel(request)  # Let it stop cleanly (keeping its model loaded) first
+        for request in expired:
+            self._finish(request, error=AIWorkerTimeout(f"{request.method} still queued at its deadline"),
+                         outcome="timeouts")
+        for worker, request in hung:
+            print(f"🔥 AI worker {worker.slot} did not stop {request.method} - killing it")
+            self._crashed(worker, AIWorkerTimeout(f"{request.method} did not finish by its deadline"))
+
+    def _restart_due(self):
+        now = time.monotonic()
+        for worker in self._workers:
+            if worker.process is None and not self._closed and worker.failures < MAX_START_FAILURES \
+                    and worker.restart_at <= now:
+                with self._lock:
+                    self.counts["restarts"] += 1
+                    self._spawn(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.size,
+                "ready": sum(worker.ready for worker in self._workers),
+                "busy": sum(worker.request is not None for worker in self._workers),
+                "queued": len(self._pending),
+                **self.counts,
+            }
@@ -45,6 +45,14 @@ def startup() -> None:
     thread.start()
 
 
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    from brainbot import ai_provider_manager
+    from quiz_bank import quiz_bank
+    quiz_bank.flush()  # Questions drawn in the last few seconds
+    await ai_provider_manager.aclose()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("backend.main:app", host="127.0.0.1", port=8742, reload=True)
@@ -14,6 +14,10 @@ class QuizAnswerRequest(BaseModel):
     selected_index: int
 
 
+class EnemyWaveRequest(BaseModel):
+    count: int = 3
+
+
 class BankTransactionRequest(BaseModel):
     amount: int
 
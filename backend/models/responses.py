@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Any, Dict, Optional
 from pydantic import BaseModel
 
 
@@ -93,6 +93,10 @@ class EnemyResponse(BaseModel):
     victory_message: str
 
 
+class EnemyWaveResponse(BaseModel):
+    enemies: list[EnemyResponse]
+
+
 class CombatStateResponse(BaseModel):
     enemy: EnemyResponse
     player: CharacterResponse
@@ -292,6 +296,13 @@ class AIStatusResponse(BaseModel):
     provider: str
     available: bool
     status: str
+    health: Dict[str, Dict[str, Any]] = {}
+    scheduler: Dict[str, Dict[str, Any]] = {}
+    structured_output: Dict[str, Dict[str, Any]] = {}
+    prompt_templates: Dict[str, str] = {}
+    prefix_cache: Dict[str, Any] = {}
+    embeddings: Dict[str, Any] = {}
+    workers: Dict[str, Dict[str, Any]] = {}
 
 
 class MessageResponse(BaseModel):
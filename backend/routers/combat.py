@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import json
+from typing import AsyncIterator
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
-from backend.models.requests import QuizAnswerRequest
+from backend.models.requests import QuizAnswerRequest, EnemyWaveRequest
 from backend.models.responses import (
     CombatStateResponse, AttackResultResponse, HealResultResponse,
     FleeResultResponse, QuizQuestionResponse, QuizResultResponse,
-    EnemyResponse, RewardsResponse,
+    EnemyResponse, EnemyWaveResponse, RewardsResponse,
 )
 from backend.routers.character import _player_to_response
 from backend.services.game_service import session
@@ -17,6 +21,9 @@ router = APIRouter(prefix="/api/combat", tags=["combat"])
 # In-memory combat state (single-player, one fight at a time)
 _current_combat: CombatState | None = None
 
+# Upper bound on enemies per /wave request
+MAX_WAVE_SIZE = 10
+
 
 def _require_combat() -> CombatState:
     if _current_combat is None:
@@ -74,22 +81,47 @@ def _rewards_response(rewards: dict | None) -> RewardsResponse | None:
     )
 
 
+def _sse(events: AsyncIterator[tuple[str, dict]]) -> StreamingResponse:
+    async def body():
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _abandon_current_combat() -> None:
+    # A new encounter replaces the old one; its AI work is no longer wanted
+    if _current_combat is not None:
+        combat_service.cancel_ai_work(_current_combat)
+
+
 @router.post("/enter-forest")
-def enter_forest() -> CombatStateResponse:
+async def enter_forest(defer_narrative: bool = False) -> CombatStateResponse:
     global _current_combat
     player = session.require_player()
     if player.forest_fights <= 0:
         raise HTTPException(400, "No forest fights remaining")
-    _current_combat = combat_service.enter_forest(player)
+    _abandon_current_combat()
+    _current_combat = await combat_service.aenter_forest(player, defer_narrative=defer_narrative)
     return _combat_state_response(_current_combat)
 
 
+@router.post("/wave")
+def enemy_wave(req: EnemyWaveRequest) -> EnemyWaveResponse:
+    player = session.require_player()
+    if not 1 <= req.count <= MAX_WAVE_SIZE:
+        raise HTTPException(400, f"Wave size must be between 1 and {MAX_WAVE_SIZE}")
+    enemies = combat_service.generate_wave(player, req.count)
+    return EnemyWaveResponse(enemies=[_enemy_response(e) for e in enemies])
+
+
 @router.post("/master-fight/{level}")
 def start_master_fight(level: int) -> CombatStateResponse:
     global _current_combat
     player = session.require_player()
     if not player.can_challenge_master():
         raise HTTPException(400, "Cannot challenge master")
+    _abandon_current_combat()
     _current_combat = combat_service.start_master_fight(player, level)
     return _combat_state_response(_current_combat)
 
@@ -157,14 +189,26 @@ def run_away() -> FleeResultResponse:
 
 
 @router.post("/quiz/start")
-def quiz_start() -> QuizQuestionResponse:
+async def quiz_start() -> QuizQuestionResponse:
     state = _require_combat()
-    result = combat_service.quiz_start(state)
+    result = await combat_service.aquiz_start(state)
     if "error" in result:
         raise HTTPException(400, result["error"])
     return QuizQuestionResponse(**result)
 
 
+@router.get("/stream/narrative")
+async def stream_narrative() -> StreamingResponse:
+    state = _require_combat()
+    return _sse(combat_service.astream_narrative(state))
+
+
+@router.get("/stream/quiz")
+async def stream_quiz() -> StreamingResponse:
+    state = _require_combat()
+    return _sse(combat_service.astream_quiz(state))
+
+
 @router.post("/quiz/answer")
 def quiz_answer(req: QuizAnswerRequest) -> QuizResultResponse:
     state = _require_combat()
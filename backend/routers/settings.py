@@ -74,4 +74,11 @@ def ai_status() -> AIStatusResponse:
         provider=get_current_provider_name(),
         available=is_ai_available(wait_timeout=0.5),
         status=ai_provider_manager.initialization_status,
+        health=ai_provider_manager.provider_health(),
+        scheduler=ai_provider_manager.scheduler_stats(),
+        structured_output=ai_provider_manager.structured_output_stats(),
+        prompt_templates=ai_provider_manager.prompt_template_versions(),
+        prefix_cache=ai_provider_manager.prefix_cache_stats(),
+        embeddings=ai_provider_manager.embedding_stats(),
+        workers=ai_provider_manager.ai_worker_stats(),
     )
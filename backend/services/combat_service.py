@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import random
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 import sys
 from pathlib import Path
@@ -13,10 +15,17 @@ if _project_root not in sys.path:
 
 from game_data import (
     Character, Enemy, CLASS_TYPES, FOREST_ENEMIES,
-    can_level_up, create_master_enemy, MASTERS,
+    can_level_up, create_master_enemy, MASTERS, game_settings,
 )
 from obsidian import vault
-from brainbot import sync_generate_quiz_question
+from brainbot import (
+    AIPriority, CancelToken, fallback_quiz_question, promote_ai_requests, sync_generate_quiz_question,
+    async_stream_enemy_narrative, async_stream_quiz_question,
+)
+from quiz_bank import quiz_bank
+
+# Quizzes prepared while the player is still deciding what to do
+_speculation_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="quiz-speculate")
 
 
 @dataclass
@@ -31,18 +40,65 @@ class CombatState:
     log: list[str] = field(default_factory=list)
     # Stored quiz so answer validates against the same question that was served
     pending_quiz: Optional[dict] = None
+    # Enemy has template lore; the AI narrative is delivered via the stream endpoint
+    narrative_pending: bool = False
+    # Quiz being generated since the encounter started (only when the note's bank is empty)
+    quiz_future: Optional[Future] = None
+    # Stops (or promotes) that background generation
+    quiz_cancel: Optional[CancelToken] = None
+    # Fired when the encounter ends so in-flight AI work for it stops
+    cancel: CancelToken = field(default_factory=CancelToken)
 
 
 class CombatService:
     """Stateless combat logic extracted from CombatScreen."""
 
-    def enter_forest(self, player: Character) -> CombatState:
-        """Generate an enemy and create a new combat state."""
-        enemy = vault.get_enemy_for_level(player.level)
+    def enter_forest(self, player: Character, defer_narrative: bool = False) -> CombatState:
+        """Generate an enemy and create a new combat state.
+
+        With defer_narrative the enemy is built from templates immediately and the
+        AI narrative is streamed afterwards by astream_narrative.
+        """
+        enemy = vault.get_enemy_for_level(player.level, use_ai=not defer_narrative)
+        state = CombatState(enemy=enemy, narrative_pending=defer_narrative)
+        state.log.append(f"You encounter {enemy.name}!")
+        self._speculate_quiz(state)
+        return state
+
+    async def aenter_forest(self, player: Character, defer_narrative: bool = False) -> CombatState:
+        """Async enter_forest: enemy generation awaits the AI provider."""
+        if defer_narrative:
+            return self.enter_forest(player, defer_narrative=True)
+        enemy = await vault.aget_enemy_for_level(player.level)
         state = CombatState(enemy=enemy)
         state.log.append(f"You encounter {enemy.name}!")
+        self._speculate_quiz(state)
         return state
 
+    async def astream_narrative(self, state: CombatState) -> AsyncIterator[tuple[str, dict]]:
+        """Yield ("token", {...}) events as the encounter narrative streams in, then ("done", {...})."""
+        enemy = state.enemy
+        if state.narrative_pending and enemy.note_title:
+            state.narrative_pending = False
+            chunks = []
+            async for chunk in async_stream_enemy_narrative(enemy.note_title, enemy.note_content, enemy.name,
+                                                            cancel=state.cancel):
+                chunks.append(chunk)
+                yield "token", {"text": chunk}
+            narrative = "".join(chunks).strip()
+            if narrative:
+                enemy.encounter_narrative = narrative
+            else:
+                # AI unavailable - the template narrative stands
+                yield "token", {"text": enemy.encounter_narrative}
+        else:
+            yield "token", {"text": enemy.encounter_narrative}
+        yield "done", {"encounter_narrative": enemy.encounter_narrative}
+
+    def generate_wave(self, player: Character, count: int) -> list[Enemy]:
+        """Generate a wave of enemies from distinct notes for the player's level."""
+        return vault.get_enemy_wave(player.level, count)
+
     def start_master_fight(self, player: Character, level: int) -> CombatState:
         """Start a master challenge fight."""
         master_data = MASTERS.get(level)
@@ -182,12 +238,63 @@ class CombatService:
         }
 
     def quiz_start(self, state: CombatState) -> dict:
-        """Generate a quiz question for the current enemy and store it in state."""
+        """Serve a quiz question for the current enemy and store it in state.
+
+        A quiz speculated since the encounter started is used if it is ready;
+        otherwise the question comes from the note's quiz bank. If the bank is
+        empty while the speculative quiz is still being prepared, that request
+        is promoted to interactive priority (if it is still queued) and awaited.
+        A regex-generated question is the last resort.
+        """
         enemy = state.enemy
         if not enemy.note_title or not enemy.note_content:
             return {"error": "No knowledge to test with this enemy"}
 
-        quiz = sync_generate_quiz_question(enemy.note_title, enemy.note_content)
+        quiz = self._speculated_quiz(state)
+        if quiz is None:
+            quiz = quiz_bank.draw(enemy.note_title, enemy.note_content)
+        if quiz is None:
+            quiz = self._await_speculation(state)
+        self._drop_speculation(state)
+        quiz = quiz or fallback_quiz_question(enemy.note_title, enemy.note_content)
+        return self._store_quiz(state, quiz)
+
+    async def aquiz_start(self, state: CombatState) -> dict:
+        """Async quiz_start: waiting for the quiz happens off the event loop."""
+        enemy = state.enemy
+        if not enemy.note_title or not enemy.note_content:
+            return {"error": "No knowledge to test with this enemy"}
+
+        return await asyncio.to_thread(self.quiz_start, state)
+
+    async def astream_quiz(self, state: CombatState) -> AsyncIterator[tuple[str, dict]]:
+        """Yield ("question", {...}) as soon as the question text is parsed, then ("quiz", {...})."""
+        enemy = state.enemy
+        if not enemy.note_title or not enemy.note_content:
+            yield "error", {"error": "No knowledge to test with this enemy"}
+            return
+
+        quiz = self._speculated_quiz(state)
+        if quiz is None:
+            quiz = await asyncio.to_thread(quiz_bank.draw, enemy.note_title, enemy.note_content)
+        if quiz is None and state.quiz_future is not None:
+            # Already being generated: wait for it rather than generating it twice
+            quiz = (await asyncio.to_thread(self._await_speculation, state)
+                    or fallback_quiz_question(enemy.note_title, enemy.note_content))
+        self._drop_speculation(state)
+        if quiz is not None:
+            yield "question", {"question": quiz.question}
+            yield "quiz", self._store_quiz(state, quiz)
+            return
+
+        # Bank not ready yet (it is refilling in the background) - stream a live question
+        async for event in async_stream_quiz_question(enemy.note_title, enemy.note_content, cancel=state.cancel):
+            if event.get("field") == "QUESTION":
+                yield "question", {"question": event["value"]}
+            elif "quiz" in event:
+                yield "quiz", self._store_quiz(state, event["quiz"])
+
+    def _store_quiz(self, state: CombatState, quiz) -> dict:
         # Store the quiz so quiz_answer validates against the same question
         state.pending_quiz = {
             "question": quiz.question,
@@ -255,12 +362,77 @@ class CombatService:
     def flee(self, state: CombatState) -> dict:
         """Player flees combat."""
         state.combat_active = False
+        self.cancel_ai_work(state)
         msg = f"You run away from {state.enemy.name}!"
         state.log.append(msg)
         return {"success": True, "message": msg}
 
+    def cancel_ai_work(self, state: CombatState) -> None:
+        """Stop AI work for an encounter that is over or abandoned.
+
+        Queued requests leave their provider queues, running ones are aborted
+        where the provider allows it, and streams stop at their next chunk.
+        """
+        state.cancel.cancel()
+        self._drop_speculation(state)
+
     # -- Private helpers --
 
+    def _speculate_quiz(self, state: CombatState) -> None:
+        """Start generating the encounter's quiz if the note's bank has none to serve.
+
+        The bank is only peeked at: a question is drawn when the player asks for it.
+        """
+        enemy = state.enemy
+        if not enemy.note_title or not enemy.note_content:
+            return
+        if quiz_bank.has_questions(enemy.note_title, enemy.note_content):
+            return
+        state.quiz_cancel = CancelToken()
+        state.quiz_future = _speculation_pool.submit(
+            self._prepare_quiz, enemy.note_title, enemy.note_content, state.quiz_cancel)
+
+    def _prepare_quiz(self, note_title: str, note_content: str, cancel: CancelToken):
+        # Start refilling the bank too, then generate one question behind interactive AI requests
+        quiz_bank.ensure(note_title, note_content)
+        return sync_generate_quiz_question(note_title, note_content, priority=AIPriority.PREFETCH, cancel=cancel)
+
+    def _speculated_quiz(self, state: CombatState):
+        """The speculative quiz if it has finished, else None (never waits)"""
+        future = state.quiz_future
+        if future is None or not future.done() or future.cancelled():
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"⚠️ Speculative quiz unavailable: {e!r}")
+            return None
+
+    def _await_speculation(self, state: CombatState):
+        """Wait for the speculative quiz now that the player needs it, or None without one.
+
+        A request still queued behind background work moves up to interactive
+        priority; one already generating is left to finish. The wait is bounded
+        by ai_interactive_timeout.
+        """
+        future = state.quiz_future
+        if future is None:
+            return None
+        promote_ai_requests(state.quiz_cancel)
+        try:
+            return future.result(timeout=game_settings.ai_interactive_timeout)
+        except Exception as e:
+            print(f"⚠️ Speculative quiz unavailable: {e!r}")
+            return None
+
+    def _drop_speculation(self, state: CombatState) -> None:
+        """Cancel the speculative quiz (queued or generating) and forget it"""
+        if state.quiz_cancel is not None:
+            state.quiz_cancel.cancel()
+        if state.quiz_future is not None:
+            state.quiz_future.cancel()
+        state.quiz_future = state.quiz_cancel = None
+
     def _enemy_attack(self, player: Character, state: CombatState) -> tuple[int, bool, str]:
         """Enemy attacks player. Returns (damage, hit, message)."""
         strength = state.enemy.attack
@@ -282,6 +454,7 @@ class CombatService:
         """Handle victory. Returns rewards dict."""
         enemy = state.enemy
         state.combat_active = False
+        self.cancel_ai_work(state)
 
         rewards: dict = {
             "gold": enemy.gold_reward,
@@ -310,6 +483,7 @@ class CombatService:
     def _defeat(self, player: Character, state: CombatState) -> None:
         """Handle defeat."""
         state.combat_active = False
+        self.cancel_ai_work(state)
         player.hitpoints = 0
         player.alive = False
         player.gold = 0
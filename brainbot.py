@@ -2,15 +2,41 @@
 BrainBot AI Integration for Legend of the Obsidian Vault
 Multi-provider AI integration: TinyLlama (local), Claude CLI, Claude API
 """
+import asyncio
+import contextvars
+import gc
+import heapq
+import http.client
+import itertools
+import json
+import math
+import os
+import queue
 import re
 import random
+import socket
 import threading
 import time
 import subprocess
+import urllib.parse
+import zlib
 from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
+from enum import IntEnum
+
+from ai_worker import AIWorkerCancelled, AIWorkerError, AIWorkerPool
+from embedding_index import embedding_index
+from narrative_engine import narrative_engine, TemplateSlots
+from note_summary import SUMMARY_VERSION, note_summaries
+from prompt_builder import PROMPT_KIND_SCALE, ExactTokenCounter, TokenCounter, build_excerpt
+from prompt_templates import prompt_registry, render_prompt
+from structured_output import (ENEMY_SCHEMA, QUIZ_BATCH_SCHEMA, QUIZ_SCHEMA, QUIZ_TYPES, api_schema,
+                               parse_structured, schema_to_gbnf, structured_stats)
 
 # Try to import the AI libraries
 try:
@@ -22,6 +48,35 @@ except ImportError:
     Llama = None
     hf_hub_download = None
 
+# Grammar-constrained sampling (older llama-cpp-python builds lack it)
+try:
+    from llama_cpp import LlamaGrammar
+    LLAMA_GRAMMAR_AVAILABLE = True
+except ImportError:
+    LLAMA_GRAMMAR_AVAILABLE = False
+    LlamaGrammar = None
+
+# Stopping criteria let a cancelled request stop llama.cpp mid-generation
+try:
+    from llama_cpp import StoppingCriteriaList
+except ImportError:
+    StoppingCriteriaList = None
+
+# Try to import aiohttp for non-blocking HTTP providers
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    aiohttp = None
+
+# Persistent result cache shared by every provider
+try:
+    from simple_cache import make_content_hash, cache_ai_result, get_cached_ai_result
+    AI_CACHE_AVAILABLE = True
+except ImportError:
+    AI_CACHE_AVAILABLE = False
+
 # Try to import Anthropic SDK
 try:
     import anthropic
@@ -34,6 +89,27 @@ except ImportError:
 MODEL_REPO = "TheBloke/TinyLlama-1.1B-Chat-v1.0-GGUF"
 MODEL_FILE = "tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf"
 MODEL_DIR = Path.home() / ".cache" / "brainbot"
+LLAMA_CONTEXT_SIZE = 2048
+
+# Prompt templates (see prompt_templates.py) behind each kind of generation.
+# Their fingerprints are part of the cache keys, so editing a template only
+# invalidates results generated from it.
+PROMPT_TEMPLATES = {
+    "quiz": ("quiz",),
+    "quiz_bank": ("quiz_bank",),
+    "enemy": ("enemy",),
+}
+# Providers that render a kind from different templates
+PROVIDER_PROMPT_TEMPLATES = {
+    "tinyllama": {
+        "quiz": ("tinyllama_system_quiz", "quiz"),
+        "quiz_bank": ("tinyllama_system_quiz", "quiz_bank"),
+        "enemy": ("tinyllama_system_enemy", "tinyllama_enemy"),
+    },
+}
+# Kinds prompted with the note's extractive summary (see note_summary.py) instead of its text.
+# Quiz prompts keep the note excerpt: questions need the details a summary leaves out.
+SUMMARY_PROMPT_KINDS = ("enemy",)
 
 @dataclass
 class QuizQuestion:
@@ -68,6 +144,354 @@ class EnemyDescription:
     manifestation_story: str = ""
 
 
+# =============================================================================
+# Streaming Helpers
+# =============================================================================
+
+# Labels of the structured quiz completion format, in prompt order
+QUIZ_FIELDS = ("QUESTION", "CORRECT", "DECOY", "FUNNY", "TYPE")
+
+
+class StreamingFieldParser:
+    """Incrementally splits a 'LABEL: value' completion into fields.
+
+    A field is complete once the next known label arrives; finish() flushes the last one.
+    """
+
+    def __init__(self, labels: Tuple[str, ...] = QUIZ_FIELDS):
+        self._pattern = re.compile(r'\b(' + '|'.join(re.escape(label) for label in labels) + r'):')
+        self._buffer = ""
+        self._current: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Add streamed text. Returns the (label, value) pairs completed by it."""
+        self._buffer += chunk
+        completed = []
+        match = self._pattern.search(self._buffer)
+        while match:
+            if self._current is not None:
+                completed.append((self._current, self._buffer[:match.start()].strip()))
+            self._current = match.group(1)
+            self._buffer = self._buffer[match.end():]
+            match = self._pattern.search(self._buffer)
+        return completed
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush the field still being streamed when the completion ends"""
+        completed = []
+        if self._current is not None:
+            completed.append((self._current, self._buffer.strip()))
+        self._buffer = ""
+        self._current = None
+        return completed
+
+
+def quiz_from_fields(fields: Dict[str, str], note_content: str, difficulty: int) -> Optional[QuizQuestion]:
+    """QuizQuestion from validated quiz fields, or None if its answer options are not distinct"""
+    options = [fields["correct"], fields["decoy"], fields["funny"]]
+    if len({option.lower() for option in options}) < len(options):
+        return None
+    random.shuffle(options)
+    return QuizQuestion(
+        question=fields["question"],
+        answer=fields["correct"],
+        difficulty=difficulty,
+        question_type=fields["type"],
+        context=note_content[:200],
+        options=options,
+        correct_index=options.index(fields["correct"])
+    )
+
+
+def parse_quiz_fields(response: str, note_content: str, difficulty: int, mode: str = "text") -> Optional[QuizQuestion]:
+    """Parse a quiz completion (JSON or QUESTION/CORRECT/... labels) into a validated QuizQuestion.
+
+    mode is how the completion was constrained (see output_mode()); outcomes are counted per mode.
+    """
+    fields = parse_structured(response, QUIZ_SCHEMA)
+    quiz = quiz_from_fields(fields, note_content, difficulty) if fields else None
+    structured_stats.record("quiz", mode, quiz is not None)
+    return quiz
+
+
+def parse_quiz_batch(response: str, note_content: str, difficulty: int, mode: str = "text") -> List[QuizQuestion]:
+    """Parse a completion holding several questions, skipping malformed or repeated ones"""
+    data = parse_structured(response, QUIZ_BATCH_SCHEMA)
+    questions = []
+    seen = set()
+    for fields in data["questions"] if data else []:
+        quiz = quiz_from_fields(fields, note_content, difficulty)
+        if quiz and quiz.question.lower() not in seen:
+            seen.add(quiz.question.lower())
+            questions.append(quiz)
+    structured_stats.record("quiz_bank", mode, bool(questions))
+    return questions
+
+
+def parse_enemy_narrative(response: str, mode: str = "text") -> Optional[str]:
+    """The encounter narrative of an enemy completion (JSON or plain text)"""
+    data = parse_structured(response, ENEMY_SCHEMA)
+    structured_stats.record("enemy", mode, data is not None)
+    return data["narrative"] if data else None
+
+
+def output_mode(structured_mode: Optional[str]) -> str:
+    """How a provider's next completion is constrained: its structured mode, or "text" when disabled"""
+    from game_data import game_settings
+    return structured_mode if structured_mode and game_settings.ai_structured_output else "text"
+
+
+def quiz_prompt(note_title: str, note_excerpt: str, structured: bool = False) -> str:
+    """Prompt asking for one quiz question about a note, answered as JSON or labeled text"""
+    response_format = render_prompt("quiz_format_json" if structured else "quiz_format_text")
+    return render_prompt("quiz", title=note_title, excerpt=note_excerpt, response_format=response_format)
+
+
+def quiz_bank_prompt(note_title: str, note_excerpt: str, count: int, structured: bool = False) -> str:
+    """Prompt asking for several distinct quiz questions about one note (see note_excerpt())"""
+    response_format = render_prompt("quiz_bank_format_json" if structured else "quiz_bank_format_text")
+    return render_prompt("quiz_bank", title=note_title, excerpt=note_excerpt, count=count,
+                         response_format=response_format)
+
+
+def enemy_prompt(note_title: str, note_excerpt: str, structured: bool = False, template: str = "enemy") -> str:
+    """Prompt asking for the encounter narrative of a note's enemy"""
+    response_format = render_prompt("enemy_format_json" if structured else "enemy_format_text")
+    return render_prompt(template, title=note_title, excerpt=note_excerpt, response_format=response_format)
+
+
+async def iterate_in_thread(make_iterator: Callable[[], Iterator[Any]]) -> AsyncIterator[Any]:
+    """Drive a blocking iterator (e.g. llama.cpp token stream) in a thread and yield its items"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    stopped = threading.Event()
+
+    def worker():
+        try:
+            for item in make_iterator():
+                if stopped.is_set():
+                    break  # Consumer went away - leaving the loop closes the iterator (stops generation)
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    # The worker sees the caller's context (e.g. its cancel token)
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(worker,), daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
+
+# =============================================================================
+# Cancellation
+# =============================================================================
+
+class AICancelled(Exception):
+    """The caller gave up on an AI request (see CancelToken)"""
+
+
+class CancelToken:
+    """Cancels the AI work started on one caller's behalf, e.g. everything for one fight.
+
+    Providers register cleanup with on_cancel() while they block - abort the HTTP
+    request, kill the CLI process, stop llama.cpp sampling - so abandoned work
+    stops competing with live requests at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._ids = itertools.count()
+        self.promoted = False  # Set by AIScheduler.promote: this work now queues as INTERACTIVE
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ AI cancel callback failed: {e}")
+
+    def raise_if_cancelled(self):
+        if self._cancelled:
+            raise AICancelled("AI request cancelled")
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]) -> Iterator[None]:
+        """Run callback (from the cancelling thread) if the token is cancelled during the block"""
+        with self._lock:
+            if self._cancelled:
+                raise AICancelled("AI request cancelled")
+            callback_id = next(self._ids)
+            self._callbacks[callback_id] = callback
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.pop(callback_id, None)
+
+
+# Token of the AI request running in the current thread or task (set by the provider manager)
+_cancel_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("ai_cancel_token", default=None)
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    return _cancel_token.get()
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[None]:
+    """Make token the current cancel token for provider code run in the block"""
+    reset = _cancel_token.set(token)
+    try:
+        yield
+    finally:
+        _cancel_token.reset(reset)
+
+
+@contextmanager
+def on_cancel(callback: Callable[[], None]) -> Iterator[None]:
+    """Register callback on the current cancel token (if any) for the duration of the block"""
+    token = _cancel_token.get()
+    if token is None:
+        yield
+        return
+    with token.on_cancel(callback):
+        yield
+
+
+def raise_if_cancelled():
+    token = _cancel_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+# =============================================================================
+# Persistent result cache helpers
+# =============================================================================
+
+def prompt_version(kind: str, identity: Optional[Tuple[str, str]] = None) -> str:
+    """Fingerprint (versions and text hashes) of the templates a provider renders for a kind of generation"""
+    provider = identity[0] if identity else None
+    names = PROVIDER_PROMPT_TEMPLATES.get(provider, {}).get(kind, PROMPT_TEMPLATES[kind])
+    fingerprint = prompt_registry.fingerprint(*names)
+    if kind in SUMMARY_PROMPT_KINDS:
+        fingerprint += f",summary@{SUMMARY_VERSION}"  # The prompt carries the summary, not the note
+    return fingerprint
+
+
+def ai_cache_key(identity: Tuple[str, str], template_version: str, *content: Any) -> str:
+    """Stable key for a generation: (provider, model), prompt template fingerprint and prompt inputs"""
+    return make_content_hash(*identity, template_version, *content)
+
+
+def load_cached_result(key: str, result_type):
+    """Rebuild a cached QuizQuestion/EnemyDescription, or None on a miss"""
+    if not AI_CACHE_AVAILABLE:
+        return None
+    data = get_cached_ai_result(key)
+    if not data:
+        return None
+    try:
+        return result_type(**data)
+    except TypeError:
+        # Stored before a dataclass field change
+        return None
+
+
+def store_cached_result(key: str, result: Any, kind: str):
+    if AI_CACHE_AVAILABLE and result is not None:
+        try:
+            cache_ai_result(key, result, kind=kind)
+        except Exception as e:
+            print(f"⚠️ Could not cache AI result: {e}")
+
+
+def quiz_cache_key(identity: Tuple[str, str], note_title: str, note_content: str) -> str:
+    return ai_cache_key(identity, prompt_version("quiz", identity), note_title, note_content)
+
+
+def enemy_cache_key(identity: Tuple[str, str], note_title: str, note_content: str) -> str:
+    return ai_cache_key(identity, prompt_version("enemy", identity), note_title, note_content)
+
+
+def quiz_bank_cache_key(identity: Tuple[str, str], note_title: str) -> str:
+    """Key of a note's quiz bank. The bank itself records the content hash it was built from."""
+    return ai_cache_key(identity, prompt_version("quiz_bank", identity), note_title)
+
+
+def load_cached_quiz(key: str, difficulty: int) -> Optional[QuizQuestion]:
+    """Cached quiz for a note, re-labelled with the requested difficulty"""
+    quiz = load_cached_result(key, QuizQuestion)
+    if quiz:
+        quiz.difficulty = difficulty
+    return quiz
+
+
+# =============================================================================
+# Prompt token budgets
+# =============================================================================
+
+DEFAULT_PROMPT_TOKENS = 512  # Note tokens for providers without a budget setting
+
+_token_counters: Dict[Tuple[str, str], TokenCounter] = {}
+_token_counters_lock = threading.Lock()
+
+
+def token_counter_for(identity: Tuple[str, str]) -> TokenCounter:
+    """Token counter for a (provider, model) pair - each model has its own tokenizer"""
+    with _token_counters_lock:
+        counter = _token_counters.get(identity)
+        if counter is None:
+            counter = _token_counters[identity] = TokenCounter()
+        return counter
+
+
+def register_token_counter(identity: Tuple[str, str], counter: TokenCounter):
+    """Use an exact counter (e.g. the model's own tokenizer) for a provider"""
+    with _token_counters_lock:
+        _token_counters[identity] = counter
+
+
+def prompt_source(note_content: str, kind: str) -> str:
+    """Note text a prompt of this kind is built from: the summary for SUMMARY_PROMPT_KINDS, else the note"""
+    if kind in SUMMARY_PROMPT_KINDS:
+        summary = note_summaries.get(note_content)
+        text = summary.prompt_text() if summary.sentences else ""
+        if text and len(note_content) > 2 * len(text):  # Short notes are sent whole, details and all
+            return text
+    return note_content
+
+
+def prompt_budget(setting: Optional[str], kind: str, cap: Optional[int] = None) -> int:
+    """Note tokens a prompt of this kind may use, from a GameSettings budget field"""
+    from game_data import game_settings
+    tokens = getattr(game_settings, setting) if setting else DEFAULT_PROMPT_TOKENS
+    tokens = int(tokens * PROMPT_KIND_SCALE.get(kind, 1.0))
+    return min(tokens, cap) if cap else tokens
+
+
 # =============================================================================
 # AI Provider Abstract Base Class
 # =============================================================================
@@ -75,6 +499,21 @@ class EnemyDescription:
 class AIProvider(ABC):
     """Abstract base class for AI providers"""
 
+    # How many requests a batch may have in flight at once
+    max_concurrency = 4
+    # GameSettings field with the provider's note token budget (None = DEFAULT_PROMPT_TOKENS)
+    prompt_tokens_setting: Optional[str] = None
+    # How the provider holds completions to a JSON schema (None = labeled text only)
+    structured_mode: Optional[str] = None
+
+    def output_mode(self) -> str:
+        return output_mode(self.structured_mode)
+
+    def note_excerpt(self, note_content: str, kind: str = "quiz") -> str:
+        """The most informative parts of a note that fit this provider's prompt budget"""
+        return build_excerpt(prompt_source(note_content, kind), prompt_budget(self.prompt_tokens_setting, kind),
+                             token_counter_for(self.cache_identity))
+
     @abstractmethod
     def initialize(self) -> bool:
         """Initialize the provider. Returns True if successful."""
@@ -90,11 +529,66 @@ class AIProvider(ABC):
         """Generate a quiz question from note content."""
         pass
 
+    @property
+    def cache_identity(self) -> Tuple[str, str]:
+        """(provider, model) pair that scopes this provider's cached results"""
+        return (type(self).__name__, "default")
+
     @abstractmethod
     def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
         """Generate an enemy description from note content."""
         pass
 
+    def generate_quiz_questions(self, note_title: str, note_content: str, count: int) -> List[QuizQuestion]:
+        """Generate up to count distinct questions for one note. Default: a single question."""
+        quiz = self.generate_quiz_question(note_title, note_content)
+        return [quiz] if quiz else []
+
+    def generate_enemy_descriptions(self, requests: List[Tuple[str, str, str]]) -> List[Optional[EnemyDescription]]:
+        """Generate enemy descriptions for (note_title, note_content, base_enemy) requests, in order."""
+        def generate_one(request: Tuple[str, str, str]) -> Optional[EnemyDescription]:
+            try:
+                return self.generate_enemy_description(*request)
+            except Exception as e:
+                print(f"AI enemy generation failed for '{request[0]}': {e}")
+                return None
+
+        workers = min(self.max_concurrency, len(requests))
+        if workers <= 1:
+            return [generate_one(request) for request in requests]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-batch") as pool:
+            return list(pool.map(generate_one, requests))
+
+    async def agenerate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
+        """Async quiz generation. Providers without a native async client run the sync call in a worker thread."""
+        return await asyncio.to_thread(self.generate_quiz_question, note_title, note_content, difficulty)
+
+    async def agenerate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
+        """Async enemy generation. Providers without a native async client run the sync call in a worker thread."""
+        return await asyncio.to_thread(self.generate_enemy_description, note_title, note_content, base_enemy)
+
+    async def astream_enemy_narrative(self, note_title: str, note_content: str, base_enemy: str) -> AsyncIterator[str]:
+        """Yield the encounter narrative as it is generated.
+
+        Providers without token streaming yield it in one chunk once the description is ready.
+        """
+        description = await self.agenerate_enemy_description(note_title, note_content, base_enemy)
+        if description and description.encounter_narrative:
+            yield description.encounter_narrative
+
+    async def astream_quiz_response(self, note_title: str, note_content: str, difficulty: int = 1) -> AsyncIterator[str]:
+        """Yield the raw QUESTION/CORRECT/... completion as it is generated. Yields nothing if unsupported."""
+        return
+        yield
+
+    async def aclose(self):
+        """Release async resources (HTTP sessions). No-op by default."""
+        pass
+
+    def close(self):
+        """Release resources (processes, connections) before the provider is replaced. No-op by default."""
+        pass
+
     @property
     @abstractmethod
     def provider_name(self) -> str:
@@ -106,19 +600,323 @@ class AIProvider(ABC):
 # TinyLlama Provider (Local AI)
 # =============================================================================
 
+_gbnf_cache: Dict[int, str] = {}
+
+
+def llama_grammar(schema: Dict[str, Any]):
+    """llama.cpp grammar holding sampling to JSON that matches schema.
+
+    Built per call: a grammar keeps parse state while sampling, so concurrent
+    batch contexts must not share one.
+    """
+    gbnf = _gbnf_cache.get(id(schema))
+    if gbnf is None:
+        gbnf = _gbnf_cache[id(schema)] = schema_to_gbnf(schema)
+    return LlamaGrammar.from_string(gbnf, verbose=False)
+
+
+def llama_runtime_params() -> Dict[str, int]:
+    """CPU threads, prompt batch size and parallel batch contexts for llama.cpp.
+
+    Settings of 0 mean auto: threads = physical cores (logical CPUs / 2 when
+    SMT is likely), n_batch = 512 so a whole note prompt is evaluated in one
+    pass, and one extra batch context per 4 physical cores (max 4).
+    """
+    from game_data import game_settings
+    try:
+        logical = len(os.sched_getaffinity(0))
+    except AttributeError:
+        logical = os.cpu_count() or 4
+    physical = max(1, logical // 2) if logical >= 4 else logical
+
+    threads = game_settings.tinyllama_threads or physical
+    contexts = game_settings.tinyllama_batch_contexts or max(1, min(4, physical // 4))
+    return {
+        "n_threads": threads,
+        "n_batch": game_settings.tinyllama_batch or min(512, LLAMA_CONTEXT_SIZE),
+        "batch_contexts": contexts,
+        "batch_threads": max(1, threads // contexts),
+    }
+
+
+class _ModelContext:
+    """One llama.cpp context (KV cache) over a shared, memory-mapped model file"""
+
+    def __init__(self):
+        self.llama = None
+        self.lock = threading.Lock()  # One inference at a time per context
+        # Saved llama.cpp states with a fixed prompt prefix already evaluated
+        self.prefix_states: Dict[str, Any] = {}
+        self.prefix_tokens: Dict[str, List[int]] = {}
+        self.prefix_cache_supported = True
+
+    def unload(self):
+        self.llama = None
+        self.prefix_states.clear()  # States belong to the unloaded context
+        self.prefix_tokens.clear()
+
+
+class _ModelSlot:
+    """A GGUF model file, its interactive context and its (optional) batch contexts"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.primary = _ModelContext()
+        self.batch: List[_ModelContext] = []
+        self.batch_lock = threading.Lock()
+        self.batch_free: "queue.Queue[_ModelContext]" = queue.Queue()
+        self.last_used = 0.0
+        self.load_error: Optional[str] = None
+        self.vocab = None  # Vocab-only load for counting tokens without the weights
+        self.vocab_lock = threading.Lock()
+        self.vocab_failed = False
+
+
+class LlamaModelRegistry:
+    """Loads each GGUF model once, memory-mapped, and shares it between clients.
+
+    Models load lazily on first use and are unloaded again after
+    ``tinyllama_idle_unload`` seconds without a request. Bulk generation can
+    run on extra batch contexts; they map the same weights, so each one only
+    adds its own KV cache.
+    """
+
+    REAPER_INTERVAL = 30.0  # Seconds between idle checks
+    MAX_PREFIX_STATES = 8  # Saved prefix states kept per context
+
+    def __init__(self):
+        self._slots: Dict[str, _ModelSlot] = {}
+        self._lock = threading.Lock()
+        self._download_lock = threading.Lock()
+        self._reaper = None
+        # How each prompt's prefix was served: already in the live context, restored from a saved state, or built
+        self.prefix_counts = {"live": 0, "restored": 0, "built": 0}
+        self.prefix_restore_seconds = 0.0
+
+    def ensure_model_file(self, repo: str = MODEL_REPO, filename: str = MODEL_FILE) -> Optional[Path]:
+        """Path of a model file, downloading it once if needed. None if the download fails."""
+        MODEL_DIR.mkdir(parents=True, exist_ok=True)
+        model_path = MODEL_DIR / filename
+        with self._download_lock:
+            if not model_path.exists():
+                print(f"📥 Downloading TinyLlama model ({filename})...")
+                print("   This may take a few minutes on first run...")
+                try:
+                    hf_hub_download(
+                        repo_id=repo,
+                        filename=filename,
+                        cache_dir=MODEL_DIR.parent,
+                        local_dir=MODEL_DIR,
+                        local_dir_use_symlinks=False
+                    )
+                    print("✅ Model downloaded successfully!")
+                except Exception as e:
+                    print(f"❌ Model download failed: {e}")
+                    return None
+        return model_path
+
+    def _slot(self, model_path) -> _ModelSlot:
+        key = str(model_path)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = _ModelSlot(key)
+            return slot
+
+    @contextmanager
+    def use(self, model_path, prefix: Optional[str] = None) -> Iterator[Any]:
+        """Exclusive use of the shared model, loading it first if needed.
+
+        With ``prefix`` the model is restored to a saved state in which that
+        prompt prefix has already been evaluated, so a prompt starting with it
+        only evaluates the remainder.
+        """
+        slot = self._slot(model_path)
+        context = slot.primary
+        with context.lock:
+            if context.llama is None:
+                params = llama_runtime_params()
+                context.llama = self._load(slot, params["n_threads"], params["n_batch"])
+            if prefix:
+                self._restore_prefix(context, prefix)
+            try:
+                yield context.llama
+            finally:
+                slot.last_used = time.monotonic()
+
+    @contextmanager
+    def use_batch(self, model_path, prefix: Optional[str] = None) -> Iterator[Any]:
+        """Like ``use`` but on one of the parallel batch contexts (waits for a free one)"""
+        slot = self._slot(model_path)
+        with slot.batch_lock:
+            if not slot.batch:
+                params = llama_runtime_params()
+                for _ in range(params["batch_contexts"]):
+                    context = _ModelContext()
+                    slot.batch.append(context)
+                    slot.batch_free.put(context)
+        context = slot.batch_free.get()
+        try:
+            with context.lock:
+                if context.llama is None:
+                    params = llama_runtime_params()
+                    context.llama = self._load(slot, params["batch_threads"], params["n_batch"])
+                if prefix:
+                    self._restore_prefix(context, prefix)
+                try:
+                    yield context.llama
+                finally:
+                    slot.last_used = time.monotonic()
+        finally:
+            slot.batch_free.put(context)
+
+    def batch_size(self) -> int:
+        """How many prompts bulk generation runs at once"""
+        return llama_runtime_params()["batch_contexts"]
+
+    def tokenize(self, model_path, text: str) -> Optional[List[int]]:
+        """Token ids from a vocab-only load of the model (no weights), or None if it can't be loaded"""
+        if Llama is None:
+            return None
+        slot = self._slot(model_path)
+        with slot.vocab_lock:
+            if slot.vocab is None and not slot.vocab_failed:
+                try:
+                    slot.vocab = Llama(model_path=slot.path, vocab_only=True, verbose=False)
+                except Exception as e:
+                    slot.vocab_failed = True
+                    print(f"⚠️ TinyLlama tokenizer unavailable ({e}) - estimating prompt tokens")
+            if slot.vocab is None:
+                return None
+            return slot.vocab.tokenize(text.encode("utf-8"), add_bos=False)
+
+    def _load(self, slot: _ModelSlot, n_threads: int, n_batch: int):
+        if slot.load_error:
+            raise RuntimeError(slot.load_error)
+        print(f"🔄 Loading TinyLlama model into memory ({n_threads} threads, batch {n_batch})...")
+        started = time.monotonic()
+        try:
+            llama = Llama(
+                model_path=slot.path,
+                n_ctx=LLAMA_CONTEXT_SIZE,  # Context window
+                n_threads=n_threads,       # CPU threads
+                n_batch=n_batch,           # Prompt tokens evaluated per step
+                n_gpu_layers=0,            # CPU only for compatibility
+                use_mmap=True,             # Share pages with the OS file cache instead of copying weights
+                temperature=0.7,           # Creativity vs consistency
+                verbose=False              # Quiet mode
+            )
+        except Exception as e:
+            slot.load_error = f"model failed to load: {e}"
+            raise
+        print(f"🧠 TinyLlama loaded in {time.monotonic() - started:.1f}s")
+        self._start_reaper()
+        return llama
+
+    def _restore_prefix(self, context: _ModelContext, prefix: str):
+        """Make sure the context's evaluated tokens start with a prompt prefix.
+
+        llama.cpp already reuses the longest matching start of the previous
+        prompt, so nothing is done while the live context begins with the
+        prefix. Only when it has diverged (the last prompt used another system
+        prompt) is the saved state for the prefix loaded, or built once.
+        """
+        if not context.prefix_cache_supported:
+            return
+        llama = context.llama
+        try:
+            tokens = context.prefix_tokens.get(prefix)
+            if tokens is None:
+                tokens = context.prefix_tokens[prefix] = llama.tokenize(prefix.encode("utf-8"))
+            if llama.n_tokens >= len(tokens) and list(llama.input_ids[:len(tokens)]) == tokens:
+                self.prefix_counts["live"] += 1
+                return
+            started = time.perf_counter()
+            state = context.prefix_states.get(prefix)
+            if state is not None:
+                llama.load_state(state)
+                self.prefix_counts["restored"] += 1
+            else:
+                # Evaluate the prefix once from a clean context and keep the result
+                llama.reset()
+                llama.eval(tokens)
+                if len(context.prefix_states) >= self.MAX_PREFIX_STATES:
+                    context.prefix_states.pop(next(iter(context.prefix_states)))
+                context.prefix_states[prefix] = llama.save_state()
+                self.prefix_counts["built"] += 1
+            self.prefix_restore_seconds += time.perf_counter() - started
+        except Exception as e:
+            # Older llama-cpp-python without state save/load: evaluate prompts in full
+            print(f"⚠️ Prompt prefix caching disabled: {e}")
+            context.prefix_cache_supported = False
+            context.prefix_states.clear()
+            llama.reset()
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_idle, name="llama-idle-unload", daemon=True)
+                self._reaper.start()
+
+    def _reap_idle(self):
+        while True:
+            time.sleep(self.REAPER_INTERVAL)
+            self.unload_idle()
+
+    def unload_idle(self, idle_seconds: Optional[float] = None) -> int:
+        """Unload models unused for idle_seconds (default: from settings). Returns how many contexts."""
+        if idle_seconds is None:
+            from game_data import game_settings
+            idle_seconds = game_settings.tinyllama_idle_unload
+        if not idle_seconds or idle_seconds <= 0:
+            return 0
+
+        unloaded = 0
+        with self._lock:
+            slots = list(self._slots.values())
+        for slot in slots:
+            if time.monotonic() - slot.last_used < idle_seconds:
+                continue
+            for context in [slot.primary] + slot.batch:
+                # Never wait on a busy context: in use means not idle
+                if context.llama is None or not context.lock.acquire(blocking=False):
+                    continue
+                try:
+                    context.unload()
+                    unloaded += 1
+                finally:
+                    context.lock.release()
+            if unloaded:
+                print(f"💤 Unloaded idle TinyLlama model ({Path(slot.path).name})")
+        if unloaded:
+            gc.collect()
+        return unloaded
+
+    def is_loaded(self, model_path) -> bool:
+        slot = self._slots.get(str(model_path))
+        return slot is not None and slot.primary.llama is not None
+
+    def prefix_cache_stats(self) -> Dict[str, Any]:
+        """How prompt prefixes were served, and the time spent loading or building prefix states"""
+        return {**self.prefix_counts, "restore_seconds": round(self.prefix_restore_seconds, 3)}
+
+
+# Shared by every LocalAIClient (provider, fallback generator and legacy system)
+model_registry = LlamaModelRegistry()
+
+
 class LocalAIClient:
     """Local TinyLlama client for AI services"""
 
     def __init__(self):
-        self.model = None
         self.model_path = None
         self.available = False
-        self.cache = {}
-        self.cache_ttl = 300  # 5 minutes
+        self.cache_identity = ("tinyllama", MODEL_FILE)
+        self.structured_mode = "grammar" if LLAMA_GRAMMAR_AVAILABLE else None
         self.loading = False
 
     def initialize(self) -> bool:
-        """Initialize the local AI model"""
+        """Make the local AI model available. The weights load on first use (shared registry)."""
         if not TINYLLAMA_AVAILABLE:
             print("🤖 TinyLlama libraries not available - using fallback mode")
             return False
@@ -130,39 +928,13 @@ class LocalAIClient:
             self.loading = True
             print("🧠 Initializing TinyLlama model...")
 
-            # Ensure model directory exists
-            MODEL_DIR.mkdir(parents=True, exist_ok=True)
-            self.model_path = MODEL_DIR / MODEL_FILE
-
-            # Download model if not exists
-            if not self.model_path.exists():
-                print(f"📥 Downloading TinyLlama model ({MODEL_FILE})...")
-                print("   This may take a few minutes on first run...")
-
-                try:
-                    downloaded_path = hf_hub_download(
-                        repo_id=MODEL_REPO,
-                        filename=MODEL_FILE,
-                        cache_dir=MODEL_DIR.parent,
-                        local_dir=MODEL_DIR,
-                        local_dir_use_symlinks=False
-                    )
-                    print("✅ Model downloaded successfully!")
-                except Exception as e:
-                    print(f"❌ Model download failed: {e}")
-                    return False
-
-            # Load the model
-            print("🔄 Loading TinyLlama model into memory...")
-            self.model = Llama(
-                model_path=str(self.model_path),
-                n_ctx=2048,        # Context window
-                n_threads=4,       # CPU threads
-                n_gpu_layers=0,    # CPU only for compatibility
-                temperature=0.7,   # Creativity vs consistency
-                verbose=False      # Quiet mode
-            )
+            self.model_path = model_registry.ensure_model_file()
+            if self.model_path is None:
+                return False
 
+            model_path = self.model_path
+            register_token_counter(self.cache_identity,
+                                   ExactTokenCounter(lambda text: model_registry.tokenize(model_path, text)))
             self.available = True
             print("🎉 TinyLlama AI ready for intelligent quiz generation!")
             return True
@@ -175,34 +947,76 @@ class LocalAIClient:
         finally:
             self.loading = False
 
-    def generate_text(self, prompt: str, max_tokens: int = 150, generation_type: str = "quiz") -> Optional[str]:
-        """Generate text using local TinyLlama model with context-aware prompts"""
-        if not self.available or not self.model:
-            return None
+    def output_mode(self) -> str:
+        return output_mode(self.structured_mode)
+
+    def note_excerpt(self, note_content: str, kind: str = "quiz") -> str:
+        """The most informative parts of a note that fit TinyLlama's prompt budget (in its own tokens)"""
+        return build_excerpt(prompt_source(note_content, kind),
+                             prompt_budget("tinyllama_prompt_tokens", kind, cap=LLAMA_CONTEXT_SIZE // 2),
+                             token_counter_for(self.cache_identity))
+
+    def _format_prompt(self, prompt: str, generation_type: str) -> str:
+        """Wrap a prompt in the chat template with a generation-specific system prompt"""
+        return f"{self._prompt_prefix(generation_type)}{prompt}\n<|assistant|>\n"
+
+    def _prompt_prefix(self, generation_type: str) -> str:
+        """Fixed chat-template start (system prompt and user tag) shared by every prompt of a type"""
+        # Dynamic system prompt based on generation type
+        system_prompt = render_prompt("tinyllama_system_enemy" if generation_type == "enemy"
+                                      else "tinyllama_system_quiz")
+        return f"<|system|>\n{system_prompt}\n<|user|>\n"
+
+    def _sampling_options(self, max_tokens: int, generation_type: str) -> Dict[str, Any]:
+        options = {
+            "max_tokens": max_tokens,
+            "temperature": 0.8 if generation_type == "enemy" else 0.7,  # More creative for enemies
+            "top_p": 0.9,
+            "stop": ["<|user|>", "<|system|>"],  # Remove \n\n to allow full responses
+            "echo": False,
+        }
+        token = current_cancel_token()
+        if token is not None and StoppingCriteriaList is not None:
+            # Checked after every sampled token
+            options["stopping_criteria"] = StoppingCriteriaList([lambda input_ids, logits: token.cancelled])
+        return options
+
+    def stream_text(self, prompt: str, max_tokens: int = 150, generation_type: str = "quiz") -> Iterator[str]:
+        """Yield generated text token by token (blocking)"""
+        if not self.available:
+            return
 
         try:
-            # Dynamic system prompt based on generation type
-            if generation_type == "enemy":
-                system_prompt = """You are a creative fantasy writer who transforms any content into magical encounters.
-Transform mundane notes into atmospheric fantasy adventures with vivid descriptions.
-Use structured output format for easy parsing."""
-            else:  # quiz or default
-                system_prompt = """You are a helpful AI that creates quiz questions from notes.
-Generate clear, educational questions that test understanding of key concepts.
-Be concise and focused."""
-
-            # Format the prompt
-            full_prompt = f"<|system|>\n{system_prompt}\n<|user|>\n{prompt}\n<|assistant|>\n"
+            with model_registry.use(self.model_path, self._prompt_prefix(generation_type)) as model:
+                for chunk in model(self._format_prompt(prompt, generation_type), stream=True,
+                                   **self._sampling_options(max_tokens, generation_type)):
+                    text = chunk["choices"][0]["text"]
+                    if text:
+                        yield text
+        except Exception as e:
+            print(f"🔥 AI stream error ({generation_type}): {e}")
+        raise_if_cancelled()
+
+    def generate_text(self, prompt: str, max_tokens: int = 150, generation_type: str = "quiz",
+                      batch: bool = False, schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Generate text using local TinyLlama model with context-aware prompts.
+
+        With batch the prompt runs on one of the parallel batch contexts instead
+        of the interactive one. With schema, sampling is constrained to JSON matching it.
+        """
+        if not self.available:
+            return None
 
+        raise_if_cancelled()
+        use_model = model_registry.use_batch if batch else model_registry.use
+        options = self._sampling_options(max_tokens, generation_type)
+        if schema is not None:
+            options["grammar"] = llama_grammar(schema)
+        try:
             # Generate response with appropriate settings for the task
-            response = self.model(
-                full_prompt,
-                max_tokens=max_tokens,
-                temperature=0.8 if generation_type == "enemy" else 0.7,  # More creative for enemies
-                top_p=0.9,
-                stop=["<|user|>", "<|system|>"],  # Remove \n\n to allow full responses
-                echo=False
-            )
+            with use_model(self.model_path, self._prompt_prefix(generation_type)) as model:
+                response = model(self._format_prompt(prompt, generation_type), **options)
+            raise_if_cancelled()  # Output cut short by a cancel is not a usable completion
 
             if response and "choices" in response and response["choices"]:
                 generated_text = response["choices"][0]["text"].strip()
@@ -215,98 +1029,37 @@ Be concise and focused."""
 
                 return generated_text
 
+        except AICancelled:
+            raise
         except Exception as e:
             print(f"🔥 AI generation error ({generation_type}): {e}")
 
         return None
 
-    def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
-        """Generate an intelligent quiz question from note content"""
-        cache_key = f"quiz_{hash(note_content)}_{difficulty}"
-
-        # Check cache
-        if cache_key in self.cache:
-            cached_time, cached_result = self.cache[cache_key]
-            if time.time() - cached_time < self.cache_ttl:
-                return cached_result
-
-        # Create context-aware prompt for multiple choice
-        prompt = f"""Based on this note about "{note_title}":
+    def generate_texts(self, prompts: List[str], max_tokens: int = 150, generation_type: str = "quiz",
+                       schema: Optional[Dict[str, Any]] = None) -> List[Optional[str]]:
+        """Generate completions for many prompts at once on the batch contexts, in order"""
+        if not self.available or not prompts:
+            return [None] * len(prompts)
 
-{note_content[:500]}
+        def generate_one(prompt: str) -> Optional[str]:
+            return self.generate_text(prompt, max_tokens, generation_type, batch=True, schema=schema)
 
-Generate a multiple choice quiz question that tests understanding of the key concept.
-
-Create 3 answer options:
-1. One correct answer
-2. One plausible but incorrect answer (similar to correct but wrong in key detail)
-3. One humorous/obviously wrong answer
-
-Format your response exactly as:
-QUESTION: [your question here]
-CORRECT: [the correct answer]
-DECOY: [plausible but incorrect answer]
-FUNNY: [humorous wrong answer]
-TYPE: [definition/concept/relationship/fact]
-
-Make the decoy answer similar enough to confuse someone who doesn't know the material well."""
-
-        response = self.generate_text(prompt, max_tokens=200)
-
-        if response:
-            # Parse the AI response for multiple choice
-            question_match = re.search(r'QUESTION:\s*(.+?)(?=CORRECT:|$)', response, re.DOTALL)
-            correct_match = re.search(r'CORRECT:\s*(.+?)(?=DECOY:|$)', response, re.DOTALL)
-            decoy_match = re.search(r'DECOY:\s*(.+?)(?=FUNNY:|$)', response, re.DOTALL)
-            funny_match = re.search(r'FUNNY:\s*(.+?)(?=TYPE:|$)', response, re.DOTALL)
-            type_match = re.search(r'TYPE:\s*(.+?)$', response, re.DOTALL)
-
-            if question_match and correct_match and decoy_match and funny_match:
-                correct_answer = correct_match.group(1).strip()
-                decoy_answer = decoy_match.group(1).strip()
-                funny_answer = funny_match.group(1).strip()
-
-                # Create options list and randomize order
-                options = [correct_answer, decoy_answer, funny_answer]
-                correct_index = 0  # Start with correct at index 0
-
-                # Shuffle options and track where correct answer ends up
-                import random
-                shuffled_options = options.copy()
-                random.shuffle(shuffled_options)
-                correct_index = shuffled_options.index(correct_answer)
-
-                quiz = QuizQuestion(
-                    question=question_match.group(1).strip(),
-                    answer=correct_answer,
-                    difficulty=difficulty,
-                    question_type=type_match.group(1).strip() if type_match else "concept",
-                    context=note_content[:200],
-                    options=shuffled_options,
-                    correct_index=correct_index
-                )
-
-                # Cache the result
-                self.cache[cache_key] = (time.time(), quiz)
-                return quiz
-
-        return None
-
-    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
-        """Generate enemy backstory and combat dialog"""
-        cache_key = f"enemy_{hash(note_content)}_{base_enemy}"
+        workers = min(model_registry.batch_size(), len(prompts))
+        if workers <= 1:
+            return [generate_one(prompt) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llama-batch") as pool:
+            return list(pool.map(generate_one, prompts))
 
-        # Check cache
-        if cache_key in self.cache:
-            cached_time, cached_result = self.cache[cache_key]
-            if time.time() - cached_time < self.cache_ttl:
-                return cached_result
+    def _quiz_prompt(self, note_title: str, note_content: str, structured: bool = False) -> str:
+        return quiz_prompt(note_title, self.note_excerpt(note_content), structured)
 
+    def _enemy_prompt(self, note_title: str, note_content: str, structured: bool = False) -> str:
         # Extract structured content for richer context
         structured_content = self._extract_structured_content(note_content)
 
         # Build enhanced content for AI context
-        enhanced_content = note_content[:600]
+        enhanced_content = self.note_excerpt(note_content, "enemy")
         if structured_content['headers']:
             enhanced_content += f"\n\nHeaders: {', '.join(structured_content['headers'][:3])}"
         if structured_content['lists']:
@@ -314,30 +1067,87 @@ Make the decoy answer similar enough to confuse someone who doesn't know the mat
         if structured_content['numbers']:
             enhanced_content += f"\nNumbers: {', '.join(map(str, structured_content['numbers'][:5]))}"
 
-        prompt = f"""You are a dungeon master describing a magical encounter. Create a rich, atmospheric description of discovering a mystical realm where the knowledge from this note has come alive:
+        return enemy_prompt(note_title, enhanced_content, structured, template="tinyllama_enemy")
 
-Title: "{note_title}"
-Content: {enhanced_content}
+    def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
+        """Generate an intelligent quiz question from note content"""
+        cache_key = quiz_cache_key(self.cache_identity, note_title, note_content)
 
-Write a 3-4 sentence narrative describing the encounter as a dungeon master would. Include specific details from the note content (numbers, names, concepts, actions). Make it magical and immersive, like the knowledge itself has awakened to challenge intruders. Keep it concise but atmospheric.
+        # Check cache
+        cached = load_cached_quiz(cache_key, difficulty)
+        if cached:
+            return cached
 
-Examples of good style:
-- "You enter the Algorithm Archive where 27 mystical patterns swirl in the air..."
-- "The ancient text declares: 'Machine learning automates analytical model building' as glowing runes..."
-- "Five frameworks materialize as spectral guardians: TensorFlow, PyTorch..."
+        # Create context-aware prompt for multiple choice
+        mode = self.output_mode()
+        schema = QUIZ_SCHEMA if mode != "text" else None
+        prompt = self._quiz_prompt(note_title, note_content, schema is not None)
 
-Write ONLY the narrative description:"""
+        response = self.generate_text(prompt, max_tokens=240, schema=schema)
+        quiz = parse_quiz_fields(response, note_content, difficulty, mode) if response else None
+        if quiz:
+            # Cache the result
+            store_cached_result(cache_key, quiz, "quiz")
+        return quiz
 
-        response = self.generate_text(prompt, max_tokens=400, generation_type="enemy")
+    def generate_quiz_questions(self, note_title: str, note_content: str, count: int) -> List[QuizQuestion]:
+        """Generate several quiz questions from one completion"""
+        mode = self.output_mode()
+        schema = QUIZ_BATCH_SCHEMA if mode != "text" else None
+        prompt = quiz_bank_prompt(note_title, self.note_excerpt(note_content, "quiz_bank"), count, schema is not None)
+        response = self.generate_text(prompt, max_tokens=140 * count, schema=schema)
+        return parse_quiz_batch(response, note_content, 1, mode)[:count] if response else []
 
-        if response:
-            # Clean up the AI response and use it as the main narrative
-            encounter_narrative = response.strip()
+    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
+        """Generate enemy backstory and combat dialog"""
+        cache_key = enemy_cache_key(self.cache_identity, note_title, note_content)
+
+        # Check cache
+        cached = load_cached_result(cache_key, EnemyDescription)
+        if cached:
+            return cached
+
+        mode = self.output_mode()
+        schema = ENEMY_SCHEMA if mode != "text" else None
+        prompt = self._enemy_prompt(note_title, note_content, schema is not None)
+
+        response = self.generate_text(prompt, max_tokens=400, generation_type="enemy", schema=schema)
+        enemy_desc = self._build_enemy_description(note_title, note_content, response, mode)
+        if enemy_desc:
+            store_cached_result(cache_key, enemy_desc, "enemy")
+            return enemy_desc
 
-            # Remove any formatting artifacts or unwanted prefixes
-            if encounter_narrative.startswith(('Narrative:', 'ENCOUNTER_NARRATIVE:', 'Description:')):
-                encounter_narrative = encounter_narrative.split(':', 1)[1].strip()
+        print(f"❌ AI enemy generation failed - no response generated")
+        return None
 
+    def generate_enemy_descriptions(self, requests: List[Tuple[str, str, str]]) -> List[Optional[EnemyDescription]]:
+        """Generate enemy descriptions for many notes with batched inference, in order"""
+        results: List[Optional[EnemyDescription]] = []
+        pending = []
+        for note_title, note_content, _base_enemy in requests:
+            cache_key = enemy_cache_key(self.cache_identity, note_title, note_content)
+            cached = load_cached_result(cache_key, EnemyDescription)
+            if not cached:
+                pending.append((len(results), note_title, note_content, cache_key))
+            results.append(cached)
+
+        mode = self.output_mode()
+        schema = ENEMY_SCHEMA if mode != "text" else None
+        prompts = [self._enemy_prompt(note_title, note_content, schema is not None)
+                   for _, note_title, note_content, _ in pending]
+        responses = self.generate_texts(prompts, max_tokens=400, generation_type="enemy", schema=schema)
+        for (index, note_title, note_content, cache_key), response in zip(pending, responses):
+            enemy_desc = self._build_enemy_description(note_title, note_content, response, mode)
+            if enemy_desc:
+                store_cached_result(cache_key, enemy_desc, "enemy")
+            results[index] = enemy_desc
+        return results
+
+    def _build_enemy_description(self, note_title: str, note_content: str, response: Optional[str],
+                                 mode: str = "text") -> Optional[EnemyDescription]:
+        """EnemyDescription around a generated narrative, or None without one"""
+        encounter_narrative = parse_enemy_narrative(response, mode) if response else None
+        if encounter_narrative:
             print(f"🎭 AI generated rich narrative: {len(encounter_narrative)} chars")
 
             # Generate other fields using fallback methods since AI focuses only on narrative
@@ -353,8 +1163,7 @@ Write ONLY the narrative description:"""
             # Calculate recommended stats based on note content
             recommended_hp, recommended_attack = self._calculate_stats_from_content(note_content, note_title)
 
-            # Cache the result
-            enemy_desc = EnemyDescription(
+            return EnemyDescription(
                 name=enemy_name,
                 description=description,
                 weapon=weapon,
@@ -369,19 +1178,8 @@ Write ONLY the narrative description:"""
                 environment_description=environment_desc,
                 manifestation_story=f"The essence of {note_title} has awakened to guard its secrets."
             )
-
-            self.cache[cache_key] = (time.time(), enemy_desc)
-            return enemy_desc
-
-        print(f"❌ AI enemy generation failed - no response generated")
         return None
 
-    def _extract_field(self, text: str, field_name: str) -> Optional[str]:
-        """Extract a specific field from AI response"""
-        pattern = f"{field_name}:\\s*(.+?)(?=\\n[A-Z_]+:|$)"
-        match = re.search(pattern, text, re.DOTALL)
-        return match.group(1).strip() if match else None
-
     def _calculate_stats_from_content(self, content: str, title: str) -> Tuple[int, int]:
         """Calculate enemy stats based on note characteristics and content nature"""
         content_lower = content.lower()
@@ -563,184 +1361,51 @@ Write ONLY the narrative description:"""
 
     def _generate_fallback_narrative(self, title: str, content: str) -> str:
         """Generate rich dungeon master style encounter narrative when AI fails"""
-        content_lower = content.lower()
-
-        # Extract specific details from content for richer narratives
-        lines = [line.strip() for line in content.split('\n') if line.strip()]
-        numbers = re.findall(r'\b\d+\b', content)
-        key_phrases = [line for line in lines[:3] if len(line) > 10]  # First few meaningful lines
-
-        # Build rich narrative based on content type
-        if any(word in content_lower for word in ['machine learning', 'algorithm', 'neural', 'data']):
-            narrative = f"You enter the Sacred Algorithm Sanctum, where the ancient knowledge of '{title}' has crystallized into living code. "
-            if numbers:
-                narrative += f"The air crackles with {numbers[0]} different patterns of mystical energy, each representing a layer of understanding. "
-            if key_phrases:
-                narrative += f"Glowing runes spell out the eternal truth: '{key_phrases[0][:60]}...' "
-            narrative += "Data streams flow like luminous rivers through the ethereal space, while spectral frameworks stand sentinel over the accumulated wisdom."
-            return narrative
-
-        elif any(word in content_lower for word in ['parking', 'spot', 'lot', 'space']):
-            narrative = f"You approach the Phantom Parking Realm, where the faded markings of '{title}' still glow with spectral energy. "
-            if numbers:
-                narrative += f"Exactly {numbers[0]} ghostly vehicles materialize and vanish in endless cycles. "
-            if key_phrases:
-                narrative += f"Ancient inscriptions read: '{key_phrases[0][:50]}...' "
-            narrative += "The asphalt beneath your feet pulses with forgotten memories of countless arrivals and departures."
-            return narrative
-
-        elif any(word in content_lower for word in ['recipe', 'cook', 'ingredient', 'bake', 'food']):
-            narrative = f"You enter the Mystical Culinary Chamber, where the essence of '{title}' has manifested as living cuisine. "
-            if numbers:
-                narrative += f"The sacred recipe calls for {numbers[0]} mystical components, each floating in shimmering suspension. "
-            if key_phrases:
-                narrative += f"The air whispers ancient culinary secrets: '{key_phrases[0][:50]}...' "
-            narrative += "Spectral ingredients dance through the air while phantom aromas awaken primordial hunger in your soul."
-            return narrative
-
-        elif any(word in content_lower for word in ['meeting', 'agenda', 'deadline', 'office']):
-            narrative = f"You find yourself in the Ethereal Conference Dimension, where echoes of '{title}' still reverberate through spacetime. "
-            if numbers:
-                narrative += f"The phantom agenda lists {numbers[0]} items that will never be completed. "
-            if key_phrases:
-                narrative += f"Ghostly voices discuss: '{key_phrases[0][:50]}...' "
-            narrative += "Corporate spirits gather around a table that exists in all timelines simultaneously, their eternal deliberations shaping reality itself."
-            return narrative
-
-        elif any(word in content_lower for word in ['code', 'function', 'programming', 'software']):
-            narrative = f"You traverse the Digital Plane of '{title}', where lines of code have achieved consciousness. "
-            if numbers:
-                narrative += f"Exactly {numbers[0]} functions execute in parallel dimensions, their outputs weaving reality itself. "
-            if key_phrases:
-                narrative += f"The core algorithm declares: '{key_phrases[0][:50]}...' "
-            narrative += "Variables drift through the air like glowing moths while conditional statements branch into infinite possibilities."
-            return narrative
-
-        elif any(word in content_lower for word in ['network', 'ip', 'server', 'connection']):
-            narrative = f"You navigate the Ethereal Network Realm of '{title}', where data flows like rivers of light. "
-            if numbers:
-                narrative += f"The network topology reveals {numbers[0]} nodes pulsing with digital life. "
-            if key_phrases:
-                narrative += f"The server speaks in binary tongues: '{key_phrases[0][:50]}...' "
-            narrative += "Packets of information swim through fiber-optic streams while routers stand as ancient guardians of the data pathways."
-            return narrative
-
-        else:
-            # Generic but rich fallback
-            narrative = f"You discover the Sanctum of Eternal Knowledge, where the essence of '{title}' has achieved mystical consciousness. "
-            if numbers:
-                narrative += f"The sacred text contains {numbers[0]} fundamental truths that shape this reality. "
-            if key_phrases:
-                narrative += f"Ancient wisdom speaks: '{key_phrases[0][:50]}...' "
-            narrative += "Reality bends and flows around you as pure knowledge takes physical form, challenging any who dare approach its secrets."
-            return narrative
+        # Specific details for richer narratives: the note's most central sentence and numbers
+        summary = note_summaries.get(content)
+        numbers = re.findall(r'\b\d+\b', summary.text) or re.findall(r'\b\d+\b', content)
+        key_phrases = [sentence for sentence in summary.sentences if 10 < len(sentence) <= 160]
+        key_phrases += summary.keyphrases
+
+        slots = TemplateSlots({
+            'title': title,
+            'number': numbers[0] if numbers else '',
+            'key_phrase': key_phrases[0] if key_phrases else '',
+        })
+        entry = narrative_engine.table('fallback_narrative').resolve(content.lower())
+        return "".join(entry.render_segments(slots))
+
+    def _render_fallback(self, table: str, title: str, content: str) -> str:
+        """Render a content-matched fallback table from the narrative content packs"""
+        return narrative_engine.render(table, TemplateSlots({'title': title}), text=content.lower())
 
     def _generate_fallback_environment(self, title: str, content: str) -> str:
         """Generate environment description when AI fails"""
-        content_lower = content.lower()
-
-        if any(word in content_lower for word in ['parking', 'lot']):
-            return "Abandoned Phantom Parking Lot"
-        elif any(word in content_lower for word in ['recipe', 'cook']):
-            return "Spectral Kitchen of Lost Recipes"
-        elif any(word in content_lower for word in ['meeting', 'office']):
-            return "Ethereal Conference Chamber"
-        elif any(word in content_lower for word in ['code', 'programming']):
-            return "Digital Realm of Living Code"
-        elif any(word in content_lower for word in ['network', 'ip']):
-            return "Cyberspace Nexus"
-        elif any(word in content_lower for word in ['shop', 'buy']):
-            return "Merchant's Eternal Bazaar"
-        else:
-            return f"Mystical Sanctuary of {title}"
+        return self._render_fallback('fallback_environment', title, content)
 
     def _generate_fallback_name(self, title: str, content: str) -> str:
         """Generate creative enemy name when AI fails"""
-        content_lower = content.lower()
-
-        # Detect content patterns and generate appropriate names (order matters!)
-        if any(word in content_lower for word in ['recipe', 'cook', 'ingredient', 'bake', 'flour', 'sugar']):
-            return f"Culinary Phantom of {title}"
-        elif any(word in content_lower for word in ['password', 'login', 'auth', 'secret']):
-            return f"Gatekeeper of Hidden Secrets"
-        elif any(word in content_lower for word in ['code', 'function', 'class', 'variable', 'algorithm']):
-            return f"Digital Scribe of {title}"
-        elif any(word in content_lower for word in ['ip', 'address', 'network', 'server', 'router', 'ssid']):
-            return f"Subnet Phantom of {title}"
-        elif any(word in content_lower for word in ['buy', 'shop', 'purchase', 'item', 'milk', 'bread', 'eggs']):
-            return f"Merchant Wraith of Endless Desires"
-        elif any(word in content_lower for word in ['meeting', 'agenda', 'discussion', 'deadline']):
-            return f"Echo of the {title} Assembly"
-        elif any(word in content_lower for word in ['travel', 'trip', 'journey', 'flight', 'hotel']):
-            return f"Wandering Spirit of {title}"
-        elif any(word in content_lower for word in ['dream', 'sleep', 'night']):
-            return f"Oneiric Guardian of {title}"
-        elif any(word in content_lower for word in ['money', 'cost', 'price', 'budget']):
-            return f"Coinkeeper of {title}"
-        elif any(word in content_lower for word in ['health', 'doctor', 'medical']):
-            return f"Vitality Warden of {title}"
-        else:
-            # Generic but more interesting than "Guardian of X"
-            mystical_prefixes = ["Essence of", "Spirit of", "Echo of", "Phantom of", "Keeper of"]
-            return f"{random.choice(mystical_prefixes)} {title}"
+        return self._render_fallback('fallback_name', title, content)
 
     def _generate_fallback_description(self, title: str, content: str) -> str:
         """Generate enemy description when AI fails"""
-        content_lower = content.lower()
-
-        if any(word in content_lower for word in ['recipe', 'cook', 'ingredient', 'bake']):
-            return "A chef-like demon wreathed in aromatic smoke, wielding kitchen implements as weapons."
-        elif any(word in content_lower for word in ['code', 'function', 'algorithm']):
-            return "A mystical programmer, its fingers weaving glowing runes of compiled knowledge."
-        elif any(word in content_lower for word in ['ip', 'address', 'network', 'router']):
-            return "A translucent entity crackling with digital energy, its form shifting like data packets."
-        elif any(word in content_lower for word in ['meeting', 'agenda', 'deadline']):
-            return "A suited specter endlessly scribbling notes, its hollow eyes reflecting corporate tedium."
-        elif any(word in content_lower for word in ['travel', 'trip', 'flight', 'hotel']):
-            return "A restless wanderer with a map of ethereal destinations, forever planning journeys never taken."
-        else:
-            return f"A mysterious entity born from the essence of {title}, guarding its secrets fiercely."
+        return self._render_fallback('fallback_description', title, content)
 
     def _generate_fallback_weapon(self, title: str, content: str) -> str:
         """Generate weapon when AI fails"""
-        content_lower = content.lower()
-
-        if any(word in content_lower for word in ['recipe', 'cook', 'ingredient', 'bake']):
-            return "Flaming Spatula of Culinary Wrath"
-        elif any(word in content_lower for word in ['code', 'function', 'algorithm']):
-            return "Binary Blade of Compiled Logic"
-        elif any(word in content_lower for word in ['password', 'login', 'auth']):
-            return "Cryptographic Key of Forbidden Access"
-        elif any(word in content_lower for word in ['ip', 'network', 'router']):
-            return "Ethernet Lash of Digital Pain"
-        elif any(word in content_lower for word in ['meeting', 'agenda', 'deadline']):
-            return "Bureaucratic Gavel of Endless Meetings"
-        elif any(word in content_lower for word in ['travel', 'trip', 'flight', 'hotel']):
-            return "Compass Blade of Wandering Paths"
-        else:
-            return f"Ethereal Blade of {title}"
+        return self._render_fallback('fallback_weapon', title, content)
 
     def _generate_fallback_armor(self, title: str, content: str) -> str:
         """Generate armor when AI fails"""
-        content_lower = content.lower()
-
-        if any(word in content_lower for word in ['recipe', 'cook', 'ingredient', 'bake']):
-            return "Apron of Culinary Mastery"
-        elif any(word in content_lower for word in ['code', 'function', 'algorithm']):
-            return "Chainmail of Error Handling"
-        elif any(word in content_lower for word in ['ip', 'network', 'router']):
-            return "Firewall Robes of Packet Protection"
-        elif any(word in content_lower for word in ['meeting', 'agenda', 'deadline']):
-            return "Corporate Suit of Bureaucratic Defense"
-        elif any(word in content_lower for word in ['travel', 'trip', 'flight', 'hotel']):
-            return "Traveler's Cloak of Endless Journeys"
-        else:
-            return f"Mystical Vestments of {title}"
+        return self._render_fallback('fallback_armor', title, content)
 
 
 class TinyLlamaProvider(AIProvider):
     """TinyLlama provider - wraps LocalAIClient to implement AIProvider interface"""
 
+    # A single llama.cpp context can't serve concurrent requests
+    max_concurrency = 1
+
     def __init__(self):
         self._client = LocalAIClient()
         self._initialized = False
@@ -754,30 +1419,382 @@ class TinyLlamaProvider(AIProvider):
         """Check if TinyLlama is ready"""
         return self._client.available
 
+    @property
+    def cache_identity(self) -> Tuple[str, str]:
+        return self._client.cache_identity
+
     def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
         """Generate quiz question using TinyLlama"""
         return self._client.generate_quiz_question(note_title, note_content, difficulty)
 
+    def generate_quiz_questions(self, note_title: str, note_content: str, count: int) -> List[QuizQuestion]:
+        """Generate a batch of quiz questions using TinyLlama"""
+        return self._client.generate_quiz_questions(note_title, note_content, count)
+
     def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
         """Generate enemy description using TinyLlama"""
         return self._client.generate_enemy_description(note_title, note_content, base_enemy)
 
+    def generate_enemy_descriptions(self, requests: List[Tuple[str, str, str]]) -> List[Optional[EnemyDescription]]:
+        """Generate a wave of enemy descriptions with batched local inference"""
+        return self._client.generate_enemy_descriptions(requests)
+
+    async def astream_enemy_narrative(self, note_title: str, note_content: str, base_enemy: str) -> AsyncIterator[str]:
+        """Stream the encounter narrative token by token from llama.cpp"""
+        cached = load_cached_result(enemy_cache_key(self.cache_identity, note_title, note_content), EnemyDescription)
+        if cached:
+            yield cached.encounter_narrative
+            return
+
+        prompt = self._client._enemy_prompt(note_title, note_content)
+        async for chunk in iterate_in_thread(lambda: self._client.stream_text(prompt, 400, "enemy")):
+            yield chunk
+
+    async def astream_quiz_response(self, note_title: str, note_content: str, difficulty: int = 1) -> AsyncIterator[str]:
+        """Stream the raw quiz completion token by token from llama.cpp"""
+        prompt = self._client._quiz_prompt(note_title, note_content)
+        async for chunk in iterate_in_thread(lambda: self._client.stream_text(prompt, 200, "quiz")):
+            yield chunk
+
     @property
     def provider_name(self) -> str:
         return "TinyLlama (Local)"
 
 
+# =============================================================================
+# Worker Process Provider
+# =============================================================================
+
+# Provider methods a worker process serves
+WORKER_METHODS = ("generate_quiz_question", "generate_quiz_questions", "generate_enemy_description",
+                  "generate_enemy_descriptions")
+
+
+class WorkerProcessProvider(AIProvider):
+    """Runs a provider in worker processes (see ai_worker.py) so its inference never holds this process's GIL.
+
+    Results are identical to the in-process provider's and share its cache;
+    streaming falls back to whole results (see AIProvider.astream_*).
+    """
+
+    def __init__(self, factory: str, name: str, workers: int, timeout: float):
+        self._pool = AIWorkerPool(factory, WORKER_METHODS, size=workers, timeout=timeout)
+        self._name = name
+        self._info: Dict[str, Any] = {}
+        self.max_concurrency = workers
+
+    @classmethod
+    def from_settings(cls, settings) -> "WorkerProcessProvider":
+        return cls("brainbot:TinyLlamaProvider", "tinyllama", settings.ai_worker_processes,
+                   settings.ai_worker_timeout)
+
+    def initialize(self) -> bool:
+        """Start the workers; ready once one of them has loaded its model"""
+        self._info = self._pool.start() or {}
+        if self._info:
+            print(f"✅ {self.provider_name} ready")
+        return bool(self._info)
+
+    def is_available(self) -> bool:
+        return self._pool.available()
+
+    @property
+    def cache_identity(self) -> Tuple[str, str]:
+        identity = self._info.get("cache_identity")
+        return tuple(identity) if identity else (self._name, "worker")
+
+    def _call(self, method: str, *args: Any) -> Any:
+        """Run a provider method in a worker. A cancelled caller's request is stopped in the worker too."""
+        raise_if_cancelled()
+        request_id, future = self._pool.submit(method, args)
+        try:
+            with on_cancel(lambda: self._pool.cancel(request_id)):
+                return future.result()
+        except AIWorkerCancelled:
+            raise_if_cancelled()
+            raise
+        except AIWorkerError as e:
+            print(f"🔥 {self.provider_name}: {e}")
+            raise
+
+    def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
+        return self._call("generate_quiz_question", note_title, note_content, difficulty)
+
+    def generate_quiz_questions(self, note_title: str, note_content: str, count: int) -> List[QuizQuestion]:
+        return self._call("generate_quiz_questions", note_title, note_content, count)
+
+    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
+        return self._call("generate_enemy_description", note_title, note_content, base_enemy)
+
+    def generate_enemy_descriptions(self, requests: List[Tuple[str, str, str]]) -> List[Optional[EnemyDescription]]:
+        return self._call("generate_enemy_descriptions", requests)
+
+    def worker_stats(self) -> Dict[str, Any]:
+        return self._pool.stats()
+
+    def close(self):
+        self._pool.close()
+
+    async def aclose(self):
+        await asyncio.to_thread(self.close)
+
+    @property
+    def provider_name(self) -> str:
+        name = self._info.get("provider_name", self._name)
+        return f"{name} ({self._pool.size} worker process{'es' if self._pool.size > 1 else ''})"
+
+
+def create_tinyllama_provider(settings) -> AIProvider:
+    """TinyLlama in this process, or in worker processes when ai_worker_processes is set"""
+    if settings.ai_worker_processes > 0:
+        return WorkerProcessProvider.from_settings(settings)
+    return TinyLlamaProvider()
+
+
 # =============================================================================
 # Claude CLI Provider
 # =============================================================================
 
+CLAUDE_CLI_ONESHOT = ['claude', '--print', '--output-format', 'text']
+# Long-running mode: one JSON user message per line in, stream of JSON events out
+CLAUDE_CLI_STREAMING = ['claude', '--print', '--input-format', 'stream-json',
+                        '--output-format', 'stream-json', '--verbose']
+
+
+class ClaudeCLIResultError(RuntimeError):
+    """The CLI answered in stream-json but the request failed (rate limit, overload, API error)"""
+
+
+class ClaudeCLIWorker:
+    """A pre-started `claude` process answering one prompt in stream-json mode.
+
+    Isolation: every prompt runs in a fresh process, so no earlier quiz or
+    enemy prompt is in its conversation and a result depends on its prompt
+    alone (which is all the result cache keys on). The replacement process is
+    started as soon as a job ends, so its boot overlaps the idle time instead
+    of delaying the next prompt.
+    """
+
+    def __init__(self):
+        self.completed = 0  # Prompts answered in stream-json mode
+        self.streamed = False  # Some process of this worker produced stream-json output
+        self._proc = None
+        self._lines = None
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            CLAUDE_CLI_STREAMING,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read_stdout, args=(self._proc, self._lines),
+                         name="claude-cli-reader", daemon=True).start()
+
+    @staticmethod
+    def _read_stdout(proc: subprocess.Popen, lines: queue.Queue):
+        for line in proc.stdout:
+            lines.put(line)
+        proc.stdout.close()
+        lines.put(None)  # Process exited
+
+    def run(self, prompt: str, timeout: float) -> str:
+        """Send one prompt to a fresh process and wait for its result event. Raises on timeout or worker failure."""
+        if not self.alive():
+            self.stop()
+            self._start()
+        try:
+            return self._answer(prompt, timeout)
+        finally:
+            # Never send a second prompt into this conversation
+            self.stop()
+
+    def prestart(self):
+        """Boot the process for the next prompt"""
+        if not self.alive():
+            self._start()
+
+    def _answer(self, prompt: str, timeout: float) -> str:
+        message = {"type": "user", "message": {"role": "user", "content": prompt}}
+        self._proc.stdin.write(json.dumps(message) + "\n")
+        self._proc.stdin.flush()
+
+        deadline = time.monotonic() + timeout
+        # Killing the process on cancel ends its output, which wakes the loop below
+        with on_cancel(self._proc.kill):
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"no result after {timeout:.0f}s")
+                try:
+                    line = self._lines.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError(f"no result after {timeout:.0f}s")
+                if line is None:
+                    raise_if_cancelled()
+                    raise RuntimeError(f"claude exited with code {self._proc.wait()}")
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                self.streamed = True
+                if event.get("type") == "result":
+                    if event.get("is_error"):
+                        raise ClaudeCLIResultError(event.get("result") or event.get("subtype", "error"))
+                    self.completed += 1
+                    return (event.get("result") or "").strip()
+
+    def stop(self):
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass  # Process already gone
+        if proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+class ClaudeCLIWorkerPool:
+    """Bounded set of Claude CLI workers. Callers queue for a free worker.
+
+    Falls back to one `claude --print` process per prompt when the installed
+    CLI can't run in stream-json mode (or persistent workers are disabled).
+    """
+
+    def __init__(self, size: int = 2, timeout: float = 45.0, persistent: bool = True):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.persistent = persistent
+        self._idle: "queue.LifoQueue[ClaudeCLIWorker]" = queue.LifoQueue()
+        self._workers = [ClaudeCLIWorker() for _ in range(self.size)]
+        for worker in self._workers:
+            self._idle.put(worker)
+        self._lock = threading.Lock()
+        self.waiting = 0  # Requests queued for a worker
+
+    def run(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Run a prompt on the next free worker. None on queue timeout, job timeout or error."""
+        timeout = timeout or self.timeout
+        with self._lock:
+            self.waiting += 1
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            print(f"🔥 Claude CLI busy - no worker free after {timeout:.0f}s")
+            return None
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        try:
+            if self.persistent:
+                return self._run_persistent(worker, prompt, timeout)
+            return self._run_once(prompt, timeout)
+        finally:
+            if self.persistent:
+                try:
+                    worker.prestart()
+                except OSError as e:
+                    print(f"⚠️ Claude CLI worker could not start: {e}")
+            self._idle.put(worker)
+
+    def _run_persistent(self, worker: ClaudeCLIWorker, prompt: str, timeout: float) -> Optional[str]:
+        try:
+            return worker.run(prompt, timeout)
+        except TimeoutError:
+            print("🔥 Claude CLI timed out")
+        except ClaudeCLIResultError as e:
+            # Streaming works, this request failed - the next one may not
+            print(f"🔥 Claude CLI error: {e}")
+        except (OSError, RuntimeError, ValueError) as e:
+            if not any(w.streamed or w.completed for w in self._workers):
+                # No worker has produced stream-json yet: this CLI can't run in that mode
+                print(f"⚠️ Claude CLI streaming mode unavailable ({e}) - using one process per prompt")
+                self.persistent = False
+                return self._run_once(prompt, timeout)
+            print(f"🔥 Claude CLI error: {e}")
+        return None
+
+    def _run_once(self, prompt: str, timeout: float) -> Optional[str]:
+        """Run claude CLI with a prompt in a fresh process and return the response"""
+        try:
+            raise_if_cancelled()
+            proc = subprocess.Popen(
+                CLAUDE_CLI_ONESHOT,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+            try:
+                with on_cancel(proc.kill):
+                    stdout, stderr = proc.communicate(prompt, timeout=timeout)
+            finally:
+                if proc.poll() is None:  # Timed out
+                    proc.kill()
+                    proc.communicate()
+            raise_if_cancelled()
+            if proc.returncode == 0:
+                return stdout.strip()
+            else:
+                print(f"🔥 Claude CLI error: {stderr}")
+        except AICancelled:
+            raise
+        except subprocess.TimeoutExpired:
+            print("🔥 Claude CLI timed out")
+        except Exception as e:
+            print(f"🔥 Claude CLI error: {e}")
+        return None
+
+    def close(self):
+        """Stop every worker process"""
+        for _ in range(self.size):
+            try:
+                worker = self._idle.get(timeout=1)
+            except queue.Empty:
+                continue  # Still running a job; its process exits with ours
+            worker.stop()
+            self._idle.put(worker)
+
+
 class ClaudeCLIProvider(AIProvider):
     """Claude CLI provider - uses existing Claude Code subscription via CLI"""
 
-    def __init__(self):
+    prompt_tokens_setting = "claude_prompt_tokens"
+    # The CLI can't pass a schema, so JSON is asked for in the prompt
+    structured_mode = "json_prompt"
+
+    def __init__(self, workers: int = 2, timeout: float = 45.0, persistent: bool = True):
         self._available = False
-        self._cache = {}
-        self._cache_ttl = 300  # 5 minutes
+        self._pool = ClaudeCLIWorkerPool(workers, timeout, persistent)
+        self.max_concurrency = self._pool.size
+
+    @classmethod
+    def from_settings(cls, settings) -> "ClaudeCLIProvider":
+        """Build a provider from GameSettings"""
+        return cls(
+            workers=settings.claude_cli_workers,
+            timeout=settings.claude_cli_timeout,
+            persistent=settings.claude_cli_persistent,
+        )
+
+    @property
+    def cache_identity(self) -> Tuple[str, str]:
+        # "isolated": results cached while CLI processes shared a conversation are not reused
+        return ("claude_cli", "isolated")
 
     def initialize(self) -> bool:
         """Check if Claude CLI is available and authenticated"""
@@ -801,113 +1818,237 @@ class ClaudeCLIProvider(AIProvider):
         """Check if Claude CLI is ready"""
         return self._available
 
-    def _run_claude(self, prompt: str, timeout: int = 30) -> Optional[str]:
-        """Run claude CLI with a prompt and return the response"""
-        try:
-            result = subprocess.run(
-                ['claude', '--print', '--output-format', 'text'],
-                input=prompt,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-            else:
-                print(f"🔥 Claude CLI error: {result.stderr}")
-        except subprocess.TimeoutExpired:
-            print("🔥 Claude CLI timed out")
-        except Exception as e:
-            print(f"🔥 Claude CLI error: {e}")
-        return None
+    def _run_claude(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Run a prompt on the CLI worker pool and return the response"""
+        return self._pool.run(prompt, timeout)
+
+    def close(self):
+        """Stop the CLI worker processes"""
+        self._pool.close()
+
+    async def aclose(self):
+        await asyncio.to_thread(self.close)
 
     def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
         """Generate quiz question using Claude CLI"""
-        cache_key = f"quiz_{hash(note_content)}_{difficulty}"
+        cache_key = quiz_cache_key(self.cache_identity, note_title, note_content)
 
         # Check cache
-        if cache_key in self._cache:
-            cached_time, cached_result = self._cache[cache_key]
-            if time.time() - cached_time < self._cache_ttl:
-                return cached_result
+        cached = load_cached_quiz(cache_key, difficulty)
+        if cached:
+            return cached
 
-        prompt = f"""Based on this note about "{note_title}":
+        mode = self.output_mode()
+        response = self._run_claude(quiz_prompt(note_title, self.note_excerpt(note_content), mode != "text"))
+        if response:
+            quiz = parse_quiz_fields(response, note_content, difficulty, mode)
+            if quiz:
+                store_cached_result(cache_key, quiz, "quiz")
+                return quiz
+        return None
 
-{note_content[:500]}
+    def generate_quiz_questions(self, note_title: str, note_content: str, count: int) -> List[QuizQuestion]:
+        """Generate a batch of quiz questions with one Claude CLI call"""
+        mode = self.output_mode()
+        prompt = quiz_bank_prompt(note_title, self.note_excerpt(note_content, "quiz_bank"), count, mode != "text")
+        response = self._run_claude(prompt, timeout=self._pool.timeout * 2)
+        return parse_quiz_batch(response, note_content, 1, mode)[:count] if response else []
 
-Generate a multiple choice quiz question that tests understanding of the key concept.
+    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
+        """Generate enemy description using Claude CLI"""
+        cache_key = enemy_cache_key(self.cache_identity, note_title, note_content)
 
-Create 3 answer options:
-1. One correct answer
-2. One plausible but incorrect answer (similar to correct but wrong in key detail)
-3. One humorous/obviously wrong answer
+        # Check cache
+        cached = load_cached_result(cache_key, EnemyDescription)
+        if cached:
+            return cached
+
+        mode = self.output_mode()
+        response = self._run_claude(enemy_prompt(note_title, self.note_excerpt(note_content, "enemy"), mode != "text"))
+        narrative = parse_enemy_narrative(response, mode) if response else None
+        if narrative:
+            enemy_desc = EnemyDescription(
+                name=f"Spirit of {note_title}",
+                description=f"A mystical entity born from the essence of {note_title}",
+                weapon=f"Ethereal Blade of {note_title}",
+                armor=f"Mystical Vestments of {note_title}",
+                backstory=f"Born from the essence of {note_title}, this creature embodies forgotten knowledge.",
+                combat_phrases=[f"Your understanding of {note_title} means nothing to me!"],
+                defeat_message=f"The secrets of {note_title}... are yours to claim...",
+                victory_message=f"The Spirit of {note_title} has fallen!",
+                encounter_narrative=narrative
+            )
+            store_cached_result(cache_key, enemy_desc, "enemy")
+            print(f"🎭 Claude CLI generated narrative: {len(narrative)} chars")
+            return enemy_desc
+        return None
 
-Format your response exactly as:
-QUESTION: [your question here]
-CORRECT: [the correct answer]
-DECOY: [plausible but incorrect answer]
-FUNNY: [humorous wrong answer]
-TYPE: [definition/concept/relationship/fact]
+    @property
+    def provider_name(self) -> str:
+        return "Claude CLI (Subscription)"
 
-Make the decoy answer similar enough to confuse someone who doesn't know the material well."""
 
-        response = self._run_claude(prompt)
-        if response:
-            quiz = self._parse_quiz_response(response, note_content, difficulty)
-            if quiz:
-                self._cache[cache_key] = (time.time(), quiz)
-                return quiz
-        return None
+# =============================================================================
+# Text Generation Providers (Claude API, Ollama)
+# =============================================================================
 
-    def _parse_quiz_response(self, response: str, note_content: str, difficulty: int) -> Optional[QuizQuestion]:
-        """Parse Claude's quiz response into QuizQuestion object"""
-        question_match = re.search(r'QUESTION:\s*(.+?)(?=CORRECT:|$)', response, re.DOTALL)
-        correct_match = re.search(r'CORRECT:\s*(.+?)(?=DECOY:|$)', response, re.DOTALL)
-        decoy_match = re.search(r'DECOY:\s*(.+?)(?=FUNNY:|$)', response, re.DOTALL)
-        funny_match = re.search(r'FUNNY:\s*(.+?)(?=TYPE:|$)', response, re.DOTALL)
-        type_match = re.search(r'TYPE:\s*(.+?)$', response, re.DOTALL)
+class TextGenerationProvider(AIProvider):
+    """Shared prompts, parsing and caching for providers backed by a text-generation endpoint.
 
-        if question_match and correct_match and decoy_match and funny_match:
-            correct_answer = correct_match.group(1).strip()
-            decoy_answer = decoy_match.group(1).strip()
-            funny_answer = funny_match.group(1).strip()
+    Subclasses implement ``_generate_text`` (blocking) and ``_agenerate_text`` (non-blocking).
+    """
 
-            options = [correct_answer, decoy_answer, funny_answer]
-            random.shuffle(options)
-            correct_index = options.index(correct_answer)
+    # Emoji prefix for log lines
+    _log_icon = "🤖"
+    # Provider half of the cache identity (the model name is the other half)
+    _cache_provider = "text"
 
-            return QuizQuestion(
-                question=question_match.group(1).strip(),
-                answer=correct_answer,
-                difficulty=difficulty,
-                question_type=type_match.group(1).strip() if type_match else "concept",
-                context=note_content[:200],
-                options=options,
-                correct_index=correct_index
-            )
-        return None
+    def __init__(self):
+        self._available = False
+        self._session = None
+        self._session_loop = None
 
-    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
-        """Generate enemy description using Claude CLI"""
-        cache_key = f"enemy_{hash(note_content)}_{base_enemy}"
+    def is_available(self) -> bool:
+        return self._available
 
-        # Check cache
-        if cache_key in self._cache:
-            cached_time, cached_result = self._cache[cache_key]
-            if time.time() - cached_time < self._cache_ttl:
-                return cached_result
+    @abstractmethod
+    def _generate_text(self, prompt: str, max_tokens: int = 200,
+                       schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Generate text, blocking the calling thread. With schema, the text is JSON matching it."""
+        pass
 
-        prompt = f"""You are a dungeon master describing a magical encounter. Create a rich, atmospheric description of discovering a mystical realm where the knowledge from this note has come alive:
+    @abstractmethod
+    async def _agenerate_text(self, prompt: str, max_tokens: int = 200,
+                              schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Generate text without blocking the event loop. With schema, the text is JSON matching it."""
+        pass
+
+    def _get_session(self):
+        """aiohttp session reused across requests on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = self._new_session()
+            self._session_loop = loop
+        return self._session
+
+    def _new_session(self):
+        return aiohttp.ClientSession()
 
-Title: "{note_title}"
-Content: {note_content[:600]}
+    async def aclose(self):
+        """Close the aiohttp session, if one was opened"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
 
-Write a 3-4 sentence narrative describing the encounter as a dungeon master would. Include specific details from the note content (numbers, names, concepts, actions). Make it magical and immersive, like the knowledge itself has awakened to challenge intruders. Keep it concise but atmospheric.
+    @property
+    def cache_identity(self) -> Tuple[str, str]:
+        return (self._cache_provider, self._model)
+
+    def _quiz_prompt(self, note_title: str, note_content: str, structured: bool = False) -> str:
+        return quiz_prompt(note_title, self.note_excerpt(note_content), structured)
 
-Write ONLY the narrative description, nothing else."""
+    def _enemy_prompt(self, note_title: str, note_content: str, structured: bool = False) -> str:
+        return enemy_prompt(note_title, self.note_excerpt(note_content, "enemy"), structured)
 
-        response = self._run_claude(prompt, timeout=45)
+    def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
+        """Generate quiz question using the provider's text endpoint"""
+        cache_key = quiz_cache_key(self.cache_identity, note_title, note_content)
+        cached = load_cached_quiz(cache_key, difficulty)
+        if cached:
+            return cached
+
+        mode = self.output_mode()
+        schema = QUIZ_SCHEMA if mode != "text" else None
+        response = self._generate_text(self._quiz_prompt(note_title, note_content, schema is not None),
+                                       max_tokens=240, schema=schema)
+        return self._finish_quiz(cache_key, response, note_content, difficulty, mode)
+
+    async def agenerate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
+        """Generate quiz question without blocking the event loop"""
+        cache_key = quiz_cache_key(self.cache_identity, note_title, note_content)
+        cached = load_cached_quiz(cache_key, difficulty)
+        if cached:
+            return cached
+
+        mode = self.output_mode()
+        schema = QUIZ_SCHEMA if mode != "text" else None
+        response = await self._agenerate_text(self._quiz_prompt(note_title, note_content, schema is not None),
+                                              max_tokens=240, schema=schema)
+        return self._finish_quiz(cache_key, response, note_content, difficulty, mode)
+
+    def generate_quiz_questions(self, note_title: str, note_content: str, count: int) -> List[QuizQuestion]:
+        """Generate a batch of quiz questions from one completion"""
+        mode = self.output_mode()
+        schema = QUIZ_BATCH_SCHEMA if mode != "text" else None
+        prompt = quiz_bank_prompt(note_title, self.note_excerpt(note_content, "quiz_bank"), count, schema is not None)
+        response = self._generate_text(prompt, max_tokens=160 * count, schema=schema)
+        return parse_quiz_batch(response, note_content, 1, mode)[:count] if response else []
+
+    def _finish_quiz(self, cache_key: str, response: Optional[str], note_content: str, difficulty: int,
+                     mode: str = "text") -> Optional[QuizQuestion]:
         if response:
+            quiz = parse_quiz_fields(response, note_content, difficulty, mode)
+            if quiz:
+                store_cached_result(cache_key, quiz, "quiz")
+                return quiz
+        return None
+
+    async def _astream_text(self, prompt: str, max_tokens: int = 200) -> AsyncIterator[str]:
+        """Yield generated text as it arrives. Default: the whole completion in one chunk."""
+        text = await self._agenerate_text(prompt, max_tokens)
+        if text:
+            yield text
+
+    async def astream_quiz_response(self, note_title: str, note_content: str, difficulty: int = 1) -> AsyncIterator[str]:
+        """Stream the raw quiz completion"""
+        async for chunk in self._astream_text(self._quiz_prompt(note_title, note_content), max_tokens=200):
+            yield chunk
+
+    async def astream_enemy_narrative(self, note_title: str, note_content: str, base_enemy: str) -> AsyncIterator[str]:
+        """Stream the encounter narrative, caching the finished description"""
+        cache_key = enemy_cache_key(self.cache_identity, note_title, note_content)
+        cached = load_cached_result(cache_key, EnemyDescription)
+        if cached:
+            yield cached.encounter_narrative
+            return
+
+        chunks = []
+        async for chunk in self._astream_text(self._enemy_prompt(note_title, note_content), max_tokens=400):
+            chunks.append(chunk)
+            yield chunk
+        self._finish_enemy(cache_key, "".join(chunks), note_title)
+
+    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
+        """Generate enemy description using the provider's text endpoint"""
+        cache_key = enemy_cache_key(self.cache_identity, note_title, note_content)
+        cached = load_cached_result(cache_key, EnemyDescription)
+        if cached:
+            return cached
+
+        mode = self.output_mode()
+        schema = ENEMY_SCHEMA if mode != "text" else None
+        response = self._generate_text(self._enemy_prompt(note_title, note_content, schema is not None),
+                                       max_tokens=400, schema=schema)
+        return self._finish_enemy(cache_key, response, note_title, mode)
+
+    async def agenerate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
+        """Generate enemy description without blocking the event loop"""
+        cache_key = enemy_cache_key(self.cache_identity, note_title, note_content)
+        cached = load_cached_result(cache_key, EnemyDescription)
+        if cached:
+            return cached
+
+        mode = self.output_mode()
+        schema = ENEMY_SCHEMA if mode != "text" else None
+        response = await self._agenerate_text(self._enemy_prompt(note_title, note_content, schema is not None),
+                                              max_tokens=400, schema=schema)
+        return self._finish_enemy(cache_key, response, note_title, mode)
+
+    def _finish_enemy(self, cache_key: str, response: Optional[str], note_title: str,
+                      mode: str = "text") -> Optional[EnemyDescription]:
+        narrative = parse_enemy_narrative(response, mode) if response else None
+        if narrative:
             enemy_desc = EnemyDescription(
                 name=f"Spirit of {note_title}",
                 description=f"A mystical entity born from the essence of {note_title}",
@@ -917,32 +2058,61 @@ Write ONLY the narrative description, nothing else."""
                 combat_phrases=[f"Your understanding of {note_title} means nothing to me!"],
                 defeat_message=f"The secrets of {note_title}... are yours to claim...",
                 victory_message=f"The Spirit of {note_title} has fallen!",
-                encounter_narrative=response.strip()
+                encounter_narrative=narrative
             )
-            self._cache[cache_key] = (time.time(), enemy_desc)
-            print(f"🎭 Claude CLI generated narrative: {len(response)} chars")
+            store_cached_result(cache_key, enemy_desc, "enemy")
+            print(f"{self._log_icon} {self.provider_name} generated narrative: {len(narrative)} chars")
             return enemy_desc
         return None
 
-    @property
-    def provider_name(self) -> str:
-        return "Claude CLI (Subscription)"
-
 
 # =============================================================================
 # Claude API Provider
 # =============================================================================
 
-class ClaudeAPIProvider(AIProvider):
+ANTHROPIC_API_URL = "https://api.anthropic.com"
+ANTHROPIC_MESSAGES_URL = f"{ANTHROPIC_API_URL}/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+CLAUDE_API_TIMEOUT = 30.0  # Seconds per Messages API request (the SDK default is 600)
+STRUCTURED_TOOL_NAME = "record_output"
+
+
+def claude_tool_options(schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Messages API options forcing a tool call whose input is the structured output"""
+    if schema is None:
+        return {}
+    return {
+        "tools": [{"name": STRUCTURED_TOOL_NAME, "description": "Record the requested output.",
+                   "input_schema": api_schema(schema)}],
+        "tool_choice": {"type": "tool", "name": STRUCTURED_TOOL_NAME},
+    }
+
+
+def claude_response_text(content: List[Dict[str, Any]]) -> str:
+    """Text of a Messages API response - a structured tool call's input as JSON"""
+    for block in content:
+        if block.get("type") == "tool_use":
+            return json.dumps(block.get("input", {}))
+    return "".join(block.get("text", "") for block in content)
+
+
+class ClaudeAPIProvider(TextGenerationProvider):
     """Claude API provider - uses Anthropic API with user-provided key"""
 
+    _log_icon = "🎭"
+    _cache_provider = "claude_api"
+    prompt_tokens_setting = "claude_prompt_tokens"
+    # A forced tool call whose input schema is the output schema
+    structured_mode = "tool_use"
+
     def __init__(self, api_key: str = "", model: str = "claude-sonnet-4-20250514"):
+        super().__init__()
         self._api_key = api_key
         self._model = model
         self._client = None
-        self._available = False
-        self._cache = {}
-        self._cache_ttl = 300  # 5 minutes
+        # Generations go over a pooled connection that a cancel can shut down mid-request
+        self._http = PooledHTTPClient(ANTHROPIC_API_URL, timeout=CLAUDE_API_TIMEOUT,
+                                      headers={"x-api-key": api_key, "anthropic-version": ANTHROPIC_VERSION})
 
     def initialize(self) -> bool:
         """Initialize Anthropic client with API key"""
@@ -955,7 +2125,7 @@ class ClaudeAPIProvider(AIProvider):
             return False
 
         try:
-            self._client = anthropic.Anthropic(api_key=self._api_key)
+            self._client = anthropic.Anthropic(api_key=self._api_key, timeout=CLAUDE_API_TIMEOUT)
             # Test the connection with a minimal request
             self._client.messages.create(
                 model=self._model,
@@ -970,128 +2140,97 @@ class ClaudeAPIProvider(AIProvider):
             self._available = False
             return False
 
-    def is_available(self) -> bool:
-        """Check if Claude API is ready"""
-        return self._available
-
-    def _generate_text(self, prompt: str, max_tokens: int = 200) -> Optional[str]:
-        """Generate text using Claude API"""
-        if not self._available or not self._client:
+    def _generate_text(self, prompt: str, max_tokens: int = 200,
+                       schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Generate text using the Claude Messages API (aborted when the request is cancelled)"""
+        if not self._available:
             return None
 
+        payload = {
+            "model": self._model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+            **claude_tool_options(schema),
+        }
         try:
-            response = self._client.messages.create(
-                model=self._model,
-                max_tokens=max_tokens,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
+            data = self._http.request_json("POST", "/v1/messages", payload)
+            token_counter_for(self.cache_identity).observe(prompt, data.get("usage", {}).get("input_tokens", 0))
+            return claude_response_text(data.get("content", []))
         except Exception as e:
             print(f"🔥 Claude API error: {e}")
             return None
 
-    def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
-        """Generate quiz question using Claude API"""
-        cache_key = f"quiz_{hash(note_content)}_{difficulty}"
-
-        # Check cache
-        if cache_key in self._cache:
-            cached_time, cached_result = self._cache[cache_key]
-            if time.time() - cached_time < self._cache_ttl:
-                return cached_result
-
-        prompt = f"""Based on this note about "{note_title}":
-
-{note_content[:500]}
-
-Generate a multiple choice quiz question that tests understanding of the key concept.
-
-Create 3 answer options:
-1. One correct answer
-2. One plausible but incorrect answer (similar to correct but wrong in key detail)
-3. One humorous/obviously wrong answer
-
-Format your response exactly as:
-QUESTION: [your question here]
-CORRECT: [the correct answer]
-DECOY: [plausible but incorrect answer]
-FUNNY: [humorous wrong answer]
-TYPE: [definition/concept/relationship/fact]
-
-Make the decoy answer similar enough to confuse someone who doesn't know the material well."""
-
-        response = self._generate_text(prompt, max_tokens=200)
-        if response:
-            quiz = self._parse_quiz_response(response, note_content, difficulty)
-            if quiz:
-                self._cache[cache_key] = (time.time(), quiz)
-                return quiz
-        return None
-
-    def _parse_quiz_response(self, response: str, note_content: str, difficulty: int) -> Optional[QuizQuestion]:
-        """Parse Claude's quiz response into QuizQuestion object"""
-        question_match = re.search(r'QUESTION:\s*(.+?)(?=CORRECT:|$)', response, re.DOTALL)
-        correct_match = re.search(r'CORRECT:\s*(.+?)(?=DECOY:|$)', response, re.DOTALL)
-        decoy_match = re.search(r'DECOY:\s*(.+?)(?=FUNNY:|$)', response, re.DOTALL)
-        funny_match = re.search(r'FUNNY:\s*(.+?)(?=TYPE:|$)', response, re.DOTALL)
-        type_match = re.search(r'TYPE:\s*(.+?)$', response, re.DOTALL)
-
-        if question_match and correct_match and decoy_match and funny_match:
-            correct_answer = correct_match.group(1).strip()
-            decoy_answer = decoy_match.group(1).strip()
-            funny_answer = funny_match.group(1).strip()
-
-            options = [correct_answer, decoy_answer, funny_answer]
-            random.shuffle(options)
-            correct_index = options.index(correct_answer)
-
-            return QuizQuestion(
-                question=question_match.group(1).strip(),
-                answer=correct_answer,
-                difficulty=difficulty,
-                question_type=type_match.group(1).strip() if type_match else "concept",
-                context=note_content[:200],
-                options=options,
-                correct_index=correct_index
-            )
-        return None
-
-    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
-        """Generate enemy description using Claude API"""
-        cache_key = f"enemy_{hash(note_content)}_{base_enemy}"
-
-        # Check cache
-        if cache_key in self._cache:
-            cached_time, cached_result = self._cache[cache_key]
-            if time.time() - cached_time < self._cache_ttl:
-                return cached_result
-
-        prompt = f"""You are a dungeon master describing a magical encounter. Create a rich, atmospheric description of discovering a mystical realm where the knowledge from this note has come alive:
+    async def _agenerate_text(self, prompt: str, max_tokens: int = 200,
+                              schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Generate text using the Claude Messages API over aiohttp"""
+        if not self._available:
+            return None
+        if not AIOHTTP_AVAILABLE:
+            return await asyncio.to_thread(self._generate_text, prompt, max_tokens, schema)
 
-Title: "{note_title}"
-Content: {note_content[:600]}
+        headers = {
+            "x-api-key": self._api_key,
+            "anthropic-version": ANTHROPIC_VERSION,
+            "content-type": "application/json",
+        }
+        payload = {
+            "model": self._model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+            **claude_tool_options(schema),
+        }
+        try:
+            async with self._get_session().post(ANTHROPIC_MESSAGES_URL, json=payload, headers=headers,
+                                                timeout=aiohttp.ClientTimeout(total=CLAUDE_API_TIMEOUT)) as resp:
+                data = await resp.json()
+                if resp.status != 200:
+                    print(f"🔥 Claude API error: {data.get('error', {}).get('message', resp.status)}")
+                    return None
+                token_counter_for(self.cache_identity).observe(prompt, data.get("usage", {}).get("input_tokens", 0))
+                return claude_response_text(data.get("content", []))
+        except Exception as e:
+            print(f"🔥 Claude API error: {e}")
+            return None
 
-Write a 3-4 sentence narrative describing the encounter as a dungeon master would. Include specific details from the note content (numbers, names, concepts, actions). Make it magical and immersive, like the knowledge itself has awakened to challenge intruders. Keep it concise but atmospheric.
+    async def _astream_text(self, prompt: str, max_tokens: int = 200) -> AsyncIterator[str]:
+        """Stream text deltas from the Claude Messages API (server-sent events)"""
+        if not self._available or not AIOHTTP_AVAILABLE:
+            async for chunk in super()._astream_text(prompt, max_tokens):
+                yield chunk
+            return
 
-Write ONLY the narrative description, nothing else."""
+        headers = {
+            "x-api-key": self._api_key,
+            "anthropic-version": ANTHROPIC_VERSION,
+            "content-type": "application/json",
+        }
+        payload = {
+            "model": self._model,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        try:
+            async with self._get_session().post(ANTHROPIC_MESSAGES_URL, json=payload, headers=headers,
+                                                timeout=aiohttp.ClientTimeout(total=60)) as resp:
+                resp.raise_for_status()
+                async for raw_line in resp.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:])
+                    if event.get("type") == "content_block_delta":
+                        text = event.get("delta", {}).get("text")
+                        if text:
+                            yield text
+                    elif event.get("type") == "message_stop":
+                        return
+        except Exception as e:
+            print(f"🔥 Claude API stream error: {e}")
 
-        response = self._generate_text(prompt, max_tokens=400)
-        if response:
-            enemy_desc = EnemyDescription(
-                name=f"Spirit of {note_title}",
-                description=f"A mystical entity born from the essence of {note_title}",
-                weapon=f"Ethereal Blade of {note_title}",
-                armor=f"Mystical Vestments of {note_title}",
-                backstory=f"Born from the essence of {note_title}, this creature embodies forgotten knowledge.",
-                combat_phrases=[f"Your understanding of {note_title} means nothing to me!"],
-                defeat_message=f"The secrets of {note_title}... are yours to claim...",
-                victory_message=f"The Spirit of {note_title} has fallen!",
-                encounter_narrative=response.strip()
-            )
-            self._cache[cache_key] = (time.time(), enemy_desc)
-            print(f"🎭 Claude API generated narrative: {len(response)} chars")
-            return enemy_desc
-        return None
+    def close(self):
+        """Close pooled sync connections"""
+        self._http.close()
 
     def set_model(self, model: str):
         """Change the Claude model being used"""
@@ -1107,56 +2246,163 @@ Write ONLY the narrative description, nothing else."""
 # Ollama Provider (Remote GPU)
 # =============================================================================
 
-class OllamaProvider(AIProvider):
+def _abort_connection(conn: http.client.HTTPConnection):
+    sock = conn.sock
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class PooledHTTPClient:
+    """Thread-safe pool of persistent HTTP/1.1 connections to a single host"""
+
+    def __init__(self, base_url: str, pool_size: int = 4, keep_alive: float = 60.0, timeout: float = 30.0,
+                 headers: Optional[Dict[str, str]] = None):
+        parsed = urllib.parse.urlsplit(base_url)
+        self._https = parsed.scheme == "https"
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port
+        self._base_path = parsed.path.rstrip("/")
+        self._pool_size = max(1, pool_size)
+        self._keep_alive = keep_alive  # Seconds an idle connection is kept for reuse
+        self._timeout = timeout
+        self._headers = headers or {}  # Sent with every request (e.g. API keys)
+        self._idle: List[Tuple[float, http.client.HTTPConnection]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self._pool_size)
+
+    def _checkout(self, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Most recently used idle connection, or a new one. Returns (connection, reused)."""
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                last_used, conn = self._idle.pop()
+                if now - last_used < self._keep_alive and conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                    return conn, True
+                conn.close()
+        conn_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return conn_class(self._host, self._port, timeout=timeout), False
+
+    def _checkin(self, conn: http.client.HTTPConnection):
+        with self._lock:
+            if len(self._idle) < self._pool_size:
+                self._idle.append((time.monotonic(), conn))
+                return
+        conn.close()
+
+    def request_json(self, method: str, path: str, payload: Any = None, timeout: Optional[float] = None) -> Any:
+        """Send a JSON request on a pooled connection and decode the JSON response"""
+        timeout = self._timeout if timeout is None else timeout
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {**self._headers, "Content-Type": "application/json", "Connection": "keep-alive"}
+
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No free connection to {self._host} within {timeout}s")
+        try:
+            for attempt in range(2):
+                conn, reused = self._checkout(timeout)
+                try:
+                    # A cancelled request shuts the socket down, which ends the blocking read
+                    with on_cancel(lambda: _abort_connection(conn)):
+                        conn.request(method, self._base_path + path, body=body, headers=headers)
+                        resp = conn.getresponse()
+                        data = resp.read()
+                except (ConnectionError, http.client.BadStatusLine):
+                    conn.close()
+                    raise_if_cancelled()
+                    # The server may have dropped an idle connection - retry once on a fresh one
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except Exception:
+                    conn.close()
+                    raise_if_cancelled()
+                    raise
+
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._checkin(conn)
+                if resp.status >= 400:
+                    raise RuntimeError(f"HTTP {resp.status}: {data[:200].decode('utf-8', 'replace')}")
+                return json.loads(data)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, conn in idle:
+            conn.close()
+
+
+class OllamaProvider(TextGenerationProvider):
     """Ollama provider - uses remote Ollama server for GPU-accelerated inference"""
 
-    def __init__(self, host: str = "http://100.86.138.79:11434", model: str = "gemma3:4b"):
+    _log_icon = "🦙"
+    _cache_provider = "ollama"
+    prompt_tokens_setting = "ollama_prompt_tokens"
+    # The schema goes in the request's "format" field
+    structured_mode = "json_schema"
+
+    def __init__(self, host: str = "http://100.86.138.79:11434", model: str = "gemma3:4b",
+                 pool_size: int = 4, connection_keep_alive: float = 60.0,
+                 request_timeout: float = 30.0, connect_timeout: float = 5.0,
+                 model_keep_alive: str = "30m"):
+        super().__init__()
         self._host = host.rstrip("/")
         self._model = model
-        self._available = False
-        self._cache: Dict[str, Tuple[float, Any]] = {}
-        self._cache_ttl = 300  # 5 minutes
+        self._pool_size = pool_size
+        self._connection_keep_alive = connection_keep_alive
+        self._request_timeout = request_timeout
+        self._connect_timeout = connect_timeout
+        # Passed to Ollama so the model stays loaded between calls
+        self._model_keep_alive = model_keep_alive
+        self._http = PooledHTTPClient(self._host, pool_size=pool_size,
+                                      keep_alive=connection_keep_alive, timeout=request_timeout)
+
+    @classmethod
+    def from_settings(cls, settings) -> "OllamaProvider":
+        """Build a provider from GameSettings"""
+        return cls(
+            host=settings.ollama_host,
+            model=settings.ollama_model,
+            pool_size=settings.ollama_pool_size,
+            connection_keep_alive=settings.ollama_connection_keep_alive,
+            request_timeout=settings.ollama_request_timeout,
+            connect_timeout=settings.ollama_connect_timeout,
+            model_keep_alive=settings.ollama_model_keep_alive,
+        )
 
     def initialize(self) -> bool:
         """Test connectivity to Ollama server"""
-        import urllib.request
-        import urllib.error
         try:
-            req = urllib.request.Request(f"{self._host}/api/tags", method="GET")
-            with urllib.request.urlopen(req, timeout=5) as resp:
-                import json as _json
-                data = _json.loads(resp.read())
-                models = [m.get("name", "") for m in data.get("models", [])]
-                # Check if our model is available (match with or without tag)
-                model_base = self._model.split(":")[0]
-                found = any(model_base in m for m in models)
-                if found:
-                    self._available = True
-                    print(f"🦙 Ollama ready: {self._model} on {self._host}")
-                    return True
-                else:
-                    print(f"🦙 Ollama server reachable but model '{self._model}' not found. Available: {models}")
-                    # Still mark available - the model might be pullable
-                    self._available = True
-                    return True
+            data = self._http.request_json("GET", "/api/tags", timeout=self._connect_timeout)
+            models = [m.get("name", "") for m in data.get("models", [])]
+            # Check if our model is available (match with or without tag)
+            model_base = self._model.split(":")[0]
+            found = any(model_base in m for m in models)
+            if found:
+                self._available = True
+                print(f"🦙 Ollama ready: {self._model} on {self._host}")
+                return True
+            else:
+                print(f"🦙 Ollama server reachable but model '{self._model}' not found. Available: {models}")
+                # Still mark available - the model might be pullable
+                self._available = True
+                return True
         except Exception as e:
             print(f"🦙 Ollama connection failed ({self._host}): {e}")
             self._available = False
             return False
 
-    def is_available(self) -> bool:
-        return self._available
-
-    def _generate_text(self, prompt: str, max_tokens: int = 200) -> Optional[str]:
-        """Generate text using Ollama HTTP API"""
-        if not self._available:
-            return None
-
-        import urllib.request
-        import urllib.error
-        import json as _json
-
-        payload = _json.dumps({
+    def _generate_payload(self, prompt: str, max_tokens: int,
+                          schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        payload = {
             "model": self._model,
             "prompt": prompt,
             "stream": False,
@@ -1164,126 +2410,719 @@ class OllamaProvider(AIProvider):
                 "num_predict": max_tokens,
                 "temperature": 0.7,
             }
-        }).encode("utf-8")
+        }
+        if self._model_keep_alive:
+            payload["keep_alive"] = self._model_keep_alive
+        if schema is not None:
+            payload["format"] = api_schema(schema)
+        return payload
+
+    def _generate_text(self, prompt: str, max_tokens: int = 200,
+                       schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Generate text using Ollama HTTP API"""
+        if not self._available:
+            return None
 
         try:
-            req = urllib.request.Request(
-                f"{self._host}/api/generate",
-                data=payload,
-                headers={"Content-Type": "application/json"},
-                method="POST",
-            )
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                data = _json.loads(resp.read())
+            data = self._http.request_json("POST", "/api/generate", self._generate_payload(prompt, max_tokens, schema))
+            token_counter_for(self.cache_identity).observe(prompt, data.get("prompt_eval_count", 0))
+            return data.get("response", "")
+        except Exception as e:
+            print(f"🦙 Ollama generation error: {e}")
+            return None
+
+    def _new_session(self):
+        """Pooled keep-alive session sized from the provider settings"""
+        connector = aiohttp.TCPConnector(limit=self._pool_size, keepalive_timeout=self._connection_keep_alive)
+        timeout = aiohttp.ClientTimeout(total=self._request_timeout, connect=self._connect_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def _agenerate_text(self, prompt: str, max_tokens: int = 200,
+                              schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Generate text using Ollama HTTP API over aiohttp"""
+        if not self._available:
+            return None
+        if not AIOHTTP_AVAILABLE:
+            return await asyncio.to_thread(self._generate_text, prompt, max_tokens, schema)
+
+        try:
+            async with self._get_session().post(f"{self._host}/api/generate",
+                                                json=self._generate_payload(prompt, max_tokens, schema)) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+                token_counter_for(self.cache_identity).observe(prompt, data.get("prompt_eval_count", 0))
                 return data.get("response", "")
         except Exception as e:
             print(f"🦙 Ollama generation error: {e}")
             return None
 
-    def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
-        """Generate quiz question using Ollama"""
-        cache_key = f"quiz_{hash(note_content)}_{difficulty}"
+    async def _astream_text(self, prompt: str, max_tokens: int = 200) -> AsyncIterator[str]:
+        """Stream tokens from Ollama (newline-delimited JSON)"""
+        if not self._available or not AIOHTTP_AVAILABLE:
+            async for chunk in super()._astream_text(prompt, max_tokens):
+                yield chunk
+            return
 
-        if cache_key in self._cache:
-            cached_time, cached_result = self._cache[cache_key]
-            if time.time() - cached_time < self._cache_ttl:
-                return cached_result
+        payload = self._generate_payload(prompt, max_tokens)
+        payload["stream"] = True
+        try:
+            # No total deadline while streaming - only the gap between tokens is bounded
+            timeout = aiohttp.ClientTimeout(total=None, connect=self._connect_timeout, sock_read=self._request_timeout)
+            async with self._get_session().post(f"{self._host}/api/generate", json=payload, timeout=timeout) as resp:
+                resp.raise_for_status()
+                async for raw_line in resp.content:
+                    if not raw_line.strip():
+                        continue
+                    data = json.loads(raw_line)
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        token_counter_for(self.cache_identity).observe(prompt, data.get("prompt_eval_count", 0))
+                        return
+        except Exception as e:
+            print(f"🦙 Ollama stream error: {e}")
+
+    def close(self):
+        """Close pooled sync connections"""
+        self._http.close()
+
+    @property
+    def provider_name(self) -> str:
+        return f"Ollama ({self._model})"
 
-        prompt = f"""Based on this note about "{note_title}":
 
-{note_content[:500]}
+# =============================================================================
+# Mock Provider (offline load testing)
+# =============================================================================
 
-Generate a multiple choice quiz question that tests understanding of the key concept.
+MOCK_FUNNY_ANSWERS = [
+    "A goblin ate the answer",
+    "It is powered by enchanted cheese",
+    "Only on Tuesdays, under a full moon",
+    "The vault refuses to say",
+]
+
+
+def _mock_hash(text: str) -> int:
+    """Stable across runs (unlike hash()), so the same note always gets the same payload"""
+    return zlib.crc32(text.encode("utf-8"))
+
+
+# What the mock answers for each prompt template (by name - the template text may change freely)
+MOCK_TEMPLATE_KINDS = {"quiz": "quiz", "quiz_bank": "quiz_bank", "enemy": "enemy", "tinyllama_enemy": "enemy"}
+
+
+def _mock_facts(excerpt: str) -> List[str]:
+    """Plain sentences of a note excerpt, markdown stripped"""
+    text = re.sub(r'^---\n.*?\n---\n|```.*?```|[#*_>`\[\]]', ' ', excerpt, flags=re.DOTALL)
+    sentences = re.split(r'(?<=[.!?])\s+|\n+', text)
+    facts = [" ".join(sentence.split()) for sentence in sentences]
+    return [fact for fact in facts if len(fact) >= 12] or ["It is recorded in the vault"]
+
+
+class MockProvider(TextGenerationProvider):
+    """Simulated model for load testing, benchmarks and offline runs.
+
+    Answers every prompt with a deterministic, well-formed completion built from
+    the note in the prompt, after a latency drawn from a log-normal distribution.
+    Configured error and timeout rates make calls fail the way a real provider's
+    do, so the scheduler, circuit breakers and fallbacks all see realistic load.
+    """
+
+    _log_icon = "🧪"
+    _cache_provider = "mock"
+    # Completions are JSON whenever a schema is given, so both parse paths get exercised
+    structured_mode = "json_schema"
+
+    def __init__(self, latency_ms: float = 150.0, latency_spread: float = 0.5, error_rate: float = 0.0,
+                 timeout_rate: float = 0.0, timeout: float = 5.0, concurrency: int = 8, seed: int = 0):
+        super().__init__()
+        self._latency = max(0.0, latency_ms) / 1000
+        self._latency_spread = max(0.0, latency_spread)
+        self._error_rate = min(1.0, max(0.0, error_rate))
+        self._timeout_rate = min(1.0 - self._error_rate, max(0.0, timeout_rate))
+        self._timeout = max(0.0, timeout)
+        self.max_concurrency = max(1, concurrency)
+        self._model = f"mock-{seed}"
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings) -> "MockProvider":
+        """Build a provider from GameSettings"""
+        return cls(
+            latency_ms=settings.mock_latency_ms,
+            latency_spread=settings.mock_latency_spread,
+            error_rate=settings.mock_error_rate,
+            timeout_rate=settings.mock_timeout_rate,
+            timeout=settings.mock_timeout,
+            concurrency=settings.mock_concurrency,
+            seed=settings.mock_seed,
+        )
 
-Create 3 answer options:
-1. One correct answer
-2. One plausible but incorrect answer (similar to correct but wrong in key detail)
-3. One humorous/obviously wrong answer
+    def initialize(self) -> bool:
+        self._available = True
+        print(f"🧪 Mock AI ready: median {self._latency * 1000:.0f}ms, "
+              f"{self._error_rate:.0%} errors, {self._timeout_rate:.0%} timeouts")
+        return True
+
+    def _draw(self) -> Tuple[float, Optional[str]]:
+        """(seconds, failure) for the next call - failure is None, "error" or "timeout\""""
+        with self._rng_lock:
+            roll = self._rng.random()
+            latency = self._latency * math.exp(self._rng.gauss(0.0, self._latency_spread))
+        if roll < self._timeout_rate:
+            return self._timeout, "timeout"
+        if roll < self._timeout_rate + self._error_rate:
+            return latency, "error"
+        return latency, None
+
+    def _sleep(self, seconds: float):
+        """Simulated work that stops as soon as the request is cancelled"""
+        woke = threading.Event()
+        with on_cancel(woke.set):
+            woke.wait(seconds)
+        raise_if_cancelled()
+
+    def _completion(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        """Deterministic completion for one of the game's prompts, JSON when schema is given.
+
+        The prompt's template name and values (see RenderedPrompt) decide what is
+        answered, so editing a template's wording never changes the mock's output shape.
+        """
+        kind = MOCK_TEMPLATE_KINDS.get(getattr(prompt, "template", None))
+        if kind is None:
+            raise ValueError(f"mock provider got a prompt not rendered from a known template "
+                             f"({getattr(prompt, 'template', 'plain text')})")
+        values = prompt.values
+        title = str(values.get("title") or "the vault")
+        facts = _mock_facts(str(values.get("excerpt", "")))
+        seed = _mock_hash(title)
+
+        if kind == "enemy":
+            narrative = (f"The air shimmers as the knowledge of {title} takes form and blocks your path. "
+                         f"{' '.join(facts[:2])} It demands that you prove what you remember.")
+            return json.dumps({"narrative": narrative}) if schema is not None else narrative
+
+        count = int(values.get("count", 1)) if kind == "quiz_bank" else 1
+        questions = []
+        for i in range(count):
+            index = (seed + i) % len(facts)
+            correct = facts[index][:140].rstrip()
+            decoy = facts[(index + 1) % len(facts)][:140].rstrip()
+            if decoy.lower() == correct.lower():
+                decoy = f"Nothing in {title} says so"
+            questions.append({
+                "question": f"Which statement about {title} is true? (fact {index + 1})",
+                "correct": correct,
+                "decoy": decoy,
+                "funny": MOCK_FUNNY_ANSWERS[(seed + i) % len(MOCK_FUNNY_ANSWERS)],
+                "type": QUIZ_TYPES[(seed + i) % len(QUIZ_TYPES)],
+            })
+
+        if schema is not None:
+            return json.dumps({"questions": questions}) if kind == "quiz_bank" else json.dumps(questions[0])
+        return "\n\n".join(
+            "\n".join(f"{label}: {fields[label.lower()]}" for label in QUIZ_FIELDS) for fields in questions
+        )
 
-Format your response exactly as:
-QUESTION: [your question here]
-CORRECT: [the correct answer]
-DECOY: [plausible but incorrect answer]
-FUNNY: [humorous wrong answer]
-TYPE: [definition/concept/relationship/fact]
+    def _generate_text(self, prompt: str, max_tokens: int = 200,
+                       schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Simulated generation: wait out the drawn latency, then answer or fail"""
+        if not self._available:
+            return None
+        seconds, failure = self._draw()
+        self._sleep(seconds)
+        if failure:
+            print(f"🧪 Mock generation {failure} after {seconds:.2f}s")
+            return None
+        return self._completion(prompt, schema)
 
-Make the decoy answer similar enough to confuse someone who doesn't know the material well."""
+    async def _agenerate_text(self, prompt: str, max_tokens: int = 200,
+                              schema: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Simulated generation without blocking the event loop"""
+        if not self._available:
+            return None
+        seconds, failure = self._draw()
+        await asyncio.sleep(seconds)
+        if failure:
+            print(f"🧪 Mock generation {failure} after {seconds:.2f}s")
+            return None
+        return self._completion(prompt, schema)
 
-        response = self._generate_text(prompt, max_tokens=200)
-        if response:
-            quiz = self._parse_quiz_response(response, note_content, difficulty)
-            if quiz:
-                self._cache[cache_key] = (time.time(), quiz)
-                return quiz
-        return None
+    async def _astream_text(self, prompt: str, max_tokens: int = 200) -> AsyncIterator[str]:
+        """Stream the completion word by word, spread over the drawn latency"""
+        if not self._available:
+            return
+        seconds, failure = self._draw()
+        if failure:
+            await asyncio.sleep(seconds)
+            print(f"🧪 Mock stream {failure} after {seconds:.2f}s")
+            return
+        words = re.findall(r'\S+\s*', self._completion(prompt))
+        for word in words:
+            await asyncio.sleep(seconds / len(words))
+            yield word
 
-    def _parse_quiz_response(self, response: str, note_content: str, difficulty: int) -> Optional[QuizQuestion]:
-        """Parse Ollama's quiz response into QuizQuestion object"""
-        question_match = re.search(r'QUESTION:\s*(.+?)(?=CORRECT:|$)', response, re.DOTALL)
-        correct_match = re.search(r'CORRECT:\s*(.+?)(?=DECOY:|$)', response, re.DOTALL)
-        decoy_match = re.search(r'DECOY:\s*(.+?)(?=FUNNY:|$)', response, re.DOTALL)
-        funny_match = re.search(r'FUNNY:\s*(.+?)(?=TYPE:|$)', response, re.DOTALL)
-        type_match = re.search(r'TYPE:\s*(.+?)$', response, re.DOTALL)
+    @property
+    def provider_name(self) -> str:
+        return "Mock AI"
 
-        if question_match and correct_match and decoy_match and funny_match:
-            correct_answer = correct_match.group(1).strip()
-            decoy_answer = decoy_match.group(1).strip()
-            funny_answer = funny_match.group(1).strip()
 
-            options = [correct_answer, decoy_answer, funny_answer]
-            random.shuffle(options)
-            correct_index = options.index(correct_answer)
+# =============================================================================
+# Single-flight request coalescing
+# =============================================================================
 
-            return QuizQuestion(
-                question=question_match.group(1).strip(),
-                answer=correct_answer,
-                difficulty=difficulty,
-                question_type=type_match.group(1).strip() if type_match else "concept",
-                context=note_content[:200],
-                options=options,
-                correct_index=correct_index
-            )
-        return None
+class _LeaderCancelled(Exception):
+    """The leader of a coalesced call was cancelled - its followers run the work themselves"""
 
-    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
-        """Generate enemy description using Ollama"""
-        cache_key = f"enemy_{hash(note_content)}_{base_enemy}"
 
-        if cache_key in self._cache:
-            cached_time, cached_result = self._cache[cache_key]
-            if time.time() - cached_time < self._cache_ttl:
-                return cached_result
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers asking for the same key.
 
-        prompt = f"""You are a dungeon master describing a magical encounter. Create a rich, atmospheric description of discovering a mystical realm where the knowledge from this note has come alive:
+    The first caller for a key (the leader) runs the work; everyone arriving
+    while it is in flight waits on the leader's future instead of starting a
+    duplicate generation. Sync and async callers share the same futures.
+    Cancelling the leader only cancels the leader: waiting callers start over,
+    one of them becoming the new leader.
+    """
 
-Title: "{note_title}"
-Content: {note_content[:600]}
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Any, Future] = {}
+        self.coalesced = 0  # Calls answered by another caller's generation
+        self.rerun = 0  # Followers that started over after their leader was cancelled
+
+    def join(self, key: Any) -> Tuple[Future, bool]:
+        """Return (future, is_leader) for key. The leader must call finish()."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def finish(self, key: Any, future: Future, result: Any = None, error: Optional[BaseException] = None):
+        """Publish the leader's outcome and let the next request for key start fresh"""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _rejoin(self):
+        with self._lock:
+            self.coalesced -= 1
+            self.rerun += 1
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        """Run fn, or wait for the identical call already in flight"""
+        while True:
+            future, leader = self.join(key)
+            if not leader:
+                try:
+                    return future.result()
+                except _LeaderCancelled:
+                    self._rejoin()
+                    continue
+            try:
+                result = fn()
+            except AICancelled:
+                self.finish(key, future, error=_LeaderCancelled())
+                raise
+            except BaseException as e:
+                self.finish(key, future, error=e)
+                raise
+            self.finish(key, future, result)
+            return result
+
+    async def ado(self, key: Any, make_coro: Callable[[], Any]) -> Any:
+        """Await make_coro(), or the identical call already in flight"""
+        while True:
+            future, leader = self.join(key)
+            if not leader:
+                try:
+                    return await asyncio.wrap_future(future)
+                except _LeaderCancelled:
+                    self._rejoin()
+                    continue
+            try:
+                result = await make_coro()
+            except (AICancelled, asyncio.CancelledError):
+                self.finish(key, future, error=_LeaderCancelled())
+                raise
+            except BaseException as e:
+                self.finish(key, future, error=e)
+                raise
+            self.finish(key, future, result)
+            return result
 
-Write a 3-4 sentence narrative describing the encounter as a dungeon master would. Include specific details from the note content (numbers, names, concepts, actions). Make it magical and immersive, like the knowledge itself has awakened to challenge intruders. Keep it concise but atmospheric.
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
 
-Write ONLY the narrative description, nothing else."""
 
-        response = self._generate_text(prompt, max_tokens=400)
-        if response:
-            enemy_desc = EnemyDescription(
-                name=f"Spirit of {note_title}",
-                description=f"A mystical entity born from the essence of {note_title}",
-                weapon=f"Ethereal Blade of {note_title}",
-                armor=f"Mystical Vestments of {note_title}",
-                backstory=f"Born from the essence of {note_title}, this creature embodies forgotten knowledge.",
-                combat_phrases=[f"Your understanding of {note_title} means nothing to me!"],
-                defeat_message=f"The secrets of {note_title}... are yours to claim...",
-                victory_message=f"The Spirit of {note_title} has fallen!",
-                encounter_narrative=response.strip()
-            )
-            self._cache[cache_key] = (time.time(), enemy_desc)
-            print(f"🦙 Ollama generated narrative: {len(response)} chars")
-            return enemy_desc
-        return None
+# =============================================================================
+# Provider health (circuit breakers)
+# =============================================================================
 
-    @property
-    def provider_name(self) -> str:
-        return f"Ollama ({self._model})"
+# Providers tried, healthiest first, when the selected one is failing
+FAILOVER_ORDER = ("ollama", "claude_api", "claude_cli", "tinyllama")
+
+
+def _call_succeeded(result: Any) -> bool:
+    """A call counts as healthy if it produced something (batches: at least one item)"""
+    if isinstance(result, list):
+        return any(result)
+    return bool(result)
+
+
+class CircuitBreaker:
+    """Rolling health of one provider.
+
+    Closed: calls go through. Open: calls are refused until the cooldown passes.
+    Half-open: a single probe call decides whether the circuit closes or re-opens.
+    The circuit trips when the error rate or the p95 latency of the recent calls is too high.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 3, failure_rate: float = 0.5,
+                 slow_call: float = 20.0, cooldown: float = 30.0):
+        self.name = name
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.trips = 0
+        self._calls: Deque[Tuple[bool, float]] = deque(maxlen=max(1, window))
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, name: str, settings) -> "CircuitBreaker":
+        return cls(name,
+                   window=settings.ai_breaker_window,
+                   min_calls=settings.ai_breaker_min_calls,
+                   failure_rate=settings.ai_breaker_failure_rate,
+                   slow_call=settings.ai_breaker_slow_call,
+                   cooldown=settings.ai_breaker_cooldown)
+
+    def is_open(self) -> bool:
+        """True while calls are being refused (does not claim the half-open probe)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at < self.cooldown
+            if self.state == self.HALF_OPEN:
+                return time.monotonic() - self._probe_started < self.cooldown
+            return False
+
+    def allow(self) -> bool:
+        """True if a call may be sent now. In half-open state only one probe is let through."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if now - self._opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+            elif now - self._probe_started < self.cooldown:
+                return False  # Probe still out
+            self._probe_started = now
+            return True
+
+    def record(self, ok: bool, latency: float):
+        """Record one finished call and open or close the circuit accordingly"""
+        with self._lock:
+            self._calls.append((ok, latency))
+            if self.state == self.HALF_OPEN:
+                if ok:
+                    self.state = self.CLOSED
+                    self._calls.clear()  # Start the window afresh
+                    print(f"✅ {self.name} recovered - circuit closed")
+                else:
+                    self._trip("probe failed")
+            elif self.state == self.CLOSED and len(self._calls) >= self.min_calls:
+                error_rate = self._error_rate()
+                p95 = self._percentile(0.95)
+                if error_rate >= self.failure_rate:
+                    self._trip(f"{error_rate:.0%} of recent calls failed")
+                elif self.slow_call and p95 >= self.slow_call:
+                    self._trip(f"p95 latency {p95:.1f}s")
+
+    def hedge_delay(self, min_delay: float) -> Optional[float]:
+        """Seconds after which a call is slower than usual (p95 of successes), or None without enough data"""
+        with self._lock:
+            if sum(1 for ok, _ in self._calls if ok) < self.min_calls:
+                return None
+            return max(min_delay, self._percentile(0.95, successful_only=True))
+
+    def score(self) -> float:
+        """0..1 health used to rank failover candidates"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                return 0.0
+            return 1.0 - self._error_rate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": len(self._calls),
+                "error_rate": round(self._error_rate(), 3),
+                "p50": round(self._percentile(0.5), 3),
+                "p95": round(self._percentile(0.95), 3),
+                "trips": self.trips,
+            }
+
+    def _trip(self, reason: str):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.trips += 1
+        print(f"🔌 {self.name} circuit open ({reason}) - retrying in {self.cooldown:.0f}s")
+
+    def _error_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for ok, _ in self._calls if not ok) / len(self._calls)
+
+    def _percentile(self, fraction: float, successful_only: bool = False) -> float:
+        latencies = sorted(latency for ok, latency in self._calls if ok or not successful_only)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+
+# =============================================================================
+# Request scheduling
+# =============================================================================
+
+class AIPriority(IntEnum):
+    """Order in which queued AI requests get a provider slot"""
+    INTERACTIVE = 0  # A player is waiting on the result
+    PREFETCH = 1  # Needed soon (quiz bank refills)
+    BATCH = 2  # Bulk pre-generation (vault compile)
+
+
+class AIQueueFull(RuntimeError):
+    """Background request shed because its provider's queue is too deep"""
+
+
+def _resolve_waiter(future: "asyncio.Future"):
+    if not future.done():
+        future.set_result(None)
+
+
+class _SlotWaiter:
+    __slots__ = ("priority", "weight", "cancel", "event", "loop", "future", "granted")
+
+    def __init__(self, priority: AIPriority, weight: int, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 cancel: Optional[CancelToken] = None):
+        self.priority = priority
+        self.weight = weight
+        self.cancel = cancel
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve_waiter, self.future)
+
+
+class ProviderSlots:
+    """Concurrency limit for one provider, shared by sync and async callers.
+
+    Free slots go to the highest-priority waiter first (FIFO within a priority).
+    Background work never takes the last `reserve` slots, so an interactive
+    request waits at most for other interactive ones, and background queues
+    deeper than their limit shed new requests with AIQueueFull.
+    """
+
+    def __init__(self, name: str, limit: int, reserve: int = 1, queue_limits: Optional[Dict[AIPriority, int]] = None):
+        self.name = name
+        self.limit = max(1, limit)
+        self.reserve = reserve
+        self.queue_limits = queue_limits or {}
+        self.in_use = 0
+        self.shed = 0
+        self._heap: List[Tuple[int, int, _SlotWaiter]] = []
+        self._queued = {priority: 0 for priority in AIPriority}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def configure(self, limit: int, reserve: int, queue_limits: Dict[AIPriority, int]):
+        """Apply new limits (provider rebuilt or settings changed)"""
+        with self._lock:
+            self.limit = max(1, limit)
+            self.reserve = reserve
+            self.queue_limits = queue_limits
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: AIPriority = AIPriority.INTERACTIVE, weight: int = 1,
+             cancel: Optional[CancelToken] = None) -> Iterator[None]:
+        """Hold `weight` slots, blocking until they are granted (or cancel fires: AICancelled)"""
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        waiter = self._enqueue(priority, weight, cancel=cancel)
+        try:
+            with cancel.on_cancel(waiter.event.set) if cancel is not None else nullcontext():
+                waiter.event.wait()
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+        except AICancelled:
+            self._cancel(waiter)  # Also gives back slots granted in the meantime
+            raise
+        try:
+            yield
+        finally:
+            self._release(waiter.weight)
+
+    @asynccontextmanager
+    async def aslot(self, priority: AIPriority = AIPriority.INTERACTIVE, weight: int = 1) -> AsyncIterator[None]:
+        """Async slot(); waiting does not block the event loop"""
+        waiter = self._enqueue(priority, weight, asyncio.get_running_loop())
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release(waiter.weight)
+
+    def promote(self, cancel: CancelToken) -> int:
+        """Move cancel's queued waiters up to INTERACTIVE. Returns how many were still queued."""
+        with self._lock:
+            promoted = 0
+            for index, (priority, seq, waiter) in enumerate(self._heap):
+                if waiter.cancel is cancel and priority != AIPriority.INTERACTIVE:
+                    self._queued[priority] -= 1
+                    self._queued[AIPriority.INTERACTIVE] += 1
+                    waiter.priority = AIPriority.INTERACTIVE
+                    self._heap[index] = (AIPriority.INTERACTIVE, seq, waiter)
+                    promoted += 1
+            if promoted:
+                heapq.heapify(self._heap)
+                self._dispatch()
+        return promoted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_use": self.in_use,
+                "queued": {priority.name.lower(): count for priority, count in self._queued.items()},
+                "shed": self.shed,
+            }
+
+    def _capacity(self, priority: AIPriority) -> int:
+        if priority == AIPriority.INTERACTIVE:
+            return self.limit
+        return max(1, self.limit - self.reserve)
+
+    def _enqueue(self, priority: AIPriority, weight: int, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 cancel: Optional[CancelToken] = None) -> _SlotWaiter:
+        with self._lock:
+            if cancel is not None and cancel.promoted:
+                priority = AIPriority.INTERACTIVE
+            capacity = self._capacity(priority)
+            waiter = _SlotWaiter(priority, max(1, min(weight, capacity)), loop, cancel)
+            nobody_ahead = not self._heap or self._heap[0][0] > priority
+            if nobody_ahead and self.in_use + waiter.weight <= capacity:
+                self.in_use += waiter.weight
+                waiter.granted = True
+                if waiter.event is not None:
+                    waiter.event.set()
+                else:
+                    waiter.future.set_result(None)
+                return waiter
+
+            queue_limit = self.queue_limits.get(priority)
+            if queue_limit is not None and self._queued[priority] >= queue_limit:
+                self.shed += 1
+                raise AIQueueFull(f"{self.name} {priority.name.lower()} queue is full ({queue_limit})")
+            heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+            self._queued[priority] += 1
+        return waiter
+
+    def _release(self, weight: int):
+        with self._lock:
+            self.in_use -= weight
+            self._dispatch()
+
+    def _cancel(self, waiter: _SlotWaiter):
+        with self._lock:
+            if waiter.granted:
+                self.in_use -= waiter.weight
+            else:
+                self._heap = [entry for entry in self._heap if entry[2] is not waiter]
+                heapq.heapify(self._heap)
+                self._queued[waiter.priority] -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant slots to queued waiters in priority order (caller holds the lock)"""
+        while self._heap:
+            priority, _, waiter = self._heap[0]
+            if self.in_use + waiter.weight > self._capacity(priority):
+                break
+            heapq.heappop(self._heap)
+            self._queued[priority] -= 1
+            self.in_use += waiter.weight
+            waiter.grant()
+
+
+class AIScheduler:
+    """One ProviderSlots per provider, sized from the provider's max_concurrency"""
+
+    def __init__(self):
+        self._slots: Dict[str, ProviderSlots] = {}
+        self._lock = threading.Lock()
+
+    def slots(self, provider_type: str, provider: AIProvider) -> ProviderSlots:
+        from game_data import game_settings
+        queue_limits = {
+            AIPriority.PREFETCH: game_settings.ai_prefetch_queue_limit,
+            AIPriority.BATCH: game_settings.ai_batch_queue_limit,
+        }
+        with self._lock:
+            slots = self._slots.get(provider_type)
+            if slots is None:
+                slots = self._slots[provider_type] = ProviderSlots(provider_type, provider.max_concurrency)
+        if (slots.limit, slots.reserve, slots.queue_limits) != (
+                provider.max_concurrency, game_settings.ai_interactive_reserve, queue_limits):
+            slots.configure(provider.max_concurrency, game_settings.ai_interactive_reserve, queue_limits)
+        return slots
+
+    def promote(self, cancel: CancelToken) -> int:
+        """Run cancel's background requests as INTERACTIVE from now on, including those already queued.
+
+        Requests already holding a slot are left alone. Returns how many queued requests moved up.
+        """
+        cancel.promoted = True  # Before scanning, so a request queued meanwhile sees it
+        with self._lock:
+            slots = list(self._slots.values())
+        return sum(provider_slots.promote(cancel) for provider_slots in slots)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {provider_type: slots.stats() for provider_type, slots in self._slots.items()}
 
 
 # =============================================================================
@@ -1300,6 +3139,18 @@ class AIProviderManager:
         self._initialization_complete = False
         self._initialization_thread = None
         self._fallback_generator = LocalAIClient()  # For fallback quiz generation
+        self._flight = SingleFlight()  # Coalesces identical concurrent generations
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ai-hedge")
+        self._scheduler = AIScheduler()  # Per-provider slots, interactive requests first
+        self._failover_warming = False
+
+    def _quiz_flight_key(self, provider: AIProvider, note_title: str, note_content: str) -> Tuple[str, str]:
+        return ("quiz", quiz_cache_key(provider.cache_identity, note_title, note_content))
+
+    def _enemy_flight_key(self, provider: AIProvider, note_title: str, note_content: str) -> Tuple[str, str]:
+        return ("enemy", enemy_cache_key(provider.cache_identity, note_title, note_content))
 
     def register_provider(self, provider_type: str, provider: AIProvider):
         """Register a provider"""
@@ -1323,6 +3174,7 @@ class AIProviderManager:
             AIProviderType.CLAUDE_CLI: "claude_cli",
             AIProviderType.CLAUDE_API: "claude_api",
             AIProviderType.OLLAMA: "ollama",
+            AIProviderType.MOCK: "mock",
         }
 
         # Update internal state to match settings
@@ -1331,16 +3183,14 @@ class AIProviderManager:
         # Lazily create providers if not yet initialized
         if not self._providers:
             self._providers = {
-                "tinyllama": TinyLlamaProvider(),
-                "claude_cli": ClaudeCLIProvider(),
+                "tinyllama": create_tinyllama_provider(game_settings),
+                "claude_cli": ClaudeCLIProvider.from_settings(game_settings),
                 "claude_api": ClaudeAPIProvider(
                     api_key=game_settings.claude_api_key,
                     model=game_settings.claude_model
                 ),
-                "ollama": OllamaProvider(
-                    host=game_settings.ollama_host,
-                    model=game_settings.ollama_model
-                ),
+                "ollama": OllamaProvider.from_settings(game_settings),
+                "mock": MockProvider.from_settings(game_settings),
             }
 
         return self._providers.get(self._current_provider_type)
@@ -1365,13 +3215,11 @@ class AIProviderManager:
 
         # Create providers
         self._providers = {
-            "tinyllama": TinyLlamaProvider(),
-            "claude_cli": ClaudeCLIProvider(),
+            "tinyllama": create_tinyllama_provider(game_settings),
+            "claude_cli": ClaudeCLIProvider.from_settings(game_settings),
             "claude_api": ClaudeAPIProvider(api_key=api_key, model=model),
-            "ollama": OllamaProvider(
-                host=game_settings.ollama_host,
-                model=game_settings.ollama_model
-            ),
+            "ollama": OllamaProvider.from_settings(game_settings),
+            "mock": MockProvider.from_settings(game_settings),
         }
 
         self._current_provider_type = provider_type
@@ -1399,19 +3247,285 @@ class AIProviderManager:
     def wait_for_initialization(self, timeout: float = 3.0) -> bool:
         """Wait for initialization to complete"""
         if self._initialization_complete:
-            provider = self.get_current_provider()
-            return provider.is_available() if provider else False
+            return self.is_available()
         if not self._initialization_attempted:
             self.initialize()
         if self._initialization_thread:
             self._initialization_thread.join(timeout=timeout)
-        provider = self.get_current_provider()
-        return provider.is_available() if provider else False
+        return self.is_available()
 
     def is_available(self) -> bool:
-        """Check if current provider is available"""
-        provider = self.get_current_provider()
-        return provider.is_available() if provider else False
+        """Check if the current provider, or a healthy failover provider, is available"""
+        return bool(self._healthy_providers())
+
+    # -------------------------------------------------------------------------
+    # Health tracking and failover
+    # -------------------------------------------------------------------------
+
+    def _breaker(self, provider_type: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider_type)
+        if breaker is None:
+            from game_data import game_settings
+            with self._breakers_lock:
+                breaker = self._breakers.setdefault(
+                    provider_type, CircuitBreaker.from_settings(provider_type, game_settings))
+        return breaker
+
+    def provider_health(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit state, error rate and latency percentiles of every provider used so far"""
+        return {provider_type: breaker.stats() for provider_type, breaker in list(self._breakers.items())}
+
+    def _healthy_providers(self) -> List[Tuple[str, AIProvider]]:
+        """Available providers whose circuit is not open: the selected one first, then the healthiest"""
+        primary = self.get_current_provider()
+        primary_type = self._current_provider_type
+        if primary_type == "mock":
+            # Load tests measure the simulated provider alone - no failover to real models
+            healthy = primary is not None and primary.is_available() and not self._breaker(primary_type).is_open()
+            return [(primary_type, primary)] if healthy else []
+        candidates = []
+        for provider_type in (primary_type,) + FAILOVER_ORDER:
+            provider = self._providers.get(provider_type)
+            if provider is None or any(t == provider_type for t, _ in candidates):
+                continue
+            if provider.is_available() and not self._breaker(provider_type).is_open():
+                candidates.append((provider_type, provider))
+
+        if not candidates or candidates[0][1] is not primary:
+            self._warm_failover(primary_type, primary)
+            # Stable sort keeps FAILOVER_ORDER between equally healthy providers
+            candidates.sort(key=lambda c: -self._breaker(c[0]).score())
+        else:
+            candidates[1:] = sorted(candidates[1:], key=lambda c: -self._breaker(c[0]).score())
+        return candidates
+
+    def _warm_failover(self, primary_type: str, primary: Optional[AIProvider]):
+        """Start the local model in the background so there is something to fail over to.
+
+        Only once the selected provider has failed - its initialize() returned False
+        or its circuit opened - never while it is still starting up.
+        """
+        from game_data import game_settings
+        tinyllama = self._providers.get("tinyllama")
+        if self._failover_warming or not TINYLLAMA_AVAILABLE or tinyllama is None or tinyllama.is_available():
+            return
+        if not game_settings.ai_warm_failover or not self._initialization_complete:
+            return
+        primary_failed = primary is None or not primary.is_available() or self._breaker(primary_type).is_open()
+        if not primary_failed:
+            return
+        self._failover_warming = True
+        print("🧠 Preparing TinyLlama as a failover provider")
+        threading.Thread(target=tinyllama.initialize, daemon=True).start()
+
+    def _hedge_delay(self, provider_type: str, priority: AIPriority) -> Optional[float]:
+        from game_data import game_settings
+        if not game_settings.ai_hedge_requests or priority != AIPriority.INTERACTIVE:
+            return None  # Hedging doubles the load - only worth it when a player is waiting
+        return self._breaker(provider_type).hedge_delay(game_settings.ai_hedge_min_delay)
+
+    def promote(self, cancel: CancelToken) -> int:
+        """A player now waits on the background work started with cancel: queue it as INTERACTIVE"""
+        return self._scheduler.promote(cancel)
+
+    def scheduler_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Slots in use, queue depth per priority and shed requests for every provider used so far"""
+        return self._scheduler.stats()
+
+    def structured_output_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Parsed and failed completions per "kind/mode" (e.g. "quiz/json_schema")"""
+        return structured_stats.stats()
+
+    def prompt_template_versions(self) -> Dict[str, str]:
+        """Version and text hash of every prompt template - what newly cached results are built from"""
+        return prompt_registry.versions()
+
+    def prefix_cache_stats(self) -> Dict[str, Any]:
+        """How TinyLlama prompt prefixes were served (live context, restored state or built)"""
+        return model_registry.prefix_cache_stats()
+
+    def embedding_stats(self) -> Dict[str, Any]:
+        """Embedder, indexed notes and chunks of the semantic note index"""
+        return embedding_index.stats()
+
+    def ai_worker_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Worker processes, queue and completed/timed out/crashed requests per worker-backed provider"""
+        return {name: provider.worker_stats() for name, provider in self._providers.items()
+                if isinstance(provider, WorkerProcessProvider)}
+
+    def _call(self, provider_type: str, provider: AIProvider, call: Callable[[AIProvider], Any],
+              priority: AIPriority = AIPriority.INTERACTIVE, weight: int = 1,
+              cancel: Optional[CancelToken] = None) -> Any:
+        """Run call(provider) in a scheduler slot, recording its outcome and latency on the provider's breaker.
+
+        Provider code sees cancel as the current cancel token; a cancelled call raises AICancelled.
+        """
+        with self._scheduler.slots(provider_type, provider).slot(priority, weight, cancel):
+            started = time.monotonic()
+            ok = False
+            try:
+                with cancel_scope(cancel):
+                    result = call(provider)
+                ok = _call_succeeded(result)
+            finally:
+                # An abandoned call says nothing about the provider's health
+                if cancel is None or not cancel.cancelled:
+                    self._breaker(provider_type).record(ok, time.monotonic() - started)
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            return result
+
+    def _hedged_call(self, primary: Tuple[str, AIProvider], backup: Tuple[str, AIProvider],
+                     call: Callable[[AIProvider], Any], delay: float,
+                     cancel: Optional[CancelToken] = None) -> Tuple[Any, bool]:
+        """Run call on primary; past delay, race it against backup. Returns (result, backup_used)."""
+        first = self._hedge_pool.submit(self._call, *primary, call, cancel=cancel)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._breaker(backup[0]).allow():
+            return first.result(), False
+
+        print(f"⏱️ {primary[0]} slower than its p95 ({delay:.1f}s) - hedging with {backup[0]}")
+        pending = {first, self._hedge_pool.submit(self._call, *backup, call, cancel=cancel)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"AI hedged call failed: {e}")
+                    continue
+                if _call_succeeded(result):
+                    return result, True  # The slower call finishes in the background
+        return None, True
+
+    def _with_failover(self, call: Callable[[AIProvider], Any], what: str,
+                       priority: AIPriority = AIPriority.INTERACTIVE, weight: int = 1,
+                       cancel: Optional[CancelToken] = None) -> Any:
+        """Run call on the selected provider, failing over to the next healthy one.
+
+        Providers with an open circuit are skipped without waiting on them, and an
+        interactive call still running past its provider's p95 latency is hedged on
+        the next provider. Background calls shed by a full queue also fail over.
+        Raises AICancelled once cancel fires.
+        """
+        candidates = self._healthy_providers()
+        index = 0
+        while index < len(candidates):
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            provider_type, provider = candidates[index]
+            index += 1
+            if not self._breaker(provider_type).allow():
+                continue
+            backup = candidates[index] if index < len(candidates) else None
+            delay = self._hedge_delay(provider_type, priority) if backup else None
+            try:
+                if delay is None:
+                    result = self._call(provider_type, provider, call, priority, weight, cancel)
+                else:
+                    result, backup_used = self._hedged_call(candidates[index - 1], backup, call, delay, cancel)
+                    if backup_used:
+                        index += 1
+            except AICancelled:
+                raise
+            except AIQueueFull as e:
+                print(f"⏳ {e} - shedding {what}")
+                result = None
+            except Exception as e:
+                print(f"AI {what} failed on {provider_type}: {e}")
+                result = None
+            if _call_succeeded(result):
+                return result
+            if index < len(candidates):
+                print(f"↪️ AI {what} failing over to {candidates[index][0]}")
+        return None
+
+    async def _acall(self, provider_type: str, provider: AIProvider,
+                     call: Callable[[AIProvider], Awaitable[Any]], cancel: Optional[CancelToken] = None) -> Any:
+        async with self._scheduler.slots(provider_type, provider).aslot(AIPriority.INTERACTIVE):
+            started = time.monotonic()
+            try:
+                with cancel_scope(cancel):
+                    result = await call(provider)
+            except asyncio.CancelledError:
+                raise  # Lost a hedge race or abandoned - not the provider's fault
+            except Exception:
+                if cancel is None or not cancel.cancelled:
+                    self._breaker(provider_type).record(False, time.monotonic() - started)
+                raise
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            self._breaker(provider_type).record(_call_succeeded(result), time.monotonic() - started)
+            return result
+
+    async def _awith_failover(self, call: Callable[[AIProvider], Awaitable[Any]], what: str,
+                              cancel: Optional[CancelToken] = None) -> Any:
+        """Async _with_failover for interactive calls; the losing side of a hedge is cancelled.
+
+        When cancel fires the running provider calls are cancelled (closing their
+        HTTP requests) and AICancelled is raised.
+        """
+        loop = asyncio.get_running_loop()
+        started: List[asyncio.Future] = []
+
+        def cancel_started():
+            for task in started:
+                task.cancel()
+
+        with cancel.on_cancel(lambda: loop.call_soon_threadsafe(cancel_started)) if cancel else nullcontext():
+            return await self._arun_failover(call, what, cancel, started)
+
+    async def _arun_failover(self, call: Callable[[AIProvider], Awaitable[Any]], what: str,
+                             cancel: Optional[CancelToken], started: List[asyncio.Future]) -> Any:
+        candidates = self._healthy_providers()
+        index = 0
+        while index < len(candidates):
+            provider_type, provider = candidates[index]
+            index += 1
+            if not self._breaker(provider_type).allow():
+                continue
+            backup = candidates[index] if index < len(candidates) else None
+            delay = self._hedge_delay(provider_type, AIPriority.INTERACTIVE) if backup else None
+            tasks = {asyncio.ensure_future(self._acall(provider_type, provider, call, cancel))}
+            started.extend(tasks)
+            result = None
+            try:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._breaker(backup[0]).allow():
+                    print(f"⏱️ {provider_type} slower than its p95 ({delay:.1f}s) - hedging with {backup[0]}")
+                    hedge = asyncio.ensure_future(self._acall(*backup, call, cancel))
+                    tasks.add(hedge)
+                    started.append(hedge)
+                    index += 1
+                while tasks and not _call_succeeded(result):
+                    done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.cancelled():
+                            continue
+                        try:
+                            outcome = task.result()
+                        except Exception as e:
+                            print(f"AI {what} failed on {provider_type}: {e}")
+                            continue
+                        if _call_succeeded(outcome):
+                            result = outcome
+            finally:
+                for task in tasks:
+                    task.cancel()
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            if _call_succeeded(result):
+                return result
+            if index < len(candidates):
+                print(f"↪️ AI {what} failing over to {candidates[index][0]}")
+        return None
+
+    def _stream_provider(self) -> Optional[Tuple[str, AIProvider]]:
+        """First healthy provider that may take a streaming call now"""
+        for provider_type, provider in self._healthy_providers():
+            if self._breaker(provider_type).allow():
+                return provider_type, provider
+        return None
 
     def reinitialize_provider(self) -> None:
         """Rebuild and re-initialize the current provider from latest settings.
@@ -1427,25 +3541,34 @@ class AIProviderManager:
             AIProviderType.CLAUDE_CLI: "claude_cli",
             AIProviderType.CLAUDE_API: "claude_api",
             AIProviderType.OLLAMA: "ollama",
+            AIProviderType.MOCK: "mock",
         }
         self._current_provider_type = provider_map.get(game_settings.ai_provider, "tinyllama")
 
         # Rebuild the specific provider that changed
         provider_key = self._current_provider_type
         if provider_key == "ollama":
-            self._providers["ollama"] = OllamaProvider(
-                host=game_settings.ollama_host,
-                model=game_settings.ollama_model
-            )
+            previous = self._providers.get("ollama")
+            if previous:
+                previous.close()
+            self._providers["ollama"] = OllamaProvider.from_settings(game_settings)
         elif provider_key == "claude_api":
             self._providers["claude_api"] = ClaudeAPIProvider(
                 api_key=game_settings.claude_api_key,
                 model=game_settings.claude_model
             )
         elif provider_key == "claude_cli":
-            self._providers["claude_cli"] = ClaudeCLIProvider()
+            previous = self._providers.get("claude_cli")
+            if previous:
+                previous.close()
+            self._providers["claude_cli"] = ClaudeCLIProvider.from_settings(game_settings)
         elif provider_key == "tinyllama":
-            self._providers["tinyllama"] = TinyLlamaProvider()
+            previous = self._providers.get("tinyllama")
+            if previous:
+                previous.close()
+            self._providers["tinyllama"] = create_tinyllama_provider(game_settings)
+        elif provider_key == "mock":
+            self._providers["mock"] = MockProvider.from_settings(game_settings)
 
         # Re-initialize in background
         self._initialization_complete = False
@@ -1479,32 +3602,241 @@ class AIProviderManager:
         else:
             return "failed"
 
-    def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1) -> QuizQuestion:
-        """Generate quiz question with provider fallback"""
+    def generate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1,
+                               priority: AIPriority = AIPriority.INTERACTIVE,
+                               cancel: Optional[CancelToken] = None) -> QuizQuestion:
+        """Generate quiz question with provider fallback. Raises AICancelled once cancel fires."""
         provider = self.get_current_provider()
-        if provider and provider.is_available():
+        if provider:
             try:
-                quiz = provider.generate_quiz_question(note_title, note_content, difficulty)
+                quiz = self._flight.do(
+                    self._quiz_flight_key(provider, note_title, note_content),
+                    lambda: self._with_failover(
+                        lambda p: p.generate_quiz_question(note_title, note_content, difficulty),
+                        "quiz generation", priority, cancel=cancel)
+                )
                 if quiz:
-                    return quiz
+                    return replace(quiz, difficulty=difficulty)
+            except AICancelled:
+                raise
             except Exception as e:
                 print(f"AI quiz generation failed: {e}")
 
         # Fallback to regex-based generation
         return self._fallback_quiz_generation(note_title, note_content)
 
-    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
-        """Generate enemy description with provider"""
+    def generate_enemy_description(self, note_title: str, note_content: str, base_enemy: str,
+                                   priority: AIPriority = AIPriority.INTERACTIVE,
+                                   cancel: Optional[CancelToken] = None) -> Optional[EnemyDescription]:
+        """Generate enemy description with provider fallback. Raises AICancelled once cancel fires."""
+        provider = self.get_current_provider()
+        if provider:
+            try:
+                return self._flight.do(
+                    self._enemy_flight_key(provider, note_title, note_content),
+                    lambda: self._with_failover(
+                        lambda p: p.generate_enemy_description(note_title, note_content, base_enemy),
+                        "enemy generation", priority, cancel=cancel)
+                )
+            except AICancelled:
+                raise
+            except Exception as e:
+                print(f"AI enemy generation failed: {e}")
+        return None
+
+    async def agenerate_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1,
+                                      cancel: Optional[CancelToken] = None) -> QuizQuestion:
+        """Async quiz generation with provider fallback. Raises AICancelled once cancel fires."""
+        provider = self.get_current_provider()
+        if provider:
+            try:
+                quiz = await self._flight.ado(
+                    self._quiz_flight_key(provider, note_title, note_content),
+                    lambda: self._awith_failover(
+                        lambda p: p.agenerate_quiz_question(note_title, note_content, difficulty), "quiz generation",
+                        cancel=cancel)
+                )
+                if quiz:
+                    return replace(quiz, difficulty=difficulty)
+            except AICancelled:
+                raise
+            except Exception as e:
+                print(f"AI quiz generation failed: {e}")
+
+        # Fallback to regex-based generation
+        return self._fallback_quiz_generation(note_title, note_content)
+
+    async def agenerate_enemy_description(self, note_title: str, note_content: str, base_enemy: str,
+                                          cancel: Optional[CancelToken] = None) -> Optional[EnemyDescription]:
+        """Async enemy description generation with provider fallback. Raises AICancelled once cancel fires."""
         provider = self.get_current_provider()
-        if provider and provider.is_available():
+        if provider:
             try:
-                return provider.generate_enemy_description(note_title, note_content, base_enemy)
+                return await self._flight.ado(
+                    self._enemy_flight_key(provider, note_title, note_content),
+                    lambda: self._awith_failover(
+                        lambda p: p.agenerate_enemy_description(note_title, note_content, base_enemy),
+                        "enemy generation", cancel=cancel)
+                )
+            except AICancelled:
+                raise
             except Exception as e:
                 print(f"AI enemy generation failed: {e}")
         return None
 
+    async def astream_enemy_narrative(self, note_title: str, note_content: str, base_enemy: str,
+                                      cancel: Optional[CancelToken] = None) -> AsyncIterator[str]:
+        """Stream the encounter narrative from the first healthy provider.
+
+        Yields nothing if AI is unavailable; stops early (closing the provider stream) once cancel fires.
+        """
+        selected = self._stream_provider()
+        if selected and not (cancel and cancel.cancelled):
+            provider_type, provider = selected
+            async with self._scheduler.slots(provider_type, provider).aslot(AIPriority.INTERACTIVE):
+                started = time.monotonic()
+                streamed = False
+                stream = provider.astream_enemy_narrative(note_title, note_content, base_enemy)
+                try:
+                    async for chunk in stream:
+                        if cancel and cancel.cancelled:
+                            break
+                        streamed = True
+                        yield chunk
+                except Exception as e:
+                    print(f"AI narrative stream failed: {e}")
+                finally:
+                    await stream.aclose()
+                    if not (cancel and cancel.cancelled):
+                        self._breaker(provider_type).record(streamed, time.monotonic() - started)
+
+    async def astream_quiz_question(self, note_title: str, note_content: str, difficulty: int = 1,
+                                    cancel: Optional[CancelToken] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream quiz generation as events.
+
+        Yields {"field": label, "value": text} as each field of the completion is parsed,
+        then a final {"quiz": QuizQuestion}, which is authoritative (it falls back to the
+        non-streaming path and regex generation if the stream can't be parsed). Once cancel
+        fires the stream stops without a final event.
+        """
+        selected = self._stream_provider()
+        quiz = None
+        if selected:
+            provider_type, provider = selected
+            cache_key = quiz_cache_key(provider.cache_identity, note_title, note_content)
+            cached = load_cached_quiz(cache_key, difficulty)
+            if cached:
+                yield {"quiz": cached}
+                return
+
+            flight_key = ("quiz", cache_key)
+            future, leader = self._flight.join(flight_key)
+            if not leader:
+                # Same quiz already being generated - wait for it instead of streaming a duplicate
+                try:
+                    quiz = await asyncio.wrap_future(future)
+                except Exception as e:
+                    print(f"AI quiz generation failed: {e}")
+                if quiz:
+                    yield {"quiz": replace(quiz, difficulty=difficulty)}
+                    return
+            else:
+                chunks = []
+                parser = StreamingFieldParser(QUIZ_FIELDS)
+                started = None
+                stream = None
+                try:
+                    async with self._scheduler.slots(provider_type, provider).aslot(AIPriority.INTERACTIVE):
+                        started = time.monotonic()
+                        stream = provider.astream_quiz_response(note_title, note_content, difficulty)
+                        async for chunk in stream:
+                            if cancel and cancel.cancelled:
+                                break
+                            chunks.append(chunk)
+                            for label, value in parser.feed(chunk):
+                                yield {"field": label, "value": value}
+                        else:
+                            for label, value in parser.finish():
+                                yield {"field": label, "value": value}
+                except Exception as e:
+                    print(f"AI quiz stream failed: {e}")
+                finally:
+                    if stream is not None:
+                        await stream.aclose()
+                    cancelled = bool(cancel and cancel.cancelled)
+                    # Resolve waiting callers before any fallback, which may join the same key
+                    quiz = parse_quiz_fields("".join(chunks), note_content, difficulty) if chunks and not cancelled else None
+                    self._flight.finish(flight_key, future, quiz)
+                    if started is not None and not cancelled:
+                        self._breaker(provider_type).record(quiz is not None, time.monotonic() - started)
+                if quiz is not None:
+                    store_cached_result(cache_key, quiz, "quiz")
+
+        if cancel and cancel.cancelled:
+            return
+        if quiz is None:
+            try:
+                quiz = await self.agenerate_quiz_question(note_title, note_content, difficulty, cancel=cancel)
+            except AICancelled:
+                return
+        yield {"quiz": quiz}
+
+    async def aclose(self):
+        """Close async resources held by the providers"""
+        for provider in self._providers.values():
+            try:
+                await provider.aclose()
+            except Exception as e:
+                print(f"Failed to close {provider.provider_name}: {e}")
+
+    def generate_quiz_questions(self, note_title: str, note_content: str, count: int,
+                                priority: AIPriority = AIPriority.PREFETCH) -> List[QuizQuestion]:
+        """Generate a batch of quiz questions for a note's quiz bank. Empty if AI is unavailable."""
+        provider = self.get_current_provider()
+        if provider:
+            try:
+                identity = provider.cache_identity
+                key = ("quiz_bank", ai_cache_key(identity, prompt_version("quiz_bank", identity),
+                                                 note_title, note_content, count))
+                return self._flight.do(key, lambda: self._with_failover(
+                    lambda p: p.generate_quiz_questions(note_title, note_content, count),
+                    "quiz batch generation", priority
+                ) or [])
+            except Exception as e:
+                print(f"AI quiz batch generation failed: {e}")
+        return []
+
+    def current_cache_identity(self) -> Optional[Tuple[str, str]]:
+        """(provider, model) of the provider that would serve a call now, or None if AI is unavailable"""
+        candidates = self._healthy_providers()
+        return candidates[0][1].cache_identity if candidates else None
+
+    def generate_enemy_descriptions(self, requests: List[Tuple[str, str, str]],
+                                    priority: AIPriority = AIPriority.INTERACTIVE) -> List[Optional[EnemyDescription]]:
+        """Generate several enemy descriptions in one concurrent provider batch"""
+        if requests:
+            try:
+                # The provider fans the batch out, so it holds one slot per request
+                results = self._with_failover(lambda p: p.generate_enemy_descriptions(requests),
+                                              "enemy batch generation", priority, weight=len(requests))
+                if results:
+                    return results
+            except Exception as e:
+                print(f"AI enemy batch generation failed: {e}")
+        return [None] * len(requests)
+
     def _fallback_quiz_generation(self, note_title: str, note_content: str) -> QuizQuestion:
-        """Fallback quiz generation using regex patterns"""
+        """Fallback quiz generation: a question on a fact mined from the note, else regex patterns"""
+        from game_data import game_settings
+        if game_settings.fact_quiz_enabled:
+            from fact_quiz import fact_quiz  # Imports brainbot itself
+            try:
+                quiz = fact_quiz.generate(note_title, note_content)
+                if quiz:
+                    return quiz
+            except Exception as e:
+                print(f"⚠️ Fact quiz failed: {e}")
+
         content = note_content.lower()
 
         # Try to find definition patterns
@@ -1515,7 +3847,11 @@ class AIProviderManager:
 
             question = f"What is {concept}?"
             correct = definition[:50]
-            decoy = f"A type of {concept.split()[-1] if concept.split() else 'concept'}"
+            # The closest statement from another note makes a far better decoy than a template
+            neighbours = embedding_index.distractors(note_title, correct, count=1, max_chars=50) \
+                if game_settings.embedding_index_enabled and embedding_index.ready else []
+            decoy = neighbours[0].lower() if neighbours else \
+                f"A type of {concept.split()[-1] if concept.split() else 'concept'}"
             funny = "A magical unicorn that grants wishes"
 
             options = [correct, decoy, funny]
@@ -1563,6 +3899,15 @@ class AIProviderManager:
         if user_lower == correct_lower:
             return True
 
+        # Answers that mean nearly the same as the correct one (typos, reworded phrases)
+        from game_data import game_settings
+        if game_settings.embedding_index_enabled and len(correct_lower) > 2:
+            try:
+                if embedding_index.answer_matches(user_lower, correct_lower, game_settings.embedding_answer_threshold):
+                    return True
+            except Exception as e:
+                print(f"⚠️ Semantic answer check failed: {e}")
+
         # For AI-generated questions, use more sophisticated matching
         if ai_question and self.is_available():
             correct_words = set(word for word in correct_lower.split() if len(word) > 2)
@@ -1819,19 +4164,100 @@ def get_current_provider_name() -> str:
 
 
 # Sync wrapper functions for use in the main game
-def sync_generate_quiz_question(note_title: str, note_content: str, difficulty: int = 1) -> QuizQuestion:
+def sync_generate_quiz_question(note_title: str, note_content: str, difficulty: int = 1,
+                                priority: AIPriority = AIPriority.INTERACTIVE,
+                                cancel: Optional[CancelToken] = None) -> QuizQuestion:
     """Synchronous wrapper for quiz generation"""
     # Use new provider manager if initialized
     if ai_provider_manager._initialization_attempted:
-        return ai_provider_manager.generate_quiz_question(note_title, note_content, difficulty)
+        return ai_provider_manager.generate_quiz_question(note_title, note_content, difficulty, priority, cancel)
     # Fall back to legacy system
     return ai_quiz_system.generate_quiz_question(note_title, note_content, difficulty)
 
 
-def sync_generate_enemy_description(note_title: str, note_content: str, base_enemy: str) -> Optional[EnemyDescription]:
+def sync_generate_enemy_description(note_title: str, note_content: str, base_enemy: str,
+                                    priority: AIPriority = AIPriority.INTERACTIVE,
+                                    cancel: Optional[CancelToken] = None) -> Optional[EnemyDescription]:
     """Synchronous wrapper for enemy description generation"""
     # Use new provider manager if initialized
     if ai_provider_manager._initialization_attempted:
-        return ai_provider_manager.generate_enemy_description(note_title, note_content, base_enemy)
+        return ai_provider_manager.generate_enemy_description(note_title, note_content, base_enemy, priority, cancel)
     # Fall back to legacy system
-    return ai_quiz_system.generate_enemy_description(note_title, note_content, base_enemy)
\ No newline at end of file
+    return ai_quiz_system.generate_enemy_description(note_title, note_content, base_enemy)
+
+
+def sync_generate_enemy_descriptions(requests: List[Tuple[str, str, str]],
+                                     priority: AIPriority = AIPriority.INTERACTIVE) -> List[Optional[EnemyDescription]]:
+    """Synchronous wrapper for batched enemy description generation"""
+    # Use new provider manager if initialized
+    if ai_provider_manager._initialization_attempted:
+        return ai_provider_manager.generate_enemy_descriptions(requests, priority)
+    # Fall back to legacy system (one request at a time)
+    return [ai_quiz_system.generate_enemy_description(*request) for request in requests]
+
+
+def sync_generate_quiz_questions(note_title: str, note_content: str, count: int,
+                                 priority: AIPriority = AIPriority.PREFETCH) -> List[QuizQuestion]:
+    """Synchronous wrapper for batched quiz generation (empty without an AI provider)"""
+    if ai_provider_manager._initialization_attempted:
+        return ai_provider_manager.generate_quiz_questions(note_title, note_content, count, priority)
+    return []
+
+
+def promote_ai_requests(cancel: CancelToken) -> int:
+    """Move background requests started with cancel ahead of other background work (see AIScheduler.promote)"""
+    return ai_provider_manager.promote(cancel)
+
+
+def fallback_quiz_question(note_title: str, note_content: str) -> QuizQuestion:
+    """Fact-based (or regex) quiz question that never calls a model"""
+    return ai_provider_manager._fallback_quiz_generation(note_title, note_content)
+
+
+def current_ai_identity() -> Optional[Tuple[str, str]]:
+    """(provider, model) pair scoping cached AI results, or None if AI is unavailable"""
+    if ai_provider_manager._initialization_attempted:
+        return ai_provider_manager.current_cache_identity()
+    return None
+
+
+# Async wrapper functions for use in async server endpoints
+async def async_generate_quiz_question(note_title: str, note_content: str, difficulty: int = 1,
+                                       cancel: Optional[CancelToken] = None) -> QuizQuestion:
+    """Async quiz generation that doesn't hold a worker thread while waiting on the provider"""
+    if ai_provider_manager._initialization_attempted:
+        return await ai_provider_manager.agenerate_quiz_question(note_title, note_content, difficulty, cancel)
+    # Legacy system is sync-only
+    return await asyncio.to_thread(ai_quiz_system.generate_quiz_question, note_title, note_content, difficulty)
+
+
+async def async_generate_enemy_description(note_title: str, note_content: str, base_enemy: str,
+                                           cancel: Optional[CancelToken] = None) -> Optional[EnemyDescription]:
+    """Async enemy description generation that doesn't hold a worker thread while waiting on the provider"""
+    if ai_provider_manager._initialization_attempted:
+        return await ai_provider_manager.agenerate_enemy_description(note_title, note_content, base_enemy, cancel)
+    # Legacy system is sync-only
+    return await asyncio.to_thread(ai_quiz_system.generate_enemy_description, note_title, note_content, base_enemy)
+
+
+async def async_stream_enemy_narrative(note_title: str, note_content: str, base_enemy: str,
+                                       cancel: Optional[CancelToken] = None) -> AsyncIterator[str]:
+    """Stream encounter narrative text as the provider generates it"""
+    if ai_provider_manager._initialization_attempted:
+        async for chunk in ai_provider_manager.astream_enemy_narrative(note_title, note_content, base_enemy, cancel):
+            yield chunk
+        return
+    # Legacy system can't stream - deliver the whole narrative at once
+    description = await asyncio.to_thread(ai_quiz_system.generate_enemy_description, note_title, note_content, base_enemy)
+    if description and description.encounter_narrative:
+        yield description.encounter_narrative
+
+
+async def async_stream_quiz_question(note_title: str, note_content: str, difficulty: int = 1,
+                                     cancel: Optional[CancelToken] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Stream quiz generation events (see AIProviderManager.astream_quiz_question)"""
+    if ai_provider_manager._initialization_attempted:
+        async for event in ai_provider_manager.astream_quiz_question(note_title, note_content, difficulty, cancel):
+            yield event
+        return
+    yield {"quiz": await asyncio.to_thread(ai_quiz_system.generate_quiz_question, note_title, note_content, difficulty)}
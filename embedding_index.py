@@ -0,0 +1,574 @@
+"""
+Embedding Index for Legend of the Obsidian Vault
+Vectors for every note chunk in one memory-mapped float32 matrix, for semantic
+lookups (related notes, quiz distractors, fuzzy answers) without asking a model
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import threading
+import urllib.request
+import zlib
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from prompt_builder import split_sections
+from simple_cache import make_content_hash
+
+# numpy makes search vectorised and enables IVF lists; without it search is a pure-Python scan
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    from llama_cpp import Llama
+    LLAMA_EMBEDDINGS_AVAILABLE = True
+except ImportError:
+    Llama = None
+    LLAMA_EMBEDDINGS_AVAILABLE = False
+
+EMBEDDINGS_DIR = "saves/embeddings"
+CHUNK_CHARS = 600  # Target size of one indexed chunk
+HASHING_DIM = 512
+EMBED_BATCH = 32  # Chunks per embedder call while indexing
+QUERY_CACHE_SIZE = 512  # Embedded query texts kept (answers, distractor lookups)
+IVF_ROWS_PER_LIST = 64  # Lists = rows / this (IVF search probes a few lists instead of every row)
+IVF_ITERATIONS = 8
+
+Vector = Sequence[float]
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+# =============================================================================
+# Embedders
+# =============================================================================
+
+class Embedder:
+    """Turns texts into unit-length vectors of a fixed size"""
+
+    name = "embedder"  # Scopes the stored index: vectors of different embedders never mix
+    dim = 0
+    answer_threshold: Optional[float] = None  # Own answer-match similarity, when the setting does not suit it
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """Signed feature hashing of words, word pairs and character trigrams - needs no model.
+
+    Catches shared vocabulary and near-miss spellings rather than meaning, which
+    is what a typed answer or a sibling note mostly needs.
+    """
+
+    answer_threshold = 0.7  # One typo in a word still shares most of its trigrams
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> Dict[str, int]:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features: Dict[str, int] = {}
+        for word in words:
+            features["w:" + word] = features.get("w:" + word, 0) + 1
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                trigram = "c:" + padded[i:i + 3]
+                features[trigram] = features.get(trigram, 0) + 1
+        for first, second in zip(words, words[1:]):
+            pair = f"b:{first} {second}"
+            features[pair] = features.get(pair, 0) + 1
+        return features
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dim
+            for feature, count in self._features(text).items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                vector[h % self.dim] += sign * (1.0 + math.log(count))
+            vectors.append(_normalize(vector))
+        return vectors
+
+
+class OllamaEmbedder(Embedder):
+    """Embeddings from an Ollama server's /api/embed endpoint"""
+
+    def __init__(self, host: str, model: str, timeout: float = 30.0):
+        self._url = host.rstrip("/") + "/api/embed"
+        self._model = model
+        self._timeout = timeout
+        self.name = f"ollama-{model}"
+
+    def embed(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        body = json.dumps({"model": self._model, "input": texts}).encode("utf-8")
+        request = urllib.request.Request(self._url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout or self._timeout) as response:
+            vectors = [_normalize(v) for v in json.loads(response.read())["embeddings"]]
+        if vectors:
+            self.dim = len(vectors[0])
+        return vectors
+
+    def probe(self, timeout: float) -> bool:
+        """Whether the server has the embedding model (also learns its dimension)"""
+        try:
+            return bool(self.embed(["vault"], timeout=timeout))
+        except Exception as e:
+            print(f"🧭 Ollama embeddings unavailable ({self._model}): {e}")
+            return False
+
+
+class LlamaEmbedder(Embedder):
+    """Embeddings from a local GGUF embedding model through llama.cpp"""
+
+    def __init__(self, model_path: str):
+        self._llama = Llama(model_path=model_path, embedding=True, n_ctx=512, verbose=False)
+        self._lock = threading.Lock()  # One evaluation at a time per context
+        self.name = f"llama-{Path(model_path).stem}"
+        self.dim = self._llama.n_embd()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            return [_normalize(v) for v in self._llama.embed(texts)]
+
+
+def create_embedder(settings) -> Embedder:
+    """Embedder the settings ask for: a local llama.cpp model if one is set, else feature hashing.
+
+    Ollama is only used when chosen explicitly - "auto" never waits on the network.
+    """
+    backend = settings.embedding_backend
+    if backend in ("auto", "llama") and settings.embedding_model_path and LLAMA_EMBEDDINGS_AVAILABLE:
+        try:
+            return LlamaEmbedder(settings.embedding_model_path)
+        except Exception as e:
+            print(f"🧭 llama.cpp embedding model failed to load: {e}")
+    if backend == "ollama":
+        embedder = OllamaEmbedder(settings.ollama_host, settings.embedding_ollama_model,
+                                  timeout=settings.ollama_request_timeout)
+        if embedder.probe(settings.ollama_connect_timeout):
+            return embedder
+    return HashingEmbedder()
+
+
+# =============================================================================
+# Storage
+# =============================================================================
+
+@dataclass(frozen=True)
+class Chunk:
+    """One indexed piece of a note"""
+    note: str  # Note key (its path)
+    title: str
+    text: str
+
+
+def chunk_note(content: str) -> List[str]:
+    """A note's prose, headings and list items, grouped into chunks of about CHUNK_CHARS (one section per line)"""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for section in split_sections(content):
+        if section.kind in ("code", "frontmatter"):
+            continue
+        if current and size + len(section.text) > CHUNK_CHARS:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(section.text)
+        size += len(section.text) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class _Matrix:
+    """Row-major float32 vectors in a read-only memory-mapped file"""
+
+    def __init__(self, path: Optional[Path], rows: int, dim: int):
+        self.rows = rows
+        self.dim = dim
+        self.data: Any = None
+        if rows and path is not None:
+            if NUMPY_AVAILABLE:
+                self.data = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
+            else:
+                with open(path, "rb") as f:
+                    self.data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast("f")
+
+    def row(self, index: int) -> Vector:
+        if NUMPY_AVAILABLE:
+            return self.data[index]
+        return self.data[index * self.dim:(index + 1) * self.dim]
+
+    def scores(self, query: Vector, start: int = 0, end: Optional[int] = None) -> Any:
+        """Dot products of rows [start, end) with query"""
+        end = self.rows if end is None else end
+        if NUMPY_AVAILABLE:
+            return self.data[start:end] @ query
+        return [_dot(self.row(i), query) for i in range(start, end)]
+
+
+def _write_vectors(path: Path, vectors: Any):
+    if NUMPY_AVAILABLE:
+        np.asarray(vectors, dtype=np.float32).tofile(path)
+    else:
+        with open(path, "wb") as f:
+            for vector in vectors:
+                array("f", vector).tofile(f)
+
+
+def _kmeans(vectors: "np.ndarray", lists: int, seed: int = 0) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Spherical k-means (vectors are unit length): centroids and each row's list"""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), lists * 32), replace=False)]
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(IVF_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for index in range(lists):
+            members = sample[assignment == index]
+            if len(members):
+                total = members.sum(axis=0)
+                centroids[index] = total / (np.linalg.norm(total) or 1.0)
+    assignment = np.concatenate([np.argmax(vectors[start:start + 8192] @ centroids.T, axis=1)
+                                 for start in range(0, len(vectors), 8192)])
+    return centroids, assignment
+
+
+class _IndexData:
+    """One immutable snapshot of the index: chunks, their vectors and (optionally) IVF lists"""
+
+    def __init__(self, directory: Path, meta: Dict[str, Any]):
+        self.meta = meta
+        self.dim = meta["dim"]
+        self.notes: Dict[str, Dict[str, str]] = meta["notes"]
+        self.chunks = [Chunk(note, self.notes[note]["title"], text) for note, text in meta["chunks"]]
+        rows = len(self.chunks)
+        self.matrix = _Matrix(directory / meta["vectors"] if rows else None, rows, self.dim)
+        self.lists: List[Tuple[int, int]] = [tuple(bounds) for bounds in meta.get("lists", [])]
+        self.centroids = None
+        if self.lists:
+            self.centroids = np.fromfile(directory / meta["centroids"], dtype=np.float32).reshape(len(self.lists),
+                                                                                               self.dim)
+        self.note_rows: Dict[str, List[int]] = {}
+        self.title_notes: Dict[str, List[str]] = {}
+        for row, chunk in enumerate(self.chunks):
+            self.note_rows.setdefault(chunk.note, []).append(row)
+        for note, info in self.notes.items():
+            self.title_notes.setdefault(info["title"], []).append(note)
+        self.row_notes = np.array([hash(c.note) for c in self.chunks]) if NUMPY_AVAILABLE and rows else None
+
+    def candidate_ranges(self, query: Vector, probes: int) -> List[Tuple[int, int]]:
+        """Row ranges to scan: the probes closest IVF lists, or every row"""
+        if self.centroids is None or probes >= len(self.lists):
+            return [(0, self.matrix.rows)]
+        closest = np.argsort(self.centroids @ query)[::-1][:probes]
+        return [self.lists[index] for index in closest]
+
+
+# =============================================================================
+# Index
+# =============================================================================
+
+class EmbeddingIndex:
+    """Note chunk vectors for one embedder, persisted under EMBEDDINGS_DIR.
+
+    sync() embeds only notes whose content changed since the last sync and
+    swaps in a new snapshot, so searches never wait on indexing.
+    """
+
+    def __init__(self, root: str = EMBEDDINGS_DIR):
+        self.root = Path(root)
+        self._embedder: Optional[Embedder] = None
+        self._embedder_lock = threading.Lock()
+        self._data: Optional[_IndexData] = None
+        self._sync_lock = threading.Lock()
+        self._pending: Optional[List[Any]] = None  # Notes waiting for a background sync
+        self._pending_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_lock = threading.Lock()
+
+    @property
+    def embedder(self) -> Embedder:
+        with self._embedder_lock:
+            if self._embedder is None:
+                from game_data import game_settings
+                self._embedder = create_embedder(game_settings)
+                print(f"🧭 Embeddings: {self._embedder.name}")
+        return self._embedder
+
+    def reset_embedder(self):
+        """Pick the embedder again from current settings (the index for it loads on next use)"""
+        with self._embedder_lock:
+            self._embedder = None
+        self._data = None
+        with self._query_lock:
+            self._query_cache.clear()
+
+    def _directory(self) -> Path:
+        return self.root / re.sub(r"[^\w.-]+", "_", self.embedder.name)
+
+    def _snapshot(self) -> Optional[_IndexData]:
+        """Current snapshot, loading the stored index the first time"""
+        if self._data is None:
+            meta_path = self._directory() / "index.json"
+            if meta_path.exists():
+                try:
+                    self._data = _IndexData(self._directory(), json.loads(meta_path.read_text()))
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️ Embedding index unreadable, it will be rebuilt: {e}")
+        return self._data
+
+    @property
+    def ready(self) -> bool:
+        data = self._snapshot()
+        return data is not None and data.matrix.rows > 0
+
+    # -- Indexing --
+
+    def schedule_sync(self, notes: Iterable[Any]):
+        """sync() in a background thread; notes handed in while one runs are synced right after it"""
+        with self._pending_lock:
+            self._pending = list(notes)
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._sync_pending, daemon=True, name="embedding-sync")
+            self._worker.start()
+
+    def _sync_pending(self):
+        while True:
+            with self._pending_lock:
+                notes, self._pending = self._pending, None
+                if notes is None:
+                    return
+            try:
+                self.sync(notes)
+            except Exception as e:
+                print(f"⚠️ Embedding index sync failed: {e}")
+
+    def sync(self, notes: Iterable[Any]) -> Dict[str, int]:
+        """Bring the index in line with notes (objects with path, title and content)"""
+        from game_data import game_settings
+        with self._sync_lock:
+            embedder = self.embedder
+            old = self._snapshot()
+            old_notes = old.notes if old else {}
+            wanted = {str(note.path): note for note in notes}
+
+            new_notes: Dict[str, Dict[str, str]] = {}
+            rows: List[Tuple[str, str, Any]] = []  # (note, text, vector or old row index)
+            to_embed: List[Tuple[int, str]] = []
+            reused = 0
+            for key, note in wanted.items():
+                content_hash = make_content_hash(note.title, note.content)
+                new_notes[key] = {"title": note.title, "hash": content_hash}
+                if old and old_notes.get(key, {}).get("hash") == content_hash:
+                    for row in old.note_rows.get(key, []):
+                        rows.append((key, old.chunks[row].text, row))
+                    reused += 1
+                    continue
+                for text in chunk_note(note.content):
+                    to_embed.append((len(rows), f"{note.title}: {text}"))
+                    rows.append((key, text, None))
+
+            removed = len(set(old_notes) - set(wanted))
+            if old and not to_embed and not removed and len(new_notes) == len(old_notes):
+                return {"notes": len(new_notes), "embedded": 0, "reused": reused, "removed": 0}
+
+            vectors: List[Any] = [None] * len(rows)
+            for index, (_, _, source) in enumerate(rows):
+                if source is not None:
+                    vectors[index] = old.matrix.row(source)
+            for start in range(0, len(to_embed), EMBED_BATCH):
+                batch = to_embed[start:start + EMBED_BATCH]
+                for (index, _), vector in zip(batch, embedder.embed([text for _, text in batch])):
+                    vectors[index] = vector
+            if to_embed:
+                print(f"🧭 Embedded {len(to_embed)} chunks from {len(wanted) - reused} notes")
+
+            self._write(embedder, new_notes, rows, vectors, game_settings.embedding_ivf_min_chunks)
+            return {"notes": len(new_notes), "embedded": len(to_embed), "reused": reused, "removed": removed}
+
+    def _write(self, embedder: Embedder, notes: Dict[str, Dict[str, str]], rows: List[Tuple[str, str, Any]],
+               vectors: List[Any], ivf_min_chunks: int):
+        """Store a new snapshot under fresh file names and swap it in"""
+        directory = self._directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        generation = make_content_hash(*(note["hash"] for note in notes.values()), len(rows))[:12]
+        dim = embedder.dim or (len(vectors[0]) if vectors else 0)
+        meta: Dict[str, Any] = {"embedder": embedder.name, "dim": dim, "notes": notes,
+                                "vectors": f"vectors-{generation}.f32"}
+
+        if NUMPY_AVAILABLE and len(rows) >= max(ivf_min_chunks, IVF_ROWS_PER_LIST * 2):
+            matrix = np.asarray(vectors, dtype=np.float32)
+            centroids, assignment = _kmeans(matrix, len(rows) // IVF_ROWS_PER_LIST)
+            order = np.argsort(assignment, kind="stable")  # Each list becomes one contiguous block of rows
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))])
+            vectors = matrix[order]
+            rows = [rows[index] for index in order]
+            meta["lists"] = [[int(bounds[i]), int(bounds[i + 1])] for i in range(len(centroids))]
+            meta["centroids"] = f"centroids-{generation}.f32"
+            centroids.astype(np.float32).tofile(directory / meta["centroids"])
+
+        meta["chunks"] = [[note, text] for note, text, _ in rows]
+        _write_vectors(directory / meta["vectors"], vectors)
+        meta_path = directory / "index.json"
+        temp_path = directory / "index.json.tmp"
+        temp_path.write_text(json.dumps(meta))
+        os.replace(temp_path, meta_path)
+        self._data = _IndexData(directory, meta)
+
+        # Files of older snapshots (open maps keep their data until released)
+        keep = {meta["vectors"], meta.get("centroids")}
+        for path in directory.glob("*.f32"):
+            if path.name not in keep:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    # -- Queries --
+
+    def embed_query(self, text: str) -> List[float]:
+        """Vector for an ad-hoc text (answers, lookups), cached"""
+        with self._query_lock:
+            vector = self._query_cache.get(text)
+            if vector is not None:
+                self._query_cache.move_to_end(text)
+                return vector
+        vector = self.embedder.embed([text])[0]
+        with self._query_lock:
+            self._query_cache[text] = vector
+            while len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return vector
+
+    def search(self, query: Vector, k: int = 10, exclude: Optional[Set[str]] = None) -> List[Tuple[float, Chunk]]:
+        """The k chunks most similar to query (cosine), skipping notes in exclude"""
+        from game_data import game_settings
+        data = self._snapshot()
+        if data is None or not data.matrix.rows:
+            return []
+        exclude = exclude or set()
+        if NUMPY_AVAILABLE:
+            query = np.asarray(query, dtype=np.float32)
+            excluded = np.array([hash(note) for note in exclude]) if exclude else None
+            scored: List[Tuple[float, int]] = []
+            for start, end in data.candidate_ranges(query, game_settings.embedding_ivf_probes):
+                scores = data.matrix.scores(query, start, end)
+                if excluded is not None:
+                    scores = np.where(np.isin(data.row_notes[start:end], excluded), -np.inf, scores)
+                top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else range(len(scores))
+                scored.extend((float(scores[i]), start + int(i)) for i in top if scores[i] != -np.inf)
+            best = heapq.nlargest(k, scored)
+        else:
+            best = heapq.nlargest(k, ((score, row) for row, score in enumerate(data.matrix.scores(query))
+                                      if data.chunks[row].note not in exclude))
+        return [(score, data.chunks[row]) for score, row in best]
+
+    def _notes_for(self, data: _IndexData, note: str) -> List[str]:
+        """Note keys for a note key or title"""
+        return [note] if note in data.notes else data.title_notes.get(note, [])
+
+    def note_vector(self, note: str) -> Optional[List[float]]:
+        """Mean of a note's chunk vectors (by key or title), or None if it is not indexed"""
+        data = self._snapshot()
+        if data is None:
+            return None
+        rows = [row for key in self._notes_for(data, note) for row in data.note_rows.get(key, [])]
+        if not rows:
+            return None
+        total = [0.0] * data.dim
+        for row in rows:
+            for i, x in enumerate(data.matrix.row(row)):
+                total[i] += float(x)
+        return _normalize(total)
+
+    def note_similarity(self, first: str, second: str) -> Optional[float]:
+        """Cosine similarity of two notes, or None unless both are indexed"""
+        a, b = self.note_vector(first), self.note_vector(second)
+        return _dot(a, b) if a is not None and b is not None else None
+
+    def related_notes(self, note: str, k: int = 5) -> List[Tuple[str, float]]:
+        """(title, similarity) of the k notes closest to a note, best first"""
+        data = self._snapshot()
+        vector = self.note_vector(note)
+        if data is None or vector is None:
+            return []
+        best: Dict[str, float] = {}
+        for score, chunk in self.search(vector, k * 4, exclude=set(self._notes_for(data, note))):
+            best[chunk.title] = max(score, best.get(chunk.title, -1.0))
+        return sorted(best.items(), key=lambda item: -item[1])[:k]
+
+    def distractors(self, note: str, answer: str, count: int = 2, max_chars: int = 150) -> List[str]:
+        """Plausible wrong answers: the closest statements to answer from other notes"""
+        data = self._snapshot()
+        if data is None or not answer.strip():
+            return []
+        found: List[str] = []
+        seen = {answer.strip().lower()}
+        query = self.embed_query(answer)
+        for score, chunk in self.search(query, count * 6, exclude=set(self._notes_for(data, note))):
+            if score >= 0.95:
+                continue  # Says the same thing as the answer
+            lines = [line for line in chunk.text.splitlines() if not line.startswith("#")]
+            if not lines:
+                continue
+            sentence = re.split(r"(?<=[.!?])\s+", lines[0].strip())[0].strip("*-_ ")
+            sentence = sentence[:max_chars].rstrip()
+            if len(sentence) >= 3 and sentence.lower() not in seen:
+                seen.add(sentence.lower())
+                found.append(sentence)
+                if len(found) == count:
+                    break
+        return found
+
+    def text_similarity(self, first: str, second: str) -> float:
+        """Cosine similarity of two short texts"""
+        return _dot(self.embed_query(first), self.embed_query(second))
+
+    def answer_matches(self, answer: str, correct: str, threshold: float) -> bool:
+        """Whether a typed answer is close enough in meaning to the correct one"""
+        threshold = self.embedder.answer_threshold or threshold
+        return self.text_similarity(answer, correct) >= threshold
+
+    def nearest_labels(self, note: str, labels: Dict[str, str], min_score: float) -> List[str]:
+        """Labels whose description is at least min_score similar to the note, closest first"""
+        vector = self.note_vector(note)
+        if vector is None:
+            return []
+        scored = [(_dot(vector, self.embed_query(text)), label) for label, text in labels.items()]
+        return [label for score, label in sorted(scored, reverse=True) if score >= min_score]
+
+    def stats(self) -> Dict[str, Any]:
+        data = self._data
+        return {
+            "embedder": self._embedder.name if self._embedder else None,
+            "notes": len(data.notes) if data else 0,
+            "chunks": data.matrix.rows if data else 0,
+            "dim": data.dim if data else 0,
+            "ivf_lists": len(data.lists) if data else 0,
+            "numpy": NUMPY_AVAILABLE,
+        }
+
+
+embedding_index = EmbeddingIndex()
@@ -0,0 +1,280 @@
+"""
+Fact Quiz for Legend of the Obsidian Vault
+Quiz questions built from facts mined out of the notes themselves - instant,
+note-specific and free, for whenever no model is available
+"""
+import random
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from brainbot import QuizQuestion
+from prompt_builder import BULLET_RE, split_sections
+from simple_cache import make_content_hash
+
+# Term/explanation shapes: "X is Y", "X: Y", "**X** - Y"
+DEFINITION_FACT_RE = re.compile(
+    r'^(?P<term>[^.!?:]{2,60}?)\s+(?:is|are|means|refers to|is defined as|describes)\s+(?P<text>\S.*)$',
+    re.IGNORECASE
+)
+COLON_FACT_RE = re.compile(r'^(?P<term>[^:\n]{2,40}?)::?\s+(?P<text>\S.*)$')
+BOLD_PAIR_RE = re.compile(r'^(?:\*\*|__)(?P<term>[^*_\n]{2,60})(?:\*\*|__)\s*(?:[:\-–—]|is|are)\s*(?P<text>\S.*)$')
+BOLD_TERM_RE = re.compile(r'\*\*([^*\n]{2,40})\*\*|__([^_\n]{2,40})__')
+MARKUP_RE = re.compile(r'\*\*|__|`|\[\[|\]\]')
+
+# Frontmatter keys that describe the file rather than the subject
+SKIPPED_FRONTMATTER = {"tags", "tag", "aliases", "alias", "cssclass", "cssclasses", "title", "publish",
+                       "permalink", "created", "updated", "modified", "date"}
+
+# Sentence openers that look like a defined term but only point back at something
+VAGUE_TERMS = {"it", "this", "that", "these", "those", "they", "there", "he", "she", "we", "i", "you", "here",
+               "which", "what", "everything", "something", "nothing"}
+
+MAX_ANSWER_CHARS = 90  # Longer explanations are cut at a word boundary
+OPTIONS = 3  # Correct answer plus two distractors, like AI questions
+FUNNY_ANSWERS = [
+    "A magical unicorn that grants wishes",
+    "Whatever the goblin in the cellar says",
+    "Three squirrels in a trench coat",
+    "The forbidden sandwich of the north",
+]
+
+
+@dataclass(frozen=True)
+class Fact:
+    """One quizzable statement from a note"""
+    kind: str  # definition, term (bold word in a sentence), list or frontmatter
+    subject: str  # Defined term, bold term, heading of the list or frontmatter key
+    answer: str  # What the question asks for
+    source: str  # The sentence or line it came from
+
+
+def _clean(text: str) -> str:
+    text = MARKUP_RE.sub("", BULLET_RE.sub("", text)).strip()
+    return re.sub(r"\s+", " ", text)
+
+
+def _shorten(text: str) -> str:
+    text = text.rstrip(" .;,")
+    if len(text) <= MAX_ANSWER_CHARS:
+        return text
+    return text[:MAX_ANSWER_CHARS].rsplit(" ", 1)[0].rstrip(" ,;:")
+
+
+def _definition(text: str) -> Optional[Tuple[str, str]]:
+    """(term, explanation) if a line or sentence defines something"""
+    raw = BULLET_RE.sub("", text).strip()
+    match = BOLD_PAIR_RE.match(raw)
+    if not match:
+        cleaned = _clean(raw)
+        match = DEFINITION_FACT_RE.match(cleaned) or COLON_FACT_RE.match(cleaned)
+    if not match:
+        return None
+    term, explanation = _clean(match.group("term")), _shorten(_clean(match.group("text")))
+    if len(term.split()) > 6 or term.lower() in VAGUE_TERMS or len(explanation) < 8:
+        return None
+    return term, explanation
+
+
+def extract_facts(content: str) -> List[Fact]:
+    """Definitions, bold terms, list items under headings and frontmatter fields of a note"""
+    facts: List[Fact] = []
+    seen: Set[Tuple[str, str]] = set()
+    heading = ""
+
+    def add(kind: str, subject: str, answer: str, source: str):
+        if answer and (kind, answer.lower()) not in seen:
+            seen.add((kind, answer.lower()))
+            facts.append(Fact(kind, subject, answer, source))
+
+    for section in split_sections(content):
+        if section.kind == "frontmatter":
+            for line in section.text.splitlines():
+                key, _, value = line.partition(":")
+                key, value = key.strip(), value.strip().strip('"\'')
+                if value and key.lower() not in SKIPPED_FRONTMATTER and not value.startswith("["):
+                    add("frontmatter", key, _shorten(value), line.strip())
+        elif section.kind == "heading":
+            heading = _clean(section.text.lstrip("#"))
+        elif section.kind in ("definition", "text", "list"):
+            definition = _definition(section.text)
+            if definition:
+                add("definition", definition[0], definition[1], _clean(section.text))
+                continue
+            if section.kind == "list" and heading:
+                item = _shorten(_clean(section.text))
+                if 3 <= len(item) <= MAX_ANSWER_CHARS:
+                    add("list", heading, item, item)
+            for match in BOLD_TERM_RE.finditer(section.text):
+                term = (match.group(1) or match.group(2)).strip()
+                sentence = _clean(section.text)
+                if len(sentence) > len(term) + 20:
+                    add("term", term, term, sentence)
+    return facts
+
+
+class NoteFacts:
+    """Facts of one version of a note, plus where it sits in the vault"""
+
+    __slots__ = ("title", "content_hash", "folder", "tags", "facts", "asked")
+
+    def __init__(self, title: str, content_hash: str, folder: str, tags: Iterable[str], facts: List[Fact]):
+        self.title = title
+        self.content_hash = content_hash
+        self.folder = folder
+        self.tags = set(tags)
+        self.facts = facts
+        self.asked = 0  # Rotates through the facts so repeat fights ask different things
+
+
+class FactQuiz:
+    """Facts for every scanned note, turned into cloze and multiple choice questions on demand"""
+
+    def __init__(self):
+        self._notes: Dict[str, NoteFacts] = {}
+        self._by_title: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def sync(self, notes: Iterable[Any]) -> int:
+        """Extract facts of new or changed notes (objects with path, title, content and tags).
+
+        Returns the number of notes (re)extracted.
+        """
+        extracted = 0
+        current: Dict[str, NoteFacts] = {}
+        for note in notes:
+            key = str(note.path)
+            content_hash = make_content_hash(note.content)
+            entry = self._notes.get(key)
+            if entry is None or entry.content_hash != content_hash or entry.title != note.title:
+                entry = NoteFacts(note.title, content_hash, str(note.path.parent), note.tags,
+                                  extract_facts(note.content))
+                extracted += 1
+            current[key] = entry
+        with self._lock:
+            self._notes = current
+            self._by_title = {entry.title: key for key, entry in current.items()}
+        return extracted
+
+    def _entry(self, note_title: str, note_content: str) -> Tuple[Optional[str], NoteFacts]:
+        """The indexed entry for a note, or facts extracted right now if it was never scanned or changed"""
+        content_hash = make_content_hash(note_content)
+        with self._lock:
+            key = self._by_title.get(note_title)
+            entry = self._notes.get(key) if key else None
+        if entry is not None and entry.content_hash == content_hash:
+            return key, entry
+        return key, NoteFacts(note_title, content_hash, entry.folder if entry else "",
+                              entry.tags if entry else (), extract_facts(note_content))
+
+    def _pool(self, key: Optional[str], entry: NoteFacts, kinds: Sequence[str],
+              field: str) -> Tuple[List[str], List[str]]:
+        """Candidate distractors from other notes: (siblings in the folder or sharing a tag, the rest)"""
+        siblings: List[str] = []
+        others: List[str] = []
+        with self._lock:
+            notes = list(self._notes.items())
+        for other_key, other in notes:
+            if other_key == key:
+                continue
+            sibling = (entry.folder and other.folder == entry.folder) or bool(entry.tags & other.tags)
+            for fact in other.facts:
+                if fact.kind in kinds:
+                    (siblings if sibling else others).append(getattr(fact, field))
+        return siblings, others
+
+    def _distractors(self, answer: str, pools: Tuple[List[str], List[str]], own: Sequence[str],
+                     count: int) -> List[str]:
+        """Wrong answers resembling the right one in length, siblings first, then the note's own other facts"""
+        chosen: List[str] = []
+        taken = {answer.lower()}
+        for pool in (pools[0], list(own), pools[1]):
+            candidates = [c for c in set(pool) if c.lower() not in taken]
+            random.shuffle(candidates)
+            candidates.sort(key=lambda c: abs(len(c) - len(answer)) / max(len(answer), 1))
+            for candidate in candidates[:count - len(chosen)]:
+                taken.add(candidate.lower())
+                chosen.append(candidate)
+            if len(chosen) == count:
+                break
+        return chosen
+
+    def _question(self, key: Optional[str], entry: NoteFacts, fact: Fact) -> Optional[Tuple[str, str, str, List[str]]]:
+        """(question, answer, type, distractors) for one fact"""
+        title = entry.title
+        if fact.kind == "definition":
+            if random.random() < 0.5:
+                own = [f.answer for f in entry.facts if f.kind == "definition" and f is not fact]
+                wrong = self._distractors(fact.answer, self._pool(key, entry, ("definition",), "answer"), own, 2)
+                return f"In '{title}', what is {fact.subject}?", fact.answer, "definition", wrong
+            # Reverse: name the term from its explanation
+            own = [f.subject for f in entry.facts if f.kind in ("definition", "term") and f is not fact]
+            wrong = self._distractors(fact.subject, self._pool(key, entry, ("definition", "term"), "subject"), own, 2)
+            return f"Which term is described as: \"{fact.answer}\"?", fact.subject, "concept", wrong
+        if fact.kind == "term":
+            blank = re.sub(re.escape(fact.subject), "_____", fact.source, count=1, flags=re.IGNORECASE)
+            if blank == fact.source:
+                return None
+            own = [f.subject for f in entry.facts if f.kind in ("definition", "term") and f is not fact]
+            wrong = self._distractors(fact.subject, self._pool(key, entry, ("definition", "term"), "subject"), own, 2)
+            return f"Fill in the blank: {_shorten(blank)}", fact.subject, "fact", wrong
+        if fact.kind == "list":
+            # Wrong answers must not come from the same list
+            listed = {f.answer.lower() for f in entry.facts if f.kind == "list" and f.subject == fact.subject}
+            own = [f.answer for f in entry.facts if f.kind == "list" and f.answer.lower() not in listed]
+            siblings, others = self._pool(key, entry, ("list",), "answer")
+            wrong = self._distractors(fact.answer, ([c for c in siblings if c.lower() not in listed],
+                                                    [c for c in others if c.lower() not in listed]), own, 2)
+            where = f"in '{title}'" if fact.subject == title else f"under '{fact.subject}' in '{title}'"
+            return f"Which of these is listed {where}?", fact.answer, "relationship", wrong
+        if fact.kind == "frontmatter":
+            siblings, others = self._pool(key, entry, ("frontmatter",), "answer")
+            with self._lock:
+                notes = list(self._notes.values())
+            same_field = {f.answer for other in notes
+                          for f in other.facts if f.kind == "frontmatter" and f.subject == fact.subject}
+            wrong = self._distractors(fact.answer, ([c for c in siblings if c in same_field],
+                                                    [c for c in others if c in same_field]), (), 2)
+            return f"What is the {fact.subject} of '{title}'?", fact.answer, "fact", wrong
+        return None
+
+    def generate(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
+        """A question about one of the note's facts, or None if the note has nothing quizzable"""
+        key, entry = self._entry(note_title, note_content)
+        if not entry.facts:
+            return None
+        for offset in range(len(entry.facts)):
+            fact = entry.facts[(entry.asked + offset) % len(entry.facts)]
+            built = self._question(key, entry, fact)
+            if built is None:
+                continue
+            entry.asked += offset + 1
+            question, answer, question_type, wrong = built
+            funny = [f for f in FUNNY_ANSWERS if f not in wrong]
+            random.shuffle(funny)
+            options = [answer] + (wrong + funny)[:OPTIONS - 1]
+            random.shuffle(options)
+            return QuizQuestion(
+                question=question,
+                answer=answer,
+                difficulty=difficulty,
+                question_type=question_type,
+                context=fact.source[:200],
+                options=options,
+                correct_index=options.index(answer)
+            )
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            notes = list(self._notes.values())
+        counts = {"notes": len(notes), "facts": 0}
+        for entry in notes:
+            counts["facts"] += len(entry.facts)
+            for fact in entry.facts:
+                counts[fact.kind] = counts.get(fact.kind, 0) + 1
+        return counts
+
+
+fact_quiz = FactQuiz()
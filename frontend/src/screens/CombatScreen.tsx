@@ -1,4 +1,4 @@
-import { useState, useCallback } from 'react';
+import { useState, useCallback, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Terminal } from '../components/Terminal';
 import { HpBar } from '../components/HpBar';
@@ -19,6 +19,17 @@ export function CombatScreen() {
   const [combatOver, setCombatOver] = useState(false);
   const [showQuiz, setShowQuiz] = useState(false);
   const [quiz, setQuiz] = useState<api.QuizQuestion | null>(null);
+  const [narrative, setNarrative] = useState(combat?.enemy.encounter_narrative ?? '');
+
+  // Stream the AI narrative over the template one as it is generated
+  useEffect(() => {
+    if (!combat) return;
+    let first = true;
+    api.streamNarrative((text) => {
+      setNarrative((prev) => (first ? text : prev + text));
+      first = false;
+    }).then(setNarrative).catch(() => { /* keep the template narrative */ });
+  }, [combat?.enemy.name]);
 
   const appendLog = (msg: string) => setLog((prev) => [...prev, msg]);
 
@@ -103,7 +114,11 @@ export function CombatScreen() {
   const startQuiz = useCallback(async () => {
     if (combatOver) return;
     try {
-      const q = await api.quizStart();
+      // Show the question as soon as it streams in; options follow with the full quiz
+      const q = await api.streamQuiz((question) => {
+        setQuiz({ question, options: [], correct_index: 0, difficulty: 0, question_type: '' });
+        setShowQuiz(true);
+      });
       setQuiz(q);
       setShowQuiz(true);
     } catch (e) {
@@ -112,7 +127,7 @@ export function CombatScreen() {
   }, [combatOver, notify]);
 
   const answerQuiz = useCallback(async (index: number) => {
-    if (!quiz) return;
+    if (!quiz || quiz.options.length === 0) return;
     try {
       const r = await api.quizAnswer(index);
       setShowQuiz(false);
@@ -167,9 +182,9 @@ export function CombatScreen() {
     <Terminal title="MYSTICAL ENCOUNTER" subtitle="Battle for Knowledge">
       <SceneCanvas scene="combat" />
       {/* Narrative */}
-      {enemy.encounter_narrative && (
+      {narrative && (
         <div className="narrative" style={{ maxHeight: '200px', overflowY: 'auto' }}>
-          {enemy.encounter_narrative}
+          {narrative}
         </div>
       )}
 
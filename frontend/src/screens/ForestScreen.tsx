@@ -20,7 +20,8 @@ export function ForestScreen() {
     }
     try {
       notify('Something stirs in the forest...');
-      const state = await api.enterForest();
+      // Narrative streams in on the combat screen
+      const state = await api.enterForest(true);
       setCombat(state);
       nav('/combat');
     } catch (e) {
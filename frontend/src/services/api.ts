@@ -35,6 +35,29 @@ function post<T>(path: string, body?: unknown): Promise<T> {
   });
 }
 
+/** Subscribe to a server-sent event stream; resolves with the data of `doneEvent`. */
+function stream<T>(
+  path: string,
+  doneEvent: string,
+  handlers: Record<string, (data: Record<string, string>) => void> = {},
+): Promise<T> {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`${BASE_URL}${path}`);
+    for (const [event, handler] of Object.entries(handlers)) {
+      source.addEventListener(event, (e) => handler(JSON.parse((e as MessageEvent).data)));
+    }
+    source.addEventListener(doneEvent, (e) => {
+      source.close();
+      resolve(JSON.parse((e as MessageEvent).data));
+    });
+    source.addEventListener('error', (e) => {
+      source.close();
+      const data = (e as MessageEvent).data;
+      reject(new Error(data ? JSON.parse(data).error : `Stream ${path} failed`));
+    });
+  });
+}
+
 // ---- Health ----
 
 export function healthCheck() {
@@ -202,8 +225,19 @@ export interface HealResult {
   victory: boolean;
 }
 
-export function enterForest() {
-  return post<CombatState>('/api/combat/enter-forest');
+export function enterForest(deferNarrative = false) {
+  return post<CombatState>(`/api/combat/enter-forest${deferNarrative ? '?defer_narrative=true' : ''}`);
+}
+
+/** Stream the encounter narrative; onText receives each new chunk as it is generated. */
+export function streamNarrative(onText: (text: string) => void) {
+  return stream<{ encounter_narrative: string }>('/api/combat/stream/narrative', 'done', {
+    token: (data) => onText(data.text),
+  }).then((data) => data.encounter_narrative);
+}
+
+export function getEnemyWave(count: number) {
+  return post<{ enemies: Enemy[] }>('/api/combat/wave', { count });
 }
 
 export function startMasterFight(level: number) {
@@ -230,6 +264,13 @@ export function quizStart() {
   return post<QuizQuestion>('/api/combat/quiz/start');
 }
 
+/** Stream quiz generation; onQuestion fires as soon as the question text is ready. */
+export function streamQuiz(onQuestion: (question: string) => void) {
+  return stream<QuizQuestion>('/api/combat/stream/quiz', 'quiz', {
+    question: (data) => onQuestion(data.question),
+  });
+}
+
 export function quizAnswer(selectedIndex: number) {
   return post<QuizResult>('/api/combat/quiz/answer', { selected_index: selectedIndex });
 }
@@ -27,6 +27,7 @@ class AIProviderType(Enum):
     CLAUDE_CLI = "claude_cli"    # Claude Code CLI - uses existing subscription
     CLAUDE_API = "claude_api"    # Anthropic API - requires API key
     OLLAMA = "ollama"            # Remote Ollama server - GPU inference
+    MOCK = "mock"                # Simulated model - offline load testing and benchmarks
 
 
 # Available Claude models for selection
@@ -53,8 +54,77 @@ class GameSettings:
     ai_provider: AIProviderType = AIProviderType.OLLAMA
     claude_api_key: str = ""  # For CLAUDE_API mode
     claude_model: str = "claude-sonnet-4-20250514"  # Default Claude model
+    claude_cli_workers: int = 2  # Concurrent Claude CLI processes
+    claude_cli_timeout: float = 45.0  # Seconds per CLI job (and max wait for a free worker)
+    claude_cli_persistent: bool = True  # Pre-start a fresh CLI process for each prompt (stream-json)
+    tinyllama_idle_unload: float = 600.0  # Seconds unused before the local model is unloaded (0 = never)
+    tinyllama_threads: int = 0  # llama.cpp CPU threads (0 = physical cores)
+    tinyllama_batch: int = 0  # llama.cpp prompt batch size (0 = auto)
+    tinyllama_batch_contexts: int = 0  # Prompts generated in parallel for bulk work (0 = auto)
+    ai_worker_processes: int = 0  # Run TinyLlama in this many worker processes, each with its own model copy (0 = in the app process)
+    ai_worker_timeout: float = 120.0  # Seconds a request may take in a worker before it is stopped (and the worker replaced if it hangs)
     ollama_host: str = "http://100.86.138.79:11434"  # Ollama server (bucky via Tailscale)
     ollama_model: str = "gemma3:4b"  # Ollama model name
+    ollama_pool_size: int = 4  # Max pooled HTTP connections to the Ollama server
+    ollama_connection_keep_alive: float = 60.0  # Seconds an idle connection is kept for reuse
+    ollama_request_timeout: float = 30.0  # Seconds per generation request
+    ollama_connect_timeout: float = 5.0  # Seconds to connect / list models
+    ollama_model_keep_alive: str = "30m"  # How long Ollama keeps the model loaded between calls
+
+    # AI result cache (saves/ai_cache.db)
+    ai_cache_max_entries: int = 5000  # Least recently used entries are evicted beyond this (compiled content is exempt)
+    ai_cache_quiz_ttl: float = 604800.0  # Seconds a cached quiz stays valid (0 = forever)
+    ai_cache_enemy_ttl: float = 604800.0  # Seconds a cached enemy description stays valid (0 = forever)
+    enemy_cache_ttl: float = 0.0  # Seconds a generated enemy is reused for the same note version and level (0 = off)
+
+    # Quiz banks (questions generated in bulk per note)
+    quiz_bank_size: int = 6  # Questions requested per refill
+    quiz_bank_low_water: int = 2  # Refill in the background below this many unseen questions
+
+    # Provider health (circuit breakers and failover)
+    ai_breaker_window: int = 20  # Recent calls per provider used for error rate and latency percentiles
+    ai_breaker_min_calls: int = 3  # Calls in the window before a provider can be tripped
+    ai_breaker_failure_rate: float = 0.5  # Error rate that opens a provider's circuit
+    ai_breaker_slow_call: float = 20.0  # p95 latency in seconds that also opens the circuit (0 = off)
+    ai_breaker_cooldown: float = 30.0  # Seconds an open circuit waits before a half-open probe
+    ai_hedge_requests: bool = True  # Race the next healthy provider when a call runs past its p95
+    ai_hedge_min_delay: float = 2.0  # Never hedge before this many seconds
+    ai_warm_failover: bool = True  # Load TinyLlama in the background once the selected provider fails
+
+    # Request scheduling (interactive > prefetch > batch)
+    ai_interactive_reserve: int = 1  # Provider slots background AI work may never take
+    ai_prefetch_queue_limit: int = 16  # Queued prefetch requests per provider before new ones are shed
+    ai_batch_queue_limit: int = 64  # Queued batch requests per provider before new ones are shed
+    ai_interactive_timeout: float = 30.0  # Seconds a player waits on background AI work they now need
+
+    # Prompt budgets (note tokens per prompt, in each provider's tokens)
+    tinyllama_prompt_tokens: int = 192  # Small, so local prompts stay fast within the 2048-token context
+    ollama_prompt_tokens: int = 1024  # Note tokens sent to Ollama models
+    claude_prompt_tokens: int = 3000  # Note tokens sent to Claude (CLI and API)
+
+    # Structured output: JSON schemas via Ollama format, Claude tool use and TinyLlama grammars
+    ai_structured_output: bool = True  # False = labeled text prompts for every provider
+
+    # Mock provider (offline load testing and benchmarks)
+    mock_latency_ms: float = 150.0  # Median simulated generation latency
+    mock_latency_spread: float = 0.5  # Log-normal sigma of the latency (0 = every call takes the median)
+    mock_error_rate: float = 0.0  # Fraction of calls that fail after their latency
+    mock_timeout_rate: float = 0.0  # Fraction of calls that hang for mock_timeout and then fail
+    mock_timeout: float = 5.0  # Seconds a hanging call takes before it fails
+    mock_concurrency: int = 8  # Concurrent requests the mock accepts
+    mock_seed: int = 0  # Seeds the latency and failure draws (and scopes the mock's cache entries)
+
+    # Embedding index (semantic related notes, distractors and answer matching)
+    embedding_index_enabled: bool = True  # Keep a vector index of note chunks
+    embedding_backend: str = "auto"  # auto (llama if a model path is set, else hashing), llama, ollama or hashing
+    embedding_model_path: str = ""  # GGUF embedding model for the llama backend
+    embedding_ollama_model: str = "nomic-embed-text"  # Ollama model for the ollama backend
+    embedding_ivf_min_chunks: int = 4096  # Chunks before search switches from brute force to IVF lists (needs numpy)
+    embedding_ivf_probes: int = 8  # IVF lists scanned per search
+    embedding_answer_threshold: float = 0.85  # Similarity at which a typed answer counts as correct (model embedders)
+
+    # Fact quiz (model-free questions mined from the notes)
+    fact_quiz_enabled: bool = True  # Build fallback questions from note facts before the generic regex ones
 
     @classmethod
     def load(cls, path: str = "saves/settings.json") -> "GameSettings":
@@ -74,8 +144,59 @@ class GameSettings:
                     ai_provider=AIProviderType(data.get("ai_provider", "tinyllama")),
                     claude_api_key=data.get("claude_api_key", ""),
                     claude_model=data.get("claude_model", "claude-sonnet-4-20250514"),
+                    claude_cli_workers=data.get("claude_cli_workers", 2),
+                    claude_cli_timeout=data.get("claude_cli_timeout", 45.0),
+                    claude_cli_persistent=data.get("claude_cli_persistent", True),
+                    tinyllama_idle_unload=data.get("tinyllama_idle_unload", 600.0),
+                    tinyllama_threads=data.get("tinyllama_threads", 0),
+                    tinyllama_batch=data.get("tinyllama_batch", 0),
+                    tinyllama_batch_contexts=data.get("tinyllama_batch_contexts", 0),
+                    ai_worker_processes=data.get("ai_worker_processes", 0),
+                    ai_worker_timeout=data.get("ai_worker_timeout", 120.0),
                     ollama_host=data.get("ollama_host", "http://100.86.138.79:11434"),
-                    ollama_model=data.get("ollama_model", "gemma3:4b")
+                    ollama_model=data.get("ollama_model", "gemma3:4b"),
+                    ollama_pool_size=data.get("ollama_pool_size", 4),
+                    ollama_connection_keep_alive=data.get("ollama_connection_keep_alive", 60.0),
+                    ollama_request_timeout=data.get("ollama_request_timeout", 30.0),
+                    ollama_connect_timeout=data.get("ollama_connect_timeout", 5.0),
+                    ollama_model_keep_alive=data.get("ollama_model_keep_alive", "30m"),
+                    ai_cache_max_entries=data.get("ai_cache_max_entries", 5000),
+                    ai_cache_quiz_ttl=data.get("ai_cache_quiz_ttl", 604800.0),
+                    ai_cache_enemy_ttl=data.get("ai_cache_enemy_ttl", 604800.0),
+                    enemy_cache_ttl=data.get("enemy_cache_ttl", 0.0),
+                    quiz_bank_size=data.get("quiz_bank_size", 6),
+                    quiz_bank_low_water=data.get("quiz_bank_low_water", 2),
+                    ai_breaker_window=data.get("ai_breaker_window", 20),
+                    ai_breaker_min_calls=data.get("ai_breaker_min_calls", 3),
+                    ai_breaker_failure_rate=data.get("ai_breaker_failure_rate", 0.5),
+                    ai_breaker_slow_call=data.get("ai_breaker_slow_call", 20.0),
+                    ai_breaker_cooldown=data.get("ai_breaker_cooldown", 30.0),
+                    ai_hedge_requests=data.get("ai_hedge_requests", True),
+                    ai_hedge_min_delay=data.get("ai_hedge_min_delay", 2.0),
+                    ai_warm_failover=data.get("ai_warm_failover", True),
+                    ai_interactive_reserve=data.get("ai_interactive_reserve", 1),
+                    ai_prefetch_queue_limit=data.get("ai_prefetch_queue_limit", 16),
+                    ai_batch_queue_limit=data.get("ai_batch_queue_limit", 64),
+                    ai_interactive_timeout=data.get("ai_interactive_timeout", 30.0),
+                    tinyllama_prompt_tokens=data.get("tinyllama_prompt_tokens", 192),
+                    ollama_prompt_tokens=data.get("ollama_prompt_tokens", 1024),
+                    claude_prompt_tokens=data.get("claude_prompt_tokens", 3000),
+                    ai_structured_output=data.get("ai_structured_output", True),
+                    mock_latency_ms=data.get("mock_latency_ms", 150.0),
+                    mock_latency_spread=data.get("mock_latency_spread", 0.5),
+                    mock_error_rate=data.get("mock_error_rate", 0.0),
+                    mock_timeout_rate=data.get("mock_timeout_rate", 0.0),
+                    mock_timeout=data.get("mock_timeout", 5.0),
+                    mock_concurrency=data.get("mock_concurrency", 8),
+                    mock_seed=data.get("mock_seed", 0),
+                    embedding_index_enabled=data.get("embedding_index_enabled", True),
+                    embedding_backend=data.get("embedding_backend", "auto"),
+                    embedding_model_path=data.get("embedding_model_path", ""),
+                    embedding_ollama_model=data.get("embedding_ollama_model", "nomic-embed-text"),
+                    embedding_ivf_min_chunks=data.get("embedding_ivf_min_chunks", 4096),
+                    embedding_ivf_probes=data.get("embedding_ivf_probes", 8),
+                    embedding_answer_threshold=data.get("embedding_answer_threshold", 0.85),
+                    fact_quiz_enabled=data.get("fact_quiz_enabled", True)
                 )
             except (json.JSONDecodeError, ValueError):
                 pass
@@ -95,8 +216,59 @@ class GameSettings:
             "ai_provider": self.ai_provider.value,
             "claude_api_key": self.claude_api_key,
             "claude_model": self.claude_model,
+            "claude_cli_workers": self.claude_cli_workers,
+            "claude_cli_timeout": self.claude_cli_timeout,
+            "claude_cli_persistent": self.claude_cli_persistent,
+            "tinyllama_idle_unload": self.tinyllama_idle_unload,
+            "tinyllama_threads": self.tinyllama_threads,
+            "tinyllama_batch": self.tinyllama_batch,
+            "tinyllama_batch_contexts": self.tinyllama_batch_contexts,
+            "ai_worker_processes": self.ai_worker_processes,
+            "ai_worker_timeout": self.ai_worker_timeout,
             "ollama_host": self.ollama_host,
-            "ollama_model": self.ollama_model
+            "ollama_model": self.ollama_model,
+            "ollama_pool_size": self.ollama_pool_size,
+            "ollama_connection_keep_alive": self.ollama_connection_keep_alive,
+            "ollama_request_timeout": self.ollama_request_timeout,
+            "ollama_connect_timeout": self.ollama_connect_timeout,
+            "ollama_model_keep_alive": self.ollama_model_keep_alive,
+            "ai_cache_max_entries": self.ai_cache_max_entries,
+            "ai_cache_quiz_ttl": self.ai_cache_quiz_ttl,
+            "ai_cache_enemy_ttl": self.ai_cache_enemy_ttl,
+            "enemy_cache_ttl": self.enemy_cache_ttl,
+            "quiz_bank_size": self.quiz_bank_size,
+            "quiz_bank_low_water": self.quiz_bank_low_water,
+            "ai_breaker_window": self.ai_breaker_window,
+            "ai_breaker_min_calls": self.ai_breaker_min_calls,
+            "ai_breaker_failure_rate": self.ai_breaker_failure_rate,
+            "ai_breaker_slow_call": self.ai_breaker_slow_call,
+            "ai_breaker_cooldown": self.ai_breaker_cooldown,
+            "ai_hedge_requests": self.ai_hedge_requests,
+            "ai_hedge_min_delay": self.ai_hedge_min_delay,
+            "ai_warm_failover": self.ai_warm_failover,
+            "ai_interactive_reserve": self.ai_interactive_reserve,
+            "ai_prefetch_queue_limit": self.ai_prefetch_queue_limit,
+            "ai_batch_queue_limit": self.ai_batch_queue_limit,
+            "ai_interactive_timeout": self.ai_interactive_timeout,
+            "tinyllama_prompt_tokens": self.tinyllama_prompt_tokens,
+            "ollama_prompt_tokens": self.ollama_prompt_tokens,
+            "claude_prompt_tokens": self.claude_prompt_tokens,
+            "ai_structured_output": self.ai_structured_output,
+            "mock_latency_ms": self.mock_latency_ms,
+            "mock_latency_spread": self.mock_latency_spread,
+            "mock_error_rate": self.mock_error_rate,
+            "mock_timeout_rate": self.mock_timeout_rate,
+            "mock_timeout": self.mock_timeout,
+            "mock_concurrency": self.mock_concurrency,
+            "mock_seed": self.mock_seed,
+            "embedding_index_enabled": self.embedding_index_enabled,
+            "embedding_backend": self.embedding_backend,
+            "embedding_model_path": self.embedding_model_path,
+            "embedding_ollama_model": self.embedding_ollama_model,
+            "embedding_ivf_min_chunks": self.embedding_ivf_min_chunks,
+            "embedding_ivf_probes": self.embedding_ivf_probes,
+            "embedding_answer_threshold": self.embedding_answer_threshold,
+            "fact_quiz_enabled": self.fact_quiz_enabled
         }
         with open(settings_path, 'w') as f:
             json.dump(data, f, indent=2)
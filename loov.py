@@ -0,0 +1,285 @@
+"""
+Command line tools for Legend of the Obsidian Vault
+
+    python -m loov compile [--vault PATH] [--jobs N] [--only quiz,enemy,regions,embeddings]
+    python -m loov bench-local [--prompts N] [--tokens N]
+    python -m loov bench-ai [--requests N] [--concurrency N] [--kind quiz|enemy] [--mock]
+
+``compile`` pre-generates AI content for every note in the vault (quiz banks,
+enemy descriptions, region descriptors and the embedding index) ahead of play, so
+gameplay can be served without waiting on a model. Everything finished is
+written immediately and skipped on the next run, so an interrupted compile
+resumes where it stopped. Compiled banks and enemies are pinned in the AI
+cache: they never expire and the cache's LRU limit does not evict them.
+
+``bench-local`` measures local TinyLlama throughput (prompts/minute) of the
+single-prompt path against batched generation.
+
+``bench-ai`` drives concurrent requests through the whole generation path
+(scheduler, circuit breakers, parsing, fallbacks) and reports throughput and
+latency percentiles. With ``--mock`` it runs against the simulated provider,
+shaped by the ``mock_*`` settings, so it needs no model at all.
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+from brainbot import (AIPriority, EnemyDescription, LocalAIClient, ai_provider_manager, current_ai_identity,
+                      enemy_cache_key, get_current_provider_name, initialize_ai, llama_runtime_params,
+                      load_cached_result, quiz_bank_cache_key, quiz_bank_prompt,
+                      sync_generate_enemy_description, sync_generate_quiz_questions)
+from embedding_index import embedding_index
+from game_data import FOREST_ENEMIES, AIProviderType, ObsidianNote, game_settings
+from obsidian import vault
+from quiz_bank import quiz_bank
+from simple_cache import get_cache, pin_ai_result
+
+TASKS = ("quiz", "enemy", "regions", "embeddings")
+AI_STARTUP_TIMEOUT = 600.0  # First TinyLlama run may download the model
+
+
+class CompileProgress:
+    """Thread-safe counters and one progress line per finished note"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.counts: Dict[str, int] = {"generated": 0, "cached": 0, "failed": 0}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, note: ObsidianNote, results: Dict[str, str]):
+        with self._lock:
+            self.done += 1
+            for outcome in results.values():
+                self.counts[outcome] += 1
+            elapsed = time.monotonic() - self.started
+            eta = elapsed / self.done * (self.total - self.done)
+            summary = ", ".join(f"{task} {outcome}" for task, outcome in results.items())
+            width = len(str(self.total))
+            print(f"[{self.done:>{width}}/{self.total}] {self.done * 100 // self.total:3d}% "
+                  f"eta {_format_duration(eta)}  {note.title} - {summary}", flush=True)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def _compile_quiz_bank(note: ObsidianNote) -> str:
+    added = quiz_bank.fill(note.title, note.content)
+    outcome = "generated" if added else "cached" if quiz_bank.has_questions(note.title, note.content) else "failed"
+    if outcome != "failed":
+        pin_ai_result(quiz_bank_cache_key(current_ai_identity(), note.title))
+    return outcome
+
+
+def _compile_enemy(note: ObsidianNote) -> str:
+    content_sample = vault.get_enemy_content_sample(note)
+    key = enemy_cache_key(current_ai_identity(), note.title, content_sample)
+    if load_cached_result(key, EnemyDescription):
+        pin_ai_result(key)
+        return "cached"
+    base_enemy = FOREST_ENEMIES[1][0][0]  # Not part of the prompt; any base enemy will do
+    description = sync_generate_enemy_description(note.title, content_sample, base_enemy, AIPriority.BATCH)
+    if not description:
+        return "failed"
+    pin_ai_result(key)
+    return "generated"
+
+
+def _compile_note(note: ObsidianNote, tasks: List[str]) -> Dict[str, str]:
+    results = {}
+    for task in tasks:
+        try:
+            if task == "quiz":
+                results[task] = _compile_quiz_bank(note)
+            elif task == "enemy":
+                results[task] = _compile_enemy(note)
+        except Exception as e:
+            print(f"⚠️ {task} failed for '{note.title}': {e}")
+            results[task] = "failed"
+    return results
+
+
+def compile_vault(tasks: List[str], jobs: int = 0, limit: int = 0) -> int:
+    """Pre-generate AI content for the vault. Returns a process exit code."""
+    if not vault.vault_path or not vault.vault_path.exists():
+        print("❌ No vault found - pass --vault PATH")
+        return 1
+
+    notes = sorted(vault.scan_notes(force_rescan=True), key=lambda n: str(n.path))
+    if limit:
+        notes = notes[:limit]
+    print(f"📖 Vault: {vault.vault_path} ({len(notes)} notes)")
+
+    if "regions" in tasks:
+        regions = vault.get_world_regions()
+        print(f"🗺️  {len(regions)} region descriptors cached")
+
+    if "embeddings" in tasks:
+        result = embedding_index.sync(notes)
+        print(f"🧭 Embedding index: {result['embedded']} chunks embedded, {result['reused']} notes unchanged "
+              f"({embedding_index.embedder.name})")
+
+    note_tasks = [task for task in tasks if task not in ("regions", "embeddings")]
+    if not note_tasks or not notes:
+        return 0
+
+    print("🧠 Waiting for the AI provider...")
+    initialize_ai()
+    if not ai_provider_manager.wait_for_initialization(timeout=AI_STARTUP_TIMEOUT):
+        print("❌ No AI provider available - nothing to compile")
+        return 1
+
+    provider = ai_provider_manager.get_current_provider()
+    workers = jobs or provider.max_concurrency
+    print(f"🤖 {get_current_provider_name()} - {workers} concurrent jobs")
+
+    progress = CompileProgress(len(notes))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compile")
+    try:
+        futures = {pool.submit(_compile_note, note, note_tasks): note for note in notes}
+        for future in as_completed(futures):
+            progress.record(futures[future], future.result())
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted - finished work is cached; run compile again to resume")
+        pool.shutdown(wait=False, cancel_futures=True)
+        return 130
+    pool.shutdown()
+
+    counts = progress.counts
+    print(f"✅ Compiled in {_format_duration(time.monotonic() - progress.started)}: "
+          f"{counts['generated']} generated, {counts['cached']} already cached, {counts['failed']} failed")
+    print(f"🗄️  Cache: {get_cache().stats()['entries']}")
+    return 0 if counts["failed"] == 0 else 2
+
+
+def bench_local(prompt_count: int, max_tokens: int) -> int:
+    """Compare single-prompt and batched TinyLlama throughput on vault-derived prompts"""
+    client = LocalAIClient()
+    if not client.initialize():
+        print("❌ TinyLlama is not available - install llama-cpp-python")
+        return 1
+
+    sources = [(note.title, note.content) for note in vault.scan_notes()]
+    if not sources:
+        sources = [("Python", "Python is a programming language. Lists are mutable sequences.")]
+    prompts = [quiz_bank_prompt(*sources[i % len(sources)], 1) for i in range(prompt_count)]
+    params = llama_runtime_params()
+    print(f"🧪 {prompt_count} prompts, {max_tokens} tokens each - "
+          f"{params['n_threads']} threads, batch {params['n_batch']}, "
+          f"{params['batch_contexts']} batch contexts x {params['batch_threads']} threads")
+
+    # Load every context and its prompt prefix before timing
+    client.generate_text(prompts[0], max_tokens=4)
+    client.generate_texts(prompts[:params["batch_contexts"]], max_tokens=4)
+
+    started = time.monotonic()
+    for prompt in prompts:
+        client.generate_text(prompt, max_tokens=max_tokens)
+    single = time.monotonic() - started
+
+    started = time.monotonic()
+    client.generate_texts(prompts, max_tokens=max_tokens)
+    batched = time.monotonic() - started
+
+    print(f"   single-prompt: {prompt_count / single * 60:7.1f} prompts/min ({single:.1f}s)")
+    print(f"   batched:       {prompt_count / batched * 60:7.1f} prompts/min ({batched:.1f}s)")
+    print(f"   speed-up:      {single / batched:.2f}x")
+    return 0
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def bench_ai(request_count: int, concurrency: int, kind: str) -> int:
+    """Measure throughput and latency of the configured AI provider under concurrent load"""
+    ai_provider_manager.initialize()  # Not initialize_ai(): the legacy system would load TinyLlama too
+    if not ai_provider_manager.wait_for_initialization(timeout=AI_STARTUP_TIMEOUT):
+        print("❌ No AI provider available")
+        return 1
+
+    sources = [(note.title, note.content) for note in vault.scan_notes()]
+    if not sources:
+        sources = [("Python", "Python is a programming language. Lists are mutable sequences.")]
+    run = int(time.time())
+    base_enemy = FOREST_ENEMIES[1][0][0]
+
+    def request(index: int) -> Tuple[float, bool]:
+        title, content = sources[index % len(sources)]
+        title = f"{title} (bench {run}-{index})"  # Fresh title: nothing is served from the AI cache
+        started = time.monotonic()
+        if kind == "enemy":
+            ok = sync_generate_enemy_description(title, content, base_enemy) is not None
+        else:
+            ok = bool(sync_generate_quiz_questions(title, content, 1, AIPriority.INTERACTIVE))
+        return time.monotonic() - started, ok
+
+    print(f"🧪 {get_current_provider_name()}: {request_count} {kind} requests, {concurrency} concurrent")
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+        results = list(pool.map(request, range(request_count)))
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    failed = sum(1 for _, ok in results if not ok)
+    print(f"   throughput: {request_count / elapsed:7.1f} requests/s ({elapsed:.1f}s)")
+    print(f"   latency:    p50 {_percentile(latencies, 0.5) * 1000:.0f}ms, "
+          f"p95 {_percentile(latencies, 0.95) * 1000:.0f}ms, p99 {_percentile(latencies, 0.99) * 1000:.0f}ms")
+    print(f"   failed:     {failed} ({failed / request_count:.1%})")
+    for provider_type, health in ai_provider_manager.provider_health().items():
+        print(f"   {provider_type}: {health}")
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loov", description="Legend of the Obsidian Vault tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = commands.add_parser("compile", help="pre-generate AI content for the whole vault")
+    compile_parser.add_argument("--vault", help="vault folder (default: auto-detect)")
+    compile_parser.add_argument("--jobs", type=int, default=0,
+                                help="concurrent generations (default: what the provider supports)")
+    compile_parser.add_argument("--only", default=",".join(TASKS),
+                                help=f"comma-separated subset of: {', '.join(TASKS)}")
+    compile_parser.add_argument("--limit", type=int, default=0, help="only compile the first N notes")
+
+    bench_parser = commands.add_parser("bench-local", help="measure local TinyLlama prompts/minute")
+    bench_parser.add_argument("--vault", help="vault folder to take prompts from (default: auto-detect)")
+    bench_parser.add_argument("--prompts", type=int, default=16, help="prompts per run")
+    bench_parser.add_argument("--tokens", type=int, default=64, help="tokens generated per prompt")
+
+    ai_parser = commands.add_parser("bench-ai", help="load-test the AI generation path")
+    ai_parser.add_argument("--vault", help="vault folder to take notes from (default: auto-detect)")
+    ai_parser.add_argument("--requests", type=int, default=200, help="requests per run")
+    ai_parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    ai_parser.add_argument("--kind", choices=("quiz", "enemy"), default="quiz", help="what to generate")
+    ai_parser.add_argument("--mock", action="store_true", help="use the simulated provider (mock_* settings)")
+
+    args = parser.parse_args(argv)
+    if args.vault and not vault.set_vault_path(args.vault):
+        print(f"❌ Vault not found: {args.vault}")
+        return 1
+    if args.command == "bench-ai":
+        if args.mock:
+            game_settings.ai_provider = AIProviderType.MOCK  # This run only - not saved
+        return bench_ai(max(1, args.requests), max(1, args.concurrency), args.kind)
+    if args.command == "bench-local":
+        return bench_local(max(1, args.prompts), max(1, args.tokens))
+    if args.command == "compile":
+        tasks = [task.strip() for task in args.only.split(",") if task.strip()]
+        unknown = [task for task in tasks if task not in TASKS]
+        if unknown:
+            parser.error(f"unknown task(s): {', '.join(unknown)}")
+        return compile_vault(tasks, jobs=args.jobs, limit=args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Narrative Template Engine for Legend of the Obsidian Vault
+Loads fallback narrative tables from content packs and renders them with precompiled templates
+"""
+import json
+import os
+import random
+import re
+import string
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Content packs shipped with the game. Extra packs can be layered on top with
+# LOOV_CONTENT_PACKS (os.pathsep-separated directories); later packs replace
+# tables of the same name from earlier ones.
+CONTENT_PACK_DIR = Path(__file__).resolve().parent / "content_packs"
+DEFAULT_PACK = "default"
+RELOAD_INTERVAL = 2.0  # Seconds between pack modification checks
+
+_formatter = string.Formatter()
+
+
+class TemplateSlots(dict):
+    """Slot values for template rendering.
+
+    Expensive values can be registered as zero-argument factories in ``lazy``;
+    they are only computed (once) when a rendered template actually uses them.
+    """
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None,
+                 lazy: Optional[Dict[str, Callable[[], Any]]] = None):
+        super().__init__(values or {})
+        self._lazy = lazy or {}
+
+    def __missing__(self, key: str) -> Any:
+        factory = self._lazy.get(key)
+        if factory is None:
+            raise KeyError(key)
+        value = factory()
+        self[key] = value
+        return value
+
+    def filled(self, key: str) -> bool:
+        """True if the slot resolves to a non-empty value"""
+        try:
+            return bool(self[key])
+        except KeyError:
+            return False
+
+
+class CompiledTemplate:
+    """A ``str.format`` template parsed once into its literal text and slot names"""
+
+    __slots__ = ("source", "fields")
+
+    def __init__(self, source: str):
+        self.source = source
+        fields = []
+        for _literal, field_name, _spec, _conversion in _formatter.parse(source):
+            if field_name:
+                # "{numbers[0]}" / "{note.title}" depend on the root slot only
+                root = re.split(r"[.\[]", field_name, maxsplit=1)[0]
+                if root not in fields:
+                    fields.append(root)
+        self.fields = tuple(fields)
+
+    def ready(self, slots: TemplateSlots) -> bool:
+        """True if every slot this template uses has a non-empty value"""
+        return all(slots.filled(name) for name in self.fields)
+
+    def render(self, slots: TemplateSlots) -> str:
+        if not self.fields:
+            return self.source
+        return self.source.format_map(slots)
+
+
+class TableEntry:
+    """One rule, key or default of a narrative table"""
+
+    def __init__(self, table: str, data: Dict[str, Any]):
+        self.table = table
+        self.choices = [CompiledTemplate(t) for t in data.get("choices", [])]
+        self.segments = [CompiledTemplate(t) for t in data.get("segments", [])]
+        # Any extra fields (flags like "details") are passed through untouched
+        self.options = {k: v for k, v in data.items()
+                        if k not in ("choices", "segments", "keywords")}
+
+    def render(self, slots: TemplateSlots, rng=random) -> str:
+        """Render one randomly chosen template"""
+        if not self.choices:
+            return ""
+        return self._safe_render(rng.choice(self.choices), slots)
+
+    def sample(self, slots: TemplateSlots, count: int, rng=random) -> List[str]:
+        """Render ``count`` distinct templates (or all of them if fewer)"""
+        picked = rng.sample(self.choices, min(count, len(self.choices)))
+        return [self._safe_render(t, slots) for t in picked]
+
+    def render_segments(self, slots: TemplateSlots, limit: Optional[int] = None) -> List[str]:
+        """Render, in order, the segments whose slots are all filled"""
+        rendered = []
+        for template in self.segments:
+            if limit is not None and len(rendered) >= limit:
+                break
+            if template.ready(slots):
+                rendered.append(self._safe_render(template, slots))
+        return rendered
+
+    def _safe_render(self, template: CompiledTemplate, slots: TemplateSlots) -> str:
+        try:
+            return template.render(slots)
+        except (KeyError, IndexError, AttributeError, ValueError) as e:
+            print(f"⚠️ Narrative template error in '{self.table}': {e}")
+            return template.source
+
+
+class NarrativeTable:
+    """Keyword rules, keyed entries and a default, resolved in that order"""
+
+    def __init__(self, name: str, data: Dict[str, Any]):
+        self.name = name
+        self.rules = []
+        for rule in data.get("rules", []):
+            # Plain substring checks: faster than a regex alternation for short keyword lists
+            self.rules.append((tuple(rule.get("keywords", [])), TableEntry(name, rule)))
+        self.keys = {key: TableEntry(name, entry if isinstance(entry, dict) else {"choices": entry})
+                     for key, entry in data.get("keys", {}).items()}
+        default = data.get("default", {})
+        self.default = TableEntry(name, default if isinstance(default, dict) else {"choices": default})
+        self.data = data.get("data", {})
+
+    def match(self, text: Optional[str] = None, key: Optional[str] = None) -> Optional[TableEntry]:
+        """Return the first rule whose keywords occur in ``text``, else ``key``'s entry, else None"""
+        if text is not None:
+            for keywords, entry in self.rules:
+                for keyword in keywords:
+                    if keyword in text:
+                        return entry
+        if key is not None:
+            return self.keys.get(key)
+        return None
+
+    def resolve(self, text: Optional[str] = None, key: Optional[str] = None) -> TableEntry:
+        """Like ``match`` but falls back to the table's default entry"""
+        return self.match(text, key) or self.default
+
+
+class NarrativeEngine:
+    """Loads content packs once and renders narrative tables on demand"""
+
+    def __init__(self, pack_dirs: Optional[List[Path]] = None, reload_interval: float = RELOAD_INTERVAL):
+        self._explicit_dirs = pack_dirs
+        self._reload_interval = reload_interval
+        self._tables: Dict[str, NarrativeTable] = {}
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def pack_dirs(self) -> List[Path]:
+        """Pack directories in load order (later ones override earlier ones)"""
+        if self._explicit_dirs is not None:
+            return list(self._explicit_dirs)
+        dirs = [CONTENT_PACK_DIR / DEFAULT_PACK]
+        extra = os.environ.get("LOOV_CONTENT_PACKS", "")
+        dirs.extend(Path(p).expanduser() for p in extra.split(os.pathsep) if p)
+        return dirs
+
+    def _pack_files(self) -> List[Path]:
+        files = []
+        for pack_dir in self.pack_dirs():
+            if pack_dir.is_dir():
+                files.extend(sorted(pack_dir.glob("*.json")))
+        return files
+
+    def _current_signature(self, files: List[Path]):
+        signature = []
+        for path in files:
+            try:
+                stat = path.stat()
+                signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                continue
+        return tuple(signature)
+
+    def reload(self) -> bool:
+        """(Re)load every pack file. Returns False and keeps the old tables on error."""
+        files = self._pack_files()
+        tables = {}
+        try:
+            for path in files:
+                with open(path, "r", encoding="utf-8") as f:
+                    for name, data in json.load(f).items():
+                        tables[name] = NarrativeTable(name, data)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Failed to load content pack {path}: {e}")
+            return False
+
+        with self._lock:
+            self._tables = tables
+            self._signature = self._current_signature(files)
+            self._last_check = time.monotonic()
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """Hot-reload packs when a file was added, removed or modified"""
+        now = time.monotonic()
+        if now - self._last_check < self._reload_interval:
+            return False
+        self._last_check = now
+        if self._current_signature(self._pack_files()) == self._signature:
+            return False
+        print("🔄 Content packs changed - reloading narrative tables")
+        return self.reload()
+
+    def table(self, name: str) -> NarrativeTable:
+        self.reload_if_changed()
+        table = self._tables.get(name)
+        if table is None:
+            raise KeyError(f"Unknown narrative table: {name}")
+        return table
+
+    def render(self, name: str, slots: TemplateSlots, text: Optional[str] = None,
+               key: Optional[str] = None, rng=random) -> str:
+        """Resolve an entry of table ``name`` and render one of its templates"""
+        return self.table(name).resolve(text, key).render(slots, rng)
+
+    def data(self, name: str) -> Dict[str, Any]:
+        """Raw word lists stored under a table's ``data`` section"""
+        return self.table(name).data
+
+
+# Global engine instance
+narrative_engine = NarrativeEngine()
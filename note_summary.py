@@ -0,0 +1,239 @@
+"""
+Note Summaries for Legend of the Obsidian Vault
+Extractive summaries and keyphrases of every note version (TextRank over
+TF-IDF sentence vectors), for compact prompts and content-specific lore
+"""
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from prompt_builder import BOLD_RE, BULLET_RE, score_section, split_sections
+from simple_cache import make_content_hash
+
+SUMMARY_VERSION = 1  # Bump when the algorithm changes - part of the enemy prompt cache key
+SUMMARY_SENTENCES = 4
+SUMMARY_CHARS = 600
+KEYPHRASES = 8
+MAX_RANKED_SENTENCES = 300  # Longer notes are ranked on their first sentences only
+DAMPING = 0.85
+ITERATIONS = 30
+DUPLICATE_SIMILARITY = 0.7  # A sentence this close to a chosen one adds nothing
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers herself him himself his how i if in into is it its itself just let me more most my myself no nor not now of
+off on once only or other our ours ourselves out over own same she should so some such than that the their theirs
+them themselves then there these they this those through to too under until up use used using very was we were
+what when where which while who whom why will with would you your yours yourself yourselves etc e.g i.e via
+""".split())
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9'+#.-]*[A-Za-z0-9+#]|[A-Za-z]")
+PHRASE_SPLIT_RE = re.compile(r"[.,;:!?()\[\]{}\"“”|/\\]|\s[-–—]\s")
+MARKUP_RE = re.compile(r"\*\*|__|`|\[\[|\]\]|^#+\s*")
+
+
+@dataclass
+class NoteSummary:
+    """The most central sentences of a note (in note order) and its key phrases"""
+    sentences: List[str] = field(default_factory=list)
+    keyphrases: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.sentences)
+
+    def prompt_text(self) -> str:
+        """Summary plus key terms, as note text for a prompt"""
+        if not self.keyphrases:
+            return self.text
+        return f"{self.text}\nKey terms: {', '.join(self.keyphrases)}"
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", MARKUP_RE.sub("", BULLET_RE.sub("", text))).strip()
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in (m.lower() for m in WORD_RE.findall(text)) if w not in STOPWORDS and len(w) > 2]
+
+
+def _textrank(vectors: List[Dict[str, float]]) -> List[float]:
+    """PageRank over the sentence graph weighted by cosine similarity"""
+    count = len(vectors)
+    edges: List[List[tuple]] = [[] for _ in range(count)]
+    for i in range(count):
+        for j in range(i + 1, count):
+            small, large = (vectors[i], vectors[j]) if len(vectors[i]) < len(vectors[j]) else (vectors[j], vectors[i])
+            weight = sum(value * large.get(term, 0.0) for term, value in small.items())
+            if weight > 0:
+                edges[i].append((j, weight))
+                edges[j].append((i, weight))
+    totals = [sum(weight for _, weight in links) for links in edges]
+    ranks = [1.0 / count] * count
+    for _ in range(ITERATIONS):
+        incoming = [0.0] * count
+        for i, links in enumerate(edges):
+            if totals[i]:
+                share = ranks[i] / totals[i]
+                for j, weight in links:
+                    incoming[j] += share * weight
+        updated = [(1 - DAMPING) / count + DAMPING * value for value in incoming]
+        converged = max(abs(a - b) for a, b in zip(updated, ranks)) < 1e-6
+        ranks = updated
+        if converged:
+            break
+    return ranks
+
+
+def _keyphrases(texts: List[str], emphasized: Iterable[str], limit: int) -> List[str]:
+    """Recurring one- and two-word phrases (runs of content words), bold terms and headings first"""
+    runs: List[List[str]] = []
+    for text in texts:
+        for fragment in PHRASE_SPLIT_RE.split(text):
+            current: List[str] = []
+            for word in WORD_RE.findall(fragment):
+                if word.lower() in STOPWORDS or len(word) < 3 and not word.isupper():
+                    if current:
+                        runs.append(current)
+                    current = []
+                else:
+                    current.append(word)
+            if current:
+                runs.append(current)
+
+    word_counts = Counter(word.lower() for run in runs for word in run)
+    phrase_counts: Counter = Counter()
+    spelling: Dict[str, str] = {}
+    for run in runs:
+        for size in (1, 2):
+            for i in range(len(run) - size + 1):
+                words = run[i:i + size]
+                key = " ".join(word.lower() for word in words)
+                phrase_counts[key] += 1
+                spelling.setdefault(key, " ".join(words))
+    emphasized = {e.lower() for e in emphasized}
+
+    def score(key: str) -> float:
+        words = key.split()
+        value = phrase_counts[key] * sum(word_counts[w] for w in words) / len(words)
+        if len(words) > 1 and phrase_counts[key] > 1:
+            value *= 1.5  # A pair that recurs is a term of its own ("carbon dioxide")
+        if key in emphasized:
+            value *= 3.0  # Bold terms and headings are what the author singled out
+        return value
+
+    chosen: List[str] = []
+    for key in sorted(phrase_counts, key=lambda k: (-score(k), k)):
+        if any(key in other or other in key for other in (c.lower() for c in chosen)):
+            continue
+        chosen.append(spelling[key])
+        if len(chosen) == limit:
+            break
+    return chosen
+
+
+def summarize(content: str, max_sentences: int = SUMMARY_SENTENCES, max_keyphrases: int = KEYPHRASES) -> NoteSummary:
+    """Extractive summary of a note: its most central sentences and key phrases"""
+    sections = split_sections(content)
+    candidates = [s for s in sections if s.kind in ("definition", "text", "list")][:MAX_RANKED_SENTENCES]
+    sentences = [_clean(s.text) for s in candidates]
+    keep = [i for i, sentence in enumerate(sentences) if len(sentence) >= 20 and _terms(sentence)]
+    emphasized = [_clean(m) for s in sections for m in BOLD_RE.findall(s.text)]
+    emphasized += [_clean(s.text) for s in sections if s.kind == "heading"]
+    keyphrases = _keyphrases([sentences[i] for i in keep] + emphasized, emphasized, max_keyphrases)
+    if not keep:
+        return NoteSummary([s for s in sentences if s][:1], keyphrases)
+
+    # TF-IDF vector per sentence, each sentence being a document
+    term_lists = [_terms(sentences[i]) for i in keep]
+    document_frequency = Counter(term for terms in term_lists for term in set(terms))
+    vectors = []
+    for terms in term_lists:
+        weights = {term: (1 + math.log(count)) * math.log(1 + len(keep) / document_frequency[term])
+                   for term, count in Counter(terms).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        vectors.append({term: w / norm for term, w in weights.items()})
+
+    # Centrality (TextRank, ~1 on average) plus how promising the sentence looks on its own:
+    # definitions, bold terms, numbers, an early position or a heading's words
+    ranks = _textrank(vectors) if len(keep) > 1 else [1.0]
+    heading_terms = {term for s in sections if s.kind == "heading" for term in _terms(_clean(s.text))}
+    priors = [score_section(candidates[i], len(sections)) + (1.0 if heading_terms & set(terms) else 0.0)
+              for i, terms in zip(keep, term_lists)]
+    mean_prior = sum(priors) / len(priors) or 1.0
+    scored = sorted(range(len(keep)), key=lambda k: -(ranks[k] * len(keep) + priors[k] / mean_prior))
+
+    chosen: List[int] = []
+    size = 0
+    for k in scored:
+        if any(sum(v * vectors[c].get(t, 0.0) for t, v in vectors[k].items()) > DUPLICATE_SIMILARITY for c in chosen):
+            continue
+        length = len(sentences[keep[k]])
+        if chosen and size + length > SUMMARY_CHARS:
+            continue
+        chosen.append(k)
+        size += length + 1
+        if len(chosen) == max_sentences:
+            break
+    return NoteSummary([sentences[keep[k]] for k in sorted(chosen)], keyphrases)
+
+
+class NoteSummaries:
+    """Summaries of the scanned notes, one per note version.
+
+    schedule() summarizes new and changed notes in the background when the
+    vault is scanned; get() serves them (or summarizes a note it has not seen).
+    """
+
+    def __init__(self):
+        self._summaries: Dict[str, NoteSummary] = {}
+        self._lock = threading.Lock()
+        self._pending: Optional[List[str]] = None
+        self._worker: Optional[threading.Thread] = None
+
+    def get(self, content: str) -> NoteSummary:
+        key = make_content_hash(content)
+        with self._lock:
+            summary = self._summaries.get(key)
+        if summary is None:
+            summary = summarize(content)
+            with self._lock:
+                self._summaries[key] = summary
+        return summary
+
+    def schedule(self, notes: Iterable[Any]):
+        """Summarize notes (objects with content) in a background thread, dropping summaries of notes gone"""
+        contents = [note.content for note in notes]
+        with self._lock:
+            self._pending = contents
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._summarize_pending, daemon=True, name="note-summaries")
+            self._worker.start()
+
+    def _summarize_pending(self):
+        while True:
+            with self._lock:
+                contents, self._pending = self._pending, None
+                if contents is None:
+                    return
+                known = dict(self._summaries)
+            current: Dict[str, NoteSummary] = {}
+            for content in contents:
+                key = make_content_hash(content)
+                try:
+                    current[key] = known.get(key) or summarize(content)
+                except Exception as e:
+                    print(f"⚠️ Note summary failed: {e}")
+            with self._lock:
+                self._summaries = current
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"summaries": len(self._summaries)}
+
+
+note_summaries = NoteSummaries()
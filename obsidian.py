@@ -2,14 +2,19 @@
 Obsidian Vault Integration for Legend of the Obsidian Vault
 Reads notes and converts them to forest enemies
 """
+import asyncio
 import os
 import re
 import random
 from pathlib import Path
 from datetime import datetime
 from typing import List, Optional, Tuple, Dict, Any
-from game_data import ObsidianNote, Enemy, FOREST_ENEMIES
+from embedding_index import embedding_index
+from fact_quiz import fact_quiz
+from note_summary import note_summaries
+from game_data import ObsidianNote, Enemy, FOREST_ENEMIES, game_settings
 from fantasy_translator import FantasyTranslator, translate_to_fantasy, get_fantasy_term
+from narrative_engine import narrative_engine, TemplateSlots
 
 # Simple caching for performance
 try:
@@ -22,13 +27,31 @@ except ImportError:
 
 # Try to import AI functionality
 try:
-    from brainbot import sync_generate_enemy_description, is_ai_available
+    from brainbot import (sync_generate_enemy_description, sync_generate_enemy_descriptions,
+                          async_generate_enemy_description, is_ai_available)
     AI_INTEGRATION_AVAILABLE = True
 except ImportError:
     AI_INTEGRATION_AVAILABLE = False
     sync_generate_enemy_description = None
+    sync_generate_enemy_descriptions = None
+    async_generate_enemy_description = None
     is_ai_available = lambda: False
 
+# Theme keywords, and the description a note's embedding is compared with
+NOTE_THEMES = {
+    'technical': (['code', 'programming', 'software', 'api'],
+                  "software development, programming code, APIs, systems and technical tooling"),
+    'business': (['meeting', 'project', 'business', 'work'],
+                 "business meetings, projects, clients, planning and work tasks"),
+    'personal': (['personal', 'journal', 'feeling', 'thought'],
+                 "personal journal entries, feelings, reflections and private thoughts"),
+    'learning': (['learn', 'study', 'course', 'research'],
+                 "learning and study notes, courses, lectures and research"),
+}
+THEME_MIN_SIMILARITY = 0.35  # Embedding similarity at which a note joins a theme without its keywords
+RELATED_CANDIDATES = 10  # Nearest notes compared per note when relationships come from the embedding index
+
+
 class ObsidianVault:
     """Interface to Obsidian vault"""
 
@@ -155,6 +178,11 @@ class ObsidianVault:
                 continue
 
         self.last_scan = datetime.now()
+        note_summaries.schedule(notes)  # Summarizes new and changed notes in the background
+        if game_settings.fact_quiz_enabled:
+            fact_quiz.sync(notes)  # Re-extracts only the notes that changed
+        if game_settings.embedding_index_enabled:
+            embedding_index.schedule_sync(notes)  # Re-embeds only the notes that changed
         return notes
 
     def _parse_note(self, file_path: Path) -> Optional[ObsidianNote]:
@@ -218,152 +246,232 @@ class ObsidianVault:
 
         return list(set(tags))  # Remove duplicates
 
-    def get_enemy_for_level(self, level: int, notes: List[ObsidianNote] = None) -> Enemy:
-        """Generate enemy for player level using Obsidian notes"""
+    def get_enemy_for_level(self, level: int, notes: List[ObsidianNote] = None, use_ai: bool = True) -> Enemy:
+        """Generate enemy for player level using Obsidian notes.
+
+        With ``use_ai=False`` the enemy gets template lore right away (e.g. when the
+        narrative will be streamed separately) and isn't written to the cache.
+        """
         if notes is None:
             notes = self.scan_notes()
 
-        # Get base enemy stats for this level
-        if level in FOREST_ENEMIES:
-            base_enemies = FOREST_ENEMIES[level]
-        else:
-            # Use highest level enemies if beyond level 12
-            base_enemies = FOREST_ENEMIES[12]
+        enemy, note, base_enemy, features = self._pick_enemy(level, notes)
+        if enemy:
+            return enemy
 
-        base_enemy = random.choice(base_enemies)
+        # Try AI-enhanced enemy generation first
+        enemy_lore = self._generate_ai_enhanced_enemy(note, base_enemy[0], features) if use_ai else None
+        return self._finish_enemy(note, level, base_enemy, enemy_lore, features, cache=use_ai)
 
-        if notes:
-            # Use note-based enemy - select from all notes regardless of difficulty
-            # Difficulty affects stats scaling, not availability
-            note = random.choice(notes)
+    async def aget_enemy_for_level(self, level: int, notes: List[ObsidianNote] = None) -> Enemy:
+        """Async variant of get_enemy_for_level - awaits the AI provider instead of blocking a thread"""
+        if notes is None:
+            # A rescan walks the whole vault, keep it off the event loop
+            notes = await asyncio.to_thread(self.scan_notes)
 
-            # Check cache first
-            cached_enemy = None
-            if CACHE_AVAILABLE:
-                cached_enemy = get_cached_enemy(note.title, level)
-                if cached_enemy:
-                    print(f"🗄️  Using cached enemy for '{note.title}'")
-                    return cached_enemy
-
-            # Try AI-enhanced enemy generation first
-            enemy_lore = self._generate_ai_enhanced_enemy(note, base_enemy[0])
-            if enemy_lore is None:
-                # Fallback to basic generation with enhanced narratives
-                enemy_name = self._generate_enemy_name(note, base_enemy[0])
-                enemy_lore = self._generate_enemy_lore(note, base_enemy[0])
-            else:
-                # Use AI-generated name and lore
-                enemy_name = enemy_lore.get('name', self._generate_enemy_name(note, base_enemy[0]))
-
-            # Scale stats based on note difficulty vs player level
-            # Uses configurable difficulty mode from game_settings
-            note_difficulty = note.get_difficulty(player_level=level)
-            difficulty_multiplier = min(1.5, max(0.8, note_difficulty / level))
-
-            enemy = Enemy(
-                name=enemy_name,
-                hitpoints=int(base_enemy[1] * difficulty_multiplier),
-                attack=int(base_enemy[2] * difficulty_multiplier),
-                gold_reward=base_enemy[3],
-                exp_reward=base_enemy[3] // 2,
-                level=level,
-                note_content=note.content[:500],  # Truncate for performance
-                note_title=note.title,
-
-                # Enhanced lore fields
-                backstory=enemy_lore['backstory'],
-                personality_type=enemy_lore['personality_type'],
-                knowledge_domain=enemy_lore['knowledge_domain'],
-                age_descriptor=enemy_lore['age_descriptor'],
-                folder_theme=enemy_lore['folder_theme'],
-                combat_phrases=enemy_lore['combat_phrases'],
-                defeat_message=enemy_lore['defeat_message'],
-                victory_message=enemy_lore['victory_message'],
-
-                # LORD-style fields
-                description=enemy_lore.get('description', ''),
-                weapon=enemy_lore.get('weapon', ''),
-                armor=enemy_lore.get('armor', ''),
-
-                # Rich narrative fields
-                encounter_narrative=enemy_lore.get('encounter_narrative', ''),
-                environment_description=enemy_lore.get('environment_description', ''),
-                manifestation_story=enemy_lore.get('manifestation_story', '')
-            )
+        enemy, note, base_enemy, features = self._pick_enemy(level, notes)
+        if enemy:
+            return enemy
 
-            # Cache the generated enemy
-            if CACHE_AVAILABLE:
-                cache_enemy(note.title, level, enemy)
+        enemy_lore = await self._agenerate_ai_enhanced_enemy(note, base_enemy[0], features)
+        return self._finish_enemy(note, level, base_enemy, enemy_lore, features)
 
-            return enemy
-        else:
+    def _pick_enemy(self, level: int, notes: List[ObsidianNote]) -> Tuple[Optional[Enemy], Optional[ObsidianNote],
+                                                                           Tuple, Optional[Dict[str, str]]]:
+        """Choose the note and base enemy for an encounter.
+
+        Returns (enemy, note, base_enemy, features): enemy is set when nothing is
+        left to generate (no notes, or a cached enemy for the chosen note).
+        """
+        base_enemy = random.choice(self._get_base_enemies(level))
+        if not notes:
             # Fallback to standard enemy if no notes available
-            return Enemy(
-                name=base_enemy[0],
-                hitpoints=base_enemy[1],
-                attack=base_enemy[2],
-                gold_reward=base_enemy[3],
-                exp_reward=base_enemy[3] // 2,
-                level=level
-            )
+            return self._build_standard_enemy(level, base_enemy), None, base_enemy, None
+
+        # Use note-based enemy - select from all notes regardless of difficulty
+        # Difficulty affects stats scaling, not availability
+        note = random.choice(notes)
+        if CACHE_AVAILABLE:
+            cached_enemy = get_cached_enemy(note.title, note.content, level)
+            if cached_enemy:
+                print(f"🗄️  Using cached enemy for '{note.title}'")
+                return cached_enemy, note, base_enemy, None
+
+        return None, note, base_enemy, self._extract_enemy_features(note)
+
+    def _finish_enemy(self, note: ObsidianNote, level: int, base_enemy: Tuple, enemy_lore: Optional[Dict],
+                      features: Dict[str, str], cache: bool = True) -> Enemy:
+        """Build a note enemy from its (AI or template) lore and cache it"""
+        enemy = self._build_note_enemy(note, level, base_enemy, enemy_lore, features)
+        if CACHE_AVAILABLE and cache:
+            cache_enemy(note.title, note.content, level, enemy)
+        return enemy
+
+    def get_enemy_wave(self, level: int, count: int, notes: List[ObsidianNote] = None) -> List[Enemy]:
+        """Generate up to ``count`` enemies from distinct notes in one pass.
+
+        Notes are scanned once, each note's features are extracted once, and
+        all AI enrichments go to the provider as a single concurrent batch.
+        The wave is smaller than ``count`` if the vault has fewer notes.
+        """
+        if count <= 0:
+            return []
+        if notes is None:
+            notes = self.scan_notes()
 
-    def _generate_enemy_name(self, note: ObsidianNote, base_enemy: str) -> str:
-        """Generate fantasy enemy name with rich lore integration"""
-        return self._generate_fantasy_name(note, base_enemy)
+        base_enemies = self._get_base_enemies(level)
+        if not notes:
+            return [self._build_standard_enemy(level, random.choice(base_enemies)) for _ in range(count)]
 
-    def _generate_fantasy_name(self, note: ObsidianNote, base_enemy: str) -> str:
-        """Create immersive fantasy names based on note content and metadata"""
+        picks = random.sample(notes, min(count, len(notes)))
+        enemies: List[Optional[Enemy]] = [None] * len(picks)
 
-        # Fantasy name components
-        MYSTICAL_PREFIXES = [
-            "Shadow", "Crimson", "Ancient", "Forgotten", "Whisper", "Ethereal",
-            "Obsidian", "Gilded", "Spectral", "Temporal", "Void", "Crystal"
-        ]
+        # Serve what we can from the cache, collect the rest for generation
+        pending = []
+        for index, note in enumerate(picks):
+            if CACHE_AVAILABLE:
+                cached_enemy = get_cached_enemy(note.title, note.content, level)
+                if cached_enemy:
+                    enemies[index] = cached_enemy
+                    continue
+            pending.append((index, note, random.choice(base_enemies), self._extract_enemy_features(note)))
 
-        FANTASY_TITLES = [
-            "Keeper", "Guardian", "Weaver", "Lord", "Wraith", "Sage", "Oracle",
-            "Curator", "Archivist", "Scribe", "Chronicler", "Sentinel", "Warden"
-        ]
+        # One batched AI request for every uncached enemy
+        ai_descriptions = [None] * len(pending)
+        if pending and self._ai_enemy_generation_ready(f"wave of {len(pending)}"):
+            try:
+                ai_descriptions = sync_generate_enemy_descriptions([
+                    (note.title, features['content_sample'], base_enemy[0])
+                    for _, note, base_enemy, features in pending
+                ])
+            except Exception as e:
+                print(f"AI enemy wave generation failed: {e}")
 
-        # Map note characteristics to mystical themes
-        knowledge_domain = self._analyze_knowledge_domain(note)
-        age_descriptor = self._get_age_descriptor(note.age_days)
-        folder_theme = self._get_folder_theme(note.path.parent.name.lower())
+        for (index, note, base_enemy, features), ai_description in zip(pending, ai_descriptions):
+            enemy_lore = None
+            if ai_description:
+                enemy_lore = self._lore_from_ai_description(note, base_enemy[0], ai_description, features)
+            enemies[index] = self._finish_enemy(note, level, base_enemy, enemy_lore, features)
 
-        # Generate fantasy base creature
-        fantasy_creature = self._transform_creature_name(base_enemy, knowledge_domain)
+        print(f"⚔️  Generated wave of {len(enemies)} enemies ({len(pending)} new, {len(enemies) - len(pending)} cached)")
+        return enemies
 
-        # Create name variations based on different patterns
-        name_patterns = [
-            # Pattern 1: [Prefix] [Creature], [Title] of [Domain]
-            f"{random.choice(MYSTICAL_PREFIXES)} {fantasy_creature}, {random.choice(FANTASY_TITLES)} of {knowledge_domain}",
+    def _get_base_enemies(self, level: int) -> List[Tuple]:
+        """Base enemy stat rows for a player level"""
+        if level in FOREST_ENEMIES:
+            return FOREST_ENEMIES[level]
+        # Use highest level enemies if beyond level 12
+        return FOREST_ENEMIES[12]
 
-            # Pattern 2: [Creature] the [Age] [Title]
-            f"{fantasy_creature} the {age_descriptor} {random.choice(FANTASY_TITLES)}",
+    def _extract_enemy_features(self, note: ObsidianNote) -> Dict[str, str]:
+        """Note features shared by name, lore and AI generation (computed once per enemy)"""
+        return {
+            'knowledge_domain': self._analyze_knowledge_domain(note),
+            'age_descriptor': self._get_age_descriptor(note.age_days),
+            'folder_theme': self._get_folder_theme(note.path.parent.name.lower()),
+            # Note text for AI prompts (each provider trims it to its own token budget)
+            'content_sample': self.get_enemy_content_sample(note),
+        }
 
-            # Pattern 3: [Title] [Name] of [Folder Theme]
-            f"{random.choice(FANTASY_TITLES)} {self._generate_mystical_name()} of {folder_theme}",
+    def get_enemy_content_sample(self, note: ObsidianNote) -> str:
+        """The note text AI enemy generation is prompted with (stable per note version).
+
+        The whole note is passed on; providers pick the most informative
+        sections that fit their own prompt budget.
+        """
+        return note.content
+
+    def _build_note_enemy(self, note: ObsidianNote, level: int, base_enemy: Tuple,
+                          enemy_lore: Optional[Dict], features: Dict[str, str]) -> Enemy:
+        """Create a note-based enemy from AI lore, or from fallback lore when ``enemy_lore`` is None"""
+        if enemy_lore is None:
+            # Fallback to basic generation with enhanced narratives
+            enemy_name = self._generate_enemy_name(note, base_enemy[0], features)
+            enemy_lore = self._generate_enemy_lore(note, base_enemy[0], features)
+        else:
+            # Use AI-generated name and lore
+            enemy_name = enemy_lore.get('name') or self._generate_enemy_name(note, base_enemy[0], features)
+
+        # Scale stats based on note difficulty vs player level
+        # Uses configurable difficulty mode from game_settings
+        note_difficulty = note.get_difficulty(player_level=level)
+        difficulty_multiplier = min(1.5, max(0.8, note_difficulty / level))
+
+        return Enemy(
+            name=enemy_name,
+            hitpoints=int(base_enemy[1] * difficulty_multiplier),
+            attack=int(base_enemy[2] * difficulty_multiplier),
+            gold_reward=base_enemy[3],
+            exp_reward=base_enemy[3] // 2,
+            level=level,
+            note_content=note.content[:500],  # Truncate for performance
+            note_title=note.title,
+
+            # Enhanced lore fields
+            backstory=enemy_lore['backstory'],
+            personality_type=enemy_lore['personality_type'],
+            knowledge_domain=enemy_lore['knowledge_domain'],
+            age_descriptor=enemy_lore['age_descriptor'],
+            folder_theme=enemy_lore['folder_theme'],
+            combat_phrases=enemy_lore['combat_phrases'],
+            defeat_message=enemy_lore['defeat_message'],
+            victory_message=enemy_lore['victory_message'],
+
+            # LORD-style fields
+            description=enemy_lore.get('description', ''),
+            weapon=enemy_lore.get('weapon', ''),
+            armor=enemy_lore.get('armor', ''),
+
+            # Rich narrative fields
+            encounter_narrative=enemy_lore.get('encounter_narrative', ''),
+            environment_description=enemy_lore.get('environment_description', ''),
+            manifestation_story=enemy_lore.get('manifestation_story', '')
+        )
+
+    def _build_standard_enemy(self, level: int, base_enemy: Tuple) -> Enemy:
+        """Standard enemy used when no notes are available"""
+        return Enemy(
+            name=base_enemy[0],
+            hitpoints=base_enemy[1],
+            attack=base_enemy[2],
+            gold_reward=base_enemy[3],
+            exp_reward=base_enemy[3] // 2,
+            level=level
+        )
+
+    def _generate_enemy_name(self, note: ObsidianNote, base_enemy: str, features: Optional[Dict[str, str]] = None) -> str:
+        """Generate fantasy enemy name with rich lore integration"""
+        return self._generate_fantasy_name(note, base_enemy, features)
 
-            # Pattern 4: The [Age] [Creature] of [Domain]
-            f"The {age_descriptor} {fantasy_creature} of {knowledge_domain}",
+    def _generate_fantasy_name(self, note: ObsidianNote, base_enemy: str, features: Optional[Dict[str, str]] = None) -> str:
+        """Create immersive fantasy names based on note content and metadata"""
+        name_table = narrative_engine.table('enemy_name')
+        words = name_table.data
 
-            # Pattern 5: [Mystical Name], [Title] of [Theme]
-            f"{self._generate_mystical_name()}, {random.choice(FANTASY_TITLES)} of {knowledge_domain}",
-        ]
+        # Map note characteristics to mystical themes
+        if features is None:
+            features = self._extract_enemy_features(note)
+        knowledge_domain = features['knowledge_domain']
+
+        slots = TemplateSlots({
+            'creature': self._transform_creature_name(base_enemy, knowledge_domain),
+            'knowledge_domain': knowledge_domain,
+            'age_descriptor': features['age_descriptor'],
+            'folder_theme': features['folder_theme'],
+        }, lazy={
+            # Each pattern uses at most one of these, so draw them on demand
+            'prefix': lambda: random.choice(words['prefixes']),
+            'title_word': lambda: random.choice(words['titles']),
+            'mystical_name': self._generate_mystical_name,
+        })
 
         # Select and refine the name
-        name = random.choice(name_patterns)
+        name = name_table.default.render(slots)
 
         # Ensure name fits display constraints (40 chars)
         if len(name) > 40:
             # Try shorter variations
-            short_patterns = [
-                f"{fantasy_creature} the {age_descriptor}",
-                f"{random.choice(FANTASY_TITLES)} {self._generate_mystical_name()}",
-                f"The {knowledge_domain} {random.choice(FANTASY_TITLES)}",
-                f"{random.choice(MYSTICAL_PREFIXES)} {fantasy_creature}",
-            ]
-            name = random.choice(short_patterns)
+            name = name_table.keys['short'].render(slots)
 
             # Final truncation if still too long
             if len(name) > 40:
@@ -371,71 +479,85 @@ class ObsidianVault:
 
         return name
 
-    def _generate_ai_enhanced_enemy(self, note: ObsidianNote, base_enemy: str) -> Optional[Dict]:
-        """Generate enemy using AI when available"""
+    def _ai_enemy_generation_ready(self, label: str) -> bool:
+        """True if AI enemy generation can be attempted right now"""
         if not AI_INTEGRATION_AVAILABLE:
             print(f"🚫 AI_INTEGRATION_AVAILABLE = False")
-            return None
+            return False
 
         # Try waiting briefly for AI initialization
         if not is_ai_available(wait_timeout=2.0):
-            print(f"🚫 AI not available for {note.title} - using fallback generation")
+            print(f"🚫 AI not available for {label} - using fallback generation")
+            return False
+        return True
+
+    def _generate_ai_enhanced_enemy(self, note: ObsidianNote, base_enemy: str,
+                                    features: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+        """Generate enemy using AI when available"""
+        if not self._ai_enemy_generation_ready(note.title):
             return None
 
+        if features is None:
+            features = self._extract_enemy_features(note)
 
         try:
-            # Random content sampling for large notes
-            content_sample = self._get_random_content_sample(note.content)
-
             # Use AI to generate enhanced enemy description
             ai_description = sync_generate_enemy_description(
                 note.title,
-                content_sample,
+                features['content_sample'],
                 base_enemy
             )
 
             if ai_description:
-                return {
-                    'name': ai_description.name,
-                    'description': ai_description.description,
-                    'weapon': ai_description.weapon,
-                    'armor': ai_description.armor,
-                    'backstory': ai_description.backstory,
-                    'personality_type': f"LORD-style {base_enemy}",
-                    'knowledge_domain': f"Guardian of: {note.title}",
-                    'age_descriptor': self._get_age_descriptor(note.age_days),
-                    'folder_theme': f"Your {note.path.parent.name} Notes",
-                    'combat_phrases': ai_description.combat_phrases,
-                    'defeat_message': ai_description.defeat_message,
-                    'victory_message': ai_description.victory_message,
-                    'recommended_hp': ai_description.recommended_hp,
-                    'recommended_attack': ai_description.recommended_attack,
-                    # New narrative fields
-                    'encounter_narrative': ai_description.encounter_narrative,
-                    'environment_description': ai_description.environment_description,
-                    'manifestation_story': ai_description.manifestation_story
-                }
+                return self._lore_from_ai_description(note, base_enemy, ai_description, features)
         except Exception as e:
             print(f"AI enemy generation failed: {e}")
 
         return None
 
-    def _get_random_content_sample(self, content: str, max_length: int = 800) -> str:
-        """Get a random sample from note content for variety"""
-        if len(content) <= max_length:
-            return content
+    async def _agenerate_ai_enhanced_enemy(self, note: ObsidianNote, base_enemy: str,
+                                           features: Dict[str, str]) -> Optional[Dict]:
+        """Async _generate_ai_enhanced_enemy: awaits the AI provider"""
+        # The readiness check may wait briefly for AI initialization, so keep it off the event loop
+        if not await asyncio.to_thread(self._ai_enemy_generation_ready, note.title):
+            return None
 
-        # For large notes, take a random chunk
-        start_pos = random.randint(0, max(0, len(content) - max_length))
-        sample = content[start_pos:start_pos + max_length]
+        try:
+            ai_description = await async_generate_enemy_description(
+                note.title,
+                features['content_sample'],
+                base_enemy
+            )
+            if ai_description:
+                return self._lore_from_ai_description(note, base_enemy, ai_description, features)
+        except Exception as e:
+            print(f"AI enemy generation failed: {e}")
 
-        # Try to start at a sentence boundary if possible
-        sentences = sample.split('. ')
-        if len(sentences) > 1:
-            # Skip the first partial sentence and take the rest
-            sample = '. '.join(sentences[1:])
+        return None
 
-        return sample
+    def _lore_from_ai_description(self, note: ObsidianNote, base_enemy: str, ai_description,
+                                  features: Dict[str, str]) -> Dict:
+        """Map an AI EnemyDescription onto the enemy lore fields"""
+        return {
+            'name': ai_description.name,
+            'description': ai_description.description,
+            'weapon': ai_description.weapon,
+            'armor': ai_description.armor,
+            'backstory': ai_description.backstory,
+            'personality_type': f"LORD-style {base_enemy}",
+            'knowledge_domain': f"Guardian of: {note.title}",
+            'age_descriptor': features['age_descriptor'],
+            'folder_theme': f"Your {note.path.parent.name} Notes",
+            'combat_phrases': ai_description.combat_phrases,
+            'defeat_message': ai_description.defeat_message,
+            'victory_message': ai_description.victory_message,
+            'recommended_hp': ai_description.recommended_hp,
+            'recommended_attack': ai_description.recommended_attack,
+            # New narrative fields
+            'encounter_narrative': ai_description.encounter_narrative,
+            'environment_description': ai_description.environment_description,
+            'manifestation_story': ai_description.manifestation_story
+        }
 
     def _generate_ai_enhanced_name(self, note: ObsidianNote, base_enemy: str, ai_description) -> str:
         """Generate a clear, note-based enemy name"""
@@ -461,121 +583,99 @@ class ObsidianVault:
 
     def _analyze_knowledge_domain(self, note: ObsidianNote) -> str:
         """Analyze note content to determine mystical knowledge domain"""
-        content_lower = (note.title + " " + note.content[:200]).lower()
-
-        # Technical domains
-        if any(term in content_lower for term in ['python', 'javascript', 'code', 'function', 'class']):
-            return random.choice(["Code Mysteries", "Arcane Scripts", "Digital Codex", "Silicon Scriptures"])
-        elif any(term in content_lower for term in ['project', 'todo', 'task', 'goal']):
-            return random.choice(["Project Forge", "Creation Sanctum", "Builder's Archive", "Craft Chambers"])
-        elif any(term in content_lower for term in ['meeting', 'discussion', 'team', 'call']):
-            return random.choice(["Council Echoes", "Assembly Whispers", "Gathering Lore", "Conclave Records"])
-        elif any(term in content_lower for term in ['personal', 'diary', 'thought', 'reflection']):
-            return random.choice(["Memory Fragments", "Soul Whispers", "Inner Sanctum", "Thought Streams"])
-        elif any(term in content_lower for term in ['documentation', 'guide', 'manual', 'readme']):
-            return random.choice(["Ancient Tomes", "Wisdom Scrolls", "Knowledge Vaults", "Sacred Manuals"])
-        elif any(term in content_lower for term in ['idea', 'concept', 'theory', 'research']):
-            return random.choice(["Concept Realms", "Theory Planes", "Research Depths", "Innovation Chambers"])
-        else:
-            return random.choice(["Forgotten Lore", "Hidden Knowledge", "Mysterious Wisdom", "Secret Archives"])
+        content_lower = self._note_gist(note)
+        return narrative_engine.render('knowledge_domain', TemplateSlots(), text=content_lower)
 
     def _get_age_descriptor(self, age_days: int) -> str:
         """Get age-based mystical descriptor"""
         if age_days < 7:
-            return random.choice(["Awakened", "Fresh", "Newly Bound", "Recently Risen"])
+            band = 'week'
         elif age_days < 30:
-            return random.choice(["Restless", "Active", "Stirring", "Vigilant"])
+            band = 'month'
         elif age_days < 90:
-            return random.choice(["Slumbering", "Dormant", "Weathered", "Seasoned"])
+            band = 'season'
         elif age_days < 365:
-            return random.choice(["Ancient", "Time-worn", "Aged", "Venerable"])
+            band = 'year'
         else:
-            return random.choice(["Primordial", "Forgotten", "Eternal", "Timeless"])
+            band = None
+        return narrative_engine.render('age_descriptor', TemplateSlots(), key=band)
 
     def _get_folder_theme(self, folder_name: str) -> str:
         """Convert folder names to mystical themes"""
-        folder_themes = {
-            'personal': "Inner Sanctum",
-            'work': "Labor Forges",
-            'projects': "Creation Labs",
-            'notes': "Thought Realms",
-            'docs': "Archive Halls",
-            'documentation': "Scroll Chambers",
-            'meetings': "Council Rooms",
-            'ideas': "Vision Plains",
-            'research': "Study Depths",
-            'code': "Script Vaults",
-            'drafts': "Prototype Realms",
-            'archive': "Ancient Vaults",
-            'temp': "Ethereal Spaces",
-            'backup': "Shadow Mirrors"
-        }
-
-        # Check for partial matches
-        for key, theme in folder_themes.items():
-            if key in folder_name:
-                return theme
-
-        # Default mystical transformation
-        return f"{folder_name.title()} Realms"
+        slots = TemplateSlots({'folder_title': folder_name.title()})
+        return narrative_engine.render('folder_theme', slots, text=folder_name)
 
     def _transform_creature_name(self, base_enemy: str, domain: str) -> str:
         """Transform basic enemy into fantasy creature"""
-        creature_transformations = {
-            'mosquito': ['Bloodmite', 'Crimson Wisp', 'Memory Gnat', 'Data Midge'],
-            'rat': ['Shadow Scurrier', 'Archive Rat', 'Scroll Gnawer', 'Byte Rodent'],
-            'spider': ['Web Weaver', 'Code Spider', 'Network Arachnid', 'Thread Spinner'],
-            'snake': ['Code Serpent', 'Logic Viper', 'Syntax Snake', 'Digital Asp'],
-            'bat': ['Night Flitter', 'Echo Bat', 'Shadow Wing', 'Cave Dweller'],
-            'wolf': ['Pack Hunter', 'Shadow Wolf', 'Lone Stalker', 'Wild Guardian'],
-            'bear': ['Forest Guardian', 'Cave Protector', 'Mighty Defender', 'Strength Bearer'],
-            'skeleton': ['Bone Guardian', 'Undead Sentinel', 'Death Warden', 'Marrow Keeper'],
-            'goblin': ['Mischief Maker', 'Trouble Sprite', 'Chaos Imp', 'Disorder Goblin'],
-            'troll': ['Stone Troll', 'Bridge Guardian', 'Mountain Keeper', 'Rock Defender']
-        }
-
-        base_lower = base_enemy.lower()
-        for creature, transforms in creature_transformations.items():
-            if creature in base_lower:
-                return random.choice(transforms)
-
-        # Default transformation - add mystical descriptor
-        mystical_descriptors = ['Ethereal', 'Shadow', 'Mystic', 'Spectral', 'Void', 'Crystal']
-        return f"{random.choice(mystical_descriptors)} {base_enemy}"
+        slots = TemplateSlots({'base_enemy': base_enemy})
+        return narrative_engine.render('creature', slots, text=base_enemy.lower())
 
     def _generate_mystical_name(self) -> str:
         """Generate fantasy character names"""
-        prefixes = ['Vex', 'Zar', 'Mor', 'Kael', 'Thane', 'Nyx', 'Vel', 'Drak', 'Syl', 'Kor']
-        middle_parts = ['tha', 'lor', 'ven', 'dor', 'mir', 'goth', 'ran', 'tek', 'phi', 'on']
-        suffixes = ['ra', 'us', 'el', 'an', 'is', 'ara', 'oth', 'iel', 'ash', 'ex']
+        parts = narrative_engine.data('mystical_name')
 
         # Occasionally use single names, usually compound
         if random.random() < 0.3:
-            return random.choice(prefixes) + random.choice(suffixes)
+            return random.choice(parts['prefixes']) + random.choice(parts['suffixes'])
         else:
-            return random.choice(prefixes) + "'" + random.choice(middle_parts) + random.choice(suffixes)
+            return random.choice(parts['prefixes']) + "'" + random.choice(parts['middles']) + random.choice(parts['suffixes'])
+
+    def _get_fantasy_title(self, note: ObsidianNote) -> str:
+        """Fantasy translation of the note title, or a mystical fallback"""
+        fantasy_title = translate_to_fantasy(note.title)
+        if fantasy_title == note.title or len(fantasy_title) > len(note.title) + 20:
+            fantasy_title = f"the Sacred {note.title.replace('_', ' ').title()}"
+        return fantasy_title
 
-    def _generate_enemy_lore(self, note: ObsidianNote, base_enemy: str) -> dict:
+    def _get_fantasy_concept(self, note: ObsidianNote) -> str:
+        """Fantasy term for the main concept (first two title words)"""
+        title_words = note.title.replace('_', ' ').split()
+        return get_fantasy_term(' '.join(title_words[:2]))
+
+    def _note_gist(self, note: ObsidianNote) -> str:
+        """Lowercased title, summary and key phrases - what lore tables are matched against"""
+        summary = note_summaries.get(note.content)
+        return f"{note.title} {summary.text} {' '.join(summary.keyphrases)}".lower()
+
+    def _lore_slots(self, note: ObsidianNote, **values) -> TemplateSlots:
+        """Template slots for lore tables; fantasy translations are computed on first use"""
+        return TemplateSlots(values, lazy={
+            'fantasy_title': lambda: self._get_fantasy_title(note),
+            'fantasy_concept': lambda: self._get_fantasy_concept(note),
+        })
+
+    def _generate_enemy_lore(self, note: ObsidianNote, base_enemy: str, features: Optional[Dict[str, str]] = None) -> dict:
         """Generate comprehensive enemy lore including backstory and personality"""
 
         # Analyze note characteristics
-        knowledge_domain = self._analyze_knowledge_domain(note)
-        age_descriptor = self._get_age_descriptor(note.age_days)
-        folder_theme = self._get_folder_theme(note.path.parent.name.lower())
+        if features is None:
+            features = self._extract_enemy_features(note)
+        knowledge_domain = features['knowledge_domain']
+        age_descriptor = features['age_descriptor']
+        folder_theme = features['folder_theme']
         personality_type = self._determine_personality_type(note, knowledge_domain)
 
+        # One slot set for every table, so the fantasy translations run at most once per enemy
+        slots = self._lore_slots(
+            note,
+            knowledge_domain=knowledge_domain,
+            age_descriptor=age_descriptor,
+            age_lower=age_descriptor.lower(),
+            folder_theme=folder_theme,
+        )
+
         # Generate backstory based on note content and characteristics
-        backstory = self._create_backstory(note, base_enemy, knowledge_domain, age_descriptor)
+        backstory = self._create_backstory(note, base_enemy, knowledge_domain, age_descriptor, slots)
 
         # Generate combat phrases
-        combat_phrases = self._generate_combat_phrases(note, personality_type, knowledge_domain)
+        combat_phrases = self._generate_combat_phrases(note, personality_type, knowledge_domain, slots)
 
         # Generate defeat and victory messages
-        defeat_message = self._generate_defeat_message(note, personality_type)
-        victory_message = self._generate_victory_message(note, personality_type)
+        defeat_message = self._generate_defeat_message(note, personality_type, slots)
+        victory_message = self._generate_victory_message(note, personality_type, slots)
 
         # Generate rich narrative fields for fallback generation
-        encounter_narrative = self._generate_dynamic_encounter_narrative(note, knowledge_domain, age_descriptor)
+        encounter_narrative = self._generate_dynamic_encounter_narrative(note, knowledge_domain, age_descriptor, slots)
         environment_description = self._generate_dynamic_environment(note, folder_theme)
         manifestation_story = self._generate_manifestation_story(note, personality_type)
 
@@ -599,183 +699,48 @@ class ObsidianVault:
 
     def _determine_personality_type(self, note: ObsidianNote, knowledge_domain: str) -> str:
         """Determine enemy personality based on note characteristics"""
-        content_lower = (note.title + " " + note.content[:200]).lower()
-
-        # Personality mapping based on content and age
+        # Ancient knowledge - wise but possibly outdated
         if note.age_days > 365:
-            # Ancient knowledge - wise but possibly outdated
-            return random.choice(["Ancient Scholar", "Forgotten Sage", "Time-worn Guardian", "Eternal Keeper"])
+            return narrative_engine.render('personality_type', TemplateSlots(), key='ancient')
 
-        elif any(term in content_lower for term in ['error', 'bug', 'problem', 'issue', 'fix']):
-            # Problem-focused content - aggressive protector
-            return random.choice(["Defensive Warrior", "Problem Guardian", "Chaos Sentinel", "Error Wraith"])
+        content_lower = self._note_gist(note)
+        return narrative_engine.render('personality_type', TemplateSlots(), text=content_lower)
 
-        elif any(term in content_lower for term in ['idea', 'concept', 'theory', 'research']):
-            # Theoretical content - intellectual guardian
-            return random.choice(["Thoughtful Oracle", "Concept Keeper", "Theory Weaver", "Idea Curator"])
-
-        elif any(term in content_lower for term in ['personal', 'feeling', 'emotion', 'thought']):
-            # Personal content - emotional guardian
-            return random.choice(["Memory Keeper", "Emotion Guardian", "Soul Protector", "Heart Sentinel"])
-
-        elif any(term in content_lower for term in ['project', 'task', 'todo', 'goal']):
-            # Project content - dutiful guardian
-            return random.choice(["Task Master", "Project Sentinel", "Goal Guardian", "Duty Keeper"])
-
-        else:
-            # General knowledge guardian
-            return random.choice(["Knowledge Warden", "Wisdom Keeper", "Archive Guardian", "Lore Protector"])
-
-    def _create_backstory(self, note: ObsidianNote, base_enemy: str, knowledge_domain: str, age_descriptor: str) -> str:
+    def _create_backstory(self, note: ObsidianNote, base_enemy: str, knowledge_domain: str, age_descriptor: str,
+                          slots: Optional[TemplateSlots] = None) -> str:
         """Create a 2-3 sentence backstory explaining why this enemy guards this knowledge"""
+        if slots is None:
+            slots = self._lore_slots(note, knowledge_domain=knowledge_domain, age_lower=age_descriptor.lower())
+        return narrative_engine.render('backstory', slots)
 
-        # Use fantasy translator to convert key concepts
-        # Extract key words from title
-        title_words = note.title.replace('_', ' ').split()
-        main_concept = ' '.join(title_words[:2])  # Use first 2 words as main concept
-
-        # Get fantasy terms for key concepts
-        fantasy_concept = get_fantasy_term(main_concept)
-        fantasy_title = translate_to_fantasy(note.title)
-
-        # If no good translation, create a mystical version
-        if fantasy_title == note.title or len(fantasy_title) > len(note.title) + 20:
-            fantasy_title = f"the Sacred {note.title.replace('_', ' ').title()}"
-
-        # Backstory templates using fantasy translations
-        backstory_templates = [
-            f"Once a humble seeker of knowledge, this {age_descriptor.lower()} guardian was bound to protect {fantasy_title}. "
-            f"Years of contemplating the mysteries of {fantasy_concept} have transformed it into a fierce protector of this sacred wisdom. "
-            f"It will not yield this knowledge to those who cannot prove their understanding.",
-
-            f"Born from the essence of forgotten learning, this spirit has watched over {fantasy_title} since its creation. "
-            f"The mystical energies of {knowledge_domain} flow through its ethereal form, making it both teacher and examiner. "
-            f"Only those who demonstrate true comprehension may pass.",
-
-            f"This {age_descriptor.lower()} entity emerged when the wisdom within {fantasy_title} reached critical importance. "
-            f"Charged with preserving the integrity of {fantasy_concept}, it tests all who would access this power. "
-            f"Its duty is eternal, its purpose unwavering.",
-
-            f"Long ago, a scholar's deep meditation on {fantasy_title} created this mystical guardian. "
-            f"Infused with the power of ancient {knowledge_domain}, it exists between thought and reality. "
-            f"It challenges seekers to prove they are worthy of the sacred arts of {fantasy_concept}.",
-        ]
-
-        return random.choice(backstory_templates)
-
-    def _generate_combat_phrases(self, note: ObsidianNote, personality_type: str, knowledge_domain: str) -> List[str]:
+    def _generate_combat_phrases(self, note: ObsidianNote, personality_type: str, knowledge_domain: str,
+                                 slots: Optional[TemplateSlots] = None) -> List[str]:
         """Generate 3-5 combat phrases the enemy might say during battle"""
+        if slots is None:
+            slots = self._lore_slots(note, knowledge_domain=knowledge_domain)
+        entry = narrative_engine.table('combat_phrases').resolve(key=personality_type)
+        return entry.sample(slots, 3)
 
-        # Get fantasy translation of key concepts
-        title_words = note.title.replace('_', ' ').split()
-        main_concept = ' '.join(title_words[:2])
-        fantasy_concept = get_fantasy_term(main_concept)
-        fantasy_title = translate_to_fantasy(note.title)
-        if fantasy_title == note.title or len(fantasy_title) > len(note.title) + 20:
-            fantasy_title = f"the Sacred {note.title.replace('_', ' ').title()}"
-
-        # Phrases based on personality type with fantasy translations
-        phrase_sets = {
-            "Ancient Scholar": [
-                f"You dare challenge the wisdom of ages?",
-                f"This knowledge was old when the world was young!",
-                f"Feel the weight of accumulated learning!",
-                f"Your understanding of {fantasy_concept} is but a flickering candle!",
-                f"The ancient secrets of {fantasy_title} are beyond your grasp!"
-            ],
-            "Defensive Warrior": [
-                f"I will not let you corrupt this knowledge!",
-                f"Stand back! The power of {fantasy_title} is protected!",
-                f"You must prove yourself worthy!",
-                f"Guard yourself against the mystical arts of {fantasy_concept}!",
-                f"These sacred arts are not for the unworthy!"
-            ],
-            "Thoughtful Oracle": [
-                f"Do you comprehend the depths of {fantasy_title}?",
-                f"Your mind must expand to contain this wisdom!",
-                f"Think carefully before you proceed!",
-                f"The mysteries of {fantasy_concept} require true understanding!",
-                f"Can you unravel these arcane secrets?"
-            ],
-            "Memory Keeper": [
-                f"These memories are precious beyond measure!",
-                f"I guard the echoes of important thoughts!",
-                f"Your mind cannot hold what you have not earned!",
-                f"Feel the weight of preserved {fantasy_concept}!",
-                f"The sacred memories of {fantasy_title} shall not be disturbed!"
-            ],
-            "Task Master": [
-                f"Have you completed the necessary preparations?",
-                f"This knowledge requires discipline to understand!",
-                f"Organization and method are required here!",
-                f"You must prove your mastery of {fantasy_concept}!",
-                f"The disciplines of {fantasy_title} demand perfection!"
-            ]
-        }
-
-        # Default phrases with fantasy concepts if personality not found
-        default_phrases = [
-            f"You seek the secrets of {knowledge_domain}?",
-            f"This knowledge is not for the unprepared!",
-            f"Prove your worth, seeker!",
-            f"The wisdom of {fantasy_title} is mine to protect!",
-            f"The mystical arts of {fantasy_concept} require true dedication!"
-        ]
-
-        # Get appropriate phrases or use defaults
-        phrases = phrase_sets.get(personality_type, default_phrases)
-        return random.sample(phrases, min(3, len(phrases)))
-
-    def _generate_defeat_message(self, note: ObsidianNote, personality_type: str) -> str:
+    def _generate_defeat_message(self, note: ObsidianNote, personality_type: str,
+                                 slots: Optional[TemplateSlots] = None) -> str:
         """Generate message when enemy is defeated"""
+        if slots is None:
+            slots = self._lore_slots(note)
+        return narrative_engine.render('defeat_message', slots, key=personality_type)
 
-        # Get fantasy translation of the note title
-        fantasy_title = translate_to_fantasy(note.title)
-        if fantasy_title == note.title or len(fantasy_title) > len(note.title) + 20:
-            fantasy_title = f"the Sacred {note.title.replace('_', ' ').title()}"
-
-        defeat_messages = {
-            "Ancient Scholar": f"Your wisdom... exceeds my expectations. The ancient knowledge of {fantasy_title} is yours to bear...",
-            "Defensive Warrior": f"You have proven your strength worthy of this power. Guard {fantasy_title} well...",
-            "Thoughtful Oracle": f"Your understanding runs deep. Take these mystical insights and use them wisely...",
-            "Memory Keeper": f"You have shown respect for these precious memories. Carry {fantasy_title} in your heart...",
-            "Task Master": f"Your dedication has been proven. The disciplined arts of {fantasy_title} are earned...",
-        }
-
-        return defeat_messages.get(personality_type,
-            f"You have bested me, seeker. The wisdom of {fantasy_title} is yours...")
-
-    def _generate_victory_message(self, note: ObsidianNote, personality_type: str) -> str:
+    def _generate_victory_message(self, note: ObsidianNote, personality_type: str,
+                                  slots: Optional[TemplateSlots] = None) -> str:
         """Generate message when enemy defeats the player"""
-
-        # Get fantasy translation of the note title
-        fantasy_title = translate_to_fantasy(note.title)
-        if fantasy_title == note.title or len(fantasy_title) > len(note.title) + 20:
-            fantasy_title = f"the Sacred {note.title.replace('_', ' ').title()}"
-
-        victory_messages = {
-            "Ancient Scholar": f"Your mind was not ready for such ancient wisdom. Return when you have learned more...",
-            "Defensive Warrior": f"You were not strong enough to claim this power. Train harder and return...",
-            "Thoughtful Oracle": f"Your understanding needs more time to develop. Reflect and try again...",
-            "Memory Keeper": f"These memories are too precious for an unprepared mind. Come back when ready...",
-            "Task Master": f"You lack the discipline required. Complete your preparations and return...",
-        }
-
-        return victory_messages.get(personality_type,
-            f"You are not yet worthy of the mystical knowledge within {fantasy_title}. Return when you are stronger...")
+        if slots is None:
+            slots = self._lore_slots(note)
+        return narrative_engine.render('victory_message', slots, key=personality_type)
 
     def generate_quiz_question(self, note: ObsidianNote) -> Tuple[str, str]:
         """Generate a quiz question from note content with fantasy narrative framing"""
 
         # Get fantasy translations for mystical framing
-        fantasy_title = translate_to_fantasy(note.title)
-        if fantasy_title == note.title or len(fantasy_title) > len(note.title) + 20:
-            fantasy_title = f"the Sacred {note.title.replace('_', ' ').title()}"
-
-        # Extract key concept for riddle framing
-        title_words = note.title.replace('_', ' ').split()
-        main_concept = ' '.join(title_words[:2])
-        fantasy_concept = get_fantasy_term(main_concept)
+        fantasy_title = self._get_fantasy_title(note)
+        fantasy_concept = self._get_fantasy_concept(note)
 
         try:
             # Try AI-enhanced quiz generation first
@@ -832,26 +797,22 @@ class ObsidianVault:
 
     def _frame_as_riddle(self, base_question: str, fantasy_title: str, fantasy_concept: str) -> str:
         """Transform a regular question into a mystical riddle"""
-
-        riddle_frames = [
-            f"The guardian of {fantasy_title} poses this riddle: '{base_question}'",
-            f"To unlock the secrets of {fantasy_concept}, answer this: '{base_question}'",
-            f"The ancient voice whispers: '{base_question}'",
-            f"The mystical keeper asks: '{base_question}'",
-            f"Before you may claim {fantasy_title}, solve this enigma: '{base_question}'",
-            f"The spirit guardian challenges you: '{base_question}'",
-            f"To prove your worthiness of {fantasy_concept}, answer: '{base_question}'",
-        ]
-
-        return random.choice(riddle_frames)
+        slots = TemplateSlots({
+            'question': base_question,
+            'fantasy_title': fantasy_title,
+            'fantasy_concept': fantasy_concept,
+        })
+        return narrative_engine.render('riddle_frame', slots)
 
     def _extract_note_details(self, note: ObsidianNote) -> Dict[str, Any]:
         """Extract meaningful details from note content for narrative use"""
         content = note.content.strip()
         lines = [line.strip() for line in content.split('\n') if line.strip()]
+        summary = note_summaries.get(note.content)
 
         details = {
-            'first_line': lines[0] if lines else '',
+            # The note's most central sentence says more than whatever line it opens with
+            'first_line': summary.sentences[0] if summary.sentences else (lines[0] if lines else ''),
             'key_phrases': [],
             'numbers': [],
             'items': [],
@@ -859,9 +820,9 @@ class ObsidianVault:
             'names': []
         }
 
-        # Extract numbers
+        # Extract numbers, those in the summary first
         import re
-        numbers = re.findall(r'\b\d+\b', content)
+        numbers = list(dict.fromkeys(re.findall(r'\b\d+\b', summary.text) + re.findall(r'\b\d+\b', content)))
         details['numbers'] = [int(n) for n in numbers[:5]]  # Limit to 5 numbers
 
         # Extract items/things (nouns)
@@ -871,9 +832,11 @@ class ObsidianVault:
         list_items = re.findall(r'[-*•]\s*([^\n]+)', content)
         details['items'].extend([item.strip() for item in list_items[:3]])
 
-        # Look for key phrases (capitalize important words)
-        key_words = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', content)
-        details['names'].extend(key_words[:3])
+        # Key phrases of the note, then capitalized words
+        details['names'].extend(summary.keyphrases[:3])
+        if len(details['names']) < 3:
+            key_words = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', content)
+            details['names'].extend(key_words[:3 - len(details['names'])])
 
         # Extract actions/verbs
         action_patterns = [
@@ -890,131 +853,37 @@ class ObsidianVault:
 
         return details
 
-    def _generate_dynamic_encounter_narrative(self, note: ObsidianNote, knowledge_domain: str, age_descriptor: str) -> str:
+    def _generate_dynamic_encounter_narrative(self, note: ObsidianNote, knowledge_domain: str, age_descriptor: str,
+                                              slots: Optional[TemplateSlots] = None) -> str:
         """Generate dynamic encounter narrative based on note content"""
-        content_lower = (note.title + " " + note.content[:300]).lower()
-        fantasy_title = translate_to_fantasy(note.title)
-        if fantasy_title == note.title or len(fantasy_title) > len(note.title) + 20:
-            fantasy_title = f"the Sacred {note.title.replace('_', ' ').title()}"
+        content_lower = self._note_gist(note)
+        if slots is None:
+            slots = self._lore_slots(note, knowledge_domain=knowledge_domain, age_lower=age_descriptor.lower())
 
         # Extract specific details from the note
         details = self._extract_note_details(note)
-
-        # Create rich, content-based narratives
-        def build_narrative_with_details(base_narrative: str) -> str:
-            """Add specific note details to base narrative"""
-            additions = []
-
-            if details['first_line']:
-                additions.append(f"The ancient inscription reads: '{details['first_line'][:50]}...'")
-
-            if details['numbers']:
-                num_desc = ', '.join(str(n) for n in details['numbers'][:3])
-                additions.append(f"Mystical energies resonate with the sacred numbers: {num_desc}.")
-
-            if details['items']:
-                item_desc = ', '.join(f"'{item}'" for item in details['items'][:2])
-                additions.append(f"Ethereal manifestations of {item_desc} float through the arcane space.")
-
-            if details['names']:
-                name_desc = ', '.join(details['names'][:2])
-                additions.append(f"The names {name_desc} echo with power in this mystical realm.")
-
-            # Combine base narrative with specific details
-            full_narrative = base_narrative
-            if additions:
-                full_narrative += " " + " ".join(additions[:2])  # Limit to avoid too long
-
-            return full_narrative
+        detail_slots = TemplateSlots({
+            'first_line': details['first_line'],
+            'numbers': ', '.join(str(n) for n in details['numbers'][:3]),
+            'items': ', '.join(f"'{item}'" for item in details['items'][:2]),
+            'names': ', '.join(details['names'][:2]),
+            'extra_numbers': ', '.join(str(n) for n in details['numbers'][1:3]) if len(details['numbers']) > 1 else '',
+            'actions': ', '.join(details['actions'][:2]),
+            'second_key_phrase': details['key_phrases'][1] if len(details['key_phrases']) > 1 else '',
+        })
 
         # Content-aware narrative generation with specific details
-        if any(word in content_lower for word in ['code', 'function', 'algorithm', 'programming', 'script']):
-            base_narratives = [
-                f"You enter a digital realm where the code from {fantasy_title} has manifested as living algorithms. The very essence of programming logic pulses through the ethereal space, transforming abstract concepts into tangible magical forces.",
-                f"The Sanctuary of Digital Mysteries materializes around you, where {fantasy_title} has become a living testament to computational power. Lines of code float like glowing runes, each symbol containing the accumulated wisdom of countless hours of development.",
-                f"You find yourself in the Codex Chamber, where {fantasy_title} exists as pure algorithmic energy. The air crackles with the power of executed functions and living variables, creating a symphony of digital magic."
-            ]
-            base = random.choice(base_narratives)
-            narratives = [build_narrative_with_details(base)]
-        elif any(word in content_lower for word in ['meeting', 'agenda', 'discussion', 'deadline', 'project']):
-            base_narratives = [
-                f"You enter the Ethereal Conference Chamber, where {fantasy_title} has become a living manifestation of endless deliberation. The very air vibrates with the energy of unfinished business and spectral agendas.",
-                f"The Phantom Boardroom materializes around you, infused with the essence of {fantasy_title}. Transparent figures forever debate around an endless table, their words echoing through dimensions of corporate purgatory.",
-                f"You step into the Halls of Eternal Meetings, where {fantasy_title} exists as a testament to bureaucratic persistence. Time seems suspended in this realm of perpetual planning and endless discussion."
-            ]
-            base = random.choice(base_narratives)
-            narratives = [build_narrative_with_details(base)]
-        elif any(word in content_lower for word in ['buy', 'shop', 'purchase', 'item', 'list', 'grocery']):
-            narratives = [
-                f"You enter the Merchant's Eternal Bazaar, where the desires from {fantasy_title} have manifested as ghostly commerce. Items float endlessly, never to be purchased.",
-                f"The mystical marketplace appears before you, where {fantasy_title} has become a living catalog of unfulfilled desires. Spectral goods drift through the air.",
-                f"You find yourself in the Bazaar of Lost Wants, where {fantasy_title} exists as a testament to consumer longing that transcends the physical realm."
-            ]
-        elif any(word in content_lower for word in ['password', 'login', 'auth', 'secret', 'key']):
-            narratives = [
-                f"You approach the Vault of Hidden Secrets, where {fantasy_title} guards the most precious mysteries. The air shimmers with protective enchantments.",
-                f"The Chamber of Forbidden Knowledge materializes around you. {fantasy_title} has become a living guardian of secrets that mortals should not possess.",
-                f"You enter the Sanctum of Veiled Truths, where {fantasy_title} stands as an eternal sentinel protecting knowledge from unworthy eyes."
-            ]
-        elif any(word in content_lower for word in ['recipe', 'cook', 'ingredient', 'food', 'meal']):
-            narratives = [
-                f"You enter a mystical kitchen where the essence of {fantasy_title} lingers in the air. Spectral ingredients dance around ancient parchment.",
-                f"The Culinary Realm opens before you, where {fantasy_title} has become a living cookbook. Aromatic spirits swirl around phantom cooking implements.",
-                f"You find yourself in the Kitchen of Eternal Preparation, where {fantasy_title} exists as a never-ending feast that can never be consumed."
-            ]
-        elif any(word in content_lower for word in ['ip', 'address', 'network', 'router', 'server']):
-            narratives = [
-                f"You traverse the ethereal pathways of the Network Dimension, where {fantasy_title} governs the connections between digital realms. Data spirits flow like rivers of light.",
-                f"The Cyberspace Nexus materializes around you, with {fantasy_title} serving as a mystical gateway between worlds. Network packets dance through the air like fireflies.",
-                f"You enter the Realm of Digital Pathways, where {fantasy_title} has become a living map of connections that bind all electronic consciousness together."
-            ]
-        elif any(word in content_lower for word in ['journal', 'diary', 'personal', 'feeling', 'emotion', 'thought']):
-            narratives = [
-                f"You step into the Memory Gardens, where {fantasy_title} blooms as a living testament to personal experience. Emotional energies swirl like gentle breezes.",
-                f"The Sanctuary of Inner Thoughts opens before you, where {fantasy_title} has taken root as a manifestation of the human soul. Memories drift like autumn leaves.",
-                f"You enter the Chamber of Heart's Secrets, where {fantasy_title} exists as a crystallized emotion, radiating the pure essence of personal truth."
-            ]
-        elif any(word in content_lower for word in ['parking', 'lot', 'space', 'spot']):
-            narratives = [
-                f"You approach an abandoned lot where the faded markings of {fantasy_title} still glow with spectral energy. The empty space holds memories of a thousand journeys.",
-                f"The Phantom Parking Realm materializes around you, where {fantasy_title} exists as an eternal marker in the void. Ghostly vehicles phase in and out of existence.",
-                f"You find yourself in the Liminal Space of Transit, where {fantasy_title} has become a beacon for souls forever seeking their place in the world."
-            ]
-        else:
-            # Generic but rich fallbacks with content details
-            base_narratives = [
-                f"You discover the Mystical Sanctuary of {fantasy_title}, where {age_descriptor.lower()} knowledge has taken ethereal form. This sacred space pulses with the accumulated wisdom of ages, each thought crystallized into tangible magical energy.",
-                f"The air shimmers with arcane power as {fantasy_title} materializes before you in all its glory. This {age_descriptor.lower()} wisdom has transcended mere documentation, becoming a conscious entity in the mystical realm of {knowledge_domain}.",
-                f"You step into the Chamber of Living Memory, where {fantasy_title} exists as a testament to the power of preserved knowledge. Reality itself bends around this sacred information, transforming abstract concepts into magical forces.",
-                f"The boundaries between mind and matter dissolve as {fantasy_title} emerges from the collective unconscious. This guardian of {knowledge_domain} seeks to test your understanding and worthiness to access its secrets."
-            ]
-            base = random.choice(base_narratives)
-            narratives = [build_narrative_with_details(base)]
-
-        # Get the narrative to return
-        narrative = random.choice(narratives)
+        entry = narrative_engine.table('encounter_narrative').resolve(content_lower)
+        narrative = entry.render(slots)
+        if entry.options.get('details'):
+            # Add up to two specific note details to the base narrative
+            additions = narrative_engine.table('encounter_details').default.render_segments(detail_slots, limit=2)
+            if additions:
+                narrative += " " + " ".join(additions)
 
         # EXTEND to 600+ chars (6-8 lines) if needed
         if len(narrative) < 600:
-            extensions = []
-
-            # Add more atmospheric details
-            if details['numbers'] and len(details['numbers']) > 1:
-                extra_nums = ', '.join(str(n) for n in details['numbers'][1:3])
-                extensions.append(f"Additional mystical frequencies {extra_nums} vibrate in harmony with the realm's energy.")
-
-            if details['actions']:
-                action_desc = ', '.join(details['actions'][:2])
-                extensions.append(f"The very space seems to {action_desc}, filling you with both wonder and trepidation.")
-
-            if details['key_phrases'] and len(details['key_phrases']) > 1:
-                phrase = details['key_phrases'][1][:60]
-                extensions.append(f"Ancient wisdom whispers: '{phrase}...' - a truth that resonates through dimensions.")
-
-            # Generic atmospheric padding
-            extensions.append("The very air seems alive with potential, each breath filling you with ancient knowledge.")
-            extensions.append("Reality shimmers at the edges of perception as the boundary between wisdom and physical form dissolves completely.")
-            extensions.append("You sense the weight of accumulated understanding pressing against your consciousness, challenging you to prove your worth.")
+            extensions = narrative_engine.table('encounter_extensions').default.render_segments(detail_slots)
 
             # Add extensions until we reach 600 chars
             for ext in extensions:
@@ -1027,215 +896,39 @@ class ObsidianVault:
 
     def _generate_dynamic_environment(self, note: ObsidianNote, folder_theme: str) -> str:
         """Generate environment description based on note characteristics"""
-        content_lower = (note.title + " " + note.content[:200]).lower()
+        content_lower = self._note_gist(note)
+        slots = TemplateSlots({'folder_theme': folder_theme})
 
         # Content-based environments
-        if any(word in content_lower for word in ['code', 'programming', 'algorithm']):
-            return random.choice([
-                "Digital Realm of Living Code",
-                "Computational Sanctuary",
-                "The Binary Gardens",
-                "Algorithmic Cathedral"
-            ])
-        elif any(word in content_lower for word in ['meeting', 'project', 'work']):
-            return random.choice([
-                "Ethereal Conference Chamber",
-                "Corporate Phantom Hall",
-                "The Endless Meeting Room",
-                "Bureaucratic Purgatory"
-            ])
-        elif any(word in content_lower for word in ['shop', 'buy', 'purchase']):
-            return random.choice([
-                "Merchant's Eternal Bazaar",
-                "Marketplace of Unfulfilled Desires",
-                "The Spectral Shopping District",
-                "Bazaar of Lost Wants"
-            ])
-        elif any(word in content_lower for word in ['personal', 'journal', 'feeling']):
-            return random.choice([
-                "Memory Gardens",
-                "Sanctuary of Inner Thoughts",
-                "The Emotional Realm",
-                "Chamber of Heart's Secrets"
-            ])
-        elif any(word in content_lower for word in ['recipe', 'cook', 'food']):
-            return random.choice([
-                "Mystical Kitchen Realm",
-                "Culinary Dimension",
-                "The Aromatic Sanctuary",
-                "Kitchen of Eternal Preparation"
-            ])
-        elif any(word in content_lower for word in ['password', 'secret', 'auth']):
-            return random.choice([
-                "Vault of Hidden Secrets",
-                "Chamber of Forbidden Knowledge",
-                "The Cryptographic Sanctum",
-                "Sanctum of Veiled Truths"
-            ])
-        else:
-            # Folder-based environments
-            folder_environments = {
-                'projects': "The Forge of Creation",
-                'work': "Corporate Spirit Realm",
-                'personal': "Inner Sanctum",
-                'notes': "Archive of Living Knowledge",
-                'docs': "Documentation Cathedral",
-                'code': "Digital Mystical Realm",
-                'meeting': "Council of Ethereal Voices"
-            }
-
-            for keyword, env in folder_environments.items():
-                if keyword in folder_theme.lower():
-                    return env
+        entry = narrative_engine.table('environment').match(content_lower)
+        if entry is not None:
+            return entry.render(slots)
 
-            # Generic mystical environments
-            return random.choice([
-                f"Mystical Sanctuary of {folder_theme}",
-                f"The Sacred {folder_theme} Realm",
-                f"Ethereal Domain of {folder_theme}",
-                f"Arcane Chamber of {folder_theme}"
-            ])
+        # Folder-based environments, then generic mystical environments
+        return narrative_engine.render('folder_environment', slots, text=folder_theme.lower())
 
     def _generate_manifestation_story(self, note: ObsidianNote, personality_type: str) -> str:
         """Generate how the enemy manifests from the note content"""
-        content_lower = (note.title + " " + note.content[:200]).lower()
-
-        manifestation_templates = {
-            "Ancient Scholar": [
-                f"Ancient wisdom stirs as forgotten knowledge awakens to defend its secrets.",
-                f"The accumulated learning of ages coalesces into a protective spirit.",
-                f"Time-worn understanding materializes to challenge the seeker."
-            ],
-            "Defensive Warrior": [
-                f"The note's protective instincts surge forth as a guardian spirit.",
-                f"Defensive energy crystallizes into a fierce protector of knowledge.",
-                f"The content's natural barriers manifest as a formidable adversary."
-            ],
-            "Thoughtful Oracle": [
-                f"Deep contemplation within the note gives birth to a wise challenger.",
-                f"Philosophical understanding takes form to test the seeker's readiness.",
-                f"The note's insights manifest as a knowing guardian spirit."
-            ],
-            "Memory Keeper": [
-                f"Cherished memories within the note awaken to protect their sanctity.",
-                f"Personal experiences crystallize into an emotional guardian.",
-                f"The note's sentimental value manifests as a protective spirit."
-            ],
-            "Task Master": [
-                f"The note's sense of duty and purpose materializes as a disciplined guardian.",
-                f"Organizational energy coalesces into a methodical challenger.",
-                f"The structured nature of the content manifests as a systematic protector."
-            ]
-        }
-
-        # Get appropriate manifestation based on personality
-        manifestations = manifestation_templates.get(personality_type, manifestation_templates["Ancient Scholar"])
-        return random.choice(manifestations)
+        return narrative_engine.render('manifestation_story', TemplateSlots(), key=personality_type)
 
     def _generate_dynamic_description(self, note: ObsidianNote, personality_type: str) -> str:
         """Generate dynamic enemy description based on note content"""
-        content_lower = (note.title + " " + note.content[:200]).lower()
-
-        # Content-based descriptions
-        if any(word in content_lower for word in ['code', 'programming', 'function']):
-            return random.choice([
-                "A mystical programmer wreathed in flowing code, its fingers weaving glowing algorithms.",
-                "A digital sage composed of compiled knowledge, with binary runes flowing across its form.",
-                "An entity of pure logic and syntax, crackling with the power of executed functions."
-            ])
-        elif any(word in content_lower for word in ['meeting', 'project', 'work']):
-            return random.choice([
-                "A suited specter endlessly scribbling notes, its hollow eyes reflecting corporate tedium.",
-                "A phantom executive wielding ethereal documents, forever bound to the meeting room.",
-                "A ghostly bureaucrat surrounded by floating agenda items and project timelines."
-            ])
-        elif any(word in content_lower for word in ['recipe', 'cook', 'food']):
-            return random.choice([
-                "A culinary spirit wreathed in aromatic smoke, wielding spectral cooking implements.",
-                "A ghostly chef with ingredients orbiting its form like mystical satellites.",
-                "An entity of pure flavor and technique, radiating the essence of perfect preparation."
-            ])
-        elif any(word in content_lower for word in ['personal', 'journal', 'feeling']):
-            return random.choice([
-                "An emotional guardian shimmering with the colors of memory and feeling.",
-                "A sentimental spirit wrapped in wisps of cherished experiences.",
-                "A being of pure emotion, its form shifting with the tides of remembered feelings."
-            ])
-        else:
-            # Generic mystical descriptions
-            return random.choice([
-                f"A mysterious entity born from the essence of knowledge, guarding its secrets fiercely.",
-                f"A spectral guardian wreathed in the energies of accumulated understanding.",
-                f"An otherworldly being that embodies the very soul of preserved wisdom.",
-                f"A mystical protector formed from the crystallized essence of thought and memory."
-            ])
+        content_lower = self._note_gist(note)
+        return narrative_engine.render('description', TemplateSlots(), text=content_lower)
 
     def _generate_dynamic_weapon(self, note: ObsidianNote, knowledge_domain: str) -> str:
         """Generate dynamic weapon based on note content"""
-        content_lower = (note.title + " " + note.content[:200]).lower()
-
-        if any(word in content_lower for word in ['code', 'programming', 'function']):
-            return random.choice([
-                "Binary Blade of Compiled Logic",
-                "Algorithmic Scythe of Infinite Loops",
-                "Debugger's Hammer of Truth",
-                "Syntax Sword of Perfect Code"
-            ])
-        elif any(word in content_lower for word in ['meeting', 'project', 'agenda']):
-            return random.choice([
-                "Bureaucratic Gavel of Endless Meetings",
-                "Agenda Spear of Perpetual Discussion",
-                "Project Hammer of Crushing Deadlines",
-                "Committee Blade of Decision Paralysis"
-            ])
-        elif any(word in content_lower for word in ['recipe', 'cook', 'food']):
-            return random.choice([
-                "Flaming Spatula of Culinary Wrath",
-                "Whisk of Ethereal Mixing",
-                "Chef's Knife of Perfect Preparation",
-                "Seasoning Shaker of Flavor Mastery"
-            ])
-        elif any(word in content_lower for word in ['password', 'secret', 'auth']):
-            return random.choice([
-                "Cryptographic Key of Forbidden Access",
-                "Authentication Blade of Verification",
-                "Secret Sword of Hidden Knowledge",
-                "Password Staff of Protective Encryption"
-            ])
-        else:
-            # Domain-based weapons
-            domain_weapons = {
-                "Code Mysteries": "Ethereal Debugging Blade",
-                "Memory Fragments": "Nostalgia Scythe",
-                "Council Echoes": "Gavel of Spectral Authority",
-                "Project Forge": "Hammer of Creative Force"
-            }
-            return domain_weapons.get(knowledge_domain, f"Mystical {knowledge_domain} Blade")
+        content_lower = self._note_gist(note)
+        slots = TemplateSlots({'knowledge_domain': knowledge_domain})
+        return narrative_engine.render('weapon', slots, text=content_lower, key=knowledge_domain)
 
     def _generate_dynamic_armor(self, note: ObsidianNote, age_descriptor: str) -> str:
         """Generate dynamic armor based on note age and content"""
-        content_lower = (note.title + " " + note.content[:200]).lower()
+        content_lower = self._note_gist(note)
 
         # Age-based armor modifiers
-        age_modifiers = {
-            "Ancient": ["Time-worn", "Weathered", "Eternally-aged"],
-            "Forgotten": ["Dust-covered", "Neglected", "Abandoned"],
-            "Recent": ["Fresh", "Newly-forged", "Modern"],
-            "Established": ["Well-maintained", "Proven", "Refined"]
-        }
-
-        modifier = random.choice(age_modifiers.get(age_descriptor, ["Mystical"]))
-
-        if any(word in content_lower for word in ['code', 'programming']):
-            return f"{modifier} Chainmail of Error Handling"
-        elif any(word in content_lower for word in ['meeting', 'corporate']):
-            return f"{modifier} Corporate Suit of Bureaucratic Defense"
-        elif any(word in content_lower for word in ['recipe', 'cook']):
-            return f"{modifier} Apron of Culinary Mastery"
-        elif any(word in content_lower for word in ['personal', 'journal']):
-            return f"{modifier} Robes of Emotional Protection"
-        else:
-            return f"{modifier} Vestments of Knowledge"
+        modifier = narrative_engine.render('armor_modifier', TemplateSlots(), key=age_descriptor)
+        return narrative_engine.render('armor', TemplateSlots({'modifier': modifier}), text=content_lower)
 
     def get_vault_path(self) -> str:
         """Get current vault path"""
@@ -1247,11 +940,19 @@ class ObsidianVault:
         if not self.vault_path or not self.vault_path.exists():
             return []
 
+        notes = self.scan_notes()
+
+        # Regions only change when notes do; reuse descriptors built for this vault state
+        cache_key = self._regions_cache_key(notes) if CACHE_AVAILABLE else None
+        if cache_key:
+            cached_regions = get_cached_ai_result(cache_key)
+            if cached_regions:
+                return cached_regions
+
         regions = []
 
         # Scan for note-containing folders
         folder_counts = {}
-        notes = self.scan_notes()
 
         # Count notes per folder
         for note in notes:
@@ -1277,7 +978,15 @@ class ObsidianVault:
                 'difficulty': 'Mixed'
             })
 
-        return sorted(regions, key=lambda x: x['note_count'], reverse=True)
+        regions = sorted(regions, key=lambda x: x['note_count'], reverse=True)
+        if cache_key:
+            cache_ai_result(cache_key, regions, kind="regions")
+        return regions
+
+    def _regions_cache_key(self, notes: List[ObsidianNote]) -> str:
+        """Digest of the vault's note paths and modification times"""
+        return make_content_hash("regions", self.vault_path,
+                                 *sorted(f"{note.path}:{note.modified.timestamp()}" for note in notes))
 
     def _create_fantasy_region(self, folder_name: str, notes: List[ObsidianNote]) -> Dict[str, any]:
         """Transform a folder into a fantasy region"""
@@ -1373,23 +1082,8 @@ class ObsidianVault:
 
     def _generate_region_description(self, region_name: str, region_type: str, note_count: int) -> str:
         """Generate atmospheric description for the region"""
-
-        descriptions = {
-            'Forge Realm': f"The sound of mystical hammers echoes through {region_name}, where {note_count} projects take shape in workshops of creation.",
-            'Council Chambers': f"Formal halls of {region_name} where {note_count} important deliberations have been preserved in stone.",
-            'Memory Gardens': f"Peaceful {region_name} where {note_count} personal reflections bloom like ethereal flowers.",
-            'Reflection Pools': f"Serene waters of {region_name} mirror {note_count} moments of inner contemplation.",
-            'Arcane Laboratories': f"The {region_name} crackle with magical energy from {note_count} arcane experiments.",
-            'Assembly Halls': f"Echoing chambers of {region_name} where {note_count} gatherings have left their mark.",
-            'Scholarly Libraries': f"Vast halls of {region_name} containing {note_count} tomes of accumulated wisdom.",
-            'Inspiration Peaks': f"The soaring heights of {region_name} where {note_count} brilliant ideas touch the clouds.",
-            'Chronicle Vaults': f"Ancient repositories of {region_name} safeguarding {note_count} important records.",
-            'Documentation Citadel': f"The fortress of {region_name} protects {note_count} carefully maintained archives.",
-            'Academy Grounds': f"The educational fields of {region_name} where {note_count} lessons have been learned."
-        }
-
-        return descriptions.get(region_type,
-            f"The mysterious {region_name} holds {note_count} secrets waiting to be discovered.")
+        slots = TemplateSlots({'region_name': region_name, 'note_count': note_count})
+        return narrative_engine.render('region_description', slots, key=region_type)
 
     def _get_region_enemy_types(self, region_type: str, themes: List[str]) -> List[str]:
         """Determine what types of enemies inhabit this region"""
@@ -1497,19 +1191,38 @@ class ObsidianVault:
 
         self.initialize_encyclopedia()
 
-        for i, note1 in enumerate(notes):
-            for note2 in notes[i+1:]:
-                relationship_strength = self._calculate_note_similarity(note1, note2)
-
-                if relationship_strength > 0.3:  # Significant relationship threshold
-                    relationship_key = f"{note1.title}_{note2.title}"
-                    self.encyclopedia['note_relationships'][relationship_key] = {
-                        'note1': note1.title,
-                        'note2': note2.title,
-                        'strength': relationship_strength,
-                        'relationship_type': self._classify_relationship(note1, note2, relationship_strength),
-                        'discovered': datetime.now()
-                    }
+        for note1, note2 in self._relationship_candidates(notes):
+            relationship_strength = self._calculate_note_similarity(note1, note2)
+
+            if relationship_strength > 0.3:  # Significant relationship threshold
+                relationship_key = f"{note1.title}_{note2.title}"
+                self.encyclopedia['note_relationships'][relationship_key] = {
+                    'note1': note1.title,
+                    'note2': note2.title,
+                    'strength': relationship_strength,
+                    'relationship_type': self._classify_relationship(note1, note2, relationship_strength),
+                    'discovered': datetime.now()
+                }
+
+    def _relationship_candidates(self, notes: List[ObsidianNote]):
+        """Note pairs worth scoring: each note with its nearest neighbours, or every pair without an index"""
+        if not (game_settings.embedding_index_enabled and embedding_index.ready):
+            for i, note1 in enumerate(notes):
+                for note2 in notes[i+1:]:
+                    yield note1, note2
+            return
+
+        by_title = {}
+        for note in notes:
+            by_title.setdefault(note.title, []).append(note)
+        seen = set()
+        for note1 in notes:
+            for title, _ in embedding_index.related_notes(str(note1.path), k=RELATED_CANDIDATES):
+                for note2 in by_title.get(title, []):
+                    pair = frozenset((str(note1.path), str(note2.path)))
+                    if len(pair) == 2 and pair not in seen:
+                        seen.add(pair)
+                        yield note1, note2
 
     def _calculate_note_similarity(self, note1: ObsidianNote, note2: ObsidianNote) -> float:
         """Calculate similarity between two notes"""
@@ -1526,7 +1239,14 @@ class ObsidianVault:
         words2 = set(note2.title.lower().replace('_', ' ').split())
         title_similarity = len(words1 & words2) / max(len(words1 | words2), 1)
 
-        # Content similarity (basic keyword overlap)
+        # Content similarity - semantic when both notes are embedded, which can carry more of the weight
+        semantic = None
+        if game_settings.embedding_index_enabled:
+            semantic = embedding_index.note_similarity(str(note1.path), str(note2.path))
+        if semantic is not None:
+            return (tag_similarity * 0.3 + folder_similarity * 0.2 + title_similarity * 0.1 + max(semantic, 0.0) * 0.4)
+
+        # Basic keyword overlap
         content1_words = set(note1.content[:200].lower().split())
         content2_words = set(note2.content[:200].lower().split())
         content_similarity = len(content1_words & content2_words) / max(len(content1_words | content2_words), 1)
@@ -1627,21 +1347,14 @@ class ObsidianVault:
         themes = []
         content_lower = (note.title + ' ' + note.content[:200]).lower()
 
-        # Technical themes
-        if any(word in content_lower for word in ['code', 'programming', 'software', 'api']):
-            themes.append('technical')
-
-        # Business themes
-        if any(word in content_lower for word in ['meeting', 'project', 'business', 'work']):
-            themes.append('business')
-
-        # Personal themes
-        if any(word in content_lower for word in ['personal', 'journal', 'feeling', 'thought']):
-            themes.append('personal')
+        for theme, (keywords, _) in NOTE_THEMES.items():
+            if any(word in content_lower for word in keywords):
+                themes.append(theme)
 
-        # Learning themes
-        if any(word in content_lower for word in ['learn', 'study', 'course', 'research']):
-            themes.append('learning')
+        # Themes the note is about without using their keywords
+        if game_settings.embedding_index_enabled:
+            descriptions = {theme: text for theme, (_, text) in NOTE_THEMES.items() if theme not in themes}
+            themes.extend(embedding_index.nearest_labels(str(note.path), descriptions, THEME_MIN_SIMILARITY))
 
         # Add folder-based theme
         folder_theme = note.path.parent.name.lower()
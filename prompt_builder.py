@@ -0,0 +1,195 @@
+"""
+Prompt Builder for Legend of the Obsidian Vault
+Fits the most informative parts of a note into each provider's token budget
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+CHARS_PER_TOKEN = 4.0  # Starting estimate until a provider reports real token counts
+
+# How much of a provider's note budget each kind of prompt gets
+PROMPT_KIND_SCALE = {"quiz": 1.0, "quiz_bank": 1.5, "enemy": 1.0}
+
+# Base score per section kind - what makes good quiz and lore material
+SECTION_SCORES = {
+    "heading": 3.0,
+    "definition": 3.0,
+    "list": 1.5,
+    "text": 1.0,
+    "code": 0.5,
+    "frontmatter": 0.3,
+}
+
+HEADING_RE = re.compile(r'^#{1,6}\s+\S')
+BULLET_RE = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+(?:\[[ xX]\]\s+)?')
+BOLD_RE = re.compile(r'\*\*[^*\n]+\*\*|__[^_\n]+__')
+DEFINITION_RE = re.compile(
+    r'^[^.!?]{2,60}?\s+(?:is|are|means|refers to|is defined as|describes)\s+\S'
+    r'|^\s*[\w*][^:\n]{1,40}::?\s+\S',
+    re.IGNORECASE
+)
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9*_"(\[])')
+
+
+class TokenCounter:
+    """Estimates a provider's token count from text length.
+
+    observe() calibrates the estimate with the prompt token counts a provider
+    reports back, so budgets converge on that provider's real tokenizer.
+    """
+
+    def __init__(self, chars_per_token: float = CHARS_PER_TOKEN):
+        self.chars_per_token = chars_per_token
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        return max(1, int(len(text) / self.chars_per_token + 0.5)) if text else 0
+
+    def observe(self, text: str, tokens: int):
+        """Blend in a real (text, token count) measurement"""
+        if tokens <= 0 or len(text) < 200:
+            return  # Too small to say anything about the ratio
+        ratio = min(8.0, max(1.5, len(text) / tokens))
+        with self._lock:
+            self.chars_per_token = 0.8 * self.chars_per_token + 0.2 * ratio
+
+
+class ExactTokenCounter(TokenCounter):
+    """Counts with a real tokenizer, falling back to the estimate when it is unavailable"""
+
+    def __init__(self, tokenize: Callable[[str], Optional[List[int]]], chars_per_token: float = CHARS_PER_TOKEN):
+        super().__init__(chars_per_token)
+        self._tokenize = tokenize
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        tokens = self._tokenize(text)
+        return len(tokens) if tokens is not None else super().count(text)
+
+
+@dataclass
+class Section:
+    """One candidate piece of a note: a heading, list item or sentence"""
+    text: str
+    kind: str
+    position: int  # Order in the note
+    block: int  # Sentences of one paragraph share a block and are re-joined with spaces
+    score: float = 0.0
+
+
+def split_sections(content: str) -> List[Section]:
+    """Break a note into headings, list items, code blocks and paragraph sentences"""
+    sections: List[Section] = []
+    block = 0
+    paragraph: List[str] = []
+    lines = content.splitlines()
+    index = 0
+
+    def add(text: str, kind: str):
+        text = text.strip()
+        if text:
+            sections.append(Section(text, kind, len(sections), block))
+
+    def flush_paragraph():
+        nonlocal block
+        if paragraph:
+            for sentence in SENTENCE_RE.split(" ".join(paragraph)):
+                add(sentence, "definition" if DEFINITION_RE.match(sentence) else "text")
+            paragraph.clear()
+            block += 1
+
+    # YAML frontmatter
+    if lines and lines[0].strip() == "---":
+        end = next((i for i in range(1, len(lines)) if lines[i].strip() == "---"), None)
+        if end is not None:
+            add("\n".join(lines[1:end]), "frontmatter")
+            block += 1
+            index = end + 1
+
+    while index < len(lines):
+        line = lines[index]
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            flush_paragraph()
+            end = next((i for i in range(index + 1, len(lines)) if lines[i].strip().startswith("```")), len(lines))
+            add("\n".join(lines[index:end + 1]), "code")
+            block += 1
+            index = end + 1
+            continue
+        if not stripped:
+            flush_paragraph()
+        elif HEADING_RE.match(stripped):
+            flush_paragraph()
+            add(stripped, "heading")
+            block += 1
+        elif BULLET_RE.match(line):
+            flush_paragraph()
+            add(line.rstrip(), "list")
+            block += 1
+        else:
+            paragraph.append(stripped)
+        index += 1
+    flush_paragraph()
+    return sections
+
+
+def score_section(section: Section, total: int) -> float:
+    """How much a section is worth putting in front of the model"""
+    score = SECTION_SCORES[section.kind]
+    score += min(2, len(BOLD_RE.findall(section.text)))  # Bold terms are what the author cared about
+    if re.search(r'\d', section.text):
+        score += 0.5  # Numbers make for concrete questions
+    if section.kind == "list" and DEFINITION_RE.match(BULLET_RE.sub("", section.text)):
+        score += 1.5  # "- Term: meaning" items are definitions too
+    if len(section.text) < 20 and section.kind not in ("heading", "list"):
+        score -= 0.5  # Fragments carry little
+    score += 0.5 * (1 - section.position / max(1, total))  # Notes tend to lead with the important part
+    return score
+
+
+def build_excerpt(content: str, budget_tokens: int, counter: Optional[TokenCounter] = None) -> str:
+    """The most informative sections of a note that fit budget_tokens, in note order.
+
+    A note that already fits is returned whole.
+    """
+    counter = counter or TokenCounter()
+    content = content.strip()
+    if budget_tokens <= 0 or counter.count(content) <= budget_tokens:
+        return content
+
+    sections = split_sections(content)
+    for section in sections:
+        section.score = score_section(section, len(sections))
+
+    chosen: List[Section] = []
+    seen = set()
+    remaining = budget_tokens
+    for section in sorted(sections, key=lambda s: (-s.score, s.position)):
+        key = " ".join(section.text.lower().split())
+        if key in seen:
+            continue  # Repeated boilerplate (templates, copied blocks) is only worth sending once
+        cost = counter.count(section.text) + 1  # + separator
+        if cost <= remaining:
+            chosen.append(section)
+            seen.add(key)
+            remaining -= cost
+        if remaining < 4:
+            break
+
+    if not chosen:
+        # Every section is larger than the budget - cut the best one down
+        best = max(sections, key=lambda s: (s.score, -s.position), default=None)
+        text = best.text if best else content
+        return text[:int(budget_tokens * counter.chars_per_token)].rstrip()
+
+    parts: List[str] = []
+    previous: Optional[Section] = None
+    for section in sorted(chosen, key=lambda s: s.position):
+        if previous is not None:
+            parts.append(" " if section.block == previous.block else "\n")
+        parts.append(section.text)
+        previous = section
+    return "".join(parts)
@@ -0,0 +1,226 @@
+"""
+Prompt Templates for Legend of the Obsidian Vault
+Every prompt the game sends to a model, as named and versioned templates.
+A template's version and text hash are part of the cache key of everything
+generated from it, so changing a prompt only invalidates its own results.
+"""
+import hashlib
+import string
+import threading
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A prompt with $placeholders.
+
+    includes names the templates whose text can end up in this one's output:
+    a placeholder named after an include is filled with it automatically, and
+    the others are fragments the caller chooses between (e.g. the JSON or the
+    labeled-text response format). Either way they are part of the fingerprint.
+    """
+    name: str
+    version: int
+    text: str
+    includes: Tuple[str, ...] = ()
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:12]
+
+
+class RenderedPrompt(str):
+    """Text of a rendered prompt that also knows which template and values produced it.
+
+    It is a plain str to every provider; code that must understand a prompt
+    (the mock provider) reads template and values instead of parsing the text.
+    """
+
+    template: str
+    values: Dict[str, object]
+
+    def __new__(cls, text: str, template: str, values: Dict[str, object]):
+        prompt = super().__new__(cls, text)
+        prompt.template = template
+        prompt.values = values
+        return prompt
+
+
+class PromptRegistry:
+    """Named prompt templates, rendered through render() and fingerprinted for cache keys"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, version: int, text: str, includes: Tuple[str, ...] = ()) -> PromptTemplate:
+        template = PromptTemplate(name, version, text, tuple(includes))
+        with self._lock:
+            if name in self._templates:
+                raise ValueError(f"prompt template '{name}' is already registered")
+            self._templates[name] = template
+            self._fingerprints.clear()
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"unknown prompt template '{name}'") from None
+
+    def render(self, name: str, **values: object) -> RenderedPrompt:
+        """Fill a template's placeholders: includes by name, everything else from values"""
+        template = self.get(name)
+        for include in template.includes:
+            values.setdefault(include, self.render(include))
+        return RenderedPrompt(string.Template(template.text).substitute(values), name, values)
+
+    def fingerprint(self, *names: str) -> str:
+        """Version and text hash of the named templates and everything they include"""
+        key = ",".join(names)
+        fingerprint = self._fingerprints.get(key)
+        if fingerprint is None:
+            parts = []
+            seen = set()
+
+            def visit(name: str):
+                if name in seen:
+                    return
+                seen.add(name)
+                template = self.get(name)
+                parts.append(f"{name}@{template.version}#{template.digest}")
+                for include in template.includes:
+                    visit(include)
+
+            for name in names:
+                visit(name)
+            fingerprint = self._fingerprints[key] = ",".join(parts)
+        return fingerprint
+
+    def versions(self) -> Dict[str, str]:
+        """Every template's "version#digest", for status reporting"""
+        with self._lock:
+            return {name: f"{t.version}#{t.digest}" for name, t in sorted(self._templates.items())}
+
+
+prompt_registry = PromptRegistry()
+
+
+def render_prompt(name: str, **values: object) -> RenderedPrompt:
+    """Render a registered prompt template (see PromptRegistry.render)"""
+    return prompt_registry.render(name, **values)
+
+
+# =============================================================================
+# Response formats
+# =============================================================================
+
+prompt_registry.register("quiz_fields_text", 1, """QUESTION: [your question here]
+CORRECT: [the correct answer]
+DECOY: [plausible but incorrect answer]
+FUNNY: [humorous wrong answer]
+TYPE: [definition/concept/relationship/fact]""")
+
+prompt_registry.register("quiz_fields_json", 1, (
+    '{"question": "[your question here]", "correct": "[the correct answer]", '
+    '"decoy": "[plausible but incorrect answer]", "funny": "[humorous wrong answer]", '
+    '"type": "[definition/concept/relationship/fact]"}'))
+
+prompt_registry.register("quiz_format_text", 1, "Format your response exactly as:\n$quiz_fields_text",
+                         includes=("quiz_fields_text",))
+
+prompt_registry.register("quiz_format_json", 1, "Respond with only a JSON object:\n$quiz_fields_json",
+                         includes=("quiz_fields_json",))
+
+prompt_registry.register(
+    "quiz_bank_format_text", 1,
+    "Format each question exactly as below, one block after another:\n$quiz_fields_text",
+    includes=("quiz_fields_text",))
+
+prompt_registry.register(
+    "quiz_bank_format_json", 1,
+    'Respond with only a JSON object holding every question:\n{"questions": [$quiz_fields_json, ...]}',
+    includes=("quiz_fields_json",))
+
+prompt_registry.register("enemy_format_text", 1, "Write ONLY the narrative description, nothing else.")
+
+prompt_registry.register("enemy_format_json", 1,
+                         'Respond with only a JSON object: {"narrative": "[the narrative description]"}')
+
+
+# =============================================================================
+# Prompts
+# =============================================================================
+
+prompt_registry.register("quiz", 3, """Based on this note about "$title":
+
+$excerpt
+
+Generate a multiple choice quiz question that tests understanding of the key concept.
+
+Create 3 answer options:
+1. One correct answer
+2. One plausible but incorrect answer (similar to correct but wrong in key detail)
+3. One humorous/obviously wrong answer
+
+$response_format
+
+Make the decoy answer similar enough to confuse someone who doesn't know the material well.""",
+                         includes=("quiz_format_text", "quiz_format_json"))
+
+prompt_registry.register("quiz_bank", 3, """Based on this note about "$title":
+
+$excerpt
+
+Generate $count different multiple choice quiz questions, each testing a different fact or concept from the note.
+
+For every question create 3 answer options:
+1. One correct answer
+2. One plausible but incorrect answer (similar to correct but wrong in key detail)
+3. One humorous/obviously wrong answer
+
+$response_format
+
+Make the decoy answers similar enough to confuse someone who doesn't know the material well.""",
+                         includes=("quiz_bank_format_text", "quiz_bank_format_json"))
+
+ENEMY_INTRO = ("You are a dungeon master describing a magical encounter. Create a rich, atmospheric description "
+               "of discovering a mystical realm where the knowledge from this note has come alive:")
+ENEMY_INSTRUCTIONS = ("Write a 3-4 sentence narrative describing the encounter as a dungeon master would. "
+                      "Include specific details from the note content (numbers, names, concepts, actions). "
+                      "Make it magical and immersive, like the knowledge itself has awakened to challenge "
+                      "intruders. Keep it concise but atmospheric.")
+
+prompt_registry.register("enemy", 3, f"""{ENEMY_INTRO}
+
+Title: "$title"
+Content: $excerpt
+
+{ENEMY_INSTRUCTIONS}
+
+$response_format""", includes=("enemy_format_text", "enemy_format_json"))
+
+# TinyLlama gets worked examples of the style - small models copy them closely
+prompt_registry.register("tinyllama_enemy", 3, f"""{ENEMY_INTRO}
+
+Title: "$title"
+Content: $excerpt
+
+{ENEMY_INSTRUCTIONS}
+
+Examples of good style:
+- "You enter the Algorithm Archive where 27 mystical patterns swirl in the air..."
+- "The ancient text declares: 'Machine learning automates analytical model building' as glowing runes..."
+- "Five frameworks materialize as spectral guardians: TensorFlow, PyTorch..."
+
+$response_format""", includes=("enemy_format_text", "enemy_format_json"))
+
+prompt_registry.register("tinyllama_system_quiz", 1, """You are a helpful AI that creates quiz questions from notes.
+Generate clear, educational questions that test understanding of key concepts.
+Be concise and focused.""")
+
+prompt_registry.register("tinyllama_system_enemy", 1, """You are a creative fantasy writer who transforms any content into magical encounters.
+Transform mundane notes into atmospheric fantasy adventures with vivid descriptions.
+Use structured output format for easy parsing.""")
@@ -0,0 +1,227 @@
+"""
+Quiz Bank for Legend of the Obsidian Vault
+Per-note banks of AI quiz questions, generated in bulk and refilled in the background
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, replace
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from brainbot import (AIPriority, QuizQuestion, current_ai_identity, quiz_bank_cache_key,
+                      sync_generate_quiz_questions)
+from simple_cache import cache_ai_result, get_cached_ai_result, make_content_hash
+
+REFILL_WORKERS = 2  # Notes refilled concurrently
+RETRY_DELAY = 30.0  # Seconds before retrying a refill that produced nothing
+SAVE_DELAY = 5.0  # Seconds draws are collected before the banks they changed are saved
+
+
+class NoteBank:
+    """Questions for one note: unseen ones are drawn first, served ones are recycled"""
+
+    __slots__ = ("content_hash", "unseen", "served", "refilling", "retry_after")
+
+    def __init__(self, content_hash: str = "", unseen: Optional[List[QuizQuestion]] = None,
+                 served: Optional[List[QuizQuestion]] = None):
+        self.content_hash = content_hash
+        self.unseen: Deque[QuizQuestion] = deque(unseen or [])
+        self.served: Deque[QuizQuestion] = deque(served or [])
+        self.refilling = False
+        self.retry_after = 0.0
+
+    def reset(self, content_hash: str):
+        """Drop questions written for an older version of the note"""
+        self.content_hash = content_hash
+        self.unseen.clear()
+        self.served.clear()
+        self.retry_after = 0.0
+
+    def take(self) -> Optional[QuizQuestion]:
+        if self.unseen:
+            quiz = self.unseen.popleft()
+        elif self.served:
+            quiz = self.served.popleft()  # Every question seen - cycle through them again
+        else:
+            return None
+        self.served.append(quiz)
+        return quiz
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "content_hash": self.content_hash,
+            "unseen": [asdict(q) for q in self.unseen],
+            "served": [asdict(q) for q in self.served],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NoteBank":
+        try:
+            return cls(data["content_hash"],
+                       [QuizQuestion(**q) for q in data.get("unseen", [])],
+                       [QuizQuestion(**q) for q in data.get("served", [])])
+        except (KeyError, TypeError):
+            # Stored before a QuizQuestion field change
+            return cls()
+
+
+class QuizBank:
+    """Serves quiz questions from per-note banks without waiting on a model"""
+
+    def __init__(self, workers: int = REFILL_WORKERS, save_delay: float = SAVE_DELAY):
+        self._banks: Dict[Tuple[Tuple[str, str], str], NoteBank] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quiz-bank")
+        self._save_delay = save_delay
+        self._unsaved: Dict[Tuple[Tuple[str, str], str], NoteBank] = {}  # Banks drawn from since their last save
+        self._save_timer: Optional[threading.Timer] = None
+
+    def draw(self, note_title: str, note_content: str, difficulty: int = 1) -> Optional[QuizQuestion]:
+        """Take the next question for a note, or None if its bank is empty.
+
+        A low, empty or outdated bank is refilled in the background.
+        """
+        identity = current_ai_identity()
+        if identity is None:
+            return None
+
+        content_hash = make_content_hash(note_content)
+        bank = self._get_bank(identity, note_title)
+        with self._lock:
+            if bank.content_hash != content_hash:
+                bank.reset(content_hash)
+            quiz = bank.take()
+            if quiz:
+                self._schedule_save(identity, note_title, bank)
+        self._refill_if_low(identity, note_title, note_content, bank)
+        return replace(quiz, difficulty=difficulty) if quiz else None
+
+    def ensure(self, note_title: str, note_content: str) -> bool:
+        """Start filling a note's bank ahead of time. Returns False if AI is unavailable."""
+        identity = current_ai_identity()
+        if identity is None:
+            return False
+
+        content_hash = make_content_hash(note_content)
+        bank = self._get_bank(identity, note_title)
+        with self._lock:
+            if bank.content_hash != content_hash:
+                bank.reset(content_hash)
+        self._refill_if_low(identity, note_title, note_content, bank)
+        return True
+
+    def fill(self, note_title: str, note_content: str, priority: AIPriority = AIPriority.BATCH) -> int:
+        """Fill a note's bank in the calling thread. Returns the number of questions added."""
+        identity = current_ai_identity()
+        if identity is None:
+            return 0
+
+        content_hash = make_content_hash(note_content)
+        bank = self._get_bank(identity, note_title)
+        with self._lock:
+            if bank.content_hash != content_hash:
+                bank.reset(content_hash)
+            if not self._is_low(bank) or bank.refilling:
+                return 0
+            bank.refilling = True
+        return self._refill(identity, note_title, note_content, content_hash, bank, priority)
+
+    def has_questions(self, note_title: str, note_content: str) -> bool:
+        """True if the note's bank holds questions for its current content"""
+        identity = current_ai_identity()
+        if identity is None:
+            return False
+        bank = self._get_bank(identity, note_title)
+        with self._lock:
+            return bank.content_hash == make_content_hash(note_content) and bool(bank.unseen or bank.served)
+
+    def flush(self) -> int:
+        """Save every bank drawn from since its last save (also done SAVE_DELAY after a draw, and on shutdown).
+
+        Returns the number of banks saved.
+        """
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            unsaved, self._unsaved = self._unsaved, {}
+            saved = [(key, bank.to_dict()) for key, bank in unsaved.items()]
+        for (identity, note_title), data in saved:
+            cache_ai_result(quiz_bank_cache_key(identity, note_title), data, kind="quiz_bank")
+        return len(saved)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "notes": len(self._banks),
+                "unseen": sum(len(b.unseen) for b in self._banks.values()),
+                "refilling": sum(1 for b in self._banks.values() if b.refilling),
+            }
+
+    def _get_bank(self, identity: Tuple[str, str], note_title: str) -> NoteBank:
+        key = (identity, note_title)
+        bank = self._banks.get(key)
+        if bank is None:
+            data = get_cached_ai_result(quiz_bank_cache_key(identity, note_title))
+            loaded = NoteBank.from_dict(data) if data else NoteBank()
+            with self._lock:
+                bank = self._banks.setdefault(key, loaded)
+        return bank
+
+    def _schedule_save(self, identity: Tuple[str, str], note_title: str, bank: NoteBank):
+        """Remember a drawn-from bank and save it soon, so served questions stay served after a restart.
+
+        Caller holds the lock.
+        """
+        self._unsaved[(identity, note_title)] = bank
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self._save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _is_low(self, bank: NoteBank) -> bool:
+        from game_data import game_settings
+        return len(bank.unseen) < max(1, game_settings.quiz_bank_low_water)
+
+    def _refill_if_low(self, identity: Tuple[str, str], note_title: str, note_content: str, bank: NoteBank):
+        with self._lock:
+            if bank.refilling or not self._is_low(bank) or time.monotonic() < bank.retry_after:
+                return
+            bank.refilling = True
+            content_hash = bank.content_hash
+        self._executor.submit(self._refill, identity, note_title, note_content, content_hash, bank)
+
+    def _refill(self, identity: Tuple[str, str], note_title: str, note_content: str,
+                content_hash: str, bank: NoteBank, priority: AIPriority = AIPriority.PREFETCH) -> int:
+        from game_data import game_settings
+        questions = []
+        try:
+            questions = sync_generate_quiz_questions(note_title, note_content, game_settings.quiz_bank_size, priority)
+        except Exception as e:
+            print(f"⚠️ Quiz bank refill failed for '{note_title}': {e}")
+
+        with self._lock:
+            bank.refilling = False
+            if bank.content_hash != content_hash:
+                return 0  # Note changed while generating; the next draw starts over
+            known = {q.question.lower() for q in bank.unseen}
+            known.update(q.question.lower() for q in bank.served)
+            added = [q for q in questions if q.question.lower() not in known]
+            if not added:
+                bank.retry_after = time.monotonic() + RETRY_DELAY
+                return 0
+            bank.unseen.extend(added)
+            # Keep recycled questions bounded by the bank size
+            while len(bank.served) > game_settings.quiz_bank_size:
+                bank.served.popleft()
+            data = bank.to_dict()
+            self._unsaved.pop((identity, note_title), None)  # Saved below
+
+        cache_ai_result(quiz_bank_cache_key(identity, note_title), data, kind="quiz_bank")
+        print(f"📚 Quiz bank for '{note_title}' refilled with {len(added)} questions")
+        return len(added)
+
+
+# Global quiz bank instance
+quiz_bank = QuizBank()
@@ -0,0 +1,239 @@
+"""
+Persistent AI Cache for Legend of the Obsidian Vault
+SQLite-backed, size-bounded LRU cache shared by every AI provider
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CACHE_DB_PATH = "saves/ai_cache.db"
+MAINTENANCE_EVERY = 200  # Writes between automatic expiry/eviction passes
+
+
+def make_content_hash(*parts: Any) -> str:
+    """Stable digest of the given parts (unlike hash(), identical across processes)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")  # Separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+class AICache:
+    """Key/value store of JSON results with per-entry TTL and least-recently-used eviction.
+
+    Pinned entries (content compiled ahead of play) never expire and are not
+    counted against or evicted by the max_entries limit.
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, max_entries: int = 5000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_cache (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                expires REAL,
+                last_access REAL NOT NULL,
+                pinned INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(ai_cache)")]
+        if "pinned" not in columns:  # Cache created before pinning
+            self._conn.execute("ALTER TABLE ai_cache ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_access ON ai_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM ai_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, expires = row
+            if expires is not None and expires < now:
+                self._conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE ai_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, kind: str = "ai"):
+        """Store a JSON-serializable value. ttl is in seconds (None = no expiry); a pinned key stays pinned."""
+        now = time.time()
+        expires = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ai_cache (key, kind, value, created, expires, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET kind = excluded.kind, value = excluded.value, "
+                "created = excluded.created, last_access = excluded.last_access, "
+                "expires = CASE WHEN pinned THEN NULL ELSE excluded.expires END",
+                (key, kind, json.dumps(value), now, expires, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            run_maintenance = self._writes % MAINTENANCE_EVERY == 0
+        if run_maintenance:
+            self.maintenance()
+
+    def pin(self, key: str) -> bool:
+        """Keep an entry for good: no expiry, no LRU eviction. False if the key is not cached."""
+        with self._lock:
+            pinned = self._conn.execute(
+                "UPDATE ai_cache SET pinned = 1, expires = NULL WHERE key = ?", (key,)
+            ).rowcount
+            self._conn.commit()
+        return pinned > 0
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def maintenance(self) -> int:
+        """Drop expired entries, then the least recently used unpinned ones beyond max_entries"""
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM ai_cache WHERE NOT pinned AND expires IS NOT NULL AND expires < ?", (time.time(),)
+            ).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM ai_cache WHERE NOT pinned").fetchone()[0]
+            if count > self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM ai_cache WHERE key IN "
+                    "(SELECT key FROM ai_cache WHERE NOT pinned ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def clear(self, kind: Optional[str] = None):
+        with self._lock:
+            if kind is None:
+                self._conn.execute("DELETE FROM ai_cache")
+            else:
+                self._conn.execute("DELETE FROM ai_cache WHERE kind = ?", (kind,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, COUNT(*) FROM ai_cache GROUP BY kind").fetchall()
+            pinned = self._conn.execute("SELECT COUNT(*) FROM ai_cache WHERE pinned").fetchone()[0]
+        return {
+            "entries": dict(rows),
+            "pinned": pinned,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_cache: Optional[AICache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> AICache:
+    """Shared cache instance, sized from game settings on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from game_data import game_settings
+                _cache = AICache(max_entries=game_settings.ai_cache_max_entries)
+    return _cache
+
+
+def _ttl(setting: str) -> Optional[float]:
+    """TTL in seconds from game settings; 0 means None"""
+    from game_data import game_settings
+    return getattr(game_settings, setting) or None
+
+
+# =============================================================================
+# AI results (quiz questions, enemy descriptions)
+# =============================================================================
+
+def cache_ai_result(key: str, value: Any, kind: str = "ai", ttl: Optional[float] = None):
+    """Store an AI result (dataclass or JSON value) under a make_content_hash key"""
+    if hasattr(value, "__dataclass_fields__"):
+        value = asdict(value)
+    if ttl is None:
+        ttl = _ttl("ai_cache_quiz_ttl" if kind.startswith("quiz") else "ai_cache_enemy_ttl")
+    get_cache().set(key, value, ttl=ttl, kind=kind)
+
+
+def get_cached_ai_result(key: str) -> Optional[Any]:
+    return get_cache().get(key)
+
+
+def pin_ai_result(key: str) -> bool:
+    """Keep a compiled result for good (see AICache.pin)"""
+    return get_cache().pin(key)
+
+
+# =============================================================================
+# Narratives and whole enemies
+# =============================================================================
+
+def cache_narrative(key: str, narrative: str, ttl: Optional[float] = None):
+    get_cache().set(key, narrative, ttl=ttl if ttl is not None else _ttl("ai_cache_enemy_ttl"), kind="narrative")
+
+
+def get_cached_narrative(key: str) -> Optional[str]:
+    return get_cache().get(key)
+
+
+def _enemy_key(note_title: str, note_content: str, level: int) -> str:
+    return make_content_hash("enemy", note_title, make_content_hash(note_content), level)
+
+
+def cache_enemy(note_title: str, note_content: str, level: int, enemy):
+    """Remember a generated enemy for a version of a note and a level.
+
+    Off by default (enemy_cache_ttl = 0): while it is on, repeat encounters
+    with the same note and level meet the identical enemy until the TTL runs out.
+    """
+    ttl = _ttl("enemy_cache_ttl")
+    if ttl is None:
+        return  # Enemy caching disabled
+    get_cache().set(_enemy_key(note_title, note_content, level), asdict(enemy), ttl=ttl, kind="enemy")
+
+
+def get_cached_enemy(note_title: str, note_content: str, level: int):
+    data = get_cache().get(_enemy_key(note_title, note_content, level))
+    if data is None:
+        return None
+    from game_data import Enemy
+    try:
+        return Enemy(**data)
+    except TypeError:
+        # Stored before an Enemy field change
+        return None
+
+
+def periodic_maintenance() -> int:
+    """Expire and evict cache entries. Returns the number removed."""
+    return get_cache().maintenance()
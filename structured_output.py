@@ -0,0 +1,249 @@
+"""
+Structured Output for Legend of the Obsidian Vault
+JSON schemas for AI responses, GBNF grammars for llama.cpp, and the one
+validating parser every provider's response goes through
+"""
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+QUIZ_TYPES = ["definition", "concept", "relationship", "fact"]
+
+# "x-label" names the field in the labeled text format (QUESTION: ...), which
+# streaming and providers without structured output still produce
+QUIZ_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "question": {"type": "string", "maxLength": 300, "x-label": "QUESTION"},
+        "correct": {"type": "string", "maxLength": 150, "x-label": "CORRECT"},
+        "decoy": {"type": "string", "maxLength": 150, "x-label": "DECOY"},
+        "funny": {"type": "string", "maxLength": 150, "x-label": "FUNNY"},
+        "type": {"type": "string", "enum": QUIZ_TYPES, "default": "concept", "x-label": "TYPE"},
+    },
+    "required": ["question", "correct", "decoy", "funny"],
+}
+
+QUIZ_BATCH_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "questions": {"type": "array", "items": QUIZ_SCHEMA, "minItems": 1},
+    },
+    "required": ["questions"],
+}
+
+# "x-plain": a completion that isn't JSON at all is taken as this field
+ENEMY_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "narrative": {"type": "string", "maxLength": 1500, "x-label": "NARRATIVE", "x-plain": True},
+    },
+    "required": ["narrative"],
+}
+
+# Prefixes small models put in front of a plain-text narrative
+_PLAIN_PREFIXES = ("narrative:", "encounter_narrative:", "description:")
+
+
+# =============================================================================
+# Parsing and validation
+# =============================================================================
+
+def _load_json(text: str) -> Optional[Any]:
+    """The first JSON object or array in a completion (code fences and chatter around it are ignored)"""
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r'[{\[]', text):
+        try:
+            return decoder.raw_decode(text, match.start())[0]
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_labeled_object(text: str, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    labels = {prop["x-label"]: name for name, prop in schema["properties"].items() if "x-label" in prop}
+    if not labels:
+        return None
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(label) for label in labels) + r'):')
+    matches = list(pattern.finditer(text))
+    if not matches:
+        plain = [name for name, prop in schema["properties"].items() if prop.get("x-plain")]
+        if plain:
+            value = text.strip()
+            if value.lower().startswith(_PLAIN_PREFIXES):
+                value = value.split(":", 1)[1].strip()
+            return {plain[0]: value}
+        return None
+    fields = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(text)
+        fields.setdefault(labels[match.group(1)], text[match.end():end].strip())
+    return fields
+
+
+def _parse_labeled(text: str, schema: Dict[str, Any]) -> Optional[Any]:
+    """Read the labeled text format into the shape the schema describes"""
+    properties = schema.get("properties", {})
+    arrays = [(name, prop) for name, prop in properties.items() if prop.get("type") == "array"]
+    if len(properties) == 1 and arrays:
+        name, prop = arrays[0]
+        item_schema = prop["items"]
+        first_label = next(iter(item_schema["properties"].values()))["x-label"]
+        blocks = re.split(r'(?=\b' + re.escape(first_label) + r':)', text)
+        items = [_parse_labeled_object(block, item_schema) for block in blocks if first_label + ":" in block]
+        return {name: [item for item in items if item]}
+    return _parse_labeled_object(text, schema)
+
+
+def validate(data: Any, schema: Dict[str, Any]) -> Optional[Any]:
+    """Cleaned copy of data if it satisfies schema, else None.
+
+    Strings are stripped and clipped to maxLength, enums match case-insensitively
+    (falling back to their default), and invalid array items are dropped.
+    """
+    kind = schema.get("type")
+    if kind == "string":
+        if not isinstance(data, (str, int, float)) or isinstance(data, bool):
+            return None
+        value = str(data).strip().strip('"').strip()
+        if "enum" in schema:
+            lowered = {option.lower(): option for option in schema["enum"]}
+            return lowered.get(value.lower(), schema.get("default"))
+        if not value:
+            return None
+        return value[:schema["maxLength"]].rstrip() if "maxLength" in schema else value
+
+    if kind == "array":
+        if not isinstance(data, list):
+            return None
+        items = [validate(item, schema["items"]) for item in data]
+        items = [item for item in items if item is not None]
+        return items if len(items) >= schema.get("minItems", 0) else None
+
+    if kind == "object":
+        properties = schema.get("properties", {})
+        if not isinstance(data, dict):
+            # A bare value for a one-field schema (e.g. a list of questions)
+            if len(properties) != 1:
+                return None
+            data = {next(iter(properties)): data}
+        # Models sometimes vary the key case ("Question")
+        data = {str(key).lower(): value for key, value in data.items()}
+        cleaned = {}
+        for name, prop in properties.items():
+            if name in data:
+                value = validate(data[name], prop)
+                if value is not None:
+                    cleaned[name] = value
+                    continue
+            if name in schema.get("required", []):
+                return None
+            if "default" in prop:
+                cleaned[name] = prop["default"]
+        return cleaned
+    return data
+
+
+def api_schema(schema: Any) -> Any:
+    """Schema without the parser's "x-" annotations, for providers that validate schemas"""
+    if isinstance(schema, dict):
+        return {key: api_schema(value) for key, value in schema.items() if not key.startswith("x-")}
+    if isinstance(schema, list):
+        return [api_schema(value) for value in schema]
+    return schema
+
+
+def parse_structured(text: Optional[str], schema: Dict[str, Any]) -> Optional[Any]:
+    """Parse a completion against a schema: JSON first, then the labeled text format"""
+    if not text:
+        return None
+    data = _load_json(text)
+    if data is not None:
+        cleaned = validate(data, schema)
+        if cleaned is not None:
+            return cleaned
+    labeled = _parse_labeled(text, schema)
+    return validate(labeled, schema) if labeled is not None else None
+
+
+# =============================================================================
+# Parse metrics
+# =============================================================================
+
+class StructuredOutputStats:
+    """Parse successes and failures per (kind, mode) - failures are wasted generations"""
+
+    def __init__(self):
+        self._counts: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, mode: str, ok: bool):
+        with self._lock:
+            counts = self._counts.setdefault((kind, mode), [0, 0])
+            counts[0] += 1
+            if not ok:
+                counts[1] += 1
+
+    def failure_rate(self, kind: Optional[str] = None) -> float:
+        with self._lock:
+            selected = [c for (k, _), c in self._counts.items() if kind is None or k == kind]
+        total = sum(c[0] for c in selected)
+        return sum(c[1] for c in selected) / total if total else 0.0
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                f"{kind}/{mode}": {"parsed": total - failed, "failed": failed,
+                                   "failure_rate": round(failed / total, 3) if total else 0.0}
+                for (kind, mode), (total, failed) in self._counts.items()
+            }
+
+
+structured_stats = StructuredOutputStats()
+
+
+# =============================================================================
+# llama.cpp grammars
+# =============================================================================
+
+GBNF_COMMON = r'''ws ::= [ \t\n]{0,4}
+char ::= [^"\\\x7F\x00-\x1F] | "\\" (["\\/bfnrt] | "u" [0-9a-fA-F] [0-9a-fA-F] [0-9a-fA-F] [0-9a-fA-F])
+string ::= "\"" char+ "\"" ws'''
+
+
+def _gbnf_literal(text: str) -> str:
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _gbnf_rule(schema: Dict[str, Any], name: str, rules: Dict[str, str]) -> str:
+    kind = schema.get("type")
+    if kind == "string":
+        if "enum" not in schema:
+            return "string"
+        rules[name] = "(" + " | ".join(_gbnf_literal(json.dumps(option)) for option in schema["enum"]) + ") ws"
+        return name
+    if kind == "array":
+        item = _gbnf_rule(schema["items"], f"{name}-item", rules)
+        rules[name] = f'"[" ws {item} ("," ws {item})* "]" ws'
+        return name
+    if kind == "object":
+        parts = []
+        for prop_name, prop in schema["properties"].items():
+            value = _gbnf_rule(prop, f"{name}-{prop_name}", rules)
+            parts.append(f'{_gbnf_literal(json.dumps(prop_name))} ws ":" ws {value}')
+        rules[name] = '"{" ws ' + ' "," ws '.join(parts) + ' "}" ws'
+        return name
+    raise ValueError(f"unsupported schema type for grammar: {kind}")
+
+
+def schema_to_gbnf(schema: Dict[str, Any]) -> str:
+    """GBNF grammar that only admits JSON matching schema (all properties, in schema order)"""
+    rules: Dict[str, str] = {}
+    _gbnf_rule(schema, "root", rules)
+    body = "\n".join(f"{name} ::= {rule}" for name, rule in rules.items())
+    return f"{body}\n{GBNF_COMMON}\n"
@@ -0,0 +1,33 @@
+"""Provider stand-in served by the worker processes in test_ai_worker"""
+import os
+import time
+
+from brainbot import raise_if_cancelled
+
+
+class Target:
+    cache_identity = ("test", "worker")
+    provider_name = "Test target"
+
+    def initialize(self) -> bool:
+        return True
+
+    def echo(self, value):
+        return os.getpid(), value
+
+    def slow(self, seconds: float) -> str:
+        """Cooperative work: stops once the request is cancelled"""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            raise_if_cancelled()
+            time.sleep(0.02)
+        return "done"
+
+    def hang(self):
+        time.sleep(60)  # Ignores cancellation
+
+    def crash(self):
+        os._exit(3)
+
+    def fail(self):
+        raise ValueError("bad note")
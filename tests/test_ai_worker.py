@@ -0,0 +1,84 @@
+"""AI worker pool: request routing, timeouts, crashes and cancellation"""
+import time
+import unittest
+from unittest import mock
+
+import ai_worker
+from ai_worker import AIWorkerCancelled, AIWorkerCrashed, AIWorkerError, AIWorkerPool, AIWorkerTimeout
+
+METHODS = ("echo", "slow", "hang", "crash", "fail")
+
+
+class AIWorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        for patcher in (mock.patch.object(ai_worker, "CANCEL_GRACE", 0.5),
+                        mock.patch.object(ai_worker, "RESTART_DELAY", 0.1)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start_pool(self, size: int = 1, timeout: float = 10.0) -> AIWorkerPool:
+        pool = AIWorkerPool("tests.ai_worker_target:Target", METHODS, size=size, timeout=timeout)
+        self.addCleanup(pool.close)
+        info = pool.start(60)
+        self.assertEqual(info, {"cache_identity": ("test", "worker"), "provider_name": "Test target"})
+        return pool
+
+    def wait_until_ready(self, pool: AIWorkerPool, count: int):
+        deadline = time.monotonic() + 60
+        while pool.stats()["ready"] < count and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def test_results_reach_the_request_that_asked(self):
+        pool = self.start_pool(size=2)
+        self.wait_until_ready(pool, 2)
+        futures = [pool.submit("echo", (i,))[1] for i in range(8)]
+        values = [future.result(30)[1] for future in futures]
+        self.assertEqual(values, list(range(8)))
+        self.assertEqual(pool.stats()["completed"], 8)
+
+    def test_errors_are_raised_in_the_caller(self):
+        pool = self.start_pool()
+        with self.assertRaisesRegex(AIWorkerError, "bad note"):
+            pool.call("fail")
+        self.assertEqual(pool.call("echo", "still serving")[1], "still serving")
+
+    def test_hung_request_times_out_and_its_worker_is_replaced(self):
+        pool = self.start_pool(timeout=0.5)
+        pid = pool.call("echo", 1)[0]
+        with self.assertRaises(AIWorkerTimeout):
+            pool.call("hang")
+        self.assertNotEqual(pool.call("echo", 2, timeout=60)[0], pid)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_crashed_worker_is_restarted(self):
+        pool = self.start_pool()
+        with self.assertRaises(AIWorkerCrashed):
+            pool.call("crash")
+        self.assertEqual(pool.call("echo", "after crash", timeout=60)[1], "after crash")
+        stats = pool.stats()
+        self.assertEqual((stats["crashes"], stats["restarts"]), (1, 1))
+
+    def test_cancel_stops_the_request_in_the_worker(self):
+        pool = self.start_pool()
+        pid = pool.call("echo", 1)[0]
+        request_id, future = pool.submit("slow", (30,))
+        time.sleep(0.3)
+        pool.cancel(request_id)
+        with self.assertRaises(AIWorkerCancelled):
+            future.result(5)
+        # Cooperative cancel: the same process serves the next request
+        self.assertEqual(pool.call("echo", 2, timeout=10)[0], pid)
+
+    def test_close_fails_queued_requests(self):
+        pool = self.start_pool()
+        pool.submit("slow", (30,))
+        _, queued = pool.submit("echo", (1,))
+        pool.close()
+        with self.assertRaises(AIWorkerCancelled):
+            queued.result(5)
+        self.assertFalse(pool.available())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Circuit breaker: tripping on errors and latency, cooldown and the half-open probe"""
+import unittest
+from unittest import mock
+
+from brainbot import CircuitBreaker
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("brainbot.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("test", window=10, min_calls=3, failure_rate=0.5, slow_call=5.0, cooldown=30.0)
+
+    def test_trips_on_error_rate(self):
+        self.breaker.record(True, 1.0)
+        self.breaker.record(False, 1.0)
+        self.assertTrue(self.breaker.allow())  # Too few calls to judge
+        self.breaker.record(False, 1.0)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertTrue(self.breaker.is_open())
+        self.assertEqual(self.breaker.score(), 0.0)
+
+    def test_trips_on_slow_calls(self):
+        for _ in range(3):
+            self.breaker.record(True, 6.0)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.trips, 1)
+
+    def test_half_open_lets_one_probe_through(self):
+        for _ in range(3):
+            self.breaker.record(False, 1.0)
+        self.now += 31
+        self.assertFalse(self.breaker.is_open())
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())  # Probe still out
+
+        self.breaker.record(True, 1.0)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.stats()["calls"], 0)
+        self.assertEqual(self.breaker.score(), 1.0)
+
+    def test_failed_probe_reopens(self):
+        for _ in range(3):
+            self.breaker.record(False, 1.0)
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(False, 1.0)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.trips, 2)
+        self.assertFalse(self.breaker.allow())
+
+    def test_hedge_delay_needs_successes(self):
+        self.assertIsNone(self.breaker.hedge_delay(0.5))
+        for latency in (0.1, 0.2, 2.0):
+            self.breaker.record(True, latency)
+        self.assertEqual(self.breaker.hedge_delay(0.5), 2.0)
+        self.assertEqual(self.breaker.hedge_delay(3.0), 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Claude API sync generations: pooled HTTP, explicit timeout and cancellation"""
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from brainbot import CLAUDE_API_TIMEOUT, CancelToken, ClaudeAPIProvider, PooledHTTPClient, cancel_scope
+
+
+class FakeMessagesAPI(BaseHTTPRequestHandler):
+    """Answers like the Messages API, or hangs while the server's `hang` event is clear"""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((dict(self.headers), request))
+        if self.server.hang:
+            self.server.release.wait(10)
+        body = json.dumps({"content": [{"type": "text", "text": "A shadow rises."}],
+                           "usage": {"input_tokens": 12}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ClaudeAPIProviderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMessagesAPI)
+        self.server.requests, self.server.hang, self.server.release = [], False, threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(self.server.release.set)
+
+        self.provider = ClaudeAPIProvider(api_key="test-key", model="claude-test")
+        self.provider._available = True
+        self.provider._http = PooledHTTPClient(f"http://127.0.0.1:{self.server.server_port}",
+                                               timeout=CLAUDE_API_TIMEOUT,
+                                               headers={"x-api-key": "test-key"})
+        self.addCleanup(self.provider.close)
+
+    def test_generates_over_the_pooled_client(self):
+        self.assertEqual(self.provider._generate_text("Describe the enemy", 50), "A shadow rises.")
+        headers, request = self.server.requests[0]
+        self.assertEqual(headers["x-api-key"], "test-key")
+        self.assertEqual(request["model"], "claude-test")
+        self.assertEqual(request["messages"], [{"role": "user", "content": "Describe the enemy"}])
+
+    def test_cancel_aborts_a_running_request(self):
+        self.server.hang = True
+        token = CancelToken()
+        results = []
+
+        def generate():
+            with cancel_scope(token):
+                results.append(self.provider._generate_text("Describe the enemy", 50))
+
+        thread = threading.Thread(target=generate)
+        thread.start()
+        while not self.server.requests:
+            time.sleep(0.01)
+        begun = time.monotonic()
+        token.cancel()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.monotonic() - begun, 2.0)
+        self.assertEqual(results, [None])
+
+    def test_requests_have_an_explicit_timeout(self):
+        provider = ClaudeAPIProvider(api_key="test-key")
+        self.assertEqual(provider._http._timeout, 30.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
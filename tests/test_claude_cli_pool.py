@@ -0,0 +1,107 @@
+"""Claude CLI worker pool: every prompt gets its own conversation"""
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import brainbot
+from brainbot import ClaudeCLIWorkerPool
+
+# Stands in for `claude --input-format stream-json`: answers each prompt with
+# the prompt and how many prompts its conversation has seen so far. "overloaded"
+# gets an error result and "crash" makes the process exit without answering.
+FAKE_CLI = textwrap.dedent("""
+    import json, sys
+    seen = []
+    for line in sys.stdin:
+        seen.append(json.loads(line)["message"]["content"])
+        if seen[-1] == "crash":
+            sys.exit(1)
+        print(json.dumps({"type": "system", "subtype": "init"}), flush=True)
+        if seen[-1] == "overloaded":
+            print(json.dumps({"type": "result", "is_error": True, "result": "Overloaded"}), flush=True)
+            continue
+        result = f"{seen[-1]} after {len(seen) - 1} earlier prompts"
+        print(json.dumps({"type": "result", "is_error": False, "result": result}), flush=True)
+""")
+
+# A CLI without stream-json support: plain text out, whatever comes in
+PLAIN_CLI = textwrap.dedent("""
+    import sys
+    print("error: unknown option '--input-format'")
+    sys.exit(1)
+""")
+
+ONESHOT_CLI = textwrap.dedent("""
+    import sys
+    print(f"one-shot: {sys.stdin.read()}")
+""")
+
+
+class ClaudeCLIWorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.scripts = {}
+        for name, source in (("stream", FAKE_CLI), ("plain", PLAIN_CLI), ("oneshot", ONESHOT_CLI)):
+            self.scripts[name] = Path(directory.name) / f"{name}.py"
+            self.scripts[name].write_text(source)
+        for name, command in (("CLAUDE_CLI_STREAMING", "stream"), ("CLAUDE_CLI_ONESHOT", "oneshot")):
+            patcher = mock.patch.object(brainbot, name, [sys.executable, str(self.scripts[command])])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_prompts_do_not_share_a_conversation(self):
+        pool = ClaudeCLIWorkerPool(size=1, timeout=10)
+        self.addCleanup(pool.close)
+
+        first = pool.run("quiz about Photosynthesis")
+        second = pool.run("enemy for Mitochondria")
+
+        self.assertEqual(first, "quiz about Photosynthesis after 0 earlier prompts")
+        self.assertEqual(second, "enemy for Mitochondria after 0 earlier prompts")
+        self.assertTrue(pool.persistent)
+
+    def test_next_process_is_started_before_the_next_prompt(self):
+        pool = ClaudeCLIWorkerPool(size=1, timeout=10)
+        self.addCleanup(pool.close)
+
+        pool.run("first")
+        worker = pool._idle.get_nowait()
+        pool._idle.put(worker)
+        self.assertTrue(worker.alive())
+
+    def test_error_result_keeps_streaming_mode(self):
+        pool = ClaudeCLIWorkerPool(size=1, timeout=10)
+        self.addCleanup(pool.close)
+
+        self.assertIsNone(pool.run("overloaded"))
+        self.assertTrue(pool.persistent)
+        self.assertEqual(pool.run("quiz"), "quiz after 0 earlier prompts")
+
+    def test_exit_after_another_worker_answered_keeps_streaming_mode(self):
+        pool = ClaudeCLIWorkerPool(size=2, timeout=10)
+        self.addCleanup(pool.close)
+
+        pool.run("quiz")  # Answered by one worker...
+        busy = pool._idle.get_nowait()  # ...which is now busy, so the other one gets the crash
+        try:
+            self.assertIsNone(pool.run("crash"))
+        finally:
+            pool._idle.put(busy)
+        self.assertTrue(pool.persistent)
+
+    def test_cli_without_stream_json_falls_back_to_one_process_per_prompt(self):
+        pool = ClaudeCLIWorkerPool(size=1, timeout=10)
+        self.addCleanup(pool.close)
+
+        with mock.patch.object(brainbot, "CLAUDE_CLI_STREAMING", [sys.executable, str(self.scripts["plain"])]):
+            self.assertEqual(pool.run("quiz"), "one-shot: quiz")
+        self.assertFalse(pool.persistent)
+
+
+if __name__ == "__main__":
+    unittest.main()
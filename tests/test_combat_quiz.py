@@ -0,0 +1,103 @@
+"""Speculative encounter quizzes: peeked at, never consumed early, promoted and awaited when needed"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from backend.services import combat_service
+from backend.services.combat_service import CombatService, CombatState
+from brainbot import AIPriority, QuizQuestion
+from game_data import Enemy, game_settings
+
+
+def make_quiz(text: str) -> QuizQuestion:
+    return QuizQuestion(question=text, answer="A", difficulty=1, question_type="fact", context="",
+                        options=["A", "B", "C"], correct_index=0)
+
+
+class SpeculativeQuizTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = CombatService()
+        self.state = CombatState(enemy=Enemy(name="Ink Wraith", hitpoints=10, attack=3, gold_reward=5,
+                                             exp_reward=7, note_title="Photosynthesis",
+                                             note_content="Plants make sugar from light."))
+        self.bank = mock.MagicMock()
+        patcher = mock.patch.object(combat_service, "quiz_bank", self.bank)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.service.cancel_ai_work, self.state)
+
+    def test_banked_question_is_only_drawn_when_the_player_asks(self):
+        self.bank.has_questions.return_value = True
+        self.bank.draw.return_value = make_quiz("Banked?")
+
+        self.service._speculate_quiz(self.state)
+        self.assertIsNone(self.state.quiz_future)
+        self.bank.draw.assert_not_called()
+
+        result = self.service.quiz_start(self.state)
+        self.assertEqual(result["question"], "Banked?")
+        self.bank.draw.assert_called_once()
+
+    def _speculate_blocked(self, release: threading.Event):
+        """Start a speculative quiz that generates until release is set (or it is cancelled)"""
+        self.bank.has_questions.return_value = False
+        self.bank.draw.return_value = None
+        started = threading.Event()
+        self.calls = []
+
+        def generate(note_title, note_content, priority, cancel):
+            self.calls.append(priority)
+            started.set()
+            while not release.is_set():
+                cancel.raise_if_cancelled()
+                time.sleep(0.01)
+            return make_quiz("Speculated?")
+
+        patcher = mock.patch.object(combat_service, "sync_generate_quiz_question", generate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service._speculate_quiz(self.state)
+        started.wait(5)
+
+    def test_running_speculation_is_promoted_and_awaited(self):
+        release = threading.Event()
+        self._speculate_blocked(release)
+        speculation = self.state.quiz_cancel
+        threading.Timer(0.2, release.set).start()
+        with mock.patch.object(combat_service, "promote_ai_requests") as promote:
+            result = self.service.quiz_start(self.state)
+
+        self.assertEqual(result["question"], "Speculated?")
+        self.assertEqual(self.calls, [AIPriority.PREFETCH])  # Not generated a second time
+        promote.assert_called_once_with(speculation)
+        self.assertFalse(self.state.cancel.cancelled)
+
+    def test_wait_is_bounded_by_the_interactive_timeout(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self._speculate_blocked(release)
+        speculation = self.state.quiz_cancel
+        with mock.patch.object(game_settings, "ai_interactive_timeout", 0.2), \
+                mock.patch.object(combat_service, "fallback_quiz_question", lambda *args: make_quiz("Fallback?")):
+            begun = time.monotonic()
+            result = self.service.quiz_start(self.state)
+
+        self.assertLess(time.monotonic() - begun, 2.0)
+        self.assertEqual(result["question"], "Fallback?")
+        self.assertTrue(speculation.cancelled)
+
+    def test_finished_speculation_is_served(self):
+        self.bank.has_questions.return_value = False
+        with mock.patch.object(combat_service, "sync_generate_quiz_question",
+                               lambda *args, **kwargs: make_quiz("Speculated?")):
+            self.service._speculate_quiz(self.state)
+            self.state.quiz_future.result(5)
+            result = self.service.quiz_start(self.state)
+        self.assertEqual(result["question"], "Speculated?")
+        self.bank.draw.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Embedding index: building, querying and IVF lists"""
+import tempfile
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+from unittest import mock
+
+import embedding_index
+from embedding_index import EmbeddingIndex, HashingEmbedder, OllamaEmbedder, chunk_note, create_embedder
+from game_data import GameSettings, game_settings
+
+
+@dataclass
+class Note:
+    path: Path
+    title: str
+    content: str
+
+
+NOTES = [
+    Note(Path("biology/Photosynthesis.md"), "Photosynthesis",
+         "# Photosynthesis\nPlants turn sunlight, water and carbon dioxide into glucose and oxygen.\n"
+         "Chlorophyll in the chloroplasts absorbs the light."),
+    Note(Path("biology/Respiration.md"), "Respiration",
+         "# Respiration\nCells break down glucose with oxygen to release energy as ATP.\n"
+         "It happens in the mitochondria."),
+    Note(Path("history/Rome.md"), "Rome",
+         "# Rome\nThe Roman Empire was ruled by emperors from Augustus onwards.\n"
+         "Its legions built roads across Europe."),
+]
+
+
+def make_index(directory: str) -> EmbeddingIndex:
+    index = EmbeddingIndex(directory)
+    index._embedder = HashingEmbedder()
+    return index
+
+
+class EmbeddingIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_build_and_query(self):
+        index = make_index(self.directory)
+        self.assertEqual(index.sync(NOTES), {"notes": 3, "embedded": 3, "reused": 0, "removed": 0})
+        self.assertTrue(index.ready)
+
+        score, chunk = index.search(index.embed_query("chlorophyll absorbs sunlight"), k=1)[0]
+        self.assertEqual(chunk.title, "Photosynthesis")
+        self.assertEqual(index.related_notes("Photosynthesis", k=1)[0][0], "Respiration")
+        self.assertEqual([c.title for _, c in index.search(index.embed_query("glucose"), k=5,
+                                                             exclude={"biology/Photosynthesis.md"})][0],
+                         "Respiration")
+
+    def test_sync_is_incremental_and_persisted(self):
+        index = make_index(self.directory)
+        index.sync(NOTES)
+        edited = NOTES[:2] + [Note(NOTES[2].path, "Rome", NOTES[2].content + "\nJulius Caesar crossed the Rubicon.")]
+        self.assertEqual(index.sync(edited), {"notes": 3, "embedded": 1, "reused": 2, "removed": 0})
+        self.assertEqual(index.sync(edited[:2])["removed"], 1)
+
+        reopened = make_index(self.directory)
+        self.assertEqual(reopened.stats()["notes"], 0)  # Loaded lazily
+        self.assertTrue(reopened.ready)
+        self.assertEqual(reopened.stats()["notes"], 2)
+
+    def test_answer_matching_tolerates_typos(self):
+        index = make_index(self.directory)
+        self.assertTrue(index.answer_matches("photosynthesys", "photosynthesis", 0.85))
+        self.assertFalse(index.answer_matches("Augustus", "photosynthesis", 0.85))
+
+    def test_search_without_numpy_scans_every_row(self):
+        with mock.patch.object(embedding_index, "NUMPY_AVAILABLE", False), \
+                mock.patch.object(game_settings, "embedding_ivf_min_chunks", 0):
+            index = make_index(self.directory)
+            index.sync(NOTES)
+            self.assertEqual(index.stats()["ivf_lists"], 0)
+            self.assertEqual(index.search(index.embed_query("Roman legions"), k=1)[0][1].title, "Rome")
+
+    @unittest.skipUnless(embedding_index.NUMPY_AVAILABLE, "numpy not installed")
+    def test_ivf_lists_are_built_and_probed(self):
+        notes = [Note(Path(f"topic/{i}.md"), f"Topic {i}", f"Topic {i} covers subject{i} and detail{i}.")
+                 for i in range(embedding_index.IVF_ROWS_PER_LIST * 2)]
+        with mock.patch.object(game_settings, "embedding_ivf_min_chunks", 0), \
+                mock.patch.object(game_settings, "embedding_ivf_probes", 1):
+            index = make_index(self.directory)
+            index.sync(notes)
+            self.assertEqual(index.stats()["ivf_lists"], 2)
+            results = index.search(index.embed_query("Topic 7 covers subject7 and detail7."), k=1)
+        self.assertEqual(results[0][1].title, "Topic 7")
+
+    def test_chunks_skip_code_and_frontmatter(self):
+        chunks = chunk_note("---\ntags: [a]\n---\n# Title\nSome prose here.\n```\ncode()\n```\n")
+        self.assertEqual(chunks, ["# Title\nSome prose here."])
+
+
+class CreateEmbedderTest(unittest.TestCase):
+
+    def test_auto_never_uses_ollama(self):
+        settings = GameSettings()
+        settings.embedding_backend = "auto"
+        with mock.patch.object(OllamaEmbedder, "probe") as probe:
+            self.assertIsInstance(create_embedder(settings), HashingEmbedder)
+        probe.assert_not_called()
+
+    def test_ollama_is_opt_in(self):
+        settings = GameSettings()
+        settings.embedding_backend = "ollama"
+        with mock.patch.object(OllamaEmbedder, "probe", return_value=True):
+            self.assertIsInstance(create_embedder(settings), OllamaEmbedder)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Enemy selection shared by the sync and async encounter paths"""
+import asyncio
+import random
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import obsidian
+from game_data import ObsidianNote
+from obsidian import ObsidianVault
+
+NOTES = [
+    ObsidianNote(path=Path(f"demo/{title}.md"), title=title, content=content,
+                 created=datetime(2024, 1, 1), modified=datetime(2024, 1, 1), tags=[])
+    for title, content in (
+        ("Photosynthesis", "# Photosynthesis\nPlants turn light into sugar in their chloroplasts."),
+        ("Roman Empire", "# Roman Empire\nAugustus became the first emperor in 27 BC."),
+    )
+]
+
+
+class EnemySelectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vault = ObsidianVault("demo")
+        for patcher in (mock.patch.object(obsidian, "CACHE_AVAILABLE", False),
+                        mock.patch.object(self.vault, "_ai_enemy_generation_ready", return_value=False)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_sync_and_async_pick_the_same_enemy(self):
+        random.seed(7)
+        sync_enemy = self.vault.get_enemy_for_level(3, NOTES)
+        random.seed(7)
+        async_enemy = asyncio.run(self.vault.aget_enemy_for_level(3, NOTES))
+        self.assertEqual((sync_enemy.note_title, sync_enemy.hitpoints), (async_enemy.note_title, async_enemy.hitpoints))
+        self.assertIn(sync_enemy.note_title, {"Photosynthesis", "Roman Empire"})
+
+    def test_cached_enemy_is_served_by_both_paths(self):
+        cached = self.vault.get_enemy_for_level(3, NOTES[:1])
+        with mock.patch.object(obsidian, "CACHE_AVAILABLE", True), \
+                mock.patch.object(obsidian, "get_cached_enemy", return_value=cached) as lookup:
+            self.assertIs(self.vault.get_enemy_for_level(3, NOTES[:1]), cached)
+            self.assertIs(asyncio.run(self.vault.aget_enemy_for_level(3, NOTES[:1])), cached)
+        self.assertEqual(lookup.call_args.args, ("Photosynthesis", NOTES[0].content, 3))
+
+    def test_no_notes_gives_a_standard_enemy(self):
+        self.assertFalse(asyncio.run(self.vault.aget_enemy_for_level(1, [])).note_title)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Fact mining and model-free quiz questions"""
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+from fact_quiz import FactQuiz, extract_facts
+
+BIOLOGY = """---
+kingdom: Plantae
+tags: [biology]
+---
+# Photosynthesis
+Photosynthesis is the process plants use to turn light into chemical energy.
+**Chlorophyll** - the green pigment that absorbs light.
+This is where the magic happens.
+
+## Inputs
+- Sunlight
+- Water
+- Carbon dioxide
+"""
+
+CELLS = """# Cells
+Mitochondria are the organelles that release energy from glucose.
+The **nucleus** holds the genetic material of the cell.
+"""
+
+
+@dataclass
+class Note:
+    path: Path
+    title: str
+    content: str
+    tags: List[str] = field(default_factory=list)
+
+
+class ExtractFactsTest(unittest.TestCase):
+
+    def test_definitions_terms_lists_and_frontmatter(self):
+        facts = {(f.kind, f.subject, f.answer) for f in extract_facts(BIOLOGY)}
+        self.assertIn(("definition", "Photosynthesis",
+                       "the process plants use to turn light into chemical energy"), facts)
+        self.assertIn(("definition", "Chlorophyll", "the green pigment that absorbs light"), facts)
+        self.assertIn(("list", "Inputs", "Carbon dioxide"), facts)
+        self.assertIn(("frontmatter", "kingdom", "Plantae"), facts)
+        self.assertFalse(any(f[0] == "frontmatter" and f[1] == "tags" for f in facts))
+
+    def test_vague_subjects_are_skipped(self):
+        self.assertFalse(any(f.subject.lower() == "this" for f in extract_facts(BIOLOGY)))
+
+    def test_bold_term_in_a_sentence(self):
+        terms = [f for f in extract_facts(CELLS) if f.kind == "term"]
+        self.assertEqual([(f.subject, f.source) for f in terms],
+                         [("nucleus", "The nucleus holds the genetic material of the cell.")])
+
+
+class FactQuizTest(unittest.TestCase):
+
+    def setUp(self):
+        self.quiz = FactQuiz()
+        self.notes = [Note(Path("bio/Photosynthesis.md"), "Photosynthesis", BIOLOGY, ["biology"]),
+                      Note(Path("bio/Cells.md"), "Cells", CELLS, ["biology"])]
+        self.quiz.sync(self.notes)
+
+    def test_sync_only_extracts_changed_notes(self):
+        self.assertEqual(self.quiz.sync(self.notes), 0)
+        self.notes[1].content += "\nRibosomes are the sites of protein synthesis.\n"
+        self.assertEqual(self.quiz.sync(self.notes), 1)
+        self.assertEqual(self.quiz.sync(self.notes[:1]), 0)
+        self.assertEqual(self.quiz.stats()["notes"], 1)
+
+    def test_questions_are_well_formed_and_rotate(self):
+        questions = [self.quiz.generate("Photosynthesis", BIOLOGY, difficulty=2) for _ in range(6)]
+        for question in questions:
+            self.assertEqual(len(question.options), 3)
+            self.assertEqual(len(set(o.lower() for o in question.options)), 3)
+            self.assertEqual(question.options[question.correct_index], question.answer)
+            self.assertEqual(question.difficulty, 2)
+        self.assertGreater(len({q.question for q in questions}), 3)
+
+    def test_unscanned_note_is_mined_on_demand(self):
+        question = self.quiz.generate("Loose note", "Osmosis is the movement of water across a membrane.")
+        self.assertIn(question.answer, {"the movement of water across a membrane", "Osmosis"})
+
+    def test_note_without_facts_gives_no_question(self):
+        self.assertIsNone(self.quiz.generate("Empty", "just some words"))
+
+
+if __name__ == "__main__":
+    unittest.main()
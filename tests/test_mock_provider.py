@@ -0,0 +1,54 @@
+"""Mock provider answers by prompt template, whatever the template's wording"""
+import json
+import unittest
+from unittest import mock
+
+from brainbot import ENEMY_SCHEMA, QUIZ_BATCH_SCHEMA, QUIZ_SCHEMA, MockProvider, enemy_prompt, quiz_bank_prompt, quiz_prompt
+from prompt_templates import PromptTemplate, prompt_registry
+
+EXCERPT = "Plants turn light into sugar. Chlorophyll absorbs red and blue light."
+
+
+class MockProviderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = MockProvider(latency_ms=0)
+        self.provider.initialize()
+
+    def test_answers_each_template(self):
+        quiz = json.loads(self.provider._completion(quiz_prompt("Photosynthesis", EXCERPT, True), QUIZ_SCHEMA))
+        self.assertIn(quiz["correct"], {"Plants turn light into sugar.", "Chlorophyll absorbs red and blue light."})
+
+        batch = json.loads(self.provider._completion(quiz_bank_prompt("Photosynthesis", EXCERPT, 3, True),
+                                                     QUIZ_BATCH_SCHEMA))
+        self.assertEqual(len(batch["questions"]), 3)
+
+        enemy = json.loads(self.provider._completion(enemy_prompt("Photosynthesis", EXCERPT, True), ENEMY_SCHEMA))
+        self.assertIn("Photosynthesis", enemy["narrative"])
+        self.assertIn("QUESTION:", self.provider._completion(quiz_prompt("Photosynthesis", EXCERPT)))
+
+    def test_reworded_template_keeps_its_output_shape(self):
+        reworded = {name: PromptTemplate(name, 99, "Totally new wording. $excerpt $response_format", ())
+                    for name in ("quiz", "enemy")}
+        reworded["quiz_bank"] = PromptTemplate("quiz_bank", 99, "$count please: $excerpt $response_format", ())
+        with mock.patch.dict(prompt_registry._templates, reworded):
+            batch = json.loads(self.provider._completion(quiz_bank_prompt("Photosynthesis", EXCERPT, 2, True),
+                                                         QUIZ_BATCH_SCHEMA))
+            narrative = self.provider._completion(enemy_prompt("Photosynthesis", EXCERPT))
+        self.assertEqual(len(batch["questions"]), 2)
+        self.assertIn("knowledge of Photosynthesis", narrative)
+
+    def test_unknown_prompt_fails_loudly(self):
+        with self.assertRaises(ValueError):
+            self.provider._completion("Write a poem about Photosynthesis")
+
+    def test_generation_end_to_end(self):
+        with mock.patch("brainbot.load_cached_quiz", return_value=None), \
+                mock.patch("brainbot.store_cached_result"):
+            quiz = self.provider.generate_quiz_question("Photosynthesis", EXCERPT)
+        self.assertIsNotNone(quiz)
+        self.assertEqual(quiz.options[quiz.correct_index], quiz.answer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Extractive note summaries and key phrases"""
+import unittest
+from types import SimpleNamespace
+
+from note_summary import SUMMARY_CHARS, NoteSummaries, summarize
+
+NOTE = """# Photosynthesis
+**Photosynthesis** is the process plants use to turn light into chemical energy.
+It takes place in the chloroplasts, where chlorophyll absorbs the light.
+The light reactions split water and release oxygen as a by-product.
+The Calvin cycle then fixes carbon dioxide into sugar using the energy from the light reactions.
+My aunt grows tomatoes in her garden every summer.
+Photosynthesis supplies the sugar and oxygen that almost all life depends on.
+
+## Factors
+- Light intensity limits the rate of photosynthesis.
+- Carbon dioxide concentration also limits the rate.
+- Temperature affects the enzymes of the Calvin cycle.
+"""
+
+
+class SummarizeTest(unittest.TestCase):
+
+    def test_summary_keeps_central_sentences_in_note_order(self):
+        summary = summarize(NOTE)
+        self.assertLessEqual(len(summary.sentences), 4)
+        self.assertIn("Photosynthesis is the process plants use to turn light into chemical energy.", summary.sentences)
+        self.assertNotIn("My aunt grows tomatoes in her garden every summer.", summary.sentences)
+        positions = [NOTE.replace("**", "").index(sentence) for sentence in summary.sentences]
+        self.assertEqual(positions, sorted(positions))
+        self.assertLessEqual(len(summary.text), SUMMARY_CHARS + 200)
+
+    def test_keyphrases_are_recurring_and_emphasized_terms(self):
+        keyphrases = [phrase.lower() for phrase in summarize(NOTE).keyphrases]
+        self.assertIn("photosynthesis", keyphrases)
+        self.assertTrue({"calvin cycle", "light reactions", "carbon dioxide"} & set(keyphrases))
+        self.assertNotIn("the", keyphrases)
+
+    def test_prompt_text_lists_key_terms(self):
+        summary = summarize(NOTE)
+        self.assertTrue(summary.prompt_text().startswith(summary.text))
+        self.assertIn("Key terms: ", summary.prompt_text())
+
+    def test_tiny_and_empty_notes(self):
+        self.assertEqual(summarize("Short note.").sentences, ["Short note."])
+        self.assertEqual(summarize("").sentences, [])
+
+
+class NoteSummariesTest(unittest.TestCase):
+
+    def test_summaries_are_cached_per_note_version(self):
+        summaries = NoteSummaries()
+        self.assertIs(summaries.get(NOTE), summaries.get(NOTE))
+        self.assertIsNot(summaries.get(NOTE), summaries.get(NOTE + "\nMore text about leaves and light."))
+
+    def test_schedule_replaces_summaries_of_gone_notes(self):
+        summaries = NoteSummaries()
+        summaries.get("Old note that was deleted from the vault.")
+        summaries.schedule([SimpleNamespace(content=NOTE)])
+        summaries._worker.join(5)
+        self.assertEqual(summaries.stats(), {"summaries": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""TinyLlama prompt prefix reuse"""
+import unittest
+
+from brainbot import LlamaModelRegistry, _ModelContext
+
+
+class FakeLlama:
+    """Tracks evaluated tokens like llama_cpp.Llama (one token per character)"""
+
+    def __init__(self):
+        self.input_ids = []
+        self.loads = 0
+        self.saves = 0
+
+    @property
+    def n_tokens(self):
+        return len(self.input_ids)
+
+    def tokenize(self, text: bytes):
+        return list(text)
+
+    def reset(self):
+        self.input_ids = []
+
+    def eval(self, tokens):
+        self.input_ids = self.input_ids + list(tokens)
+
+    def save_state(self):
+        self.saves += 1
+        return list(self.input_ids)
+
+    def load_state(self, state):
+        self.loads += 1
+        self.input_ids = list(state)
+
+    def generate(self, prompt: str):
+        """What create_completion leaves behind: the prompt and the sampled tokens"""
+        self.input_ids = list(prompt.encode("utf-8")) + [0, 0]
+
+
+class PrefixCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = LlamaModelRegistry()
+        self.context = _ModelContext()
+        self.context.llama = self.llama = FakeLlama()
+
+    def test_matching_live_context_is_left_alone(self):
+        self.registry._restore_prefix(self.context, "<quiz>")
+        self.llama.generate("<quiz>first note")
+        self.registry._restore_prefix(self.context, "<quiz>")
+        self.llama.generate("<quiz>second note")
+        self.registry._restore_prefix(self.context, "<quiz>")
+
+        self.assertEqual(self.registry.prefix_counts, {"live": 2, "restored": 0, "built": 1})
+        self.assertEqual((self.llama.saves, self.llama.loads), (1, 0))
+
+    def test_diverged_context_restores_the_saved_prefix(self):
+        self.registry._restore_prefix(self.context, "<quiz>")
+        self.llama.generate("<quiz>note")
+        self.registry._restore_prefix(self.context, "<enemy>")
+        self.llama.generate("<enemy>note")
+        self.registry._restore_prefix(self.context, "<quiz>")
+
+        self.assertEqual(self.registry.prefix_counts, {"live": 0, "restored": 1, "built": 2})
+        self.assertEqual(self.llama.input_ids, list(b"<quiz>"))
+
+    def test_unsupported_llama_disables_prefix_states(self):
+        class NoStateLlama(FakeLlama):
+            def save_state(self):
+                raise AttributeError("save_state")
+
+        self.context.llama = NoStateLlama()
+        self.registry._restore_prefix(self.context, "<quiz>")
+        self.assertFalse(self.context.prefix_cache_supported)
+        self.assertEqual(self.context.llama.input_ids, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
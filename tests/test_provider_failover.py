@@ -0,0 +1,73 @@
+"""Failover warming: TinyLlama only loads once the selected provider has failed"""
+import threading
+import unittest
+from unittest import mock
+
+import brainbot
+from brainbot import AIProviderManager
+from game_data import AIProviderType, game_settings
+
+
+class FakeProvider:
+
+    def __init__(self, available: bool):
+        self.available = available
+        self.initialized = threading.Event()
+
+    def is_available(self) -> bool:
+        return self.available
+
+    def initialize(self) -> bool:
+        self.initialized.set()
+        return True
+
+
+class FailoverWarmingTest(unittest.TestCase):
+
+    def setUp(self):
+        for patcher in (mock.patch.object(game_settings, "ai_provider", AIProviderType.OLLAMA),
+                        mock.patch.object(game_settings, "ai_warm_failover", True),
+                        mock.patch.object(brainbot, "TINYLLAMA_AVAILABLE", True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.manager = AIProviderManager()
+        self.ollama = FakeProvider(available=False)
+        self.tinyllama = FakeProvider(available=False)
+        self.manager._providers = {"ollama": self.ollama, "tinyllama": self.tinyllama}
+
+    def assert_warmed(self, warmed: bool):
+        self.assertEqual(self.tinyllama.initialized.wait(1 if warmed else 0.1), warmed)
+
+    def test_not_while_the_primary_is_starting(self):
+        self.assertFalse(self.manager.is_available())
+        self.assert_warmed(False)
+
+    def test_not_when_the_primary_came_up(self):
+        self.manager._initialization_complete = True
+        self.ollama.available = True
+        self.assertTrue(self.manager.is_available())
+        self.assert_warmed(False)
+
+    def test_after_the_primary_failed_to_initialize(self):
+        self.manager._initialization_complete = True
+        self.manager.is_available()
+        self.assert_warmed(True)
+
+    def test_after_the_primary_circuit_opened(self):
+        self.manager._initialization_complete = True
+        self.ollama.available = True
+        breaker = self.manager._breaker("ollama")
+        for _ in range(breaker.min_calls):
+            breaker.record(False, 1.0)
+        self.assertFalse(self.manager.is_available())
+        self.assert_warmed(True)
+
+    def test_setting_opts_out(self):
+        self.manager._initialization_complete = True
+        with mock.patch.object(game_settings, "ai_warm_failover", False):
+            self.manager.is_available()
+        self.assert_warmed(False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Quiz banks: drawing, refilling and remembering what was served"""
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import quiz_bank as quiz_bank_module
+import simple_cache
+from brainbot import QuizQuestion
+from game_data import game_settings
+from quiz_bank import QuizBank
+from simple_cache import AICache
+
+IDENTITY = ("mock", "test")
+NOTE = ("Photosynthesis", "Plants make sugar from light.")
+
+
+def make_questions(count: int, start: int = 0):
+    return [QuizQuestion(question=f"Question {i}?", answer="A", difficulty=1, question_type="fact", context="",
+                         options=["A", "B", "C"], correct_index=0) for i in range(start, start + count)]
+
+
+class QuizBankTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = AICache(str(Path(directory.name) / "cache.db"))
+        self.addCleanup(cache._conn.close)
+        self.generated = []
+
+        def generate(note_title, note_content, count, priority):
+            questions = make_questions(count, len(self.generated))
+            self.generated.extend(questions)
+            return questions
+
+        for patcher in (mock.patch.object(simple_cache, "_cache", cache),
+                        mock.patch.object(quiz_bank_module, "current_ai_identity", return_value=IDENTITY),
+                        mock.patch.object(quiz_bank_module, "sync_generate_quiz_questions", side_effect=generate),
+                        mock.patch.object(game_settings, "quiz_bank_size", 4),
+                        mock.patch.object(game_settings, "quiz_bank_low_water", 2)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def wait_for_refill(self, bank: QuizBank):
+        deadline = time.monotonic() + 5
+        while bank.stats()["refilling"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_empty_bank_refills_in_the_background(self):
+        bank = QuizBank(save_delay=60)
+        self.assertIsNone(bank.draw(*NOTE))
+        self.wait_for_refill(bank)
+        self.assertEqual(bank.stats()["unseen"], 4)
+        self.assertEqual(bank.draw(*NOTE, difficulty=3).question, "Question 0?")
+        self.assertEqual(bank.draw(*NOTE).difficulty, 1)
+
+    def test_low_bank_is_topped_up_and_unseen_questions_come_first(self):
+        bank = QuizBank(save_delay=60)
+        self.assertEqual(bank.fill(*NOTE), 4)
+        drawn = [bank.draw(*NOTE).question for _ in range(3)]  # Third draw leaves 1 unseen: low
+        self.wait_for_refill(bank)
+        self.assertEqual(drawn, ["Question 0?", "Question 1?", "Question 2?"])
+        self.assertEqual(bank.stats()["unseen"], 5)
+
+    def test_changed_note_drops_old_questions(self):
+        bank = QuizBank(save_delay=60)
+        bank.fill(*NOTE)
+        self.assertFalse(bank.has_questions(NOTE[0], NOTE[1] + " Edited."))
+        self.assertIsNone(bank.draw(NOTE[0], NOTE[1] + " Edited."))
+
+    def test_drawn_questions_stay_served_after_a_restart(self):
+        bank = QuizBank(save_delay=60)
+        bank.fill(*NOTE)
+        first = bank.draw(*NOTE).question
+        self.assertEqual(bank.flush(), 1)
+
+        restarted = QuizBank(save_delay=60)
+        self.assertNotEqual(restarted.draw(*NOTE).question, first)
+
+    def test_draws_are_saved_after_the_delay(self):
+        bank = QuizBank(save_delay=0.05)
+        bank.fill(*NOTE)
+        first = bank.draw(*NOTE).question
+        time.sleep(0.3)
+        self.assertEqual(bank.flush(), 0)  # Already saved by the timer
+        self.assertNotEqual(QuizBank().draw(*NOTE).question, first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""Provider slots: priority order, the interactive reserve, load shedding, promotion and cancellation"""
+import asyncio
+import threading
+import time
+import unittest
+
+from brainbot import AICancelled, AIPriority, AIQueueFull, AIScheduler, CancelToken, ProviderSlots
+
+
+def _wait_queued(slots, priority, count):
+    deadline = time.monotonic() + 5
+    while slots.stats()["queued"][priority.name.lower()] < count:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"{priority.name} never queued {count}")
+        time.sleep(0.01)
+
+
+class ProviderSlotsTest(unittest.TestCase):
+
+    def _take_in_thread(self, slots, priority, order, hold=0.0):
+        def take():
+            with slots.slot(priority):
+                order.append(priority)
+                time.sleep(hold)
+        thread = threading.Thread(target=take)
+        thread.start()
+        return thread
+
+    def test_free_slots_go_to_the_highest_priority_first(self):
+        slots = ProviderSlots("test", limit=1, reserve=0)
+        order = []
+        with slots.slot(AIPriority.INTERACTIVE):
+            threads = [self._take_in_thread(slots, AIPriority.BATCH, order)]
+            _wait_queued(slots, AIPriority.BATCH, 1)
+            threads.append(self._take_in_thread(slots, AIPriority.PREFETCH, order))
+            _wait_queued(slots, AIPriority.PREFETCH, 1)
+            threads.append(self._take_in_thread(slots, AIPriority.INTERACTIVE, order))
+            _wait_queued(slots, AIPriority.INTERACTIVE, 1)
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(order, [AIPriority.INTERACTIVE, AIPriority.PREFETCH, AIPriority.BATCH])
+        self.assertEqual(slots.stats()["in_use"], 0)
+
+    def test_background_work_leaves_the_reserve_for_players(self):
+        slots = ProviderSlots("test", limit=2, reserve=1)
+        order = []
+        with slots.slot(AIPriority.PREFETCH):
+            waiting = self._take_in_thread(slots, AIPriority.PREFETCH, order)
+            _wait_queued(slots, AIPriority.PREFETCH, 1)
+            with slots.slot(AIPriority.INTERACTIVE):  # Granted at once from the reserve
+                self.assertEqual(slots.stats()["in_use"], 2)
+            self.assertEqual(order, [])
+        waiting.join(5)
+        self.assertEqual(order, [AIPriority.PREFETCH])
+
+    def test_deep_background_queue_sheds_requests(self):
+        slots = ProviderSlots("test", limit=1, reserve=0, queue_limits={AIPriority.BATCH: 1})
+        order = []
+        with slots.slot(AIPriority.INTERACTIVE):
+            queued = self._take_in_thread(slots, AIPriority.BATCH, order)
+            _wait_queued(slots, AIPriority.BATCH, 1)
+            with self.assertRaises(AIQueueFull):
+                with slots.slot(AIPriority.BATCH):
+                    pass
+        queued.join(5)
+        self.assertEqual(order, [AIPriority.BATCH])
+        self.assertEqual(slots.stats()["shed"], 1)
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        slots = ProviderSlots("test", limit=1, reserve=0)
+        cancel = CancelToken()
+        errors = []
+
+        def wait():
+            try:
+                with slots.slot(AIPriority.PREFETCH, cancel=cancel):
+                    pass
+            except AICancelled as e:
+                errors.append(e)
+
+        with slots.slot(AIPriority.INTERACTIVE):
+            thread = threading.Thread(target=wait)
+            thread.start()
+            _wait_queued(slots, AIPriority.PREFETCH, 1)
+            cancel.cancel()
+            thread.join(5)
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(slots.stats()["queued"]["prefetch"], 0)
+        self.assertEqual(slots.stats()["in_use"], 0)
+
+    def test_promoted_request_jumps_the_background_queue(self):
+        slots = ProviderSlots("test", limit=1, reserve=0)
+        scheduler = AIScheduler()
+        scheduler._slots["test"] = slots
+        speculation = CancelToken()
+        order = []
+
+        def take(priority, cancel=None, label=None):
+            with slots.slot(priority, cancel=cancel):
+                order.append(label)
+
+        with slots.slot(AIPriority.INTERACTIVE):
+            threads = [threading.Thread(target=take, args=(AIPriority.BATCH, None, "batch"))]
+            threads[0].start()
+            _wait_queued(slots, AIPriority.BATCH, 1)
+            threads.append(threading.Thread(target=take, args=(AIPriority.PREFETCH, speculation, "speculation")))
+            threads[1].start()
+            _wait_queued(slots, AIPriority.PREFETCH, 1)
+            self.assertEqual(scheduler.promote(speculation), 1)
+            self.assertEqual(slots.stats()["queued"], {"interactive": 1, "prefetch": 0, "batch": 1})
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, ["speculation", "batch"])
+
+        # Requests made after the promotion queue as interactive straight away
+        with slots.slot(AIPriority.INTERACTIVE):
+            later = threading.Thread(target=take, args=(AIPriority.PREFETCH, speculation, "later"))
+            later.start()
+            _wait_queued(slots, AIPriority.INTERACTIVE, 1)
+        later.join(5)
+
+    def test_async_waiters_share_the_limit(self):
+        slots = ProviderSlots("test", limit=1, reserve=0)
+        active = []
+        peak = []
+
+        async def job():
+            async with slots.aslot(AIPriority.BATCH):
+                active.append(1)
+                peak.append(len(active))
+                await asyncio.sleep(0.01)
+                active.pop()
+
+        async def main():
+            await asyncio.gather(*(job() for _ in range(3)))
+
+        asyncio.run(main())
+        self.assertEqual(max(peak), 1)
+        self.assertEqual(slots.stats()["in_use"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
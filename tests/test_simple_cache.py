@@ -0,0 +1,99 @@
+"""AI result cache: TTL, LRU eviction and keys"""
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import simple_cache
+from game_data import Enemy, game_settings
+from simple_cache import AICache, cache_enemy, get_cached_enemy, make_content_hash
+
+
+class AICacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = AICache(str(Path(directory.name) / "cache.db"), max_entries=3)
+        self.addCleanup(self.cache._conn.close)
+
+    def test_round_trip_and_expiry(self):
+        self.cache.set("forever", {"a": 1})
+        self.cache.set("brief", [1, 2], ttl=0.05)
+        self.assertEqual(self.cache.get("forever"), {"a": 1})
+        self.assertEqual(self.cache.get("brief"), [1, 2])
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get("brief"))
+        self.assertEqual(self.cache.get("forever"), {"a": 1})
+
+    def test_maintenance_evicts_least_recently_used(self):
+        for key in ("a", "b", "c"):
+            self.cache.set(key, key)
+            time.sleep(0.01)
+        self.cache.get("a")  # a is now the most recently used
+        self.cache.set("d", "d")
+        self.assertEqual(self.cache.maintenance(), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), "a")
+
+    def test_pinned_entries_never_expire_or_get_evicted(self):
+        self.cache.set("compiled", "bank", ttl=0.05)
+        self.assertTrue(self.cache.pin("compiled"))
+        self.assertFalse(self.cache.pin("missing"))
+        self.cache.set("compiled", "refilled bank", ttl=0.05)  # Rewrites keep the pin
+        for key in ("a", "b", "c", "d"):
+            self.cache.set(key, key)
+            time.sleep(0.01)
+        time.sleep(0.05)
+        self.assertEqual(self.cache.maintenance(), 1)  # Only "a": pinned entries don't count toward the limit
+        self.assertEqual(self.cache.get("compiled"), "refilled bank")
+        self.assertEqual(self.cache.stats()["pinned"], 1)
+
+    def test_cache_from_before_pinning_is_upgraded(self):
+        path = self.cache.db_path + ".old"
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE ai_cache (key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL, "
+                     "created REAL NOT NULL, expires REAL, last_access REAL NOT NULL)")
+        conn.execute("INSERT INTO ai_cache VALUES ('old', 'ai', '1', 0, NULL, 0)")
+        conn.commit()
+        conn.close()
+        upgraded = AICache(path)
+        self.addCleanup(upgraded._conn.close)
+        self.assertTrue(upgraded.pin("old"))
+        self.assertEqual(upgraded.get("old"), 1)
+
+    def test_content_hash_separates_parts(self):
+        self.assertEqual(make_content_hash("a", 1), make_content_hash("a", 1))
+        self.assertNotEqual(make_content_hash("ab", "c"), make_content_hash("a", "bc"))
+
+
+class EnemyCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = AICache(str(Path(directory.name) / "cache.db"))
+        self.addCleanup(cache._conn.close)
+        for patcher in (mock.patch.object(simple_cache, "_cache", cache),
+                        mock.patch.object(game_settings, "enemy_cache_ttl", 60.0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.enemy = Enemy(name="Ink Wraith", hitpoints=10, attack=3, gold_reward=5, exp_reward=7, level=2)
+
+    def test_enemy_is_keyed_on_note_content_and_level(self):
+        cache_enemy("Photosynthesis", "Plants make sugar.", 2, self.enemy)
+        self.assertEqual(get_cached_enemy("Photosynthesis", "Plants make sugar.", 2), self.enemy)
+        self.assertIsNone(get_cached_enemy("Photosynthesis", "Plants make sugar from light.", 2))
+        self.assertIsNone(get_cached_enemy("Photosynthesis", "Plants make sugar.", 3))
+
+    def test_enemy_cache_off_by_default(self):
+        self.assertEqual(type(game_settings).__dataclass_fields__["enemy_cache_ttl"].default, 0.0)
+        with mock.patch.object(game_settings, "enemy_cache_ttl", 0.0):
+            cache_enemy("Photosynthesis", "Plants make sugar.", 2, self.enemy)
+        self.assertIsNone(get_cached_enemy("Photosynthesis", "Plants make sugar.", 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
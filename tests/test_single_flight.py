@@ -0,0 +1,104 @@
+"""SingleFlight coalescing and cancellation"""
+import asyncio
+import threading
+import time
+import unittest
+
+from brainbot import AICancelled, CancelToken, SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.coalesced, 3)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_errors_reach_followers_and_next_call_starts_fresh(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("key", lambda: (_ for _ in ()).throw(ValueError("boom")))
+        self.assertEqual(flight.do("key", lambda: 2), 2)
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = SingleFlight()
+        leader_token = CancelToken()
+        leader_started = threading.Event()
+        outcome = {}
+
+        def leader_work():
+            leader_started.set()
+            while not leader_token.cancelled:
+                time.sleep(0.01)
+            leader_token.raise_if_cancelled()
+
+        def leader():
+            try:
+                outcome["leader"] = flight.do("key", leader_work)
+            except AICancelled:
+                outcome["leader"] = "cancelled"
+
+        def follower():
+            outcome["follower"] = flight.do("key", lambda: "follower result")
+
+        leader_thread = threading.Thread(target=leader)
+        leader_thread.start()
+        leader_started.wait(5)
+        follower_thread = threading.Thread(target=follower)
+        follower_thread.start()
+        time.sleep(0.1)
+        leader_token.cancel()
+        leader_thread.join(5)
+        follower_thread.join(5)
+
+        self.assertEqual(outcome, {"leader": "cancelled", "follower": "follower result"})
+        self.assertEqual(flight.rerun, 1)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_async_cancelled_leader_does_not_cancel_followers(self):
+        flight = SingleFlight()
+        leader_token = CancelToken()
+
+        async def leader_work():
+            while not leader_token.cancelled:
+                await asyncio.sleep(0.01)
+            leader_token.raise_if_cancelled()
+
+        async def follower_work():
+            return "follower result"
+
+        async def run():
+            leader = asyncio.ensure_future(flight.ado("key", leader_work))
+            await asyncio.sleep(0.05)
+            follower = asyncio.ensure_future(flight.ado("key", follower_work))
+            await asyncio.sleep(0.05)
+            leader_token.cancel()
+            with self.assertRaises(AICancelled):
+                await leader
+            return await follower
+
+        self.assertEqual(asyncio.run(run()), "follower result")
+        self.assertEqual(flight.rerun, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Structured output: JSON and labeled parsing, schema validation and grammars"""
+import json
+import unittest
+
+from structured_output import (ENEMY_SCHEMA, QUIZ_BATCH_SCHEMA, QUIZ_SCHEMA, StructuredOutputStats, api_schema,
+                               parse_structured, schema_to_gbnf, validate)
+
+QUIZ = {"question": "What does chlorophyll absorb?", "correct": "Red and blue light",
+        "decoy": "Green light", "funny": "Sunscreen", "type": "fact"}
+
+
+class ValidateTest(unittest.TestCase):
+
+    def test_cleans_a_valid_question(self):
+        data = dict(QUIZ, Question="  What does chlorophyll absorb?  ", type="FACT")
+        del data["question"]
+        self.assertEqual(validate(data, QUIZ_SCHEMA), QUIZ)
+
+    def test_missing_required_field_fails(self):
+        data = dict(QUIZ)
+        del data["decoy"]
+        self.assertIsNone(validate(data, QUIZ_SCHEMA))
+        self.assertIsNone(validate(dict(QUIZ, correct="   "), QUIZ_SCHEMA))
+
+    def test_unknown_enum_and_missing_optional_use_the_default(self):
+        self.assertEqual(validate(dict(QUIZ, type="riddle"), QUIZ_SCHEMA)["type"], "concept")
+        data = dict(QUIZ)
+        del data["type"]
+        self.assertEqual(validate(data, QUIZ_SCHEMA)["type"], "concept")
+
+    def test_strings_are_clipped_to_max_length(self):
+        cleaned = validate(dict(QUIZ, correct="x" * 400), QUIZ_SCHEMA)
+        self.assertEqual(len(cleaned["correct"]), 150)
+
+    def test_arrays_drop_invalid_items(self):
+        batch = {"questions": [QUIZ, {"question": "No answers"}]}
+        self.assertEqual(validate(batch, QUIZ_BATCH_SCHEMA), {"questions": [QUIZ]})
+        self.assertIsNone(validate({"questions": [{"question": "No answers"}]}, QUIZ_BATCH_SCHEMA))
+        # A bare list for the one-field batch schema
+        self.assertEqual(validate([QUIZ], QUIZ_BATCH_SCHEMA), {"questions": [QUIZ]})
+
+    def test_rejects_wrong_types(self):
+        self.assertIsNone(validate("a question", QUIZ_SCHEMA))
+        self.assertIsNone(validate(dict(QUIZ, correct=True), QUIZ_SCHEMA))
+        self.assertIsNone(validate({"questions": QUIZ}, QUIZ_BATCH_SCHEMA))
+
+
+class ParseStructuredTest(unittest.TestCase):
+
+    def test_json_with_fences_and_chatter(self):
+        text = "Sure! Here it is:\n```json\n" + json.dumps(QUIZ) + "\n```"
+        self.assertEqual(parse_structured(text, QUIZ_SCHEMA), QUIZ)
+        self.assertEqual(parse_structured("Here you go: " + json.dumps(QUIZ) + " Enjoy!", QUIZ_SCHEMA), QUIZ)
+
+    def test_labeled_question(self):
+        text = ("QUESTION: What does chlorophyll absorb?\nCORRECT: Red and blue light\n"
+                "DECOY: Green light\nFUNNY: Sunscreen\nTYPE: fact")
+        self.assertEqual(parse_structured(text, QUIZ_SCHEMA), QUIZ)
+
+    def test_labeled_batch(self):
+        block = "QUESTION: Q{0}?\nCORRECT: A{0}\nDECOY: D{0}\nFUNNY: F{0}\n"
+        text = "Here are two:\n" + block.format(1) + "\n" + block.format(2) + "QUESTION: Unfinished?"
+        parsed = parse_structured(text, QUIZ_BATCH_SCHEMA)
+        self.assertEqual([q["question"] for q in parsed["questions"]], ["Q1?", "Q2?"])
+        self.assertEqual(parsed["questions"][1]["correct"], "A2")
+
+    def test_plain_text_narrative(self):
+        self.assertEqual(parse_structured("Narrative: A shadow rises.", ENEMY_SCHEMA),
+                         {"narrative": "A shadow rises."})
+        self.assertEqual(parse_structured('{"narrative": "A shadow rises."}', ENEMY_SCHEMA),
+                         {"narrative": "A shadow rises."})
+
+    def test_unparseable_completion(self):
+        self.assertIsNone(parse_structured("", QUIZ_SCHEMA))
+        self.assertIsNone(parse_structured(None, QUIZ_SCHEMA))
+        self.assertIsNone(parse_structured("I don't know any questions.", QUIZ_SCHEMA))
+
+
+class SchemaToolsTest(unittest.TestCase):
+
+    def test_api_schema_strips_parser_annotations(self):
+        cleaned = api_schema(QUIZ_BATCH_SCHEMA)
+        self.assertNotIn("x-label", json.dumps(cleaned))
+        self.assertEqual(cleaned["properties"]["questions"]["items"]["required"], QUIZ_SCHEMA["required"])
+        self.assertIn("x-label", QUIZ_SCHEMA["properties"]["question"])
+
+    def test_gbnf_grammar(self):
+        grammar = schema_to_gbnf(QUIZ_BATCH_SCHEMA)
+        self.assertIn("\nroot ::= \"{\" ws ", grammar)
+        self.assertIn("root-questions-item ::= ", grammar)
+        self.assertIn('"\\"definition\\""', grammar)
+        self.assertIn("string ::= ", grammar)
+        with self.assertRaises(ValueError):
+            schema_to_gbnf({"type": "number"})
+
+    def test_stats_failure_rate(self):
+        stats = StructuredOutputStats()
+        stats.record("quiz", "json", True)
+        stats.record("quiz", "json", False)
+        stats.record("enemy", "labeled", True)
+        self.assertAlmostEqual(stats.failure_rate("quiz"), 0.5)
+        self.assertAlmostEqual(stats.failure_rate(), 1 / 3)
+        self.assertEqual(stats.stats()["quiz/json"], {"parsed": 1, "failed": 1, "failure_rate": 0.5})
+
+
+if __name__ == "__main__":
+    unittest.main()